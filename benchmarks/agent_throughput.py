@@ -0,0 +1,236 @@
+"""
+端到端吞吐量基准测试
+用本地语料服务和模拟聊天模型运行 SiteExtractorAgent.extract_many，按不同并发数测量吞吐量、
+单个 URL 耗时的 p50 / p95 / p99 和峰值常驻内存，并与保存的基准结果比较
+
+用法：
+    python benchmarks/agent_throughput.py [--concurrency 1,8,32] [--requests 32]
+    python benchmarks/agent_throughput.py --workers 4       # 4 个进程提取，各进程并发 --concurrency
+    python benchmarks/agent_throughput.py --pack            # 多 URL 打包，并报告节省的请求和令牌
+    python benchmarks/agent_throughput.py --save-baseline   # 更新基准结果
+    python benchmarks/agent_throughput.py --check           # 出现回退时以退出码 1 结束
+
+基准结果与机器相关，更换机器后应先在修改前的代码上重新生成
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+from harness import CorpusServer, RSSSampler, install_fake_llm, percentile
+
+from src.agents.extractor_agent import SiteExtractorAgent
+from src.agents.process_pool import ProcessPoolExtractor
+from src.llm.providers import PROVIDERS, is_available
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "agent_throughput.json"
+
+
+def agent_config(args: argparse.Namespace) -> dict:
+    """离线运行的 Agent 配置：使用任一已安装的提供商创建 Agent，随后替换为模拟模型"""
+    provider = next((name for name in PROVIDERS if is_available(name)), None)
+    if provider is None:
+        raise SystemExit("需要至少安装一个 LLM 提供商的集成包（仅用于创建 Agent，不会发出请求）")
+    config = {
+        "model_name": "fake",
+        PROVIDERS[provider].api_key_field: "offline",
+        "cache": False,
+        "router": False,
+        "stream": args.stream,
+        # 语料都在同一个本地主机上，按主机排队会掩盖被测的吞吐量
+        "politeness": False,
+        "packing": args.pack,
+    }
+    if args.llm_concurrency:
+        config["llm_concurrency"] = args.llm_concurrency
+    return config
+
+
+async def run_level(
+    server: CorpusServer, args: argparse.Namespace, concurrency: int, offset: int
+) -> dict:
+    """在一个并发数下运行一轮，返回吞吐量、耗时分位数和峰值内存"""
+    fake_llm = functools.partial(
+        install_fake_llm,
+        latency_ms=args.llm_latency_ms,
+        tokens_per_second=args.tokens_per_second,
+    )
+    urls = server.urls(args.requests, offset=offset + 1)
+    if args.workers > 1:
+        # 多进程：计入进程启动时间；内存只统计父进程
+        extractor = ProcessPoolExtractor(agent_config(args), args.workers, initializer=fake_llm)
+        async with RSSSampler() as sampler:
+            start = time.perf_counter()
+            results = [
+                result async for result in extractor.extract_many(urls, concurrency=concurrency)
+            ]
+            elapsed = time.perf_counter() - start
+        packing = extractor.packing_stats()
+    else:
+        async with SiteExtractorAgent(agent_config(args)) as agent:
+            fake_llm(agent)
+            # 预热：建立连接池、加载解析器，不计入结果
+            await agent.extract(server.urls(1, offset=offset)[0])
+
+            async with RSSSampler() as sampler:
+                start = time.perf_counter()
+                results = [
+                    result async for result in agent.extract_many(urls, concurrency=concurrency)
+                ]
+                elapsed = time.perf_counter() - start
+            packing = agent.packing_stats()
+
+    latencies = [result["timings"]["extract"] for result in results if result.get("timings")]
+    tiers: dict[str, int] = {}
+    for result in results:
+        tiers[result.get("tier", "none")] = tiers.get(result.get("tier", "none"), 0) + 1
+    row = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(result.get("status") != "success" for result in results),
+        "throughput": round(len(results) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "peak_rss_mb": round(sampler.peak_mb, 1),
+        "tiers": tiers,
+    }
+    if args.pack:
+        # 预热的 URL 单独调用，不影响打包统计
+        row["packing"] = packing
+    return row
+
+
+def scenario(args: argparse.Namespace) -> dict:
+    """影响结果的参数，只有参数相同的基准结果才可以比较"""
+    params = {
+        "requests": args.requests,
+        "llm_latency_ms": args.llm_latency_ms,
+        "tokens_per_second": args.tokens_per_second,
+        "server_delay_ms": args.server_delay_ms,
+        "llm_concurrency": args.llm_concurrency,
+        "stream": args.stream,
+        # 语料都在同一个本地主机上，按主机排队会掩盖被测的吞吐量
+        "politeness": False,
+    }
+    if args.workers > 1:
+        params["workers"] = args.workers
+    if args.pack:
+        params["packing"] = True
+    return params
+
+
+def compare(rows: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """与基准结果比较，返回回退说明（吞吐量下降或 p95 上升超过 tolerance）"""
+    regressions = []
+    previous = {row["concurrency"]: row for row in baseline.get("results", [])}
+    print(f"\n与基准结果比较（{baseline.get('python')}，{baseline.get('platform')}）：")
+    for row in rows:
+        base = previous.get(row["concurrency"])
+        if not base:
+            continue
+        throughput_change = row["throughput"] / base["throughput"] - 1
+        p95_change = row["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rss_change = row["peak_rss_mb"] - base["peak_rss_mb"]
+        print(
+            f"  并发 {row['concurrency']:>3}: 吞吐量 {throughput_change:+.1%}  "
+            f"p95 {p95_change:+.1%}  峰值内存 {rss_change:+.1f} MB"
+        )
+        if throughput_change < -tolerance:
+            regressions.append(f"并发 {row['concurrency']} 吞吐量下降 {-throughput_change:.1%}")
+        if p95_change > tolerance:
+            regressions.append(f"并发 {row['concurrency']} p95 上升 {p95_change:.1%}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    levels = [int(level) for level in args.concurrency.split(",")]
+    rows = []
+    async with CorpusServer(delay_ms=args.server_delay_ms) as server:
+        offset = 0
+        for concurrency in levels:
+            rows.append(await run_level(server, args, concurrency, offset))
+            offset += args.requests + 1
+
+    print(
+        f"{'并发':>6}{'请求':>6}{'错误':>6}{'吞吐量/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'峰值内存 MB':>13}"
+    )
+    for row in rows:
+        print(
+            f"{row['concurrency']:>6}{row['requests']:>6}{row['errors']:>6}{row['throughput']:>10.2f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['peak_rss_mb']:>13.1f}"
+        )
+    if args.pack:
+        print("\n打包（与逐个 URL 调用相比）：")
+        for row in rows:
+            packing = row["packing"]
+            baseline = packing["baseline_input_tokens"]
+            requests = row["requests"] - packing["calls_saved"]
+            print(
+                f"  并发 {row['concurrency']:>3}: LLM 请求 {requests}/{row['requests']}  "
+                f"打包 {packing['packed_calls']} 次（{packing['packed_pages']} 个网页）  "
+                f"回退 {packing['fallbacks']}  "
+                f"估算输入令牌 {packing['estimated_input_tokens']}/{baseline}"
+                f"（节省 {packing['input_tokens_saved'] / baseline if baseline else 0:.1%}）"
+            )
+
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scenario": scenario(args),
+            "results": rows,
+        }
+        BASELINE_PATH.write_text(
+            json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"\n已保存基准结果: {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        return 0
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    if baseline.get("scenario") != scenario(args):
+        print("\n参数与基准结果不同，跳过比较")
+        return 0
+    regressions = compare(rows, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"  回退: {regression}")
+    return 1 if regressions and args.check else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端吞吐量基准测试")
+    parser.add_argument("--concurrency", default="1,8,32", help="逗号分隔的并发数")
+    parser.add_argument("--requests", type=int, default=32, help="每个并发数下的请求数")
+    parser.add_argument(
+        "--llm-latency-ms", type=float, default=300.0, help="模拟模型的首令牌延迟（毫秒）"
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=1000.0, help="模拟模型的输出速率"
+    )
+    parser.add_argument(
+        "--server-delay-ms", type=float, default=20.0, help="语料服务的响应延迟（毫秒）"
+    )
+    parser.add_argument("--llm-concurrency", type=int, help="覆盖 Agent 的 LLM 并发上限")
+    parser.add_argument("--stream", action="store_true", help="使用流式调用")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="工作进程数，大于 1 时使用多进程提取"
+    )
+    parser.add_argument("--pack", action="store_true", help="把较小的网页合并为一次 LLM 请求")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基准结果")
+    parser.add_argument("--check", action="store_true", help="出现回退时以退出码 1 结束")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对变化幅度")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+正文提取基准测试
+在本地 HTML 语料上比较整页可见文本与正文提取结果的令牌数和解析耗时
+
+用法：
+    python benchmarks/content_extraction.py [--corpus benchmarks/corpus] [--repeat 20]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import lxml.html
+
+from src.tools.content_extractor import compose_main_text, extract_main_content, visible_text
+from src.tools.text_compactor import estimate_tokens
+
+
+def measure(html: str, repeat: int) -> dict:
+    """对单个页面分别测量整页文本和正文提取的令牌数与平均耗时（毫秒）"""
+    root = lxml.html.document_fromstring(html)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body_text = visible_text(root)
+    body_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        main_text = compose_main_text(extract_main_content(root))
+    main_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    return {
+        "body_tokens": estimate_tokens(body_text),
+        "main_tokens": estimate_tokens(main_text),
+        "body_ms": body_ms,
+        "main_ms": main_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文提取基准测试")
+    parser.add_argument(
+        "--corpus", default=str(Path(__file__).parent / "corpus"), help="HTML 语料目录"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="每个页面重复解析的次数")
+    args = parser.parse_args()
+
+    files = sorted(Path(args.corpus).glob("*.html"))
+    if not files:
+        print(f"语料目录中没有 HTML 文件: {args.corpus}")
+        sys.exit(1)
+
+    print(f"{'页面':<28}{'整页令牌':>10}{'正文令牌':>10}{'减少':>8}{'整页 ms':>10}{'正文 ms':>10}")
+    total_body = total_main = 0
+    for path in files:
+        result = measure(path.read_text(encoding="utf-8"), args.repeat)
+        total_body += result["body_tokens"]
+        total_main += result["main_tokens"]
+        reduction = (
+            1 - result["main_tokens"] / result["body_tokens"] if result["body_tokens"] else 0.0
+        )
+        print(
+            f"{path.name:<28}{result['body_tokens']:>10}{result['main_tokens']:>10}"
+            f"{reduction:>8.0%}{result['body_ms']:>10.2f}{result['main_ms']:>10.2f}"
+        )
+    if total_body:
+        print(f"\n总令牌：{total_body} → {total_main}（减少 {1 - total_main / total_body:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
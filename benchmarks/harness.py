@@ -0,0 +1,225 @@
+"""
+离线基准测试工具
+本地 HTTP 服务提供 benchmarks/corpus 中保存的页面，确定性的模拟聊天模型按配置的首令牌延迟和输出速率
+返回结果，另有内存（RSS）采样和分位数计算，供各基准测试脚本复用，不访问外网也不调用真实的 LLM
+"""
+
+import asyncio
+import json
+import re
+import resource
+import sys
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from aiohttp import web
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.tools.text_compactor import estimate_tokens
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+
+class CorpusServer:
+    """在本机随机端口上提供语料页面：/<页面名>?n=<序号>，序号只用于生成互不相同的 URL"""
+
+    def __init__(self, corpus_dir: Path = CORPUS_DIR, delay_ms: float = 0.0):
+        """初始化语料服务
+
+        Args:
+            corpus_dir: HTML 语料目录
+            delay_ms: 每个响应的模拟服务端延迟（毫秒）
+        """
+        self.pages = {
+            path.stem: path.read_text(encoding="utf-8")
+            for path in sorted(corpus_dir.glob("*.html"))
+        }
+        if not self.pages:
+            raise ValueError(f"语料目录中没有 HTML 文件: {corpus_dir}")
+        self.delay = delay_ms / 1000
+        self.requests = 0
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/{name}", self._page)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        self.base_url = f"http://127.0.0.1:{self._runner.addresses[0][1]}"
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._runner.cleanup()
+
+    async def _page(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        html = self.pages.get(request.match_info["name"])
+        if html is None:
+            raise web.HTTPNotFound()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return web.Response(text=html, content_type="text/html", charset="utf-8")
+
+    def urls(self, count: int, offset: int = 0) -> list[str]:
+        """按语料页面轮流生成 count 个互不相同的 URL"""
+        names = list(self.pages)
+        return [
+            f"{self.base_url}/{names[index % len(names)]}?n={index}"
+            for index in range(offset, offset + count)
+        ]
+
+
+class FakeChatModel:
+    """确定性的模拟聊天模型
+
+    根据提示词中的 URL、标题和正文生成固定结构的 JSON 结果
+    （打包请求按网页分别生成并按 URL 对应）；首个令牌前等待 latency_ms，
+    之后按 tokens_per_second 的速率输出。支持 ainvoke 和 astream，并返回 usage_metadata。
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        tokens_per_second: float = 200.0,
+        excerpt_chars: int = 400,
+        trailing_text: str = "",
+    ):
+        """初始化模拟模型
+
+        Args:
+            latency_ms: 首个令牌的延迟（毫秒）
+            tokens_per_second: 输出速率（令牌/秒），0 表示不限速
+            excerpt_chars: 结果中摘录的正文长度，决定输出令牌数
+            trailing_text: JSON 之后附带的说明文字（模拟模型的多余输出）
+        """
+        self.latency = latency_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.excerpt_chars = excerpt_chars
+        self.trailing_text = trailing_text
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def _reply(self, messages) -> str:
+        prompt = str(messages[-1].content)
+        sections = re.split(r"^### 网页 \d+$", prompt, flags=re.M)
+        if len(sections) > 1:
+            # 打包请求：每个网页一项，按 URL 对应
+            results = [self._result(section) for section in sections[1:]]
+            payload = {"results": [{"url": result["url"], "result": result} for result in results]}
+            return json.dumps(payload, ensure_ascii=False) + self.trailing_text
+        return json.dumps(self._result(prompt), ensure_ascii=False) + self.trailing_text
+
+    def _result(self, prompt: str) -> dict:
+        url = _prompt_line(prompt, "目标网站 URL：")
+        title = _prompt_line(prompt, "页面标题：")
+        body = prompt.split("以下是抓取到的页面正文文本：", 1)[-1].strip()
+        return {
+            "url": url,
+            "标题": title,
+            "描述": body[:80],
+            "主要内容": {"文本": body[: self.excerpt_chars]},
+            "联系方式": {"邮箱": sorted(set(re.findall(r"[\w.+-]+@[\w-]+\.[\w.]+", body)))},
+            "状态": "成功",
+        }
+
+    def _usage(self, messages, text: str) -> dict:
+        input_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = estimate_tokens(text)
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generation_time(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        text = self._reply(messages)
+        usage = self._usage(messages, text)
+        await asyncio.sleep(self.latency + self._generation_time(usage["output_tokens"]))
+        return AIMessage(
+            content=text, usage_metadata=usage, response_metadata={"model_name": "fake"}
+        )
+
+    async def astream(self, messages, **kwargs):
+        text = self._reply(messages)
+        await asyncio.sleep(self.latency)
+        # 每个消息块约 4 个令牌；提前停止时只统计已输出的部分
+        step = 16
+        for start in range(0, len(text), step):
+            piece = text[start:start + step]
+            await asyncio.sleep(self._generation_time(estimate_tokens(piece)))
+            yield AIMessageChunk(content=piece)
+        yield AIMessageChunk(content="", usage_metadata=self._usage(messages, text))
+
+
+def install_fake_llm(agent, **kwargs) -> None:
+    """将 Agent 的聊天模型（含打包请求使用的模型）替换为 FakeChatModel，
+    用作多进程提取的 initializer（配合 functools.partial）
+    """
+    agent.llm = FakeChatModel(**kwargs)
+    if agent.packer is not None:
+        agent.packer.llm = agent.llm
+
+
+class RSSSampler:
+    """后台定时采样进程常驻内存，记录采样期间的峰值（MB）"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.peak_mb = current_rss_mb()
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    async def _sample(self):
+        while True:
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            await asyncio.sleep(self.interval)
+
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存（MB）；没有 /proc 的系统上返回进程生命周期内的峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩法分位数，q 取 0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def _prompt_line(prompt: str, prefix: str) -> str:
+    for line in prompt.splitlines():
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+    return ""
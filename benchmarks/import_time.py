@@ -0,0 +1,70 @@
+"""
+导入耗时基准测试
+在全新的子进程中多次执行 `import src.agents` 与 `python -m src.main --help`，报告耗时中位数，
+并列出 -X importtime 统计中累计耗时最高的模块
+
+用法：
+    python benchmarks/import_time.py [--repeat 5] [--top 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = {
+    "import src.agents": [sys.executable, "-c", "import src.agents"],
+    "python -m src.main --help": [sys.executable, "-m", "src.main", "--help"],
+}
+
+
+def run_once(command: list[str]) -> float:
+    """执行一次命令，返回耗时（毫秒）"""
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT / "src")}
+    start = time.perf_counter()
+    subprocess.run(command, cwd=PROJECT_ROOT, env=env, check=True, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def slowest_modules(top: int) -> list[tuple[int, str]]:
+    """用 -X importtime 统计 import src.agents 时累计耗时最高的顶层模块（微秒）"""
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT / "src")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.agents"],
+        cwd=PROJECT_ROOT, env=env, check=True, capture_output=True, text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # 只统计顶层包，避免子模块重复计入
+        if "." not in name:
+            modules.append((int(cumulative), name))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每条命令的执行次数")
+    parser.add_argument("--top", type=int, default=10, help="列出耗时最高的模块数量")
+    args = parser.parse_args()
+
+    for label, command in COMMANDS.items():
+        timings = [run_once(command) for _ in range(args.repeat)]
+        print(
+            f"{label:<30} 中位数 {statistics.median(timings):8.1f} ms  最小 {min(timings):8.1f} ms"
+        )
+
+    print("\nimport src.agents 累计耗时最高的顶层模块：")
+    for cumulative, name in slowest_modules(args.top):
+        print(f"  {name:<30}{cumulative / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
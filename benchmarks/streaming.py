@@ -0,0 +1,98 @@
+"""
+流式解析基准测试
+用按固定速率输出令牌的模拟模型，比较一次性调用与流式调用的首个字段到达时间、完成时间和消耗的输出令牌数。
+模拟输出为 ```json 代码块包裹的提取结果，后面跟着一段说明文字（模型常见的多余输出）
+
+用法：
+    python benchmarks/streaming.py [--token-ms 10] [--trailing-tokens 80]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.llm.streaming import stream_json
+
+RESULT = {
+    "title": "Acme Robotics",
+    "description": "Industrial robots and automation software for small factories.",
+    "company_name": "Acme Robotics Ltd.",
+    "emails": ["sales@acme.example", "support@acme.example"],
+    "phones": ["+1 555 0100"],
+    "address": "42 Industrial Way, Springfield",
+    "products": ["Arm X1", "Conveyor C3", "FleetOS"],
+    "social_links": {"linkedin": "https://linkedin.com/company/acme", "github": "https://github.com/acme"},
+}
+
+
+class SimulatedModel:
+    """以固定间隔逐个输出令牌的模拟模型（约 4 个字符一个令牌）"""
+
+    def __init__(self, text: str, token_ms: float):
+        self.tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        self.token_ms = token_ms
+        self.emitted = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        for _ in self.tokens:
+            await asyncio.sleep(self.token_ms / 1000)
+            self.emitted += 1
+        return AIMessage(content="".join(self.tokens))
+
+    async def astream(self, messages, **kwargs):
+        for token in self.tokens:
+            await asyncio.sleep(self.token_ms / 1000)
+            self.emitted += 1
+            yield AIMessageChunk(content=token)
+
+
+async def run(token_ms: float, trailing_tokens: int):
+    text = (
+        "```json\n" + json.dumps(RESULT, ensure_ascii=False, indent=2) + "\n```\n"
+        + "以上是根据页面内容提取的信息。" * (trailing_tokens // 4)
+    )
+
+    model = SimulatedModel(text, token_ms)
+    start = time.perf_counter()
+    await model.ainvoke([])
+    blocking_ms = (time.perf_counter() - start) * 1000
+    blocking_tokens = model.emitted
+
+    model = SimulatedModel(text, token_ms)
+    first_field = []
+    start = time.perf_counter()
+
+    def on_field(key, value):
+        if not first_field:
+            first_field.append((time.perf_counter() - start) * 1000)
+
+    await stream_json(model, [], on_field=on_field)
+    streaming_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{'':<10}{'首个字段':>12}{'完成':>12}{'输出令牌':>10}")
+    print(f"{'一次性':<10}{blocking_ms:>10.0f}ms{blocking_ms:>10.0f}ms{blocking_tokens:>10}")
+    print(f"{'流式':<10}{first_field[0]:>10.0f}ms{streaming_ms:>10.0f}ms{model.emitted:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式解析基准测试")
+    parser.add_argument(
+        "--token-ms", type=float, default=10.0, help="模拟模型每个令牌的输出间隔（毫秒）"
+    )
+    parser.add_argument(
+        "--trailing-tokens", type=int, default=80, help="JSON 之后多余说明文字的令牌数"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.token_ms, args.trailing_tokens))
+
+
+if __name__ == "__main__":
+    main()
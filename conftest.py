@@ -14,6 +14,7 @@ warnings.filterwarnings(
     category=UserWarning
 )
 
-# 添加项目根目录到 Python 路径
+# 添加项目根目录和 src 目录到 Python 路径（模块中使用 from config.settings import settings）
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
@@ -1,8 +1,9 @@
 """
 Agent 模块
-包含主要的 Agent 实现
+包含主要的 Agent 实现和多进程提取器
 """
 
 from .extractor_agent import SiteExtractorAgent
+from .process_pool import ProcessPoolExtractor
 
-__all__ = ["SiteExtractorAgent"]
+__all__ = ["SiteExtractorAgent", "ProcessPoolExtractor"]
@@ -12,12 +12,43 @@
 import warnings
 import json
 import operator
+import inspect
+import asyncio
 from typing import TypedDict, Annotated, Any
-from collections.abc import Sequence
+from collections.abc import Sequence, Iterable, AsyncIterable, AsyncIterator, Callable
 from pathlib import Path
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from src.tools.browser_tool import BrowserTool
+from src.tools.browser_pool import BrowserPool
+from src.tools.request_filter import RequestFilter
+from src.tools.page_readiness import ReadinessPolicy
+from src.tools.http_fetcher import HttpFetcher
+from src.tools.page_fetcher import PageFetcher
+from src.tools.politeness import PolitenessScheduler, RobotsCache
+from src.tools.cache import TieredCache, FetchCache, LLMResultCache
+from src.tools.fingerprint import FingerprintStore, compare, make_fingerprint
+from src.tools.link_ranker import rank_links
+from src.tools.url_utils import ensure_scheme
+from src.tools.text_compactor import TextCompactor, estimate_tokens, fit_json_ld
+from src.llm.providers import is_available, select_provider, create_chat_model
+from src.llm.router import LLMRouter, build_router
+from src.llm.rate_limiter import RateLimiter, RateLimitedChatModel
+from src.llm.streaming import stream_json
+from src.llm.packing import PromptPacker
+from src.llm.prompt_cache import cache_tokens, enable_prompt_caching
+from src.llm.structured import (
+    ParseResult, bind_structured_output, broken_fragments, parse_response, reask_messages,
+)
+from src.prompts.schema import PackedExtraction, SiteExtraction
+from src.metrics.tracing import span
+from src.metrics.registry import (
+    EXTRACTIONS,
+    LLM_PARSE_RESULTS,
+    LLM_TOKENS,
+    PAGE_BYTES,
+    PAGE_TEXT_CHARS,
+)
 from config.settings import settings
 
 # 抑制 Python 3.14 与 Pydantic V1 的兼容性警告
@@ -32,48 +63,22 @@ warnings.filterwarnings(
 SYSTEM_PROMPT_FILE = Path(__file__).parent.parent / "prompts" / "system_prompt.md"
 SYSTEM_PROMPT = SYSTEM_PROMPT_FILE.read_text(encoding="utf-8") if SYSTEM_PROMPT_FILE.exists() else "你是一个专业的网站信息提取专家。"
 
+# 提取请求的静态前缀：系统提示词 + 输出要求，各次请求逐字节相同，放在消息开头供提供商缓存；
+# 网页内容（以及增量修改时上次的结果）只出现在其后的用户消息中
+EXTRACTION_PROMPT = SYSTEM_PROMPT + (
+    "\n\n用户消息中给出网页的抓取结果（或上次的提取结果与页面变化）。请严格按照上述要求进行信息提取，"
+    "并只输出一个合法的 JSON 对象，不要添加任何解释性文字或 Markdown 代码块。"
+)
+
 
-# 动态导入 LLM 提供商
-# 标记各提供商的可用性状态
-GEMINI_AVAILABLE = False
-OPENAI_AVAILABLE = False
-ANTHROPIC_AVAILABLE = False
-GROQ_AVAILABLE = False
-SILICONFLOW_AVAILABLE = False
-XUNFEI_AVAILABLE = False
-CEREBRAS_AVAILABLE = False
-
-# 导入 Google Gemini
-try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    GEMINI_AVAILABLE = True
-except ImportError:
-    pass
-
-# 导入 OpenAI
-try:
-    from langchain_openai import ChatOpenAI
-    OPENAI_AVAILABLE = True
-    # SiliconFlow、讯飞和 Cerebras 也使用 OpenAI 兼容的 API
-    SILICONFLOW_AVAILABLE = True
-    XUNFEI_AVAILABLE = True
-    CEREBRAS_AVAILABLE = True
-except ImportError:
-    pass
-
-# 导入 Anthropic
-try:
-    from langchain_anthropic import ChatAnthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    pass
-
-# 导入 Groq
-try:
-    from langchain_groq import ChatGroq
-    GROQ_AVAILABLE = True
-except ImportError:
-    pass
+# LLM 提供商在创建模型时按需导入，这里只检查集成包是否已安装
+GEMINI_AVAILABLE = is_available("gemini")
+OPENAI_AVAILABLE = is_available("openai")
+ANTHROPIC_AVAILABLE = is_available("anthropic")
+GROQ_AVAILABLE = is_available("groq")
+SILICONFLOW_AVAILABLE = is_available("siliconflow")
+XUNFEI_AVAILABLE = is_available("xunfei")
+CEREBRAS_AVAILABLE = is_available("cerebras")
 
 
 class AgentState(TypedDict):
@@ -83,10 +88,22 @@ class AgentState(TypedDict):
     - messages: 消息历史记录
     - extracted_info: 提取的信息
     - url: 目标网站 URL
+    - on_field: 流式调用时顶层字段完成的回调（可选）
+    - site: 是否为站点模式（抓取首页和相关子页面后合并提取）
+    - pending: 站点模式下 fetch 节点待抓取的 URL
+    - pages: 站点模式下已抓取的页面（首页在前），失败的页面带有 error
+    - subpages: rank 节点挑选的子页面，尚未排序时为 None
+    - page_data: merge 节点合并后的页面，首页抓取失败时为 None
     """
     messages: Annotated[Sequence[BaseMessage], operator.add]
     extracted_info: dict[str, Any]
     url: str | None
+    on_field: Callable[[str, Any], Any] | None
+    site: bool
+    pending: list[str]
+    pages: list[dict[str, Any]]
+    subpages: list[dict[str, Any]] | None
+    page_data: dict[str, Any] | None
 
 
 
@@ -104,23 +121,341 @@ class SiteExtractorAgent:
             config: 配置字典，包含模型配置和 API Key 等信息
                 - model_name: 模型名称
                 - temperature: 生成温度
-                - max_tokens: 最大令牌数
+                - max_tokens: 最大输出令牌数（默认 settings.max_tokens）
                 - google_api_key: Google API Key（可选）
                 - openai_api_key: OpenAI API Key（可选）
                 - anthropic_api_key: Anthropic API Key（可选）
                 - groq_api_key: Groq API Key（可选）
                 - siliconflow_api_key: SiliconFlow API Key（可选）
                 - xunfei_api_key: 讯飞 API Key（可选）
+                - browser_concurrency: 同时打开的页面数上限（可选）
+                - llm_concurrency: 同时进行的 LLM 请求数上限（可选）
+                - cache: 是否启用抓取缓存和 LLM 结果缓存（可选，默认 settings.cache_enabled）
+                - main_content: 是否只向 LLM 提供页面主体内容（可选，
+                  默认 settings.main_content_extraction）
+                - router: 是否在所有配置了 API Key 的提供商之间路由（可选，
+                  默认 settings.llm_router_enabled）
+                - stream: 是否流式调用 LLM 并增量解析 JSON（可选，默认 settings.llm_streaming）
+                - structured_output: 是否为支持的提供商启用结构化输出（可选，
+                  默认 settings.llm_structured_output）
+                - rate_limit_share: 本进程分得的 RPM / TPM 额度比例（可选，
+                  默认 1，多进程运行时为 1 / 进程数）
+                - politeness: 是否按主机限制并发和请求间隔并遵守 robots.txt（可选，默认关闭；
+                  batch、worker 命令和 ProcessPoolExtractor 按 settings.politeness_enabled 开启）
+                - recrawl: 是否按上次的页面指纹增量重新提取（可选，默认 settings.recrawl_enabled）
+                - site: 是否默认使用站点模式，合并首页和相关子页面后提取（可选，
+                  默认 settings.site_mode_enabled）
+                - packing: 是否把批量运行中较小的网页合并为一次 LLM 请求（可选，
+                  默认 settings.llm_packing_enabled）
         """
         self.config = config
+        self.provider: str | None = None
+        self.providers: list[str] = []
+        self.structured = config.get("structured_output", settings.llm_structured_output)
+        # 单一提供商时的客户端限流器，打包请求与单独调用共用额度
+        self._rate_limiter: RateLimiter | None = None
+        # 各 "提供商/模型" 的解析结果计数
+        self._parse_counts: dict[str, dict[str, int]] = {}
         self.llm = self._create_llm()
         self.graph = self._build_graph()
+        # 浏览器池在首次抓取时启动，由 Agent 持有并在 close() 中关闭
+        self.browser_pool = BrowserPool(
+            size=settings.browser_pool_size,
+            headless=settings.browser_headless,
+            contexts_per_browser=settings.browser_contexts_per_instance,
+            max_pages_per_browser=settings.browser_max_pages_per_instance,
+            max_memory_mb=settings.browser_max_memory_mb,
+        )
+        # 拦截与文本提取无关的子资源请求，统计在所有页面间累计
+        self.request_filter = RequestFilter(
+            blocked_resource_types=settings.browser_block_resource_types,
+            block_stylesheets=settings.browser_block_stylesheets,
+            block_trackers=settings.browser_block_trackers,
+            blocked_domains=settings.browser_blocked_domains,
+        )
+        self.readiness = ReadinessPolicy(
+            strategy=settings.browser_wait_strategy,
+            deadline_ms=settings.browser_wait_deadline_ms,
+            stable_ms=settings.browser_text_stable_ms,
+            domain_overrides=settings.browser_wait_overrides,
+        )
+        # 抓取与 LLM 调用分别限流，使不同 URL 的两个阶段可以重叠执行
+        self._page_semaphore = asyncio.Semaphore(
+            config.get("browser_concurrency")
+            or settings.browser_pool_size * settings.browser_contexts_per_instance
+        )
+        self._llm_semaphore = asyncio.Semaphore(
+            config.get("llm_concurrency") or settings.llm_concurrency
+        )
+        self.main_content = config.get("main_content", settings.main_content_extraction)
+        self.stream = config.get("stream", settings.llm_streaming)
+        # 调用 LLM 前压缩页面文本，使输入落在当前提供商的令牌预算内（路由时取各提供商的最小值）
+        self.compactor = TextCompactor(
+            budget_tokens=min(
+                settings.provider_input_token_budgets.get(name, settings.llm_input_token_budget)
+                for name in self.providers
+            )
+        )
+        # 多 URL 打包：同时等待 LLM 的较小网页合并为一次请求
+        # （路由时各提供商的输出结构和限额不同，不打包）
+        self.packer: PromptPacker | None = None
+        if config.get("packing", settings.llm_packing_enabled) and not isinstance(
+            self.llm, LLMRouter
+        ):
+            self.packer = PromptPacker(
+                self._create_pack_llm(),
+                SYSTEM_PROMPT,
+                budget_tokens=min(settings.llm_pack_budget_tokens, self.compactor.budget_tokens),
+                max_pages=settings.llm_pack_max_pages,
+                max_wait=settings.llm_pack_max_wait_ms / 1000,
+                semaphore=self._llm_semaphore,
+            )
+        # 两级缓存：页面抓取结果按 URL 缓存，LLM 结果按页面内容和模型配置缓存
+        self.fetch_cache: FetchCache | None = None
+        self.llm_cache: LLMResultCache | None = None
+        if config.get("cache", settings.cache_enabled):
+            self.fetch_cache = FetchCache(TieredCache(
+                settings.cache_path,
+                "fetch_cache",
+                memory_entries=settings.cache_memory_entries,
+                max_disk_entries=settings.cache_max_disk_entries,
+                ttl=settings.fetch_cache_ttl,
+            ))
+            self.llm_cache = LLMResultCache(TieredCache(
+                settings.cache_path,
+                "llm_cache",
+                memory_entries=settings.cache_memory_entries,
+                max_disk_entries=settings.cache_max_disk_entries,
+                ttl=settings.llm_cache_ttl or None,
+            ))
+        # 增量重新提取：按 URL 保存页面指纹和上次的提取结果，不随抓取缓存开关和有效期失效
+        self.fingerprints: FingerprintStore | None = None
+        if config.get("recrawl", settings.recrawl_enabled):
+            self.fingerprints = FingerprintStore(TieredCache(
+                settings.cache_path,
+                "fingerprints",
+                memory_entries=settings.cache_memory_entries,
+                max_disk_entries=settings.cache_max_disk_entries,
+            ))
+        # 服务端渲染的页面走 HTTP 快速通道，需要 JavaScript 渲染时才使用浏览器
+        http_fetcher = None
+        if settings.http_fast_path:
+            http_fetcher = HttpFetcher(
+                timeout=settings.http_timeout,
+                max_connections=settings.http_max_connections,
+                min_text_chars=settings.http_min_text_chars,
+            )
+        # 按主机排队：限制单个主机的并发和请求间隔，遵守 robots.txt
+        self.scheduler: PolitenessScheduler | None = None
+        if config.get("politeness", False):
+            robots = None
+            if settings.robots_txt_enabled:
+                robots = RobotsCache(
+                    user_agent=settings.robots_user_agent, ttl=settings.robots_txt_ttl
+                )
+            self.scheduler = PolitenessScheduler(
+                max_per_host=settings.host_max_concurrency,
+                min_delay=settings.host_min_delay,
+                robots=robots,
+                max_crawl_delay=settings.robots_max_crawl_delay,
+                lookahead=settings.politeness_lookahead,
+            )
+        self.fetcher = PageFetcher(
+            browser_factory=self._create_browser_tool,
+            http=http_fetcher,
+            browser_semaphore=self._page_semaphore,
+            cache=self.fetch_cache,
+            scheduler=self.scheduler,
+        )
+
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        await self.close()
+
+    async def close(self):
+        """释放 Agent 持有的资源（HTTP 会话、浏览器池和缓存连接）"""
+        await self.fetcher.close()
+        await self.browser_pool.close()
+        for cache in (self.fetch_cache, self.llm_cache, self.fingerprints):
+            if cache is not None:
+                cache.cache.close()
+
+    def cache_stats(self) -> dict[str, Any]:
+        """返回抓取缓存、LLM 结果缓存和页面指纹的命中统计（未启用时为空字典）"""
+        stats: dict[str, Any] = {}
+        if self.fetch_cache is not None:
+            stats["fetch"] = self.fetch_cache.stats()
+        if self.llm_cache is not None:
+            stats["llm"] = self.llm_cache.stats()
+        if self.fingerprints is not None:
+            stats["fingerprints"] = self.fingerprints.stats()
+        return stats
+
+    def llm_stats(self) -> dict[str, Any]:
+        """返回 LLM 路由和客户端限流的统计（未启用时为空字典）
+
+        包括各提供商的请求数、限流队列长度和等待时间。
+        """
+        return self.llm.stats() if isinstance(self.llm, (LLMRouter, RateLimitedChatModel)) else {}
+
+    def packing_stats(self) -> dict[str, Any]:
+        """返回多 URL 打包的统计（未启用时为空字典）
+
+        包括请求数、回退次数，以及相对逐个 URL 调用节省的请求数与估算输入令牌数。
+        """
+        return self.packer.stats() if self.packer else {}
+
+    def politeness_stats(self, top: int | None = None) -> dict[str, Any]:
+        """返回按主机的排队统计（未启用礼貌抓取时为空字典）
+
+        Args:
+            top: 只返回累计等待时间最长的前若干个主机（可选）
+        """
+        return self.scheduler.stats(top) if self.scheduler else {}
+
+    def parse_stats(self) -> dict[str, Any]:
+        """返回各 "提供商/模型" 的解析结果计数和解析失败率（不含 LLM 结果缓存命中）"""
+        stats = {}
+        for key, counts in self._parse_counts.items():
+            total = sum(counts.values())
+            stats[key] = {
+                **counts,
+                "total": total,
+                "failure_rate": round(counts.get("failed", 0) / total, 4) if total else 0.0,
+            }
+        return stats
+
+    def _record_parse(self, mode: str, provider: str, model: str):
+        LLM_PARSE_RESULTS.inc(provider=provider, model=model, result=mode)
+        counts = self._parse_counts.setdefault(f"{provider}/{model}", {})
+        counts[mode] = counts.get(mode, 0) + 1
+
+    @staticmethod
+    def _record_usage(response, provider: str, extracted_info: dict[str, Any]):
+        """累加响应的令牌用量到结果的 usage 字段，并计入令牌计数器"""
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        total = extracted_info.setdefault("usage", {})
+        for key, value in usage.items():
+            if isinstance(value, int):
+                total[key] = total.get(key, 0) + value
+        for token_type in ("input_tokens", "output_tokens"):
+            LLM_TOKENS.inc(usage.get(token_type) or 0, provider=provider, type=token_type[:-7])
+        # 提供商的提示词缓存：命中（cache_read）和写入（cache_creation）的输入令牌，
+        # 已包含在 input_tokens 中
+        for token_type, value in cache_tokens(usage).items():
+            total[f"{token_type}_tokens"] = total.get(f"{token_type}_tokens", 0) + value
+            LLM_TOKENS.inc(value, provider=provider, type=token_type)
+
+    async def _reask(
+        self, parsed: ParseResult, provider: str, extracted_info: dict[str, Any]
+    ) -> ParseResult:
+        """只把无法解析的片段交给模型重新输出一次，与其余可以解析的字段合并
+
+        修复请求不附带页面内容，令牌消耗远小于重新提取；请求失败或仍无法解析时返回原解析结果。
+        """
+        fields, fragments = broken_fragments(parsed.text, settings.llm_reask_max_chars)
+        if not fragments:
+            return parsed
+        try:
+            async with self._llm_semaphore:
+                with span("reask", fragments=len(fragments)):
+                    reply = await self.llm.ainvoke(reask_messages(fragments))
+        except Exception:
+            return parsed
+        self._record_usage(reply, provider, extracted_info)
+        fixed = parse_response(reply)
+        if fixed.data is None:
+            return parsed
+        return ParseResult({**fields, **fixed.data}, "reask", parsed.text)
+
+    @staticmethod
+    def _record_page_metrics(page_data: dict[str, Any], sizes: dict[str, Any]):
+        """将页面字节数和文本长度计入直方图（抓取缓存命中时不重复计入）"""
+        if page_data.get("cache") == "hit":
+            return
+        if sizes.get("page_bytes"):
+            PAGE_BYTES.observe(sizes["page_bytes"], tier=page_data.get("tier", ""))
+        PAGE_TEXT_CHARS.observe(sizes["text_chars"], kind="text")
+        PAGE_TEXT_CHARS.observe(sizes["main_content_chars"], kind="main_content")
+
+    @staticmethod
+    def _patch_prompt(
+        url: str,
+        previous: dict[str, Any],
+        diff: dict[str, Any],
+        metadata_text: str,
+        json_ld_text: str,
+    ) -> str:
+        """构建增量修改的用户提示词：上次的提取结果 + 新增或改动的段落（元数据变化时一并附上）"""
+        parts = [
+            f"目标网站 URL：{url}",
+            "以下是该页面上次的提取结果（JSON）：",
+            json.dumps(previous, ensure_ascii=False),
+            "页面自上次提取以来发生了变化。以下只列出新增或改动的段落，未列出的内容与上次相同"
+            + (f"；另有 {diff['removed']} 行已从页面中删除" if diff["removed"] else "") + "：",
+            "\n---\n".join(diff["changed"]) or "（无新增内容）",
+        ]
+        if metadata_text:
+            parts.append("\n以下是当前的页面元数据（JSON）：")
+            parts.append(metadata_text)
+        if json_ld_text:
+            parts.append("\n以下是当前页面中的结构化数据（JSON-LD）：")
+            parts.append(json_ld_text)
+        return (
+            "请根据下面列出的页面变化修改上次的提取结果：保留不受影响的字段，更新或补充受变化影响的字段，"
+            "删除已不再成立的信息，输出修改后的完整 JSON 对象。\n\n"
+            + "\n\n".join(parts)
+        )
+
+    async def _reuse_previous(
+        self,
+        state: AgentState,
+        url: str,
+        page_data: dict[str, Any],
+        previous: dict[str, Any],
+        recrawl: dict[str, Any],
+    ) -> AgentState:
+        """页面未变化时复用上次的提取结果，不调用 LLM"""
+        data = previous["extracted"]
+        if state.get("on_field"):
+            for key, value in data.items():
+                result = state["on_field"](key, value)
+                if inspect.isawaitable(result):
+                    await result
+        extracted_info = {"url": url, "status": "success"}
+        for key in ("tier", "fallback_reason", "readiness", "network"):
+            if page_data.get(key):
+                extracted_info[key] = page_data[key]
+        extracted_info["recrawl"] = recrawl
+        extracted_info.update(data)
+        response = AIMessage(content=json.dumps(data, ensure_ascii=False))
+        return {
+            "messages": list(state["messages"]) + [response],
+            "extracted_info": extracted_info,
+            "url": url,
+        }
+
+    def _create_browser_tool(self) -> BrowserTool:
+        """创建绑定共享浏览器池、请求过滤器和就绪策略的 BrowserTool"""
+        return BrowserTool(
+            headless=settings.browser_headless,
+            pool=self.browser_pool,
+            request_filter=self.request_filter,
+            readiness=self.readiness,
+        )
 
     def _create_llm(self):
         """创建 LLM 实例
 
         根据配置选择合适的 LLM 提供商并创建实例。
-        优先顺序：Google Gemini → OpenAI → Anthropic → Groq → SiliconFlow → 讯飞
+        优先顺序：Google Gemini → OpenAI → Anthropic → Groq → SiliconFlow → 讯飞 → Cerebras
+        启用路由时返回覆盖所有已配置提供商的 LLMRouter。
 
         Returns:
             对应的 LLM 实例
@@ -128,78 +463,58 @@ class SiteExtractorAgent:
         Raises:
             ValueError: 当没有提供有效的 API Key 时
         """
-        # 优先使用 Google Gemini
-        if self.config.get("google_api_key") and GEMINI_AVAILABLE:
-            return ChatGoogleGenerativeAI(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["google_api_key"]
-            )
-        
-        # 备用 OpenAI
-        elif self.config.get("openai_api_key") and OPENAI_AVAILABLE:
-            return ChatOpenAI(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["openai_api_key"]
-            )
-        
-        # 备用 Anthropic
-        elif self.config.get("anthropic_api_key") and ANTHROPIC_AVAILABLE:
-            return ChatAnthropic(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["anthropic_api_key"]
-            )
-        
-        # 备用 Groq
-        elif self.config.get("groq_api_key") and GROQ_AVAILABLE:
-            return ChatGroq(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["groq_api_key"]
-            )
-        
-        # 备用 SiliconFlow
-        elif self.config.get("siliconflow_api_key") and SILICONFLOW_AVAILABLE:
-            return ChatOpenAI(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["siliconflow_api_key"],
-                base_url="https://api.siliconflow.cn/v1"
-            )
-        
-        # 备用 讯飞
-        elif self.config.get("xunfei_api_key") and XUNFEI_AVAILABLE:
-            return ChatOpenAI(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["xunfei_api_key"],
-                base_url="https://maas-api.cn-huabei-1.xf-yun.com/v2"
-            )
-        
-        # 备用 Cerebras
-        elif self.config.get("cerebras_api_key") and CEREBRAS_AVAILABLE:
-            return ChatOpenAI(
-                model=self.config.get("model_name"),
-                temperature=self.config.get("temperature", 0.0),
-                api_key=self.config["cerebras_api_key"],
-                base_url="https://api.cerebras.ai/v1"
-            )
-        
-        # 无可用的 API Key
-        else:
+        if self.config.get("router", settings.llm_router_enabled):
+            router = build_router(self.config, structured=self.structured)
+            self.providers = [route.name for route in router.routes]
+            self.provider = self.providers[0]
+            return router
+
+        # 只导入选中提供商的 SDK
+        provider = select_provider(self.config)
+        if provider is None:
             raise ValueError(
                 "需要提供以下 API Key 之一: "
                 "google_api_key、openai_api_key、anthropic_api_key、"
                 "groq_api_key、siliconflow_api_key、xunfei_api_key 或 cerebras_api_key"
             )
+        self.provider = provider
+        self.providers = [provider]
+        base = create_chat_model(provider, self.config)
+        llm = bind_structured_output(base, provider) if self.structured else base
+        # 静态前缀按提供商标记为可缓存（限流在外层，按实际发出的请求计数）
+        llm = enable_prompt_caching(
+            llm, provider, base, SiteExtraction if self.structured else None
+        )
+        # 配置了 RPM / TPM 上限时在客户端排队，避免免费档位返回 429
+        limiter = RateLimiter.from_settings(
+            provider, self.config.get("model_name"), self.config.get("rate_limit_share", 1.0)
+        )
+        self._rate_limiter = limiter
+        return RateLimitedChatModel(llm, limiter) if limiter else llm
+
+    def _create_pack_llm(self):
+        """创建打包请求使用的 LLM 实例：输出上限为 settings.llm_pack_max_output_tokens，
+        结构化输出绑定 PackedExtraction，与单独调用共用限流器
+        """
+        base = create_chat_model(
+            self.provider, {**self.config, "max_tokens": settings.llm_pack_max_output_tokens}
+        )
+        llm = (
+            bind_structured_output(base, self.provider, PackedExtraction)
+            if self.structured
+            else base
+        )
+        llm = enable_prompt_caching(
+            llm, self.provider, base, PackedExtraction if self.structured else None
+        )
+        return RateLimitedChatModel(llm, self._rate_limiter) if self._rate_limiter else llm
 
     def _build_graph(self):
         """构建 LangGraph 工作流
 
         创建并配置 LangGraph 状态图，定义提取流程。
-        当前实现为单节点流程：提取 → 结束
+        单页模式：提取 → 结束
+        站点模式：抓取首页 → 挑选子页面 → 并发抓取子页面 → 合并正文 → 提取 → 结束
 
         Returns:
             编译后的 StateGraph 实例
@@ -210,8 +525,25 @@ class SiteExtractorAgent:
         # 添加提取节点
         graph.add_node("extractor", self._extract_node)
 
-        # 设置入口点为提取节点
-        graph.set_entry_point("extractor")
+        # 站点模式的节点：fetch 抓取待抓取的 URL，rank 从首页链接中挑选子页面，merge 合并各页面正文
+        graph.add_node("fetch", self._fetch_node)
+        graph.add_node("rank", self._rank_node)
+        graph.add_node("merge", self._merge_node)
+
+        # 设置入口点：站点模式先抓取首页，单页模式直接进入提取节点
+        graph.set_conditional_entry_point(
+            lambda state: "fetch" if state.get("site") else "extractor",
+            ["fetch", "extractor"],
+        )
+
+        # 首页抓取完成后挑选子页面，子页面抓取完成后合并
+        graph.add_conditional_edges(
+            "fetch",
+            lambda state: "rank" if state.get("subpages") is None else "merge",
+            ["rank", "merge"],
+        )
+        graph.add_edge("rank", "fetch")
+        graph.add_edge("merge", "extractor")
 
         # 添加边：提取完成后结束流程
         graph.add_edge("extractor", END)
@@ -219,33 +551,241 @@ class SiteExtractorAgent:
         # 编译并返回状态图
         return graph.compile()
 
-    async def extract(self, url: str) -> dict[str, Any]:
+    async def extract(
+        self,
+        url: str,
+        on_field: Callable[[str, Any], Any] | None = None,
+        site: bool | None = None,
+    ) -> dict[str, Any]:
         """执行提取任务
 
         启动提取工作流，从指定 URL 提取信息。
 
         Args:
             url: 目标网站 URL
+            on_field: 启用流式调用时，每个顶层字段完成后调用
+                on_field(键, 值)，可以是协程函数（可选）
+            site: 是否使用站点模式：同时抓取首页中与联系方式、公司介绍等相关的子页面，合并后一次提取
+                （可选，默认按配置的 site）
 
         Returns:
-            提取的信息字典，包含网站的标题、描述、内容等信息
+            提取的信息字典，包含网站的标题、描述、内容等信息；站点模式下 pages 列出参与合并的页面
         """
+        if site is None:
+            site = self.config.get("site", settings.site_mode_enabled)
         # 初始化状态
         initial_state: AgentState = {
             "messages": [HumanMessage(content=f"请提取网站信息: {url}")],
             "extracted_info": {},
-            "url": url
+            "url": url,
+            "on_field": on_field,
+            "site": site,
+            "pending": [url],
+            "pages": [],
+            "subpages": None,
+            "page_data": None,
         }
 
-        # 执行工作流
-        result = await self.graph.ainvoke(initial_state)
-        return result["extracted_info"]
+        # 执行工作流；各阶段的耗时记录在 timings 中，并计入阶段耗时直方图
+        with span("extract", url=url) as root:
+            result = await self.graph.ainvoke(initial_state)
+            extracted_info = result["extracted_info"]
+            root.set_attribute("status", extracted_info.get("status", "error"))
+        extracted_info["timings"] = root.timings()
+        EXTRACTIONS.inc(
+            status=extracted_info.get("status", "error"), tier=extracted_info.get("tier", "")
+        )
+        return extracted_info
+
+    async def extract_many(
+        self,
+        urls: Iterable[str] | AsyncIterable[str],
+        concurrency: int | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """批量执行提取任务，按完成顺序流式返回结果
+
+        URL 按需从输入中读取，同时处理的 URL 数量不超过 concurrency；
+        页面抓取和 LLM 调用分别受 Agent 的两个信号量约束。
+        启用礼貌抓取时预读一段输入并按主机交错调度，正在等待的主机不占用并发名额。
+        单个 URL 的失败只体现在它自己的结果中，不会中断整个批次。
+        读取输入出错时不再读取新的 URL，已开始的 URL 处理完并返回结果后再抛出该异常。
+
+        Args:
+            urls: URL 的同步或异步可迭代对象
+            concurrency: 同时处理的 URL 数量上限，默认使用 settings.batch_concurrency
+
+        Yields:
+            每个 URL 的提取结果字典（结构同 extract）
+        """
+        concurrency = max(1, concurrency or settings.batch_concurrency)
+        url_iter = _aiter_urls(urls)
+        if self.scheduler:
+            url_iter = self.scheduler.interleave(url_iter)
+        url_lock = asyncio.Lock()
+        results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        finished = object()
+        # 读取输入时发生的异常：记录后各 worker 停止读取，在返回已完成的结果之后抛出
+        input_error: list[BaseException] = []
+
+        async def worker():
+            while True:
+                async with url_lock:
+                    if input_error:
+                        return
+                    try:
+                        url = await anext(url_iter)
+                    except StopAsyncIteration:
+                        return
+                    except Exception as e:
+                        input_error.append(e)
+                        return
+                try:
+                    result = await self.extract(url)
+                except Exception as e:
+                    result = {"url": url, "status": "error", "error": str(e)}
+                finally:
+                    if self.scheduler:
+                        self.scheduler.unreserve(url)
+                await results.put(result)
+
+        async def supervisor(workers: list[asyncio.Task]):
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                await results.put(finished)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        supervisor_task = asyncio.create_task(supervisor(workers))
+        try:
+            while True:
+                result = await results.get()
+                if result is finished:
+                    break
+                yield result
+            await supervisor_task
+            if input_error:
+                raise input_error[0]
+        finally:
+            for task in workers + [supervisor_task]:
+                task.cancel()
+            await asyncio.gather(*workers, supervisor_task, return_exceptions=True)
+
+    async def _fetch_node(self, state: AgentState) -> AgentState:
+        """抓取节点（站点模式）：经共享的抓取工具并发抓取待抓取的 URL，单个页面失败时只记录错误"""
+        urls = [ensure_scheme(url) for url in state.get("pending") or [] if url]
+        scores = {item["url"]: item["score"] for item in state.get("subpages") or []}
+        with span("site_fetch", pages=len(urls)):
+            results = await asyncio.gather(
+                *(self.fetcher.fetch_page(url) for url in urls), return_exceptions=True
+            )
+        pages = list(state.get("pages") or [])
+        for url, result in zip(urls, results):
+            page: dict[str, Any] = {"url": url}
+            if url in scores:
+                page["score"] = scores[url]
+            if isinstance(result, BaseException):
+                page["error"] = str(result) or type(result).__name__
+            else:
+                page["page_data"] = result
+            pages.append(page)
+        return {"pages": pages, "pending": []}
+
+    async def _rank_node(self, state: AgentState) -> AgentState:
+        """排序节点（站点模式）：从首页链接中挑选至多 settings.site_max_subpages 个子页面"""
+        pages = state.get("pages") or []
+        landing = pages[0].get("page_data") if pages else None
+        subpages: list[dict[str, Any]] = []
+        if landing:
+            with span("link_rank"):
+                # 按跳转后的地址判断同站点并解析相对链接
+                base_url = landing.get("final_url") or pages[0]["url"]
+                subpages = rank_links(
+                    base_url, landing.get("links") or [], settings.site_max_subpages
+                )
+        return {"subpages": subpages, "pending": [item["url"] for item in subpages]}
+
+    async def _merge_node(self, state: AgentState) -> AgentState:
+        """合并节点（站点模式）：去掉各页面间重复的行（导航、页脚），按预算压缩各页面正文后合并为一个页面
+
+        首页至少占用 settings.site_landing_budget_share 的正文预算，其余页面平分剩余预算，
+        前面的页面用不完的预算顺延给后面的页面。元数据取自首页，结构化数据合并去重。
+        """
+        pages = state.get("pages") or []
+        landing = pages[0].get("page_data") if pages else None
+        if not landing:
+            return {"page_data": None}
+
+        with span("site_merge", pages=len(pages)):
+            fetched = [page for page in pages if page.get("page_data")]
+            # 为元数据和结构化数据预留四分之一的预算
+            remaining = self.compactor.budget_tokens * 3 // 4
+            landing_budget = int(remaining * settings.site_landing_budget_share)
+            seen_lines: set[str] = set()
+            sections = []
+            json_ld = []
+            seen_json_ld: set[str] = set()
+            for index, page in enumerate(fetched):
+                page_data = page["page_data"]
+                for item in page_data.get("json_ld") or []:
+                    key = json.dumps(item, ensure_ascii=False, sort_keys=True)
+                    if key not in seen_json_ld:
+                        seen_json_ld.add(key)
+                        json_ld.append(item)
+
+                source_text = page_data.get("text") or ""
+                main_content = page_data.get("main_content") or ""
+                if self.main_content and len(main_content) >= settings.main_content_min_chars:
+                    source_text = main_content
+                lines = []
+                for line in source_text.splitlines():
+                    line = " ".join(line.split())
+                    if line and line not in seen_lines:
+                        seen_lines.add(line)
+                        lines.append(line)
+
+                share = remaining // (len(fetched) - index)
+                if index == 0:
+                    share = max(share, landing_budget)
+                if share <= 0 or not lines:
+                    continue
+                text, _ = self.compactor.compact("\n".join(lines), share)
+                remaining -= estimate_tokens(text)
+                title = page_data.get("title") or ""
+                header = f"【页面 {index + 1}】{page['url']}" + (f"（{title}）" if title else "")
+                sections.append(header + "\n" + text)
+
+            merged = {
+                key: landing[key]
+                for key in ("url", "title", "metadata", "canonical", "lang", "tier",
+                            "fallback_reason", "readiness", "network", "cache")
+                if key in landing
+            }
+            merged.update({
+                "text": "\n\n".join(sections),
+                "main_content": "",
+                "json_ld": json_ld,
+                "pages": [
+                    {
+                        "url": page["url"],
+                        **({"score": page["score"]} if "score" in page else {}),
+                        **(
+                            {"tier": page["page_data"].get("tier")} if page.get("page_data")
+                            else {"error": page.get("error")}
+                        ),
+                    }
+                    for page in pages
+                ],
+            })
+            page_bytes = sum(page["page_data"].get("bytes") or 0 for page in fetched)
+            if page_bytes:
+                merged["bytes"] = page_bytes
+        return {"page_data": merged}
 
     async def _extract_node(self, state: AgentState) -> AgentState:
         """提取节点：从网站提取信息
         
-        先使用 BrowserTool 抓取网页内容，然后将系统提示词与网页信息一并交给 LLM，
-        通过一次调用完成结构化信息提取。
+        先抓取网页内容（HTTP 快速通道或浏览器），然后将系统提示词与网页信息一并交给 LLM，
+        通过一次调用完成结构化信息提取。站点模式下使用 merge 节点合并后的页面，不再抓取。
         
         Args:
             state: 当前状态
@@ -259,74 +799,243 @@ class SiteExtractorAgent:
                 raise ValueError("url 不能为空")
 
             # 如果用户未提供协议，则默认使用 https://
-            if not url.startswith(("http://", "https://")):
-                url = "https://" + url
-
-            # 使用浏览器抓取网页内容
-            async with BrowserTool(headless=settings.browser_headless) as browser:
-                page_data = await browser.fetch_page(url)
-
-            page_title = page_data.get("title") or ""
-            page_text = page_data.get("text") or ""
-            metadata = page_data.get("metadata") or {}
-            metadata_text = json.dumps(metadata, ensure_ascii=False)
-
-            # 构建一次性调用的提示词：系统提示词 + 带网页内容的用户消息
-            human_parts: list[str] = []
-            human_parts.append(f"目标网站 URL：{url}")
-            if page_title:
-                human_parts.append(f"页面标题：{page_title}")
-            human_parts.append("以下是抓取到的页面正文文本：")
-            human_parts.append(page_text)
-            if metadata:
-                human_parts.append("\n以下是抓取到的页面元数据（JSON）：")
-                human_parts.append(metadata_text)
-
-            human_prompt = (
-                "请严格按照系统提示词中的要求，基于下面提供的网页抓取结果进行信息提取，"
-                "并只输出一个合法的 JSON 对象，不要添加任何解释性文字或 Markdown 代码块。\n\n"
-                + "\n\n".join(human_parts)
-            )
+            url = ensure_scheme(url)
+
+            site = state.get("site", False)
+            # 增量重新提取按单个页面的指纹进行，站点模式不使用
+            fingerprints = None if site else self.fingerprints
+            previous = None
+            if site:
+                page_data = state.get("page_data")
+                if page_data is None:
+                    pages = state.get("pages") or []
+                    raise RuntimeError(pages[0].get("error") if pages else "首页抓取失败")
+            else:
+                # 增量重新提取：读取上次的指纹，抓取时按其中的验证头发起条件请求
+                validators = None
+                if fingerprints is not None:
+                    previous = await fingerprints.get(url)
+                if previous:
+                    validators = {
+                        "etag": previous.get("etag"),
+                        "last_modified": previous.get("last_modified"),
+                    }
+
+                # 抓取网页内容：优先 HTTP 快速通道，必要时回退到共享浏览器池
+                page_data = await self.fetcher.fetch_page(url, validators=validators)
+                if page_data.get("not_modified"):
+                    await fingerprints.refresh(url)
+                    return await self._reuse_previous(
+                        state, url, page_data, previous, {"status": "not_modified"}
+                    )
+
+            with span("prompt_build"):
+                page_title = page_data.get("title") or ""
+                metadata = dict(page_data.get("metadata") or {})
+                for key in ("canonical", "lang"):
+                    if page_data.get(key):
+                        metadata[key] = page_data[key]
+                metadata_text = json.dumps(metadata, ensure_ascii=False)
+                # 结构化数据至多占用四分之一的预算，超出时按条目保留
+                # （放不下的条目缩短或丢弃），始终是合法的 JSON
+                budget = self.compactor.budget_tokens
+                json_ld_text = fit_json_ld(page_data.get("json_ld") or [], budget // 4)
+
+                # 元数据和结构化数据占用的令牌从预算中扣除，正文至少保留一半预算
+                text_budget = max(
+                    budget - estimate_tokens(metadata_text + json_ld_text), budget // 2
+                )
+                # 优先使用正文提取结果，提取内容过短时回退到整页文本
+                source_text = page_data.get("text") or ""
+                text_source = "body"
+                main_content = page_data.get("main_content") or ""
+                if self.main_content and len(main_content) >= settings.main_content_min_chars:
+                    source_text, text_source = main_content, "main_content"
+                if site:
+                    text_source = "site"
+                page_text, compaction = self.compactor.compact(source_text, text_budget)
+                compaction["source"] = text_source
+
+                # 构建一次性调用的提示词：系统提示词 + 带网页内容的用户消息
+                human_parts: list[str] = []
+                human_parts.append(f"目标网站 URL：{url}")
+                if page_title:
+                    human_parts.append(f"页面标题：{page_title}")
+                if site:
+                    human_parts.append("以下是该网站首页和相关子页面的正文文本（按页面分段），请汇总为整个网站的信息：")
+                else:
+                    human_parts.append("以下是抓取到的页面正文文本：")
+                human_parts.append(page_text)
+                if metadata:
+                    human_parts.append("\n以下是抓取到的页面元数据（JSON）：")
+                    human_parts.append(metadata_text)
+                if json_ld_text:
+                    human_parts.append("\n以下是页面中的结构化数据（JSON-LD）：")
+                    human_parts.append(json_ld_text)
+
+                # 用户消息只包含网页内容，提取要求在静态前缀中；打包时直接作为该网页的分段
+                human_prompt = "\n\n".join(human_parts)
+                pack_section = human_prompt
+
+                # 页面指纹：标题、元数据和结构化数据合并计算一个哈希
+                signature = "\n".join((page_title, metadata_text, json_ld_text))
+                recrawl = None
+                if fingerprints is not None:
+                    recrawl = {"status": "new"}
+                    if previous:
+                        diff = compare(previous, page_text, signature)
+                        recrawl = {
+                            "distance": diff["distance"],
+                            "changed_ratio": diff["changed_ratio"],
+                        }
+                        if (
+                            not diff["metadata_changed"]
+                            and diff["distance"] <= settings.recrawl_simhash_threshold
+                            and diff["changed_ratio"] <= settings.recrawl_unchanged_max_ratio
+                        ):
+                            recrawl["status"] = "unchanged"
+                        elif diff["changed_ratio"] <= settings.recrawl_patch_max_ratio:
+                            # 只把改动的段落和上次的结果交给模型修改
+                            recrawl["status"] = "patched"
+                            recrawl["changed_sections"] = len(diff["changed"])
+                            human_prompt = self._patch_prompt(
+                                url, previous["extracted"], diff,
+                                metadata_text if diff["metadata_changed"] else "",
+                                json_ld_text if diff["metadata_changed"] else "",
+                            )
+                            pack_section = None
+                        else:
+                            recrawl["status"] = "full"
 
-            messages = [
-                SystemMessage(content=SYSTEM_PROMPT),
-                HumanMessage(content=human_prompt),
-            ]
+                messages = [
+                    SystemMessage(content=EXTRACTION_PROMPT),
+                    HumanMessage(content=human_prompt),
+                ]
 
-            # 单次调用 LLM，直接基于网页内容生成结构化结果
-            response = await self.llm.ainvoke(messages)
+            if recrawl is not None and recrawl["status"] == "unchanged":
+                # 内容几乎相同：复用上次的结果，不调用 LLM；
+                # 保留上次的指纹作为比较基准，避免小改动逐次累积
+                await fingerprints.refresh(
+                    url, etag=page_data.get("etag"), last_modified=page_data.get("last_modified")
+                )
+                return await self._reuse_previous(state, url, page_data, previous, recrawl)
+
+            # 页面内容、提示词和模型配置都未变化时直接复用缓存的提取结果
+            cache_key = None
+            cached_data = None
+            if self.llm_cache is not None:
+                with span("cache_lookup"):
+                    cache_key = LLMResultCache.make_key(
+                        EXTRACTION_PROMPT,
+                        human_prompt,
+                        self.config.get("model_name"),
+                        self.config.get("temperature", 0.0),
+                    )
+                    cached_data = await self.llm_cache.get(cache_key)
+
+            # 较小的网页交给打包器，与同时等待 LLM 的其他网页合并为一次请求；
+            # 需要逐字段回调时不打包，未能打包或打包结果不可用时按原方式单独调用
+            packed = None
+            if (
+                cached_data is None
+                and self.packer is not None
+                and pack_section is not None
+                and not state.get("on_field")
+                and estimate_tokens(pack_section) <= settings.llm_pack_page_tokens
+            ):
+                with span("llm_call", provider=self.provider or "", packed=True):
+                    packed = await self.packer.submit(url, pack_section)
+
+            if cached_data is not None:
+                response = AIMessage(content=json.dumps(cached_data, ensure_ascii=False))
+                if state.get("on_field"):
+                    for key, value in cached_data.items():
+                        result = state["on_field"](key, value)
+                        if inspect.isawaitable(result):
+                            await result
+            elif packed is not None:
+                response = AIMessage(
+                    content=json.dumps(packed.data, ensure_ascii=False),
+                    usage_metadata=packed.usage,
+                    response_metadata=packed.response_metadata,
+                )
+            else:
+                # 单次调用 LLM，直接基于网页内容生成结构化结果；
+                # 流式调用时字段完成即交给回调，JSON 对象闭合后停止接收
+                async with self._llm_semaphore:
+                    with span("llm_call", provider=self.provider or "", stream=self.stream):
+                        if self.stream:
+                            response = await stream_json(
+                                self.llm, messages, on_field=state.get("on_field")
+                            )
+                        else:
+                            response = await self.llm.ainvoke(messages)
 
             extracted_info = {
                 "url": url,
                 "status": "success",
             }
+            for key in ("tier", "fallback_reason", "readiness", "network", "pages"):
+                if page_data.get(key):
+                    extracted_info[key] = page_data[key]
+            extracted_info["compaction"] = compaction
+            if recrawl is not None:
+                extracted_info["recrawl"] = recrawl
+            response_metadata = getattr(response, "response_metadata", None) or {}
+            llm_info = {
+                **response_metadata.get("router", {}),
+                **response_metadata.get("rate_limit", {}),
+            }
+            if llm_info:
+                extracted_info["llm"] = llm_info
+            if response_metadata.get("stream"):
+                extracted_info["stream"] = response_metadata["stream"]
+            if response_metadata.get("packed"):
+                extracted_info["packed"] = response_metadata["packed"]
+            sizes = {
+                "page_bytes": page_data.get("bytes"),
+                "text_chars": len(page_data.get("text") or ""),
+                "main_content_chars": len(main_content),
+                "prompt_chars": len(EXTRACTION_PROMPT) + len(human_prompt),
+            }
+            extracted_info["sizes"] = {
+                key: value for key, value in sizes.items() if value is not None
+            }
+            self._record_page_metrics(page_data, extracted_info["sizes"])
+            provider = llm_info.get("provider") or self.provider or ""
+            model = llm_info.get("model") or self.config.get("model_name") or ""
+            if cached_data is None:
+                self._record_usage(response, provider, extracted_info)
+            if cache_key is not None:
+                extracted_info["cache"] = {
+                    "fetch": page_data.get("cache"),
+                    "llm": "hit" if cached_data is not None else "miss",
+                }
 
-            try:
-                content = response.content
-                if isinstance(content, list):
-                    content = " ".join(str(item) for item in content)
-                elif not isinstance(content, str):
-                    content = str(content)
-
-                # 保留对 ```json 包裹的兼容解析，防止模型仍然输出代码块
-                if "```json" in content:
-                    json_start = content.find("```json") + 7
-                    json_end = content.find("```", json_start)
-                    json_str = content[json_start:json_end].strip()
-                elif "```" in content:
-                    json_start = content.find("```") + 3
-                    json_end = content.find("```", json_start)
-                    json_str = content[json_start:json_end].strip()
-                else:
-                    json_str = content
-
-                extracted_data = json.loads(json_str)
-                extracted_info.update(extracted_data)
+            # 依次尝试工具调用参数、严格 JSON 和宽松修复；仍失败时只针对出错的片段重新询问一次
+            with span("json_parse"):
+                parsed = parse_response(response)
+            if packed is not None:
+                # 记录打包输出本身的解析方式
+                parsed = parsed._replace(mode=packed.mode)
+            if cached_data is None:
+                if parsed.data is None and settings.llm_parse_reask:
+                    parsed = await self._reask(parsed, provider, extracted_info)
+                self._record_parse(parsed.mode, provider, model)
 
-            except (json.JSONDecodeError, Exception) as parse_error:
-                extracted_info["raw_response"] = str(response.content)
+            if parsed.data is not None:
+                extracted_info.update(parsed.data)
+                extracted_info["parse"] = parsed.mode
+                if cache_key is not None and cached_data is None:
+                    await self.llm_cache.store(cache_key, parsed.data)
+                if fingerprints is not None:
+                    await fingerprints.store(
+                        url, make_fingerprint(page_data, page_text, signature, parsed.data)
+                    )
+            else:
+                extracted_info["raw_response"] = parsed.text
                 extracted_info["status"] = "parsed_error"
-                extracted_info["parse_error"] = str(parse_error)
+                extracted_info["parse_error"] = parsed.error
 
             updated_messages = list(state["messages"]) + [response]
 
@@ -349,4 +1058,18 @@ class SiteExtractorAgent:
                 },
                 "url": state.get("url"),
             }
-    
\ No newline at end of file
+    
+
+
+async def _aiter_urls(urls: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    """将同步或异步的 URL 序列统一为异步迭代器，并跳过空行"""
+    if isinstance(urls, AsyncIterable):
+        async for url in urls:
+            url = url.strip()
+            if url:
+                yield url
+    else:
+        for url in urls:
+            url = url.strip()
+            if url:
+                yield url
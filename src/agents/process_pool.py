@@ -0,0 +1,417 @@
+"""
+多进程提取
+将 URL 分发给多个工作进程，每个进程有自己的事件循环、浏览器池和 SiteExtractorAgent，
+使 Playwright 驱动、HTML 解析和 JSON 处理不再受限于单个 CPU 核心；
+父进程负责读取输入、限制在途 URL 数量（反压）并按完成顺序汇总结果
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import signal
+import traceback
+import zlib
+from collections import Counter
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from typing import Any, Callable, Optional
+
+from config.settings import settings
+from src.agents.extractor_agent import SiteExtractorAgent, _aiter_urls
+from src.tools.url_utils import host_key
+
+# 轮询进程间队列的间隔（秒），同时决定发现工作进程异常退出的延迟
+_POLL_INTERVAL = 0.5
+
+
+class ProcessPoolExtractor:
+    """多进程批量提取器，提供与 SiteExtractorAgent 相同的 extract_many 和各项统计方法
+
+    每个工作进程从自己的任务队列（分片）领取 URL，父进程把 URL 分给未完成 URL 最少的分片；
+    启用礼貌抓取时改为按主机分片，同一主机的 URL 总由同一个进程处理，
+    使按主机的并发和间隔限制在进程间同样成立。任务队列和结果队列都有容量上限：
+    输出写入变慢时工作进程随之等待，输入只在有空位时才继续读取。父进程记录分给每个分片、
+    尚未返回结果的 URL。工作进程异常退出（如浏览器崩溃导致进程被杀）时，
+    其已开始提取的 URL 记为错误结果，分片中其余的 URL 交给接替的新进程。
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        workers: int,
+        initializer: Optional[Callable[[Any], None]] = None,
+    ):
+        """初始化提取器
+
+        Args:
+            config: 传给每个工作进程中 SiteExtractorAgent 的配置（需要可以 pickle）
+            workers: 工作进程数
+            initializer: 在每个工作进程中以 Agent 为参数调用一次（可选，需要可以 pickle）
+        """
+        self.workers = max(1, workers)
+        # 各进程分摊客户端限流额度，合计不超过账户的 RPM / TPM 上限
+        self.config = {
+            **config,
+            "rate_limit_share": config.get("rate_limit_share", 1.0) / self.workers,
+            # 批量运行默认礼貌抓取
+            "politeness": config.get("politeness", settings.politeness_enabled),
+        }
+        self.initializer = initializer
+        # 各工作进程结束时上报的 LLM 和解析统计
+        self.worker_stats: list[dict[str, Any]] = []
+        self.restarts = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """工作进程在 extract_many 结束时退出，这里无需释放资源"""
+
+    def llm_stats(self) -> dict[str, Any]:
+        """汇总各工作进程的 LLM 路由和限流统计"""
+        return merge_stats([stats["llm"] for stats in self.worker_stats])
+
+    def parse_stats(self) -> dict[str, Any]:
+        """汇总各工作进程的解析结果计数"""
+        return merge_stats([stats["parse"] for stats in self.worker_stats])
+
+    def packing_stats(self) -> dict[str, Any]:
+        """汇总各工作进程的多 URL 打包统计（各进程分别打包，不跨进程合并请求）"""
+        return merge_stats([stats.get("packing", {}) for stats in self.worker_stats])
+
+    def politeness_stats(self, top: int | None = None) -> dict[str, Any]:
+        """汇总各工作进程按主机的排队统计（按主机分片时各主机只出现在一个进程中）
+
+        Args:
+            top: 只返回累计等待时间最长的前若干个主机（可选）
+        """
+        merged = merge_stats([stats.get("politeness", {}) for stats in self.worker_stats])
+        if top and merged.get("hosts"):
+            ordered = sorted(
+                merged["hosts"].items(),
+                key=lambda item: item[1]["avg_wait_ms"] * item[1]["requests"],
+                reverse=True,
+            )
+            merged["hosts"] = dict(ordered[:top])
+        return merged
+
+    async def extract_many(
+        self,
+        urls: Iterable[str] | AsyncIterable[str],
+        concurrency: int | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """在多个工作进程中批量提取，按完成顺序流式返回结果
+
+        Args:
+            urls: URL 的同步或异步可迭代对象
+            concurrency: 每个工作进程同时处理的 URL 数量上限，默认使用 settings.batch_concurrency
+
+        Yields:
+            每个 URL 的提取结果字典（结构同 SiteExtractorAgent.extract）
+        """
+        concurrency = max(1, concurrency or settings.batch_concurrency)
+        # spawn：子进程不继承父进程的事件循环和线程
+        context = multiprocessing.get_context("spawn")
+        by_host = self.config["politeness"]
+        # 每个分片一个任务队列，替补进程接管原进程的分片
+        shards = [context.Queue(maxsize=concurrency) for _ in range(self.workers)]
+        # 各分片的换代次数：工作进程异常退出后分片换用新队列，旧队列连同其中的 URL 一起丢弃
+        generation = [0] * self.workers
+        # 已分配到各分片、尚未返回结果的 URL（放入队列之前记录，工作进程在任何时刻退出都不会漏掉）
+        assigned: list[Counter] = [Counter() for _ in range(self.workers)]
+        outstanding = [0] * self.workers
+        # 各 URL 因工作进程退出而重新分配的次数
+        retried: Counter = Counter()
+        # 已放入结束标记的分片
+        closed: set[int] = set()
+        discarded: list[Any] = []
+        results = context.Queue(maxsize=self.workers * concurrency)
+        processes: dict[int, multiprocessing.Process] = {}
+        # 各工作进程所属的分片
+        shard_of: dict[int, int] = {}
+        # 各工作进程已开始提取、尚未返回结果的 URL
+        in_flight: dict[int, list[str]] = {}
+        finished: set[int] = set()
+        # 已完成初始化（创建 Agent）的工作进程
+        ready: set[int] = set()
+
+        def start(index: int, shard: int):
+            process = context.Process(
+                target=_worker_main,
+                args=(index, self.config, concurrency, shards[shard], results, self.initializer),
+                name=f"extractor-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            processes[index] = process
+            shard_of[index] = shard
+            in_flight[index] = []
+
+        def settle(shard: int, url: str):
+            """URL 已有结果，不再属于该分片"""
+            if assigned[shard][url] > 0:
+                assigned[shard][url] -= 1
+                outstanding[shard] -= 1
+                if not assigned[shard][url]:
+                    del assigned[shard][url]
+
+        async def put_shard(shard: int, item: Optional[str]):
+            """放入分片的任务队列
+
+            等待期间分片换用新队列时，URL 已在换代时重新放入新队列，
+            不再重复放入；结束标记改放入新队列。
+            """
+            while True:
+                current = generation[shard]
+                if (
+                    await asyncio.to_thread(_try_put, shards[shard], item)
+                    and generation[shard] == current
+                ):
+                    return
+                if generation[shard] != current and item is not None:
+                    return
+
+        async def feed():
+            """按任务队列的空位读取输入，读完后为每个分片放入一个结束标记"""
+            async for url in _aiter_urls(urls):
+                if by_host:
+                    # 按主机分片：同一主机的 URL 总由同一个进程处理
+                    shard = zlib.crc32(host_key(url).encode()) % self.workers
+                else:
+                    shard = min(range(self.workers), key=outstanding.__getitem__)
+                assigned[shard][url] += 1
+                outstanding[shard] += 1
+                await put_shard(shard, url)
+            for shard in range(self.workers):
+                await put_shard(shard, None)
+                closed.add(shard)
+
+        def replace(index: int) -> list[str]:
+            """接替异常退出的工作进程，返回记为错误的 URL
+
+            分片中尚未开始提取的 URL（包括已被该进程取出、还没开始的）放入新队列交给替补进程；
+            已开始的 URL 可能正是导致进程退出的原因，不再重试。
+            """
+            shard = shard_of[index]
+            started = in_flight.pop(index)
+            for url in started:
+                settle(shard, url)
+            pending = []
+            for url in list(assigned[shard].elements()):
+                # 同一 URL 第二次随进程退出时不再重试（开始提取的消息可能没来得及送达父进程）
+                if retried[url]:
+                    settle(shard, url)
+                    started.append(url)
+                else:
+                    retried[url] += 1
+                    pending.append(url)
+            generation[shard] += 1
+            discarded.append(shards[shard])
+            shards[shard] = context.Queue(maxsize=concurrency + len(pending) + 1)
+            for url in pending:
+                shards[shard].put_nowait(url)
+            if shard in closed:
+                # 输入已读完，替补进程同样需要结束标记
+                shards[shard].put_nowait(None)
+            finished.add(index)
+            self.restarts += 1
+            start(len(processes), shard)
+            return started
+
+        for index in range(self.workers):
+            start(index, index)
+        feeder = asyncio.create_task(feed())
+        try:
+            while len(finished) < len(processes):
+                message = await asyncio.to_thread(_get, results)
+                if message is None:
+                    if feeder.done() and feeder.exception():
+                        raise feeder.exception()
+                    for index, process in list(processes.items()):
+                        if index in finished or process.exitcode is None:
+                            continue
+                        if index not in ready:
+                            # 启动阶段就退出的进程重启后同样会失败，直接报错
+                            raise RuntimeError(
+                                f"工作进程 {index} 启动失败（退出码 {process.exitcode}）"
+                            )
+                        # 异常退出：已开始的 URL 记为错误，由新进程接替分片中其余的 URL
+                        for url in replace(index):
+                            yield {
+                                "url": url,
+                                "status": "error",
+                                "error": f"工作进程异常退出（退出码 {process.exitcode}）",
+                            }
+                    continue
+
+                kind, index, url, payload = message
+                if kind == "ready":
+                    ready.add(index)
+                elif kind == "start":
+                    in_flight[index].append(url)
+                elif kind == "result":
+                    if url in in_flight.get(index, ()):
+                        in_flight[index].remove(url)
+                    settle(shard_of[index], url)
+                    yield payload
+                elif kind == "stats":
+                    self.worker_stats.append(payload)
+                elif kind == "done":
+                    finished.add(index)
+                elif kind == "error":
+                    raise RuntimeError(f"工作进程 {index} 出错:\n{payload}")
+            # 传播读取输入时发生的异常
+            await feeder
+        finally:
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+            for process in processes.values():
+                await asyncio.to_thread(process.join, 5)
+            for channel in [*shards, *discarded, results]:
+                channel.cancel_join_thread()
+                channel.close()
+
+
+def merge_stats(items: list[dict[str, Any]]) -> dict[str, Any]:
+    """合并多个进程的统计字典
+
+    计数求和，max_* 取最大值，latency_ms / error_rate 按请求数加权平均，
+    avg_wait_ms 和 failure_rate 按合并后的计数重新计算，其余非数值字段取第一个值。
+    """
+    merged: dict[str, Any] = {}
+    keys = list(dict.fromkeys(key for item in items for key in item))
+    for key in keys:
+        present = [item for item in items if key in item]
+        values = [item[key] for item in present]
+        first = values[0]
+        if isinstance(first, dict):
+            merged[key] = merge_stats(values)
+        elif isinstance(first, bool):
+            merged[key] = any(values)
+        elif isinstance(first, (int, float)) or first is None:
+            pairs = [
+                (item.get("requests", 1), value)
+                for item, value in zip(present, values)
+                if value is not None
+            ]
+            if not pairs:
+                merged[key] = None
+            elif key.startswith("max_"):
+                merged[key] = max(value for _, value in pairs)
+            elif key in ("latency_ms", "error_rate"):
+                weight = sum(requests for requests, _ in pairs)
+                average = (
+                    sum(requests * value for requests, value in pairs) / weight if weight else 0.0
+                )
+                merged[key] = round(average, 4 if key == "error_rate" else 1)
+            else:
+                merged[key] = sum(value for _, value in pairs)
+        else:
+            merged[key] = first
+    if "avg_wait_ms" in merged:
+        requests = merged.get("requests") or 0
+        merged["avg_wait_ms"] = (
+            round(merged.get("total_wait_ms", 0) / requests, 1) if requests else 0.0
+        )
+    if "failure_rate" in merged:
+        total = merged.get("total") or 0
+        merged["failure_rate"] = round(merged.get("failed", 0) / total, 4) if total else 0.0
+    return merged
+
+
+def _worker_main(index: int, config: dict[str, Any], concurrency: int, tasks, results, initializer):
+    """工作进程入口：中断信号由父进程处理，子进程随父进程的 terminate 退出"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(_worker_loop(index, config, concurrency, tasks, results, initializer))
+    except Exception:
+        results.put(("error", index, None, traceback.format_exc()))
+        return
+    results.put(("done", index, None, None))
+
+
+async def _worker_loop(
+    index: int, config: dict[str, Any], concurrency: int, tasks, results, initializer
+):
+    """领取 URL 并提取，同时处理的 URL 不超过 concurrency；结果连同领取时的 URL 一起返回父进程"""
+    async def incoming():
+        while True:
+            url = await asyncio.to_thread(tasks.get)
+            if url is None:
+                return
+            yield url
+
+    async with SiteExtractorAgent(config) as agent:
+        if initializer is not None:
+            initializer(agent)
+        await _put(results, ("ready", index, None, None))
+        source = incoming()
+        if agent.scheduler:
+            # 预读窗口不超过进程能同时处理的 URL 数：预读的 URL 已离开有界的任务队列，
+            # 窗口过大会抵消反压
+            agent.scheduler.lookahead = min(
+                agent.scheduler.lookahead, concurrency * agent.scheduler.max_per_host
+            )
+            source = agent.scheduler.interleave(source)
+        slots = asyncio.Semaphore(concurrency)
+        running: set[asyncio.Task] = set()
+
+        async def run(url: str):
+            try:
+                # 开始提取时告知父进程：进程异常退出时已开始的 URL 记为错误，其余 URL 交给替补进程
+                await _put(results, ("start", index, url, None))
+                try:
+                    result = await agent.extract(url)
+                except Exception as e:
+                    result = {"url": url, "status": "error", "error": str(e)}
+                finally:
+                    if agent.scheduler:
+                        agent.scheduler.unreserve(url)
+                # 结果队列已满（父进程写出变慢）时在这里等待，不再领取新的 URL
+                await _put(results, ("result", index, url, result))
+            finally:
+                slots.release()
+
+        while True:
+            await slots.acquire()
+            try:
+                url = await anext(source)
+            except StopAsyncIteration:
+                break
+            task = asyncio.create_task(run(url))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        await asyncio.gather(*running)
+        stats = {
+            "llm": agent.llm_stats(),
+            "parse": agent.parse_stats(),
+            "politeness": agent.politeness_stats(),
+            "packing": agent.packing_stats(),
+        }
+        await _put(results, ("stats", index, None, stats))
+
+
+def _get(channel) -> Any:
+    try:
+        return channel.get(timeout=_POLL_INTERVAL)
+    except queue.Empty:
+        return None
+
+
+def _try_put(channel, item) -> bool:
+    try:
+        channel.put(item, timeout=_POLL_INTERVAL)
+        return True
+    except queue.Full:
+        return False
+
+
+async def _put(channel, item):
+    """放入进程间队列；队列已满时在线程中分段等待，取消时不会留下阻塞的线程"""
+    while not await asyncio.to_thread(_try_put, channel, item):
+        pass
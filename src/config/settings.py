@@ -3,9 +3,18 @@
 使用 Pydantic 管理应用配置
 """
 
+import os
+from typing import Any
+
 from pydantic_settings import BaseSettings
 
 
+def _user_cache_dir() -> str:
+    """用户缓存目录（XDG_CACHE_HOME，默认 ~/.cache）下本项目的子目录"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "site-info-extractor")
+
+
 class Settings(BaseSettings):
     """应用设置类"""
 
@@ -22,6 +31,15 @@ class Settings(BaseSettings):
     model_name: str = "gemini-2.5-flash"
     temperature: float = 0.0
     max_tokens: int = 2000
+    # 单次调用中页面内容的输入令牌预算（超出时压缩页面文本）
+    llm_input_token_budget: int = 6000
+    # 按提供商覆盖输入令牌预算（免费档位的上下文和每分钟令牌额度较小）
+    provider_input_token_budgets: dict[str, int] = {
+        "groq": 4000,
+        "cerebras": 4000,
+        "siliconflow": 4000,
+        "xunfei": 3000,
+    }
     
     # 各提供商特定模型配置
     
@@ -42,6 +60,163 @@ class Settings(BaseSettings):
 
     # 浏览器配置
     browser_headless: bool = True
+    # 浏览器池：常驻浏览器进程数、单个浏览器的并发上下文数
+    browser_pool_size: int = 2
+    browser_contexts_per_instance: int = 4
+    # 浏览器回收阈值：服务页面数上限、页面 JS 堆占用上限（MB），0 表示不限制
+    browser_max_pages_per_instance: int = 100
+    browser_max_memory_mb: int = 512
+    # 请求拦截：屏蔽的资源类型、是否屏蔽样式表、是否屏蔽内置统计/广告域名、额外屏蔽的域名
+    browser_block_resource_types: list[str] = ["image", "media", "font"]
+    browser_block_stylesheets: bool = False
+    browser_block_trackers: bool = True
+    browser_blocked_domains: list[str] = []
+    # 页面就绪策略：domcontentloaded / load / networkidle / text_stable
+    browser_wait_strategy: str = "text_stable"
+    # 导航与等待的总时长上限（毫秒），超时后直接提取已加载的内容
+    browser_wait_deadline_ms: int = 15000
+    # text_stable 策略要求正文长度保持不变的时长（毫秒）
+    browser_text_stable_ms: int = 500
+    # 按域名覆盖策略，如 {"example.com": "networkidle"} 或
+    # {"example.com": {"strategy": "load", "deadline_ms": 5000}}
+    browser_wait_overrides: dict[str, Any] = {}
+
+    # HTTP 快速通道：先直接请求页面，判定为 JavaScript 应用外壳时再使用浏览器
+    http_fast_path: bool = True
+    http_timeout: float = 10.0
+    http_max_connections: int = 100
+    # 正文少于该字符数时回退到浏览器渲染
+    http_min_text_chars: int = 200
+
+    # 礼貌抓取：按主机限制同时进行的请求数和相邻请求的最小间隔（秒），批量提取时交错调度不同主机；
+    # 只用于 batch、worker 命令和多进程提取，交互式模式和直接调用 SiteExtractorAgent 时默认关闭
+    politeness_enabled: bool = True
+    host_max_concurrency: int = 2
+    host_min_delay: float = 1.0
+    # 批量提取时为交错调度预读的 URL 数量
+    # （多进程提取时每个进程不超过 并发数 × host_max_concurrency）
+    politeness_lookahead: int = 1000
+    # robots.txt：按主机缓存（秒），遵守 Crawl-delay（不超过 robots_max_crawl_delay 秒）
+    robots_txt_enabled: bool = True
+    robots_txt_ttl: int = 86400
+    robots_user_agent: str = "SiteInfoExtractor"
+    robots_max_crawl_delay: float = 30.0
+
+    # 站点模式：从首页链接中按相关度（联系方式、公司介绍、团队、价格等）
+    # 挑选至多 site_max_subpages 个同站子页面并发抓取，与首页的正文合并后一次交给 LLM；
+    # 首页至少占用正文预算的 site_landing_budget_share
+    site_mode_enabled: bool = False
+    site_max_subpages: int = 4
+    site_landing_budget_share: float = 0.4
+
+    # 正文提取：按文本密度和链接密度定位页面主体内容（保留标题和联系方式），
+    # 提取结果少于 main_content_min_chars 个字符时回退到整页文本
+    main_content_extraction: bool = True
+    main_content_min_chars: int = 200
+
+    # 缓存配置：页面抓取缓存（按规范化 URL）与 LLM 结果缓存（按页面内容和模型配置），默认关闭；
+    # 缓存文件（也保存增量重新提取的页面指纹）默认位于用户缓存目录，不随运行目录变化
+    cache_enabled: bool = False
+    cache_path: str = os.path.join(_user_cache_dir(), "extractor_cache.sqlite3")
+    cache_memory_entries: int = 1024
+    cache_max_disk_entries: int = 100000
+    # 页面抓取缓存有效期（秒），过期后使用 ETag / Last-Modified 重新验证
+    fetch_cache_ttl: int = 3600
+    # LLM 结果缓存有效期（秒），0 表示永不过期
+    llm_cache_ttl: int = 0
+
+    # 增量重新提取：按 URL 保存指纹（ETag / Last-Modified、正文 SimHash、元数据哈希）
+    # 和上次的提取结果，再次提取时先发条件请求；元数据未变、
+    # 正文 SimHash 的汉明距离不超过 recrawl_simhash_threshold 且改动的行占正文的比例不超过
+    # recrawl_unchanged_max_ratio（时间戳、计数器等噪声）时复用上次结果
+    recrawl_enabled: bool = False
+    recrawl_simhash_threshold: int = 3
+    recrawl_unchanged_max_ratio: float = 0.05
+    # 改动内容占正文的比例不超过该值时只把改动的段落和上次的结果交给 LLM 修改，否则完整重新提取
+    recrawl_patch_max_ratio: float = 0.3
+
+    # 批量提取配置：同时处理的 URL 数量、同时进行的 LLM 请求数量
+    batch_concurrency: int = 8
+    # batch 模式的工作进程数：大于 1 时每个进程有自己的事件循环和浏览器池，并发数按进程计算
+    batch_workers: int = 1
+    llm_concurrency: int = 8
+
+    # 多提供商路由：在所有配置了 API Key 的提供商之间按延迟和错误率分配请求，
+    # 遇到 429 / 5xx / 超时时切换到其他提供商
+    llm_router_enabled: bool = False
+    # 参与路由的提供商，空列表表示所有配置了 API Key 的提供商
+    llm_router_providers: list[str] = []
+    # 单次调用的最大尝试次数（含首次）、重试量占请求量的比例上限
+    llm_router_max_attempts: int = 3
+    llm_router_retry_ratio: float = 0.2
+    # 单次 LLM 请求超时（秒）
+    llm_request_timeout: float = 60.0
+    # 客户端限流：每分钟请求数（rpm）和令牌数（tpm）上限，键为提供商或 "提供商/模型"（优先）。
+    # 默认值对应免费档位，付费账户可通过环境变量 LLM_RATE_LIMITS 覆盖（如 '{}' 关闭限流）
+    llm_rate_limits: dict[str, dict[str, int]] = {
+        "gemini": {"rpm": 10, "tpm": 250000},
+        "groq": {"rpm": 30, "tpm": 12000},
+        "cerebras": {"rpm": 30, "tpm": 60000},
+    }
+
+    # 流式调用：边接收边解析 JSON，顶层字段完成即可交给调用方，对象闭合后停止生成
+    llm_streaming: bool = False
+
+    # 结构化输出：支持的提供商以提取结构作为工具参数（或使用 JSON 模式），不再从文本中截取 JSON
+    llm_structured_output: bool = True
+    # 修复后仍无法解析时，只把出错的片段交给模型重新输出一次；片段总长度上限（字符）
+    llm_parse_reask: bool = True
+    llm_reask_max_chars: int = 2000
+
+    # 提示词缓存：系统提示词和提取要求作为各次请求相同的前缀放在开头，按提供商标记为可缓存
+    # （Anthropic 的 cache_control 断点、OpenAI 的 prompt_cache_key；
+    # Gemini 2.5 及以上对相同前缀隐式缓存）
+    llm_prompt_caching: bool = True
+    # Gemini 显式上下文缓存：首次请求时把系统提示词和输出结构存为 cached content，
+    # 之后只发送网页内容；缓存按时长计费，缓存期间不再强制工具调用
+    gemini_context_cache: bool = False
+    gemini_context_cache_ttl: int = 3600
+
+    # 多 URL 打包：批量运行时把压缩后不超过 llm_pack_page_tokens 的网页合并为一次请求，
+    # 系统提示词只发送一次；打包输出无法解析或缺少某个 URL 时对该网页单独调用。路由模式下不打包
+    llm_packing_enabled: bool = False
+    llm_pack_page_tokens: int = 1500
+    # 一个打包请求中各网页内容的令牌预算（不超过提供商的输入预算）和网页数上限
+    llm_pack_budget_tokens: int = 6000
+    llm_pack_max_pages: int = 8
+    # 收集网页的最长等待时间（毫秒），窗口中只有一个网页时按原方式单独调用
+    llm_pack_max_wait_ms: int = 100
+    # 打包请求的最大输出令牌数（需容纳所有网页的结果）
+    llm_pack_max_output_tokens: int = 8192
+
+    # 结果写出：batch 模式除 --output 的 JSONL 外另外写入的目标
+    # （如 ["sqlite:results.db", "parquet:results/"]），交互模式配置后也写入这些目标
+    result_sinks: list[str] = []
+    # 写出队列容量（条）：写出跟不上时提取端在队列已满处等待，积压的结果不会无限增长
+    sink_queue_size: int = 256
+    # 每批写出的结果数上限，以及收到一批中第一条结果后最多等待的时间（秒）
+    sink_batch_size: int = 64
+    sink_flush_interval: float = 1.0
+    # JSONL 两次 fsync 的最小间隔（秒），0 表示每批都 fsync
+    jsonl_fsync_interval: float = 1.0
+    # Parquet 单个文件的大小上限（MB），超过后写入新文件
+    parquet_max_file_mb: int = 128
+
+    # 指标：batch 模式下在本机该端口提供 /metrics（Prometheus）和 /traces（OTLP JSON），0 表示不启动
+    metrics_port: int = 0
+    # 追踪导出文件（OTLP JSON Lines，每条提取一行），为空时只保留在内存中
+    trace_export_path: str | None = None
+
+    # 分布式工作队列：SQLite 文件路径（同一台机器上的多个进程共享），或协调器地址 http://host:port（多台机器）
+    work_queue: str = ".cache/work_queue.sqlite3"
+    # 租约时长（秒）：工作进程在此期间未续约（崩溃或失联）时任务重新可见
+    work_queue_visibility_timeout: float = 300.0
+    # 每个任务的最大投递次数，超过后标记为失败
+    work_queue_max_attempts: int = 5
+    # 队列为空时的轮询间隔（秒）
+    work_queue_poll_interval: float = 2.0
+    # 协调器的访问令牌（可选），监听非本机地址时建议设置
+    work_queue_token: str | None = None
 
     class Config:
         """配置类"""
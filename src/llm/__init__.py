@@ -0,0 +1,21 @@
+"""
+LLM 模块
+包含提供商注册表、多提供商路由、客户端限流、流式 JSON 解析、
+结构化输出、多 URL 提示词打包和提示词缓存
+"""
+
+from .packing import PromptPacker, parse_packed_response
+from .prompt_cache import PromptCachingChatModel, enable_prompt_caching
+from .providers import PROVIDERS, create_chat_model, is_available, select_provider
+from .rate_limiter import TokenBucket
+from .router import LLMRouter, build_router
+from .streaming import IncrementalJSONParser, stream_json
+from .structured import bind_structured_output, parse_response, repair_json
+
+__all__ = [
+    "PROVIDERS", "is_available", "select_provider", "create_chat_model",
+    "TokenBucket", "LLMRouter", "build_router", "IncrementalJSONParser", "stream_json",
+    "bind_structured_output", "parse_response", "repair_json",
+    "PromptPacker", "parse_packed_response",
+    "PromptCachingChatModel", "enable_prompt_caching",
+]
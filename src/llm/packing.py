@@ -0,0 +1,297 @@
+"""
+多 URL 提示词打包
+批量运行时把多个较小的网页合并为一次 LLM 请求：系统提示词只发送一次，
+模型按 URL 返回各网页的结果，拆分后逐个按提取结构校验；打包的输出无法解析、
+缺少某个 URL 或结果不符合结构时，由调用方对相应网页单独调用
+"""
+
+import asyncio
+import json
+from contextlib import nullcontext
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import ValidationError
+
+from src.llm.rate_limiter import estimate_message_tokens
+from src.llm.structured import _response_text, repair_json, strip_code_fence
+from src.prompts.schema import SiteExtraction
+from src.tools.text_compactor import estimate_tokens
+from src.tools.url_utils import normalize_url
+
+PACK_PROMPT = (
+    "下面依次给出 {count} 个网页的抓取结果，每个网页以“### 网页 序号”开头。"
+    "请严格按照系统提示词中的要求分别提取每个网页的信息，各网页之间互不参考，"
+    "并只输出一个合法的 JSON 对象："
+    "{{\"results\": [{{\"url\": 网页的目标 URL, \"result\": 该网页的提取结果}}, ...]}}，"
+    "每个网页对应 results 中的一项，不要添加任何解释性文字或 Markdown 代码块。\n\n"
+)
+
+
+class PackedResult(NamedTuple):
+    """打包请求中单个网页的结果"""
+    # 按提取结构校验后的字段
+    data: Dict[str, Any]
+    # 打包输出的解析方式：structured、json 或 repaired
+    mode: str
+    # 按网页数平分的令牌用量，响应中没有用量时为 None
+    usage: Optional[Dict[str, int]]
+    # 打包响应的 response_metadata，packed 中记录同一请求的网页数
+    response_metadata: Dict[str, Any]
+
+
+def pack_messages(system_prompt: str, sections: List[str]) -> list:
+    """构建打包请求：系统提示词只出现一次，各网页的内容按序号分段"""
+    body = "\n\n".join(f"### 网页 {index}\n{section}" for index, section in enumerate(sections, 1))
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=PACK_PROMPT.format(count=len(sections)) + body),
+    ]
+
+
+def parse_packed_response(response, urls: List[str]) -> Tuple[Dict[str, Dict[str, Any]], str]:
+    """解析打包请求的输出并按 URL 拆分
+
+    依次尝试工具调用参数、严格 JSON 和宽松修复；兼容 {"results": [...]}、
+    顶层数组和以 URL 为键的对象。各项按规范化 URL 对应到请求中的网页；
+    所有项都没有可对应的 URL 且数量与网页数相同时按顺序对应。
+
+    Args:
+        response: LLM 返回的消息
+        urls: 请求中各网页的 URL（与分段顺序一致）
+
+    Returns:
+        (URL → 校验后的字段, 解析方式)；无法解析时为 ({}, "failed")，
+        缺少或不符合结构的网页不出现在结果中
+    """
+    payload, mode = None, "failed"
+    for call in getattr(response, "tool_calls", None) or []:
+        if isinstance(call.get("args"), dict) and call["args"]:
+            payload, mode = call["args"], "structured"
+            break
+    if payload is None:
+        text = strip_code_fence(_response_text(response))
+        try:
+            payload, mode = json.loads(text), "json"
+        except json.JSONDecodeError:
+            try:
+                payload, mode = repair_json(text), "repaired"
+            except ValueError:
+                return {}, "failed"
+
+    items = _packed_items(payload)
+    if items is None:
+        return {}, "failed"
+    wanted = {normalize_url(url): url for url in urls}
+    matched: Dict[str, Any] = {}
+    for item_url, result in items:
+        url = (
+            wanted.get(normalize_url(item_url)) if isinstance(item_url, str) and item_url else None
+        )
+        if url is not None and url not in matched:
+            matched[url] = result
+    if not matched and len(items) == len(urls):
+        matched = {url: result for url, (_, result) in zip(urls, items)}
+
+    results = {}
+    for url, result in matched.items():
+        data = _validate(result)
+        if data is not None:
+            results[url] = data
+    return results, mode
+
+
+def _packed_items(payload: Any) -> Optional[List[Tuple[Any, Any]]]:
+    """取出打包输出中的 (URL, 结果) 列表，不是可识别的结构时返回 None"""
+    if isinstance(payload, dict) and isinstance(payload.get("results"), list):
+        payload = payload["results"]
+    if isinstance(payload, list):
+        items = []
+        for item in payload:
+            if not isinstance(item, dict):
+                items.append((None, item))
+            elif isinstance(item.get("result"), dict):
+                items.append((item.get("url"), item["result"]))
+            else:
+                # 模型把字段直接写在项中而没有使用 result 包裹
+                items.append((item.get("url"), item))
+        return items
+    if (
+        isinstance(payload, dict)
+        and payload
+        and all(isinstance(value, dict) for value in payload.values())
+    ):
+        return list(payload.items())
+    return None
+
+
+def _validate(result: Any) -> Optional[Dict[str, Any]]:
+    """按提取结构校验单个网页的结果，不符合结构时返回 None"""
+    if not isinstance(result, dict) or not result:
+        return None
+    try:
+        return SiteExtraction.model_validate(result).model_dump(
+            by_alias=True, exclude_unset=True, exclude_none=True
+        )
+    except ValidationError:
+        return None
+
+
+def _split_usage(usage: Optional[Dict[str, Any]], parts: int) -> List[Optional[Dict[str, Any]]]:
+    """将一次请求的令牌用量按网页数平分，余数分给靠后的网页，合计与原用量相同
+
+    input_token_details 等明细同样按网页数拆分。
+    """
+    if not usage:
+        return [None] * parts
+
+    def share(counts: Dict[str, Any], index: int) -> Dict[str, Any]:
+        shared: Dict[str, Any] = {}
+        for key, value in counts.items():
+            if isinstance(value, int):
+                shared[key] = value * (index + 1) // parts - value * index // parts
+            elif isinstance(value, dict):
+                shared[key] = share(value, index)
+        return shared
+
+    return [share(usage, index) for index in range(parts)]
+
+
+class PromptPacker:
+    """多 URL 提示词打包器
+
+    各 URL 的提取流程把单页提示词交给 submit；打包器在 max_wait 内收集提交的网页，
+    网页数达到 max_pages 或再加入一个网页会超过 budget_tokens 时立即发出请求。
+    收集窗口中只有一个网页时不打包，submit 返回 None，由调用方按原方式单独调用。
+    """
+
+    def __init__(
+        self,
+        llm,
+        system_prompt: str,
+        budget_tokens: int,
+        max_pages: int,
+        max_wait: float,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ):
+        """初始化打包器
+
+        Args:
+            llm: 打包请求使用的聊天模型（输出上限应能容纳 max_pages 个网页的结果）
+            system_prompt: 系统提示词，每个打包请求只发送一次
+            budget_tokens: 一个打包请求中各网页内容的令牌预算
+            max_pages: 一个打包请求中的网页数上限
+            max_wait: 收集网页的最长等待时间（秒）
+            semaphore: 限制同时进行的 LLM 请求数的信号量（可选，与单独调用共用）
+        """
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.budget_tokens = budget_tokens
+        self.max_pages = max(2, max_pages)
+        self.max_wait = max_wait
+        self.semaphore = semaphore
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self._system_tokens = estimate_tokens(system_prompt)
+        self.packed_calls = 0
+        self.packed_pages = 0
+        self.single = 0
+        self.fallbacks = 0
+        self.failed_calls = 0
+        # 估算的输入令牌数：打包后实际发送的（含回退的单独调用）与逐个 URL 调用时的对比
+        self.estimated_input_tokens = 0
+        self.baseline_input_tokens = 0
+
+    async def submit(self, url: str, section: str) -> Optional[PackedResult]:
+        """提交一个网页，等待所在的打包请求完成
+
+        Args:
+            url: 网页 URL
+            section: 单页提示词中的网页内容（URL、标题、正文和元数据）
+
+        Returns:
+            该网页的 PackedResult；未打包（窗口中只有这一个网页）或打包结果不可用时返回 None
+        """
+        tokens = estimate_tokens(section)
+        if self._pending and self._pending_tokens + tokens > self.budget_tokens:
+            self._flush()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((url, section, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_pages:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        """发出当前收集的网页"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending, self._pending_tokens = self._pending, [], 0
+        if not items:
+            return
+        if len(items) == 1:
+            self.single += 1
+            if not items[0][2].done():
+                items[0][2].set_result(None)
+            return
+        task = asyncio.create_task(self._send(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, items: List[Tuple[str, str, asyncio.Future]]):
+        """发出一个打包请求并把各网页的结果交给对应的提交方；未得到结果的网页返回 None"""
+        urls = [url for url, _, _ in items]
+        results: Dict[str, Dict[str, Any]] = {}
+        mode = "failed"
+        usage_shares: List[Optional[Dict[str, int]]] = [None] * len(items)
+        metadata: Dict[str, Any] = {}
+        try:
+            messages = pack_messages(self.system_prompt, [section for _, section, _ in items])
+            self.packed_calls += 1
+            self.packed_pages += len(items)
+            self.estimated_input_tokens += estimate_message_tokens(messages)
+            self.baseline_input_tokens += sum(
+                self._system_tokens + estimate_tokens(section) for _, section, _ in items
+            )
+            try:
+                async with self.semaphore or nullcontext():
+                    response = await self.llm.ainvoke(messages)
+            except Exception:
+                self.failed_calls += 1
+            else:
+                results, mode = parse_packed_response(response, urls)
+                usage_shares = _split_usage(getattr(response, "usage_metadata", None), len(items))
+                metadata = dict(getattr(response, "response_metadata", None) or {})
+        finally:
+            for (url, section, future), usage in zip(items, usage_shares):
+                data = results.get(url)
+                if data is None:
+                    # 回退为单独调用，计入其估算的输入令牌
+                    self.fallbacks += 1
+                    self.estimated_input_tokens += self._system_tokens + estimate_tokens(section)
+                    result = None
+                else:
+                    result = PackedResult(
+                        data, mode, usage, {**metadata, "packed": {"pages": len(items)}}
+                    )
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回打包请求数、网页数、回退次数，以及相对逐个 URL 调用节省的请求数和估算输入令牌数"""
+        return {
+            "packed_calls": self.packed_calls,
+            "packed_pages": self.packed_pages,
+            "single": self.single,
+            "fallbacks": self.fallbacks,
+            "failed_calls": self.failed_calls,
+            "calls_saved": self.packed_pages - self.packed_calls - self.fallbacks,
+            "estimated_input_tokens": self.estimated_input_tokens,
+            "baseline_input_tokens": self.baseline_input_tokens,
+            "input_tokens_saved": self.baseline_input_tokens - self.estimated_input_tokens,
+        }
@@ -0,0 +1,228 @@
+"""
+提示词缓存
+各次提取请求共用相同的静态前缀（系统提示词、提取要求和输出结构），按提供商将其标记为可缓存：
+Anthropic 在系统提示词末尾加 cache_control 断点；OpenAI 对相同前缀自动缓存，
+prompt_cache_key 使请求落到同一缓存上；Gemini 2.5 及以上对相同前缀隐式缓存，
+也可以把系统提示词和输出结构预先存为显式上下文缓存（cached content），之后的请求只发送网页内容
+"""
+
+import asyncio
+import hashlib
+import time
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import SystemMessage
+
+from config.settings import settings
+
+
+def prefix_key(text: str) -> str:
+    """静态前缀的短哈希，用作 prompt_cache_key 和上下文缓存的键"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def cache_tokens(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """读取命中缓存（cache_read）和写入缓存（cache_creation）的令牌数
+
+    数据来自 usage_metadata 的 input_token_details。
+    """
+    details = (usage or {}).get("input_token_details") or {}
+    return {
+        key: details[key]
+        for key in ("cache_read", "cache_creation")
+        if isinstance(details.get(key), int) and details[key] > 0
+    }
+
+
+def _create_context_cache(llm, system_text: str, tools: Optional[list], ttl: int) -> str:
+    """创建 Gemini 上下文缓存，返回缓存名称（同步调用，在线程中执行）"""
+    from langchain_google_genai import create_context_cache
+
+    return create_context_cache(
+        llm, [SystemMessage(content=system_text)], ttl=f"{ttl}s", tools=tools
+    )
+
+
+class GeminiContextCache:
+    """Gemini 显式上下文缓存
+
+    首次请求时把系统提示词（和输出结构的工具定义）存为 cached content，到期前重新创建。
+    使用缓存的请求不能再携带系统提示词、工具和 tool_config，因此通过未绑定工具的模型发送，
+    不再强制调用工具，模型以文本输出 JSON 时仍由宽松解析处理。创建失败（模型不支持、
+    前缀低于最小缓存长度等）时在一个缓存周期内照常发送系统提示词。
+    """
+
+    def __init__(self, llm, tools: Optional[list] = None, ttl: int = 3600, create=None):
+        """初始化上下文缓存
+
+        Args:
+            llm: 未绑定工具的 ChatGoogleGenerativeAI 实例
+            tools: 与系统提示词一并缓存的工具（输出结构，可选）
+            ttl: 缓存时长（秒）
+            create: 创建缓存的函数 create(llm, system_text, tools, ttl) -> 名称（可选，
+                默认使用 langchain_google_genai）
+        """
+        self.llm = llm
+        self.tools = tools
+        self.ttl = ttl
+        self._create = create or _create_context_cache
+        # 前缀哈希 → (缓存名称或 None, 到期时间)
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = asyncio.Lock()
+        self.created = 0
+        self.failures = 0
+
+    def _lookup(self, key: str) -> Tuple[bool, Optional[str]]:
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return True, entry[0]
+        return False, None
+
+    async def get(self, system_text: str) -> Optional[str]:
+        """返回系统提示词对应的缓存名称，尚未创建或已到期时创建；不可用时返回 None"""
+        key = prefix_key(system_text)
+        found, name = self._lookup(key)
+        if found:
+            return name
+        async with self._lock:
+            found, name = self._lookup(key)
+            if found:
+                return name
+            try:
+                name = await asyncio.to_thread(
+                    self._create, self.llm, system_text, self.tools, self.ttl
+                )
+                self.created += 1
+            except Exception:
+                name = None
+                self.failures += 1
+            # 提前视为到期，避免使用即将在服务端失效的缓存
+            self._entries[key] = (name, time.monotonic() + max(self.ttl - 60, self.ttl / 2))
+            return name
+
+    def disable(self, system_text: str):
+        """使用缓存的请求失败（缓存已在服务端失效等）时，在一个缓存周期内改为照常发送系统提示词"""
+        self._entries[prefix_key(system_text)] = (None, time.monotonic() + self.ttl)
+
+    def stats(self) -> Dict[str, int]:
+        return {"created": self.created, "failures": self.failures}
+
+
+class PromptCachingChatModel:
+    """按提供商把开头的系统消息标记为可缓存的包装，接口与聊天模型的 ainvoke / astream 一致
+
+    调用方应把各次请求相同的内容放在开头的系统消息中，把网页内容放在其后的消息中。
+    """
+
+    def __init__(self, llm, provider: str, context_cache: Optional[GeminiContextCache] = None):
+        """初始化包装
+
+        Args:
+            llm: 聊天模型（可以已绑定输出结构）
+            provider: 提供商名称
+            context_cache: Gemini 显式上下文缓存（可选）
+        """
+        self.llm = llm
+        self.provider = provider
+        self.context_cache = context_cache
+
+    @staticmethod
+    def _system_text(messages) -> Optional[str]:
+        if (
+            messages
+            and isinstance(messages[0], SystemMessage)
+            and isinstance(messages[0].content, str)
+        ):
+            return messages[0].content
+        return None
+
+    def _prepare(self, messages) -> Tuple[List[Any], Dict[str, Any]]:
+        """按提供商改写消息，返回 (消息, 额外的调用参数)"""
+        system_text = self._system_text(messages)
+        if system_text is None:
+            return list(messages), {}
+        if self.provider == "anthropic":
+            # 缓存断点放在系统提示词末尾：工具定义和系统提示词一并缓存
+            block = {"type": "text", "text": system_text, "cache_control": {"type": "ephemeral"}}
+            return [SystemMessage(content=[block]), *messages[1:]], {}
+        if self.provider == "openai":
+            return list(messages), {"prompt_cache_key": f"site-extractor-{prefix_key(system_text)}"}
+        return list(messages), {}
+
+    async def _cached_content(self, messages) -> Optional[str]:
+        system_text = self._system_text(messages)
+        if self.context_cache is None or system_text is None:
+            return None
+        return await self.context_cache.get(system_text)
+
+    def _fall_back(self, messages, error: BaseException) -> bool:
+        """使用上下文缓存的请求失败时是否改为照常发送：限流、超时和服务端错误交给调用方重试"""
+        # router 在模块级导入本模块，这里延迟导入
+        from src.llm.router import classify_error
+
+        if classify_error(error) is not None:
+            return False
+        self.context_cache.disable(self._system_text(messages))
+        return True
+
+    async def ainvoke(self, messages, **kwargs):
+        cached_content = await self._cached_content(messages)
+        if cached_content:
+            try:
+                return await self.context_cache.llm.ainvoke(
+                    list(messages[1:]), cached_content=cached_content, **kwargs
+                )
+            except Exception as e:
+                if not self._fall_back(messages, e):
+                    raise
+        prepared, extra = self._prepare(messages)
+        return await self.llm.ainvoke(prepared, **{**extra, **kwargs})
+
+    async def astream(self, messages, **kwargs):
+        """流式调用；使用上下文缓存的请求在收到第一个消息块之前失败时改为照常发送"""
+        cached_content = await self._cached_content(messages)
+        if cached_content:
+            started = False
+            try:
+                async with aclosing(
+                    self.context_cache.llm.astream(
+                        list(messages[1:]), cached_content=cached_content, **kwargs
+                    )
+                ) as stream:
+                    async for chunk in stream:
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started or not self._fall_back(messages, e):
+                    raise
+        prepared, extra = self._prepare(messages)
+        async with aclosing(self.llm.astream(prepared, **{**extra, **kwargs})) as stream:
+            async for chunk in stream:
+                yield chunk
+
+
+def enable_prompt_caching(llm, provider: str, base=None, schema: Optional[type] = None):
+    """按提供商为聊天模型启用提示词缓存
+
+    Args:
+        llm: 聊天模型（可以已绑定输出结构）
+        provider: 提供商名称
+        base: 未绑定输出结构的同一模型（可选），Gemini 显式上下文缓存通过它发送请求
+        schema: llm 绑定的输出结构（可选），Gemini 显式上下文缓存时作为工具一并缓存
+
+    Returns:
+        需要改写请求时返回 PromptCachingChatModel，否则原样返回 llm
+        （按前缀自动缓存的提供商只需前缀稳定）
+    """
+    if not settings.llm_prompt_caching:
+        return llm
+    context_cache = None
+    if provider == "gemini" and settings.gemini_context_cache and base is not None:
+        context_cache = GeminiContextCache(
+            base, tools=[schema] if schema else None, ttl=settings.gemini_context_cache_ttl
+        )
+    if provider not in ("anthropic", "openai") and context_cache is None:
+        return llm
+    return PromptCachingChatModel(llm, provider, context_cache)
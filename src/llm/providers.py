@@ -0,0 +1,106 @@
+"""
+LLM 提供商注册表
+记录每个提供商对应的 LangChain 集成包和聊天模型类，仅在实际创建模型时才导入所选提供商的 SDK
+"""
+
+import importlib
+import importlib.util
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+
+from config.settings import settings
+
+
+class ProviderSpec(NamedTuple):
+    """提供商描述"""
+    # Agent 配置中的 API Key 字段
+    api_key_field: str
+    # LangChain 集成包的模块名
+    module: str
+    # 聊天模型类名
+    class_name: str
+    # Settings 中该提供商默认模型的配置项
+    model_setting: str
+    # OpenAI 兼容接口的服务地址（可选）
+    base_url: Optional[str] = None
+    # 结构化输出方式："tool"（强制工具调用）、"json_mode"（JSON 模式），None 表示不支持
+    structured_output: Optional[str] = None
+
+
+# 按优先顺序排列：配置中同时提供多个 API Key 时选择靠前的提供商
+PROVIDERS: Dict[str, ProviderSpec] = {
+    "gemini": ProviderSpec(
+        "google_api_key", "langchain_google_genai", "ChatGoogleGenerativeAI", "gemini_model_name",
+        structured_output="tool",
+    ),
+    "openai": ProviderSpec(
+        "openai_api_key", "langchain_openai", "ChatOpenAI", "openai_model_name",
+        structured_output="tool",
+    ),
+    "anthropic": ProviderSpec(
+        "anthropic_api_key", "langchain_anthropic", "ChatAnthropic", "anthropic_model_name",
+        structured_output="tool",
+    ),
+    "groq": ProviderSpec(
+        "groq_api_key", "langchain_groq", "ChatGroq", "groq_model_name",
+        structured_output="tool",
+    ),
+    # SiliconFlow、讯飞和 Cerebras 使用 OpenAI 兼容的 API；讯飞的兼容接口不支持 JSON 模式
+    "siliconflow": ProviderSpec(
+        "siliconflow_api_key", "langchain_openai", "ChatOpenAI", "siliconflow_model_name",
+        "https://api.siliconflow.cn/v1", structured_output="json_mode",
+    ),
+    "xunfei": ProviderSpec(
+        "xunfei_api_key", "langchain_openai", "ChatOpenAI", "xunfei_model_name",
+        "https://maas-api.cn-huabei-1.xf-yun.com/v2"
+    ),
+    "cerebras": ProviderSpec(
+        "cerebras_api_key", "langchain_openai", "ChatOpenAI", "cerebras_model_name",
+        "https://api.cerebras.ai/v1", structured_output="json_mode",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def is_available(provider: str) -> bool:
+    """判断提供商的集成包是否已安装（只查找模块，不执行导入）"""
+    spec = PROVIDERS.get(provider)
+    return spec is not None and importlib.util.find_spec(spec.module) is not None
+
+
+def load_chat_class(provider: str) -> type:
+    """导入并返回提供商的聊天模型类"""
+    spec = PROVIDERS[provider]
+    return getattr(importlib.import_module(spec.module), spec.class_name)
+
+
+def select_provider(config: Dict[str, Any]) -> Optional[str]:
+    """按优先顺序返回第一个配置了 API Key 且已安装集成包的提供商，没有时返回 None"""
+    for name, spec in PROVIDERS.items():
+        if config.get(spec.api_key_field) and is_available(name):
+            return name
+    return None
+
+
+def create_chat_model(provider: str, config: Dict[str, Any], **overrides):
+    """创建提供商的聊天模型实例
+
+    Args:
+        provider: 提供商名称（PROVIDERS 中的键）
+        config: Agent 配置字典，读取 model_name、temperature、max_tokens 和对应的 API Key
+        **overrides: 额外传给聊天模型类的参数（如 max_retries）
+
+    Returns:
+        LangChain 聊天模型实例
+    """
+    spec = PROVIDERS[provider]
+    kwargs = {
+        "model": config.get("model_name"),
+        "temperature": config.get("temperature", 0.0),
+        "max_tokens": config.get("max_tokens", settings.max_tokens),
+        "api_key": config[spec.api_key_field],
+    }
+    if spec.base_url:
+        kwargs["base_url"] = spec.base_url
+    kwargs.update(overrides)
+    return load_chat_class(provider)(**kwargs)
@@ -0,0 +1,262 @@
+"""
+客户端限流
+令牌桶与按提供商 / 模型配置的 RPM、TPM 限流器，用于在请求发出前控制各提供商的调用速率
+"""
+
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from src.metrics.registry import RATE_LIMIT_QUEUE_DEPTH, RATE_LIMIT_WAIT_SECONDS
+from src.metrics.tracing import span
+from src.tools.text_compactor import estimate_tokens
+
+
+class TokenBucket:
+    """令牌桶
+
+    以固定速率补充令牌，容量决定允许的突发量。acquire() 在令牌不足时等待，
+    try_acquire() 和 wait_time() 不等待，供调用方自行决定排队或选择其他提供商。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        """初始化令牌桶
+
+        Args:
+            rate_per_minute: 每分钟补充的令牌数
+            capacity: 桶容量（可选，默认等于每分钟补充量）
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """返回取得 amount 个令牌还需等待的秒数（超过容量的请求按容量计算）"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """令牌充足时立即扣除并返回 True，否则返回 False"""
+        if self.wait_time(amount) > 0:
+            return False
+        self.tokens -= min(amount, self.capacity)
+        return True
+
+    async def acquire(self, amount: float = 1.0):
+        """等待直到取得 amount 个令牌"""
+        while not self.try_acquire(amount):
+            await asyncio.sleep(self.wait_time(amount))
+
+
+def estimate_message_tokens(messages) -> int:
+    """估算一组消息的输入令牌数"""
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        if isinstance(content, list):
+            content = " ".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+            )
+        total += estimate_tokens(str(content))
+    return total
+
+
+def usage_tokens(response) -> Optional[int]:
+    """从 LangChain 消息的 usage_metadata 中读取实际消耗的总令牌数"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    total = usage.get("total_tokens")
+    if total is None:
+        total = (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+    return total or None
+
+
+class RateLimiter:
+    """单个提供商 / 模型的请求数（RPM）与令牌数（TPM）限流器
+
+    调用前按估算的输入令牌数扣除 TPM 额度，调用后按 usage_metadata 中的实际用量多退少补。
+    额度不足时调用方在先进先出的队列中等待，而不是直接报错；队列长度和等待时间计入统计。
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, name: str = ""):
+        """初始化限流器
+
+        Args:
+            rpm: 每分钟请求数上限（可选）
+            tpm: 每分钟令牌数上限（可选）
+            name: 指标中的 provider 标签（可选，为空时不导出指标）
+        """
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        # asyncio.Lock 的等待者按先进先出唤醒：队首等待额度，其余调用方排在其后
+        self._lock = asyncio.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.waited_requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        if name:
+            RATE_LIMIT_QUEUE_DEPTH.set_function(lambda: self.queue_depth, provider=name)
+
+    @classmethod
+    def from_settings(
+        cls, provider: str, model: Optional[str] = None, share: float = 1.0
+    ) -> Optional["RateLimiter"]:
+        """按 settings.llm_rate_limits 创建限流器，"提供商/模型" 的配置优先于提供商的配置
+
+        Args:
+            provider: 提供商名称
+            model: 模型名称（可选）
+            share: 本进程分得的额度比例，多个进程共用同一个账户时为 1 / 进程数
+
+        Returns:
+            RateLimiter 实例，未配置限额时返回 None
+        """
+        limits = settings.llm_rate_limits.get(
+            f"{provider}/{model}"
+        ) or settings.llm_rate_limits.get(provider)
+        if not limits or not (limits.get("rpm") or limits.get("tpm")):
+            return None
+        rpm, tpm = limits.get("rpm"), limits.get("tpm")
+        return cls(
+            rpm=max(1, int(rpm * share)) if rpm else None,
+            tpm=max(1, int(tpm * share)) if tpm else None,
+            name=provider,
+        )
+
+    def wait_time(self, estimated_tokens: int = 0) -> float:
+        """不排队时取得额度还需等待的秒数"""
+        waits = [0.0]
+        if self.request_bucket:
+            waits.append(self.request_bucket.wait_time(1))
+        if self.token_bucket:
+            waits.append(self.token_bucket.wait_time(estimated_tokens))
+        return max(waits)
+
+    def ready(self, estimated_tokens: int = 0) -> bool:
+        """没有排队的调用方且额度充足"""
+        return self.queue_depth == 0 and self.wait_time(estimated_tokens) == 0
+
+    async def acquire(self, estimated_tokens: int = 0) -> float:
+        """排队等待额度并扣除
+
+        Args:
+            estimated_tokens: 本次请求估算的令牌数
+
+        Returns:
+            实际等待的秒数
+        """
+        start = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            with span("rate_limit_wait"):
+                async with self._lock:
+                    while (wait := self.wait_time(estimated_tokens)) > 0:
+                        await asyncio.sleep(wait)
+                    if self.request_bucket:
+                        self.request_bucket.try_acquire(1)
+                    if self.token_bucket:
+                        self.token_bucket.try_acquire(estimated_tokens)
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        if self.name:
+            RATE_LIMIT_WAIT_SECONDS.observe(waited, provider=self.name)
+        self.requests += 1
+        self.estimated_tokens += estimated_tokens
+        if waited > 0.001:
+            self.waited_requests += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """按实际用量修正 TPM 额度（估算偏低时扣除差额，偏高时返还）"""
+        if actual_tokens is None:
+            return
+        self.actual_tokens += actual_tokens
+        if self.token_bucket:
+            bucket = self.token_bucket
+            bucket.tokens = min(bucket.capacity, bucket.tokens - (actual_tokens - estimated_tokens))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回限额、队列长度和等待时间统计"""
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "waited_requests": self.waited_requests,
+            "total_wait_ms": round(self.total_wait * 1000, 1),
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_wait_ms": (
+                round(self.total_wait * 1000 / self.requests, 1) if self.requests else 0.0
+            ),
+            "estimated_tokens": self.estimated_tokens,
+            "actual_tokens": self.actual_tokens,
+        }
+
+
+class RateLimitedChatModel:
+    """为单个聊天模型加上客户端限流的包装，接口与聊天模型的 ainvoke 一致"""
+
+    def __init__(self, llm, limiter: RateLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    async def ainvoke(self, messages, **kwargs):
+        """排队取得额度后调用模型，response_metadata["rate_limit"] 记录本次等待时间"""
+        estimated = estimate_message_tokens(messages)
+        waited = await self.limiter.acquire(estimated)
+        response = await self.llm.ainvoke(messages, **kwargs)
+        self.limiter.record_usage(estimated, usage_tokens(response))
+        metadata = getattr(response, "response_metadata", None)
+        if isinstance(metadata, dict):
+            metadata["rate_limit"] = {"wait_ms": round(waited * 1000, 1)}
+        return response
+
+    async def astream(self, messages, **kwargs):
+        """排队取得额度后流式调用模型，首个消息块的 response_metadata["rate_limit"] 记录等待时间
+
+        提前停止接收时按已收到的用量修正额度（未收到用量时保留估算值）。
+        """
+        estimated = estimate_message_tokens(messages)
+        waited = await self.limiter.acquire(estimated)
+        actual = 0
+        first = True
+        try:
+            async with aclosing(self.llm.astream(messages, **kwargs)) as stream:
+                async for chunk in stream:
+                    actual += usage_tokens(chunk) or 0
+                    if first:
+                        first = False
+                        metadata = getattr(chunk, "response_metadata", None)
+                        if isinstance(metadata, dict):
+                            metadata["rate_limit"] = {"wait_ms": round(waited * 1000, 1)}
+                    yield chunk
+        finally:
+            self.limiter.record_usage(estimated, actual or None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rate_limit": self.limiter.stats()}
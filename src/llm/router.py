@@ -0,0 +1,383 @@
+"""
+多提供商路由
+在所有已配置的 LLM 提供商之间按观测到的延迟和错误率分配请求，遇到限流、服务端错误或超时时自动切换
+"""
+
+import asyncio
+import random
+import time
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from src.llm.prompt_cache import enable_prompt_caching
+from src.llm.providers import PROVIDERS, create_chat_model, is_available, select_provider
+from src.llm.rate_limiter import RateLimiter, estimate_message_tokens, usage_tokens
+from src.llm.structured import bind_structured_output
+from src.prompts.schema import SiteExtraction
+
+# 延迟和错误率的指数加权平滑系数
+_EWMA_ALPHA = 0.3
+
+# 冷却时长（秒）：限流与其他可重试错误分别设置基数，连续失败时翻倍
+_RATE_LIMIT_COOLDOWN = 10.0
+_ERROR_COOLDOWN = 2.0
+_MAX_COOLDOWN = 60.0
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """判断 LLM 调用异常是否值得切换提供商重试
+
+    Returns:
+        "rate_limit"（429）、"server_error"（5xx）、"timeout"、"connection"，
+        不可重试的错误（如参数错误、鉴权失败）返回 None
+    """
+    if isinstance(error, asyncio.TimeoutError) or "timeout" in type(error).__name__.lower():
+        return "timeout"
+    if "connection" in type(error).__name__.lower():
+        return "connection"
+
+    # OpenAI / Anthropic / Groq 的异常带 status_code，Google GenAI 的异常带 code
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return "rate_limit"
+        if status == 408:
+            return "timeout"
+        if status >= 500:
+            return "server_error"
+        return None
+
+    message = str(error)
+    if "429" in message or "RESOURCE_EXHAUSTED" in message or "rate limit" in message.lower():
+        return "rate_limit"
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """读取异常所带响应中的 Retry-After 头（秒）"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderRoute:
+    """路由中的一个提供商及其运行统计"""
+
+    def __init__(self, name: str, model: str, llm, limiter: Optional[RateLimiter] = None):
+        """初始化路由项
+
+        Args:
+            name: 提供商名称
+            model: 模型名称
+            llm: LangChain 聊天模型实例
+            limiter: RPM / TPM 限流器（可选）
+        """
+        self.name = name
+        self.model = model
+        self.llm = llm
+        self.limiter = limiter
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def cooling_down(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+    def ready(self, now: float, estimated_tokens: int = 0) -> bool:
+        """不在冷却期且限流额度充足，可以立即发出请求"""
+        return not self.cooling_down(now) and (
+            self.limiter is None or self.limiter.ready(estimated_tokens)
+        )
+
+    def expected_wait(self, estimated_tokens: int = 0) -> float:
+        """在限流队列中预计等待的秒数（不在冷却期时）"""
+        if self.limiter is None:
+            return 0.0
+        return self.limiter.wait_time(estimated_tokens) + self.limiter.queue_depth * 60.0 / (
+            self.limiter.rpm or 600
+        )
+
+    def weight(self, default_latency: float) -> float:
+        """选择权重：延迟越低、错误率越低、进行中的请求越少，权重越高"""
+        latency = max(self.latency if self.latency is not None else default_latency, 0.05)
+        return 1.0 / (latency * (1 + 10 * self.error_rate) * (1 + self.in_flight))
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.latency = latency if self.latency is None else (
+            _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * self.latency
+        )
+        self.error_rate = (1 - _EWMA_ALPHA) * self.error_rate
+
+    def record_failure(self, kind: Optional[str], delay: Optional[float] = None):
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = _EWMA_ALPHA + (1 - _EWMA_ALPHA) * self.error_rate
+        if kind is None:
+            return
+        # 可重试的错误让提供商进入冷却期，期间请求分给其他提供商
+        self.consecutive_failures += 1
+        base = _RATE_LIMIT_COOLDOWN if kind == "rate_limit" else _ERROR_COOLDOWN
+        cooldown = delay or min(base * 2 ** (self.consecutive_failures - 1), _MAX_COOLDOWN)
+        self.cooldown_until = time.monotonic() + cooldown
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "in_flight": self.in_flight,
+            "cooling_down": self.cooling_down(time.monotonic()),
+            **({"rate_limit": self.limiter.stats()} if self.limiter else {}),
+        }
+
+
+class LLMRouter:
+    """多提供商 LLM 路由器
+
+    提供与聊天模型相同的 ainvoke 接口。每次调用按权重随机选择一个就绪的提供商，
+    使批量任务的吞吐量可以在多个提供商之间叠加；遇到可重试错误时切换到其他提供商，
+    重试次数同时受单次调用的尝试上限和全局重试预算约束，避免故障时放大请求量。
+    """
+
+    def __init__(
+        self,
+        routes: List[ProviderRoute],
+        max_attempts: int = 3,
+        retry_ratio: float = 0.2,
+        min_retries: int = 10,
+        request_timeout: float = 60.0,
+    ):
+        """初始化路由器
+
+        Args:
+            routes: 参与路由的提供商
+            max_attempts: 单次调用的最大尝试次数（含首次）
+            retry_ratio: 每次调用为重试预算补充的额度，即长期重试量占请求量的比例上限
+            min_retries: 重试预算的初始额度和上限
+            request_timeout: 单次请求超时（秒），超时按可重试错误处理
+        """
+        if not routes:
+            raise ValueError("LLMRouter 至少需要一个提供商")
+        self.routes = routes
+        self.max_attempts = max(1, max_attempts)
+        self.retry_ratio = retry_ratio
+        self.min_retries = min_retries
+        self.request_timeout = request_timeout
+        self._retry_tokens = float(min_retries)
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        """调用 LLM，必要时切换提供商重试
+
+        返回消息的 response_metadata["router"] 记录实际使用的提供商、模型和尝试次数，
+        response_metadata["rate_limit"] 记录在限流队列中的等待时间。
+
+        Raises:
+            最后一次尝试的异常（不可重试、达到尝试上限或重试预算耗尽时）
+        """
+        self._retry_tokens = min(self._retry_tokens + self.retry_ratio, float(self.min_retries))
+        estimated = estimate_message_tokens(messages)
+        tried: List[ProviderRoute] = []
+        attempts = 0
+        waited = 0.0
+        while True:
+            route = await self._choose(tried, estimated)
+            attempts += 1
+            route.in_flight += 1
+            try:
+                if route.limiter:
+                    waited += await route.limiter.acquire(estimated)
+                start = time.monotonic()
+                response = await asyncio.wait_for(
+                    route.llm.ainvoke(messages, **kwargs), self.request_timeout
+                )
+            except Exception as e:
+                if not self._should_retry(route, e, attempts):
+                    raise
+                tried.append(route)
+                continue
+            finally:
+                route.in_flight -= 1
+
+            route.record_success(time.monotonic() - start)
+            if route.limiter:
+                route.limiter.record_usage(estimated, usage_tokens(response))
+            metadata = getattr(response, "response_metadata", None)
+            if isinstance(metadata, dict):
+                metadata["router"] = {
+                    "provider": route.name,
+                    "model": route.model,
+                    "attempts": attempts,
+                }
+                metadata["rate_limit"] = {"wait_ms": round(waited * 1000, 1)}
+            return response
+
+    async def astream(self, messages, **kwargs):
+        """流式调用 LLM
+
+        在收到首个消息块之前出错时按与 ainvoke 相同的规则切换提供商重试；
+        开始输出后不再切换，错误直接抛给调用方。首个消息块的 response_metadata
+        记录 router 和 rate_limit 信息，提前停止接收时底层流随之关闭。
+        """
+        self._retry_tokens = min(self._retry_tokens + self.retry_ratio, float(self.min_retries))
+        estimated = estimate_message_tokens(messages)
+        tried: List[ProviderRoute] = []
+        attempts = 0
+        waited = 0.0
+        while True:
+            route = await self._choose(tried, estimated)
+            attempts += 1
+            route.in_flight += 1
+            stream = route.llm.astream(messages, **kwargs)
+            try:
+                if route.limiter:
+                    waited += await route.limiter.acquire(estimated)
+                start = time.monotonic()
+                first = await asyncio.wait_for(anext(stream, None), self.request_timeout)
+            except Exception as e:
+                route.in_flight -= 1
+                await stream.aclose()
+                if not self._should_retry(route, e, attempts):
+                    raise
+                tried.append(route)
+                continue
+            break
+
+        actual = 0
+        failed = False
+        try:
+            async with aclosing(stream):
+                if first is not None:
+                    metadata = getattr(first, "response_metadata", None)
+                    if isinstance(metadata, dict):
+                        metadata["router"] = {
+                            "provider": route.name,
+                            "model": route.model,
+                            "attempts": attempts,
+                        }
+                        metadata["rate_limit"] = {"wait_ms": round(waited * 1000, 1)}
+                    actual += usage_tokens(first) or 0
+                    yield first
+                    async for chunk in stream:
+                        actual += usage_tokens(chunk) or 0
+                        yield chunk
+        except Exception as e:
+            failed = True
+            route.record_failure(classify_error(e), retry_after(e))
+            raise
+        finally:
+            route.in_flight -= 1
+            if not failed:
+                route.record_success(time.monotonic() - start)
+                if route.limiter:
+                    route.limiter.record_usage(estimated, actual or None)
+
+    def _should_retry(self, route: ProviderRoute, error: Exception, attempts: int) -> bool:
+        """记录失败并判断是否切换提供商重试（消耗一次重试预算）"""
+        kind = classify_error(error)
+        route.record_failure(kind, retry_after(error))
+        if kind is None or attempts >= self.max_attempts:
+            return False
+        if self._retry_tokens < 1:
+            self.budget_exhausted += 1
+            return False
+        self._retry_tokens -= 1
+        self.retries += 1
+        return True
+
+    async def _choose(self, tried: List[ProviderRoute], estimated_tokens: int) -> ProviderRoute:
+        """选择提供商
+
+        优先在可以立即发出请求的提供商中按权重随机选择（优先未尝试过的）；
+        都需要排队时选择预计等待最短的一个；全部处于冷却期时等待最早恢复的一个。
+        """
+        while True:
+            now = time.monotonic()
+            ready = [route for route in self.routes if route.ready(now, estimated_tokens)]
+            candidates = [route for route in ready if route not in tried] or ready
+            if candidates:
+                known = [route.latency for route in self.routes if route.latency is not None]
+                default_latency = sum(known) / len(known) if known else 1.0
+                weights = [route.weight(default_latency) for route in candidates]
+                return random.choices(candidates, weights=weights)[0]
+
+            available = [route for route in self.routes if not route.cooling_down(now)]
+            if available:
+                return min(available, key=lambda route: route.expected_wait(estimated_tokens))
+            await asyncio.sleep(max(min(route.cooldown_until for route in self.routes) - now, 0.01))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各提供商的请求数、失败数、平滑延迟和错误率，以及重试统计"""
+        return {
+            "providers": {route.name: route.stats() for route in self.routes},
+            "retries": self.retries,
+            "budget_exhausted": self.budget_exhausted,
+        }
+
+
+def build_router(
+    config: Dict[str, Any],
+    providers: Optional[List[str]] = None,
+    structured: bool = False,
+) -> LLMRouter:
+    """为所有配置了 API Key 且已安装集成包的提供商创建路由器
+
+    config 中的 API Key 优先于 Settings；config 的 model_name 只用于按原优先顺序选中的主提供商，
+    其余提供商使用 Settings 中各自的默认模型。SDK 自带的重试被关闭，由路由器统一重试。
+
+    Args:
+        config: Agent 配置字典
+        providers: 参与路由的提供商（可选，默认 settings.llm_router_providers，为空时使用全部）
+        structured: 是否为支持的提供商绑定结构化输出
+
+    Returns:
+        LLMRouter 实例
+
+    Raises:
+        ValueError: 没有任何可用的提供商时
+    """
+    primary = select_provider(config)
+    routes = []
+    for name in providers or settings.llm_router_providers or list(PROVIDERS):
+        spec = PROVIDERS[name]
+        api_key = config.get(spec.api_key_field) or getattr(settings, spec.api_key_field, None)
+        if not api_key or not is_available(name):
+            continue
+        route_config = {**config, spec.api_key_field: api_key}
+        if name != primary:
+            route_config["model_name"] = getattr(settings, spec.model_setting)
+        base = create_chat_model(name, route_config, max_retries=0)
+        llm = bind_structured_output(base, name) if structured else base
+        llm = enable_prompt_caching(llm, name, base, SiteExtraction if structured else None)
+        routes.append(ProviderRoute(
+            name,
+            route_config["model_name"],
+            llm,
+            limiter=RateLimiter.from_settings(
+                name, route_config["model_name"], config.get("rate_limit_share", 1.0)
+            ),
+        ))
+    return LLMRouter(
+        routes,
+        max_attempts=settings.llm_router_max_attempts,
+        retry_ratio=settings.llm_router_retry_ratio,
+        request_timeout=settings.llm_request_timeout,
+    )
@@ -0,0 +1,190 @@
+"""
+流式调用与增量 JSON 解析
+边接收 LLM 输出边解析 JSON 对象，顶层字段一完成就交给调用方；
+对象闭合后立即停止生成，不再为多余的说明文字消耗令牌
+"""
+
+import inspect
+import json
+import time
+from contextlib import aclosing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+
+class IncrementalJSONParser:
+    """增量 JSON 对象解析器
+
+    逐段接收文本，跳过对象之前的内容（如说明文字或 ```json 代码块标记），
+    跟踪字符串、转义和嵌套深度；每当一个顶层字段的值结束（遇到深度 1 的逗号或右花括号）时，
+    解析出该字段并返回。只扫描新到达的文本，总开销与输出长度成线性关系。
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        # 无法解析的顶层字段原文
+        self.invalid: List[str] = []
+        self.done = False
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._member_start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def text(self) -> Optional[str]:
+        """完整 JSON 对象的文本（对象尚未闭合时为 None）"""
+        if not self.done:
+            return None
+        return self.buffer[self._start:self._end]
+
+    @property
+    def started(self) -> bool:
+        """是否已经遇到对象的左花括号"""
+        return self._start is not None
+
+    @property
+    def pending(self) -> str:
+        """对象未闭合时最后一个尚未完成的字段原文"""
+        if self._start is None or self.done:
+            return ""
+        return self.buffer[self._member_start:].strip()
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """接收一段文本
+
+        Args:
+            chunk: 新到达的文本
+
+        Returns:
+            本段文本中完成的顶层字段列表 [(键, 值), ...]
+        """
+        self.buffer += chunk
+        completed: List[Tuple[str, Any]] = []
+        buffer = self.buffer
+        index = self._pos
+        while index < len(buffer) and not self.done:
+            char = buffer[index]
+            if self._start is None:
+                if char == "{":
+                    self._start = index
+                    self._member_start = index + 1
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete(buffer[self._member_start:index], completed)
+                    self._end = index + 1
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                self._complete(buffer[self._member_start:index], completed)
+                self._member_start = index + 1
+            index += 1
+        self._pos = index
+        return completed
+
+    def _complete(self, member: str, completed: List[Tuple[str, Any]]):
+        if not member.strip():
+            return
+        try:
+            field = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            # 单个字段不合法时跳过并记录原文，供只针对该片段的修复请求使用
+            self.invalid.append(member.strip())
+            return
+        for key, value in field.items():
+            self.fields[key] = value
+            completed.append((key, value))
+
+
+def chunk_text(chunk) -> str:
+    """读取流式消息块中的文本（兼容字符串和内容块列表两种格式）
+
+    结构化输出模式下文本为空，返回工具调用参数的 JSON 片段。
+    """
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):
+        content = "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    elif not isinstance(content, str):
+        content = str(content)
+    if not content:
+        content = "".join(
+            call.get("args") or "" for call in getattr(chunk, "tool_call_chunks", None) or []
+        )
+    return content
+
+
+async def stream_json(
+    llm,
+    messages,
+    on_field: Optional[Callable[[str, Any], Any]] = None,
+    stop_on_close: bool = True,
+    **kwargs,
+) -> AIMessage:
+    """以流式方式调用 LLM 并增量解析输出中的 JSON 对象
+
+    Args:
+        llm: 支持 astream 的聊天模型（或 LLMRouter、RateLimitedChatModel）
+        messages: 消息列表
+        on_field: 顶层字段完成时的回调 on_field(键, 值)，可以是协程函数（可选）
+        stop_on_close: JSON 对象闭合后是否立即停止接收
+        **kwargs: 传给 astream 的其他参数
+
+    Returns:
+        AIMessage：对象闭合时 content 为该 JSON 对象的文本，否则为收到的全部文本；
+        response_metadata["stream"] 记录消息块数、首个字段的到达时间和是否在对象闭合时停止
+    """
+    parser = IncrementalJSONParser()
+    aggregate = None
+    chunks = 0
+    first_field: Optional[float] = None
+    stopped = False
+    started = time.perf_counter()
+    async with aclosing(llm.astream(messages, **kwargs)) as stream:
+        async for chunk in stream:
+            chunks += 1
+            aggregate = chunk if aggregate is None else aggregate + chunk
+            for key, value in parser.feed(chunk_text(chunk)):
+                if first_field is None:
+                    first_field = time.perf_counter() - started
+                if on_field is not None:
+                    result = on_field(key, value)
+                    if inspect.isawaitable(result):
+                        await result
+            if parser.done and stop_on_close:
+                # 退出 aclosing 时关闭底层流，停止生成剩余的令牌
+                stopped = True
+                break
+
+    response_metadata = dict(getattr(aggregate, "response_metadata", None) or {})
+    response_metadata["stream"] = {
+        "chunks": chunks,
+        "fields": len(parser.fields),
+        "first_field_ms": round(first_field * 1000, 1) if first_field is not None else None,
+        "stopped_on_close": stopped,
+    }
+    message = AIMessage(
+        content=parser.text if parser.done else parser.buffer,
+        response_metadata=response_metadata,
+    )
+    usage = getattr(aggregate, "usage_metadata", None)
+    if usage:
+        message.usage_metadata = usage
+    return message
@@ -0,0 +1,295 @@
+"""
+结构化输出
+为支持的提供商绑定提取结构（工具调用或 JSON 模式），并解析模型输出：
+工具调用参数 → 严格 JSON → 宽松修复（尾逗号、单引号、截断），修复失败时只针对出错的片段重新询问一次
+"""
+
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, ValidationError
+
+from src.llm.providers import PROVIDERS
+from src.llm.streaming import IncrementalJSONParser, chunk_text
+from src.prompts.schema import SiteExtraction
+
+REASK_SYSTEM_PROMPT = (
+    "你负责修复格式错误的 JSON 片段。只输出修复后的 JSON 对象，不要添加任何解释或 Markdown 代码块。"
+)
+
+REASK_PROMPT = (
+    "下面是一个 JSON 对象中格式有误的字段，请只修复语法错误（不要增删或改写内容），"
+    "并以 {\"字段名\": 值} 的 JSON 对象形式输出全部字段：\n\n"
+)
+
+
+class ParseResult(NamedTuple):
+    """模型输出的解析结果"""
+    # 解析出的对象，失败时为 None
+    data: Optional[Dict[str, Any]]
+    # structured（工具调用参数）、json（严格 JSON）、repaired（宽松修复）或 failed
+    mode: str
+    # 模型输出的原始文本
+    text: str
+    # 失败原因
+    error: Optional[str] = None
+
+
+def bind_structured_output(llm, provider: str, schema: type[BaseModel] = SiteExtraction):
+    """按提供商支持的方式为聊天模型绑定输出结构
+
+    Args:
+        llm: LangChain 聊天模型实例
+        provider: 提供商名称
+        schema: 输出结构（Pydantic 模型）
+
+    Returns:
+        绑定后的模型（仍返回 AIMessage）；提供商不支持结构化输出时原样返回
+    """
+    method = PROVIDERS[provider].structured_output
+    if method == "tool":
+        # 强制调用唯一的工具，模型的输出即为工具参数
+        return llm.bind_tools([schema], tool_choice=schema.__name__)
+    if method == "json_mode":
+        return llm.bind(response_format={"type": "json_object"})
+    return llm
+
+
+def strip_code_fence(text: str) -> str:
+    """去掉 ```json 代码块标记（兼容没有闭合标记的截断输出）"""
+    for fence in ("```json", "```"):
+        if fence in text:
+            start = text.find(fence) + len(fence)
+            end = text.find("```", start)
+            return text[start:end if end >= 0 else None].strip()
+    return text.strip()
+
+
+def _response_text(response) -> str:
+    content = chunk_text(response)
+    if content.strip():
+        return content
+    # 工具参数不是合法 JSON 时，LangChain 将原始参数字符串放在 invalid_tool_calls 中
+    for call in getattr(response, "invalid_tool_calls", None) or []:
+        if call.get("args"):
+            return call["args"]
+    return content
+
+
+def normalize(data: Dict[str, Any], schema: type[BaseModel] = SiteExtraction) -> Dict[str, Any]:
+    """按输出结构校验并规范化字段，不符合结构时原样返回"""
+    try:
+        return schema.model_validate(data).model_dump(
+            by_alias=True, exclude_unset=True, exclude_none=True
+        )
+    except ValidationError:
+        return data
+
+
+def parse_response(response) -> ParseResult:
+    """解析模型输出
+
+    依次尝试：工具调用参数、严格 JSON（兼容代码块包裹）、宽松修复。
+
+    Args:
+        response: LLM 返回的消息
+
+    Returns:
+        ParseResult
+    """
+    for call in getattr(response, "tool_calls", None) or []:
+        if isinstance(call.get("args"), dict) and call["args"]:
+            return ParseResult(
+                normalize(call["args"]), "structured", json.dumps(call["args"], ensure_ascii=False)
+            )
+
+    text = _response_text(response)
+    json_str = strip_code_fence(text)
+    try:
+        data = json.loads(json_str)
+        mode = "json"
+    except json.JSONDecodeError as e:
+        try:
+            data = repair_json(json_str)
+            mode = "repaired"
+        except ValueError:
+            return ParseResult(None, "failed", text, str(e))
+    if not isinstance(data, dict):
+        return ParseResult(None, "failed", text, f"输出不是 JSON 对象: {type(data).__name__}")
+    return ParseResult(data, mode, text)
+
+
+def broken_fragments(text: str, max_chars: int = 2000) -> Tuple[Dict[str, Any], List[str]]:
+    """找出输出中无法解析的顶层字段
+
+    Args:
+        text: 模型输出的文本
+        max_chars: 返回片段的总长度上限
+
+    Returns:
+        (可以解析的字段, 出错的字段片段列表)；输出中没有 JSON 对象时，整段文本作为一个片段
+    """
+    parser = IncrementalJSONParser()
+    parser.feed(strip_code_fence(text))
+    fragments = list(parser.invalid)
+    tail = parser.pending
+    if tail:
+        fragments.append(tail)
+    if not parser.started:
+        fragments = [text.strip()] if text.strip() else []
+
+    limited, total = [], 0
+    for fragment in fragments:
+        fragment = fragment.strip()
+        if total + len(fragment) > max_chars:
+            fragment = fragment[: max(max_chars - total, 0)]
+        if fragment:
+            limited.append(fragment)
+            total += len(fragment)
+    return parser.fields, limited
+
+
+def reask_messages(fragments: List[str]) -> list:
+    """构建只包含出错片段的修复请求（不再附带页面内容）"""
+    return [
+        SystemMessage(content=REASK_SYSTEM_PROMPT),
+        HumanMessage(content=REASK_PROMPT + "\n".join(fragments)),
+    ]
+
+
+def repair_json(text: str) -> Any:
+    """宽松解析 JSON
+
+    在严格解析失败时修复常见问题：单引号字符串、尾逗号、未加引号的键、
+    Python 风格的 True / False / None、字符串中的换行，以及输出被截断时未闭合的字符串和括号
+    （截断时丢弃最后一个不完整的字段）。
+
+    Args:
+        text: JSON 文本（可以带有前后的说明文字）
+
+    Returns:
+        解析出的对象
+
+    Raises:
+        ValueError: 无法修复时
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        raise ValueError("未找到 JSON 对象")
+
+    out: List[str] = []
+    stack: List[str] = []
+    # 最近一个完整值之后的位置和当时的括号栈，截断时回退到这里
+    safe: Optional[Tuple[int, Tuple[str, ...]]] = None
+    expect_key = False
+    index, length = min(starts), len(text)
+    while index < length:
+        char = text[index]
+        if char in "\"'":
+            is_key = expect_key and stack and stack[-1] == "{"
+            string, index, closed = _read_string(text, index)
+            out.append(string)
+            if not is_key:
+                # 被截断的字符串值保留已输出的部分
+                safe = (len(out), tuple(stack))
+            if not closed:
+                break
+            continue
+        if char in "{[":
+            stack.append(char)
+            out.append(char)
+            expect_key = char == "{"
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            if not stack:
+                break
+            stack.pop()
+            out.append("}" if char == "}" else "]")
+            safe = (len(out), tuple(stack))
+            expect_key = False
+            if not stack:
+                break
+        elif char == ",":
+            out.append(char)
+            expect_key = bool(stack) and stack[-1] == "{"
+        elif char == ":":
+            out.append(char)
+            expect_key = False
+        elif char.isspace():
+            out.append(char)
+        elif char == "/" and text.startswith("//", index):
+            # 跳过行注释
+            newline = text.find("\n", index)
+            index = length if newline < 0 else newline
+            continue
+        else:
+            end = index
+            while end < length and text[end] not in ",:[]{}\"'\n" and not text[end].isspace():
+                end += 1
+            word = text[index:end]
+            if expect_key and stack and stack[-1] == "{":
+                out.append(json.dumps(word, ensure_ascii=False))
+            else:
+                out.append({"True": "true", "False": "false", "None": "null"}.get(word, word))
+                # 位于文本末尾的数字或字面量可能不完整，不作为回退位置
+                if end < length:
+                    safe = (len(out), tuple(stack))
+            index = end
+            continue
+        index += 1
+
+    if stack:
+        if safe is None:
+            raise ValueError("JSON 被截断且没有完整的字段")
+        out = out[: safe[0]]
+        stack = list(safe[1])
+        _drop_trailing_comma(out)
+        out.extend("}" if bracket == "{" else "]" for bracket in reversed(stack))
+
+    try:
+        return json.loads("".join(out))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"无法修复的 JSON: {e}") from e
+
+
+def _read_string(text: str, index: int) -> Tuple[str, int, bool]:
+    """读取从 index 开始的单引号或双引号字符串，返回 (双引号 JSON 字符串, 结束后的位置, 是否闭合)"""
+    quote = text[index]
+    parts: List[str] = []
+    position = index + 1
+    while position < len(text):
+        char = text[position]
+        if char == "\\":
+            if position + 1 >= len(text):
+                break
+            following = text[position + 1]
+            parts.append("'" if following == "'" else char + following)
+            position += 2
+            continue
+        if char == quote:
+            return '"' + "".join(parts) + '"', position + 1, True
+        if char == '"':
+            parts.append('\\"')
+        elif char == "\n":
+            parts.append("\\n")
+        elif char == "\t":
+            parts.append("\\t")
+        else:
+            parts.append(char)
+        position += 1
+    return '"' + "".join(parts) + '"', len(text), False
+
+
+def _drop_trailing_comma(out: List[str]):
+    """去掉输出末尾的逗号（忽略其后的空白）"""
+    position = len(out) - 1
+    while position >= 0 and out[position].isspace():
+        position -= 1
+    if position >= 0 and out[position] == ",":
+        del out[position]
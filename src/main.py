@@ -4,9 +4,12 @@ import os
 import signal
 import traceback
 import select
+import argparse
+import time
 
-# 添加项目根目录到模块搜索路径
+# 添加项目根目录和 src 目录到模块搜索路径（同时支持 python src/main.py 与 python -m src.main）
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import asyncio
 import warnings
@@ -19,9 +22,27 @@ warnings.filterwarnings("ignore", message=".*Core Pydantic V1 functionality.*",
 
 from config.settings import settings
 from src.agents.extractor_agent import SiteExtractorAgent
+from src.agents.process_pool import ProcessPoolExtractor
+from src.llm.providers import PROVIDERS
+from src.metrics.server import MetricsServer
+from src.sinks import JsonlSink, SinkPipeline, create_sink
+from src.tools.url_utils import normalize_url
+from src.workqueue import QueueServer, QueueWorker, default_worker_id, open_queue
 
 console = Console()
 
+# 提供商名称 → (API Key 配置项, 默认模型配置项)
+PROVIDER_SETTINGS = {
+    name: (spec.api_key_field, spec.model_setting) for name, spec in PROVIDERS.items()
+}
+
+
+def apply_provider_config(config: dict, provider: str) -> None:
+    """将指定提供商的模型名称和 API Key 写入 Agent 配置"""
+    key_field, model_field = PROVIDER_SETTINGS[provider]
+    config["model_name"] = getattr(settings, model_field)
+    config[key_field] = getattr(settings, key_field)
+
 
 def print_banner():
     banner = Panel.fit(
@@ -118,27 +139,7 @@ async def interactive_mode():
                             console.print(f"[green]✓ 已选择: {available_models[choice_idx][1]}[/green]\n")
 
                             # 设置对应模型的配置
-                            if selected_model == "gemini":
-                                config["model_name"] = settings.gemini_model_name
-                                config["google_api_key"] = settings.google_api_key
-                            elif selected_model == "openai":
-                                config["model_name"] = settings.openai_model_name
-                                config["openai_api_key"] = settings.openai_api_key
-                            elif selected_model == "anthropic":
-                                config["model_name"] = settings.anthropic_model_name
-                                config["anthropic_api_key"] = settings.anthropic_api_key
-                            elif selected_model == "groq":
-                                config["model_name"] = settings.groq_model_name
-                                config["groq_api_key"] = settings.groq_api_key
-                            elif selected_model == "siliconflow":
-                                config["model_name"] = settings.siliconflow_model_name
-                                config["siliconflow_api_key"] = settings.siliconflow_api_key
-                            elif selected_model == "xunfei":
-                                config["model_name"] = settings.xunfei_model_name
-                                config["xunfei_api_key"] = settings.xunfei_api_key
-                            elif selected_model == "cerebras":
-                                config["model_name"] = settings.cerebras_model_name
-                                config["cerebras_api_key"] = settings.cerebras_api_key
+                            apply_provider_config(config, selected_model)
                             break
                         else:
                             console.print("[red]无效的选项，请重新输入[/red]")
@@ -157,77 +158,550 @@ async def interactive_mode():
         console.print(f"[green]使用默认模型: {available_models[0][1]}[/green]\n")
 
         # 设置对应模型的配置
-        if selected_model == "gemini":
-            config["model_name"] = settings.gemini_model_name
-            config["google_api_key"] = settings.google_api_key
-        elif selected_model == "openai":
-            config["model_name"] = settings.openai_model_name
-            config["openai_api_key"] = settings.openai_api_key
-        elif selected_model == "anthropic":
-            config["model_name"] = settings.anthropic_model_name
-            config["anthropic_api_key"] = settings.anthropic_api_key
-        elif selected_model == "groq":
-            config["model_name"] = settings.groq_model_name
-            config["groq_api_key"] = settings.groq_api_key
-        elif selected_model == "siliconflow":
-            config["model_name"] = settings.siliconflow_model_name
-            config["siliconflow_api_key"] = settings.siliconflow_api_key
-        elif selected_model == "xunfei":
-            config["model_name"] = settings.xunfei_model_name
-            config["xunfei_api_key"] = settings.xunfei_api_key
-        elif selected_model == "cerebras":
-            config["model_name"] = settings.cerebras_model_name
-            config["cerebras_api_key"] = settings.cerebras_api_key
+        apply_provider_config(config, selected_model)
+
+    # 配置了写出目标时，每条结果在显示之外也写入这些目标
+    pipeline = None
+    if settings.result_sinks:
+        try:
+            pipeline = SinkPipeline([create_sink(spec) for spec in settings.result_sinks])
+        except (ValueError, ImportError) as e:
+            console.print(f"[red]写出目标配置错误: {e}[/red]")
+            return
+        await pipeline.start()
 
     agent = SiteExtractorAgent(config)
 
-    # URL 输入循环
-    console.print("[cyan]请输入 URL > [/cyan]", end="")
-    console.file.flush()
+    try:
+        # URL 输入循环
+        console.print("[cyan]请输入 URL > [/cyan]", end="")
+        console.file.flush()
 
-    while not exit_flag['value']:
-        try:
-            # 非阻塞输入
+        while not exit_flag['value']:
             try:
-                ready, _, _ = select.select([sys.stdin], [], [], 0.1)
-            except ValueError:
-                break
-
-            if ready:
+                # 非阻塞输入
                 try:
-                    url = sys.stdin.readline().strip()
-                except (OSError, IOError):
+                    ready, _, _ = select.select([sys.stdin], [], [], 0.1)
+                except ValueError:
                     break
 
-                if url.lower() in ['quit', 'exit', 'q']:
+                if ready:
+                    try:
+                        url = sys.stdin.readline().strip()
+                    except (OSError, IOError):
+                        break
+
+                    if url.lower() in ['quit', 'exit', 'q']:
+                        console.print("[yellow]再见！[/yellow]")
+                        break
+
+                    if not url:
+                        continue
+
+                    console.print(f"[yellow]正在提取: {url}[/yellow]")
+                    # 流式调用时字段一完成就先显示出来
+                    on_field = print_field if agent.stream else None
+                    result = await agent.extract(url, on_field=on_field)
+                    console.print("[green]✓ 提取完成[/green]")
+                    console.print_json(json.dumps(result, ensure_ascii=False, indent=2))
+                    if pipeline:
+                        await pipeline.put(result)
+
+                    # 重新提示输入
+                    console.print("[cyan]请输入 URL > [/cyan]", end="")
+                    console.file.flush()
+
+                if exit_flag['value']:
                     console.print("[yellow]再见！[/yellow]")
                     break
 
-                if not url:
-                    continue
+            except KeyboardInterrupt:
+                console.print("\n[yellow]再见！[/yellow]")
+                break
+            except Exception as e:
+                console.print(f"[red]错误: {e}[/red]")
+                console.print(f"[red]{traceback.format_exc()}[/red]")
+    finally:
+        # 关闭 Agent 持有的浏览器池
+        await agent.close()
+        if pipeline:
+            await pipeline.close()
+
+
+def print_field(key: str, value) -> None:
+    """显示流式解析出的一个字段"""
+    console.print(f"[dim]  {key}: {json.dumps(value, ensure_ascii=False)[:200]}[/dim]")
+
+
+def load_completed_urls(output_path: str) -> set[str]:
+    """读取已有输出文件中已完成（非 error）的 URL，用于断点续跑"""
+    completed: set[str] = set()
+    if output_path == "-" or not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 上次中断时可能留下不完整的最后一行，追加前由 JsonlSink 截掉
+                continue
+            if record.get("status") != "error" and record.get("url"):
+                completed.add(normalize_url(record["url"]))
+    return completed
+
 
-                console.print(f"[yellow]正在提取: {url}[/yellow]")
-                result = await agent.extract(url)
-                console.print("[green]✓ 提取完成[/green]")
-                console.print_json(json.dumps(result, ensure_ascii=False, indent=2))
+# 从文件读取 URL 时每次在线程中读取的字节数（按整行取整）
+URL_READ_CHUNK_BYTES = 64 * 1024
 
-                # 重新提示输入
-                console.print("[cyan]请输入 URL > [/cyan]", end="")
-                console.file.flush()
 
-            if exit_flag['value']:
-                console.print("[yellow]再见！[/yellow]")
+async def read_urls(input_path: str, skip: set[str]):
+    """流式读取 URL（'-' 表示标准输入），跳过空行、注释、重复和已完成的 URL
+
+    读取都放到线程中进行，不阻塞事件循环：文件按块读取；标准输入可能是陆续写入的管道，
+    逐行读取，使每个 URL 到达后即可开始处理。
+
+    Args:
+        input_path: URL 列表文件路径，'-' 表示标准输入
+        skip: 需要跳过的规范化 URL（如断点续跑时已完成的 URL）
+
+    Yields:
+        去掉首尾空白的 URL，按规范化 URL 去重
+    """
+    if input_path == "-":
+        f = sys.stdin
+    else:
+        f = await asyncio.to_thread(open, input_path, encoding="utf-8")
+    seen: set[str] = set()
+    try:
+        while True:
+            if f is sys.stdin:
+                lines = [await asyncio.to_thread(f.readline)]
+            else:
+                lines = await asyncio.to_thread(f.readlines, URL_READ_CHUNK_BYTES)
+            if not lines or not lines[0]:
                 break
+            for line in lines:
+                url = line.strip()
+                if not url or url.startswith("#"):
+                    continue
+                key = normalize_url(url)
+                if key in skip or key in seen:
+                    continue
+                seen.add(key)
+                yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def build_agent_config(args: argparse.Namespace, err_console: Console) -> dict | None:
+    """根据命令行参数构建非交互模式的 Agent 配置，未找到 API Key 时返回 None"""
+    config = {
+        "model_name": settings.model_name,
+        "temperature": settings.temperature,
+        "max_tokens": settings.max_tokens,
+    }
+    provider = args.provider
+    if provider is None:
+        provider = next(
+            (name for name, (key_field, _) in PROVIDER_SETTINGS.items()
+             if getattr(settings, key_field)),
+            None,
+        )
+    if provider is None or not getattr(settings, PROVIDER_SETTINGS[provider][0]):
+        err_console.print(f"[red]未找到提供商 {provider or ''} 的 API Key[/red]")
+        return None
+    apply_provider_config(config, provider)
+    if args.model:
+        config["model_name"] = args.model
+    # 开关总是显式传入：Agent 在配置缺少对应项时回退到 settings，--no-xxx 才能关闭默认开启的功能
+    config["router"] = args.router
+    config["stream"] = args.stream
+    config["recrawl"] = args.recrawl
+    config["site"] = args.site
+    config["packing"] = args.pack
+    # 礼貌抓取只用于批量和工作进程运行，单个 URL 的交互式提取不排队、不检查 robots.txt
+    config["politeness"] = settings.politeness_enabled
+    return config
+
+
+async def batch_mode(args: argparse.Namespace) -> int:
+    """非交互批量模式：URL 文件/标准输入 → JSONL
+
+    Returns:
+        进程退出码
+    """
+    err_console = Console(stderr=True)
+    config = build_agent_config(args, err_console)
+    if config is None:
+        return 2
+
+    # --output 的 JSONL 之外另外写入 --sink 指定的目标；写出跟不上时提取端随之放慢
+    try:
+        sinks = [JsonlSink(args.output, fsync_interval=settings.jsonl_fsync_interval)]
+        sinks += [create_sink(spec) for spec in args.sink]
+    except (ValueError, ImportError) as e:
+        err_console.print(f"[red]{e}[/red]")
+        return 2
+
+    completed = set() if args.no_resume else load_completed_urls(args.output)
+    if completed:
+        err_console.print(f"[dim]断点续跑：跳过 {len(completed)} 个已完成的 URL[/dim]")
+
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(args.metrics_port)
+        await metrics_server.start()
+        err_console.print(f"[dim]指标端点: http://127.0.0.1:{metrics_server.port}/metrics[/dim]")
+        if args.workers > 1:
+            err_console.print("[yellow]多进程模式下指标端点只包含父进程的指标[/yellow]")
+
+    if args.workers > 1:
+        extractor = ProcessPoolExtractor(config, args.workers)
+        err_console.print(f"[dim]{args.workers} 个工作进程，每个进程并发 {args.concurrency}[/dim]")
+    else:
+        extractor = SiteExtractorAgent(config)
+
+    counts = {"success": 0, "parsed_error": 0, "error": 0}
+    recrawl_counts: dict[str, int] = {}
+    # 提示词缓存：输入令牌、命中和写入缓存的令牌，以及命中 / 未命中缓存的 LLM 调用耗时
+    prompt_cache = {"input": 0, "cache_read": 0, "cache_creation": 0}
+    llm_latency: dict[str, list[float]] = {"hit": [], "miss": []}
+    started = time.monotonic()
+    pipeline = SinkPipeline(sinks)
+    try:
+        async with pipeline, extractor as agent:
+            urls = read_urls(args.input, completed)
+            async for result in agent.extract_many(urls, concurrency=args.concurrency):
+                # 结果按批写出，每批写完即刷新；中断时先写完队列中的结果再退出
+                await pipeline.put(result)
+                status = result.get("status", "error")
+                counts[status] = counts.get(status, 0) + 1
+                if result.get("recrawl"):
+                    recrawl_status = result["recrawl"]["status"]
+                    recrawl_counts[recrawl_status] = recrawl_counts.get(recrawl_status, 0) + 1
+                usage = result.get("usage") or {}
+                if usage.get("input_tokens"):
+                    prompt_cache["input"] += usage["input_tokens"]
+                    prompt_cache["cache_read"] += usage.get("cache_read_tokens", 0)
+                    prompt_cache["cache_creation"] += usage.get("cache_creation_tokens", 0)
+                    llm_ms = (result.get("timings") or {}).get("llm_call")
+                    if llm_ms is not None:
+                        llm_latency["hit" if usage.get("cache_read_tokens") else "miss"].append(
+                            llm_ms
+                        )
+            llm_stats = agent.llm_stats()
+            parse_stats = agent.parse_stats()
+            politeness_stats = agent.politeness_stats(top=5)
+            packing_stats = agent.packing_stats()
+    finally:
+        if metrics_server:
+            await metrics_server.close()
+
+    elapsed = time.monotonic() - started
+    total = sum(counts.values())
+    err_console.print(
+        f"[green]完成 {total} 个 URL，用时 {elapsed:.1f}s[/green] "
+        f"[dim](成功 {counts['success']}，解析失败 {counts['parsed_error']}，"
+        f"错误 {counts['error']})[/dim]"
+    )
+    for name, stats in llm_stats.get("providers", {}).items():
+        err_console.print(
+            f"[dim]  {name} ({stats['model']}): 请求 {stats['requests']}，"
+            f"失败 {stats['failures']}，平均延迟 {stats['latency_ms']} ms"
+            f"{format_rate_limit(stats.get('rate_limit'))}[/dim]"
+        )
+    if "retries" in llm_stats:
+        err_console.print(f"[dim]  切换重试 {llm_stats['retries']} 次[/dim]")
+    if "rate_limit" in llm_stats:
+        err_console.print(f"[dim]  限流{format_rate_limit(llm_stats['rate_limit'])}[/dim]")
+    for name, stats in parse_stats.items():
+        err_console.print(
+            f"[dim]  解析 {name}: 失败率 {stats['failure_rate']:.1%}，"
+            f"宽松修复 {stats.get('repaired', 0)} 次，重新询问 {stats.get('reask', 0)} 次，"
+            f"共 {stats['total']} 次[/dim]"
+        )
+    if prompt_cache["cache_read"] or prompt_cache["cache_creation"]:
+        latency = "，".join(
+            f"{label} {sum(values) / len(values):.0f} ms（{len(values)} 次）"
+            for label, values in (("命中", llm_latency["hit"]), ("未命中", llm_latency["miss"]))
+            if values
+        )
+        err_console.print(
+            f"[dim]  提示词缓存: 命中 {prompt_cache['cache_read']} / "
+            f"输入 {prompt_cache['input']} 令牌"
+            f"（{prompt_cache['cache_read'] / prompt_cache['input']:.1%}），"
+            f"写入 {prompt_cache['cache_creation']} 令牌；LLM 平均耗时 {latency}[/dim]"
+        )
+    if recrawl_counts:
+        labels = {"not_modified": "未修改（304）", "unchanged": "内容未变", "patched": "增量修改",
+                  "full": "完整重新提取", "new": "首次提取"}
+        err_console.print("[dim]  增量重新提取: " + "，".join(
+            f"{labels.get(name, name)} {count}" for name, count in recrawl_counts.items()
+        ) + "[/dim]")
+    if packing_stats.get("packed_calls"):
+        baseline = packing_stats["baseline_input_tokens"]
+        saved = packing_stats["input_tokens_saved"]
+        err_console.print(
+            f"[dim]  打包: {packing_stats['packed_calls']} 次请求提取 "
+            f"{packing_stats['packed_pages']} 个网页，"
+            f"回退单独调用 {packing_stats['fallbacks']} 次，"
+            f"比逐个调用少 {packing_stats['calls_saved']} 次请求，"
+            f"估算输入令牌节省 {saved}（{saved / baseline if baseline else 0:.1%}）[/dim]"
+        )
+    if sinks[0].truncated_bytes:
+        err_console.print(
+            f"[dim]  输出文件末尾有上次中断留下的不完整行（{sinks[0].truncated_bytes} 字节），"
+            "已截掉后追加[/dim]"
+        )
+    sink_stats = pipeline.stats()
+    if sink_stats["blocked_puts"] or len(sinks) > 1:
+        err_console.print(
+            f"[dim]  写出: {sink_stats['written']} 条，{sink_stats['batches']} 批，"
+            f"耗时 {sink_stats['write_ms']:.0f} ms；"
+            f"队列最深 {sink_stats['max_queue_depth']} / {sink_stats['queue_size']}，"
+            f"提取端等待写出 {sink_stats['blocked_puts']} 次"
+            f"（共 {sink_stats['blocked_ms']:.0f} ms）[/dim]"
+        )
+    if politeness_stats.get("disallowed"):
+        err_console.print(
+            f"[dim]  robots.txt 禁止抓取 {politeness_stats['disallowed']} 个 URL[/dim]"
+        )
+    for host, stats in politeness_stats.get("hosts", {}).items():
+        if stats["requests"]:
+            err_console.print(
+                f"[dim]  主机 {host}: 请求 {stats['requests']}，间隔 {stats['delay_s']}s，"
+                f"平均排队 {stats['avg_wait_ms']} ms，最长 {stats['max_wait_ms']} ms[/dim]"
+            )
+    return 0
+
+
+async def worker_mode(args: argparse.Namespace) -> int:
+    """工作进程模式：从共享的工作队列领取 URL 任务，结果写回队列
+
+    Returns:
+        进程退出码
+    """
+    err_console = Console(stderr=True)
+    config = build_agent_config(args, err_console)
+    if config is None:
+        return 2
+
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(args.metrics_port)
+        await metrics_server.start()
+        err_console.print(f"[dim]指标端点: http://127.0.0.1:{metrics_server.port}/metrics[/dim]")
+
+    worker_id = args.worker_id or default_worker_id()
+    err_console.print(f"[dim]工作进程 {worker_id}，队列 {args.queue}[/dim]")
+    started = time.monotonic()
+    try:
+        async with open_queue(args.queue) as queue, SiteExtractorAgent(config) as agent:
+            worker = QueueWorker(
+                agent,
+                queue,
+                worker_id=worker_id,
+                concurrency=args.concurrency,
+                exit_when_idle=args.exit_when_idle,
+            )
+            counts = await worker.run()
+    finally:
+        if metrics_server:
+            await metrics_server.close()
+
+    elapsed = time.monotonic() - started
+    err_console.print(
+        f"[green]完成 {counts['completed']} 个任务，用时 {elapsed:.1f}s[/green] "
+        f"[dim](失败 {counts['failed']}，重新入队 {counts['retried']})[/dim]"
+    )
+    return 0
+
+
+async def coordinator_mode(args: argparse.Namespace) -> int:
+    """协调器：入队、查看积压和各工作进程吞吐量、导出结果，或以 HTTP 提供队列供其他机器访问
+
+    Returns:
+        进程退出码
+    """
+    err_console = Console(stderr=True)
+    if args.action == "serve":
+        if args.queue.startswith(("http://", "https://")):
+            err_console.print("[red]serve 需要本地 SQLite 队列文件[/red]")
+            return 2
+        async with open_queue(args.queue) as queue:
+            async with QueueServer(
+                queue, args.port, host=args.host, token=settings.work_queue_token
+            ) as server:
+                err_console.print(f"[green]协调器已启动: http://{args.host}:{server.port}[/green]")
+                await asyncio.Event().wait()
+        return 0
+
+    async with open_queue(args.queue) as queue:
+        if args.action == "enqueue":
+            urls = [url async for url in read_urls(args.input, set())]
+            counts = await queue.enqueue(urls)
+            err_console.print(
+                f"[green]新增 {counts['added']} 个任务[/green] "
+                f"[dim](重复 {counts['duplicates']} 个)[/dim]"
+            )
+        elif args.action == "status":
+            while True:
+                print_queue_stats(await queue.stats(args.window))
+                if not args.watch:
+                    break
+                await asyncio.sleep(args.watch)
+        elif args.action == "export":
+            out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+            exported, after = 0, 0
+            try:
+                while True:
+                    rows = await queue.results(after)
+                    if not rows:
+                        break
+                    for seq, result in rows:
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        after = seq
+                    exported += len(rows)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            err_console.print(f"[green]导出 {exported} 条结果[/green]")
+    return 0
+
+
+def print_queue_stats(stats: dict) -> None:
+    """显示队列积压和各工作进程的吞吐量"""
+    backlog = stats["backlog"]
+    console.print(
+        f"[cyan]积压 {backlog['pending']}[/cyan]"
+        f"（可执行 {backlog['ready']}，最久 {backlog['oldest_pending_s']}s） "
+        f"处理中 {backlog['leased']}（租约过期 {backlog['expired_leases']}） "
+        f"[green]完成 {backlog['done']}[/green] [red]失败 {backlog['failed']}[/red] "
+        f"总吞吐量 {stats['throughput']}/s"
+    )
+    if not stats["workers"]:
+        return
+    table = Table(show_header=True, header_style="bold cyan")
+    for column in ("工作进程", "完成", "失败", "吞吐量/s", "近期吞吐量/s", "上次活动"):
+        table.add_column(column)
+    for worker, row in stats["workers"].items():
+        table.add_row(
+            worker if row["active"] else f"[dim]{worker}[/dim]",
+            str(row["completed"]),
+            str(row["failed"]),
+            f"{row['throughput']:.2f}",
+            f"{row['recent_throughput']:.2f}",
+            f"{row['last_seen_s']}s 前",
+        )
+    console.print(table)
 
-        except KeyboardInterrupt:
-            console.print("\n[yellow]再见！[/yellow]")
-            break
-        except Exception as e:
-            console.print(f"[red]错误: {e}[/red]")
-            console.print(f"[red]{traceback.format_exc()}[/red]")
+
+def format_rate_limit(stats: dict | None) -> str:
+    """格式化限流统计：排队请求数和等待时间"""
+    if not stats:
+        return ""
+    return (
+        f"，排队 {stats['waited_requests']}/{stats['requests']} 次，"
+        f"平均等待 {stats['avg_wait_ms']} ms，最长 {stats['max_wait_ms']} ms"
+    )
+
+
+def add_extraction_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加 batch 和 worker 共用的提取参数
+
+    开关的默认值来自配置，可以用 --xxx 开启、--no-xxx 关闭。
+    """
+    parser.add_argument("--provider", "-p", choices=list(PROVIDER_SETTINGS),
+                        help="LLM 提供商（默认使用第一个配置了 API Key 的提供商）")
+    parser.add_argument("--model", help="覆盖提供商的默认模型名称")
+    parser.add_argument("--router", action=argparse.BooleanOptionalAction,
+                        default=settings.llm_router_enabled,
+                        help="在所有配置了 API Key 的提供商之间分配请求并自动切换")
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction,
+                        default=settings.llm_streaming,
+                        help="流式调用 LLM，JSON 对象闭合后立即停止生成")
+    parser.add_argument("--recrawl", action=argparse.BooleanOptionalAction,
+                        default=settings.recrawl_enabled,
+                        help="增量重新提取：页面未变化时复用上次的结果，"
+                             "变化时只把改动的段落交给 LLM")
+    parser.add_argument("--site", action=argparse.BooleanOptionalAction,
+                        default=settings.site_mode_enabled,
+                        help="站点模式：同时抓取首页中的联系方式、公司介绍等子页面，合并后一次提取")
+    parser.add_argument("--pack", action=argparse.BooleanOptionalAction,
+                        default=settings.llm_packing_enabled,
+                        help="把较小的网页合并为一次 LLM 请求，系统提示词只发送一次")
+    parser.add_argument("--metrics-port", type=int, default=settings.metrics_port,
+                        help="在本机该端口提供 /metrics 和 /traces（默认不启动）")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Site Info Extractor Agent")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="非交互批量提取：每行一个 URL，输出 JSONL")
+    batch.add_argument("--input", "-i", default="-", help="URL 列表文件，'-' 表示标准输入（默认）")
+    batch.add_argument(
+        "--output", "-o", default="-", help="JSONL 输出文件，'-' 表示标准输出（默认）"
+    )
+    batch.add_argument("--concurrency", "-c", type=int, default=settings.batch_concurrency,
+                       help="同时处理的 URL 数量（多进程时为每个进程的数量）")
+    batch.add_argument("--workers", "-w", type=int, default=settings.batch_workers,
+                       help="工作进程数，大于 1 时将 URL 分发给多个进程，每个进程有自己的浏览器池")
+    add_extraction_arguments(batch)
+    batch.add_argument("--sink", action="append", default=list(settings.result_sinks),
+                       help="另外写入的目标（可重复）：jsonl:路径、sqlite:路径 或 parquet:目录")
+    batch.add_argument("--no-resume", action="store_true",
+                       help="不跳过输出文件中已完成的 URL")
+
+    worker = subparsers.add_parser(
+        "worker", help="从共享的工作队列领取 URL 任务，可在多台机器上运行多个"
+    )
+    worker.add_argument("--queue", "-q", default=settings.work_queue,
+                        help="SQLite 队列文件，或协调器地址 http://host:port")
+    worker.add_argument("--concurrency", "-c", type=int, default=settings.batch_concurrency,
+                        help="同时处理的任务数")
+    add_extraction_arguments(worker)
+    worker.add_argument("--worker-id", help="工作进程标识（默认为 主机名:进程号）")
+    worker.add_argument("--exit-when-idle", action="store_true",
+                        help="队列中没有待处理和处理中的任务时退出")
+
+    coordinator = subparsers.add_parser(
+        "coordinator", help="管理工作队列：入队、查看进度、导出结果、提供 HTTP 访问"
+    )
+    coordinator.add_argument("--queue", "-q", default=settings.work_queue,
+                             help="SQLite 队列文件，或协调器地址 http://host:port")
+    actions = coordinator.add_subparsers(dest="action", required=True)
+    enqueue = actions.add_parser("enqueue", help="按规范化 URL 去重后入队")
+    enqueue.add_argument(
+        "--input", "-i", default="-", help="URL 列表文件，'-' 表示标准输入（默认）"
+    )
+    status = actions.add_parser("status", help="显示积压和各工作进程的吞吐量")
+    status.add_argument("--window", type=float, default=60.0, help="近期吞吐量的统计窗口（秒）")
+    status.add_argument(
+        "--watch", type=float, default=0, help="每隔该秒数刷新一次（默认只显示一次）"
+    )
+    export = actions.add_parser("export", help="以 JSONL 导出结果（每个 URL 一条）")
+    export.add_argument(
+        "--output", "-o", default="-", help="JSONL 输出文件，'-' 表示标准输出（默认）"
+    )
+    serve = actions.add_parser("serve", help="以 HTTP 提供队列，供其他机器上的工作进程访问")
+    serve.add_argument(
+        "--host", default="127.0.0.1", help="监听地址（供其他机器访问时设为 0.0.0.0）"
+    )
+    serve.add_argument("--port", type=int, default=8765, help="监听端口")
+    return parser
 
 
 async def main():
+    args = build_arg_parser().parse_args()
+    if args.command == "batch":
+        sys.exit(await batch_mode(args))
+    if args.command == "worker":
+        sys.exit(await worker_mode(args))
+    if args.command == "coordinator":
+        sys.exit(await coordinator_mode(args))
+
     try:
         print_banner()
         print_settings()
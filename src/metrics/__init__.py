@@ -0,0 +1,10 @@
+"""
+指标模块
+包含阶段耗时追踪、Prometheus 指标注册表和本地指标端点
+"""
+
+from .registry import REGISTRY, MetricsRegistry
+from .server import MetricsServer
+from .tracing import EXPORTER, current_span, span
+
+__all__ = ["REGISTRY", "MetricsRegistry", "EXPORTER", "span", "current_span", "MetricsServer"]
@@ -0,0 +1,69 @@
+"""
+指标 HTTP 端点
+在本地端口上提供 /metrics（Prometheus 文本格式）和 /traces（OTLP JSON）
+"""
+
+from typing import Optional
+
+from aiohttp import web
+
+from src.metrics.registry import REGISTRY, MetricsRegistry
+from src.metrics.tracing import EXPORTER, SpanExporter
+
+
+class MetricsServer:
+    """本地指标服务"""
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        registry: Optional[MetricsRegistry] = None,
+        exporter: Optional[SpanExporter] = None,
+    ):
+        """初始化指标服务
+
+        Args:
+            port: 监听端口，0 表示由系统分配
+            host: 监听地址，默认只监听本机
+            registry: 指标注册表（可选，默认使用进程内的 REGISTRY）
+            exporter: 追踪导出器（可选，默认使用进程内的 EXPORTER）
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry or REGISTRY
+        self.exporter = exporter or EXPORTER
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        """启动服务，启动后 port 为实际监听的端口"""
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        app.router.add_get("/traces", self._traces)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def _traces(self, request: web.Request) -> web.Response:
+        return web.json_response(self.exporter.to_otlp())
@@ -0,0 +1,171 @@
+"""
+阶段耗时追踪
+以上下文变量串联父子关系的轻量 span，结束时计入阶段耗时直方图，
+可导出为 OpenTelemetry（OTLP JSON）格式
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import settings
+from src.metrics.registry import STAGE_SECONDS
+
+# 当前所在的 span；asyncio 任务创建时复制上下文，各 URL 的追踪互不干扰
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# OTLP 的 span 状态码
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class Span:
+    """一次阶段执行的记录"""
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        # 根 span 收集整条追踪中已结束的 span
+        self.spans: List["Span"] = [] if parent is None else parent.spans
+        self._start = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        self.spans.append(self)
+
+    def timings(self) -> Dict[str, float]:
+        """返回整条追踪中各阶段的耗时（毫秒），同名阶段累加"""
+        timings: Dict[str, float] = {}
+        for span in self.spans:
+            timings[span.name] = timings.get(span.name, 0.0) + span.duration * 1000
+        return {name: round(value, 1) for name, value in timings.items()}
+
+    def to_otel(self) -> Dict[str, Any]:
+        """转换为 OTLP JSON 中的 span 对象"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otel_attribute(key, value) for key, value in self.attributes.items()],
+            "status": (
+                {"code": _STATUS_ERROR, "message": self.error} if self.error
+                else {"code": _STATUS_OK}
+            ),
+        }
+        if self.parent:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """记录一个阶段的耗时
+
+    在已有 span 内调用时成为其子 span；结束时计入 extractor_stage_duration_seconds{stage=name}。
+    根 span 结束时整条追踪交给导出器。
+
+    Args:
+        name: 阶段名称
+        **attributes: span 属性
+    """
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        STAGE_SECONDS.observe(current.duration, stage=name)
+        if current.parent is None:
+            EXPORTER.export(current)
+
+
+def current_span() -> Optional[Span]:
+    """返回当前所在的 span（不在追踪中时为 None）"""
+    return _current_span.get()
+
+
+class SpanExporter:
+    """保存最近的追踪，并可追加写入 OTLP JSON Lines 文件"""
+
+    def __init__(
+        self,
+        max_traces: int = 100,
+        path: Optional[str] = None,
+        service_name: str = "site-info-extractor",
+    ):
+        """初始化导出器
+
+        Args:
+            max_traces: 内存中保留的最近追踪数
+            path: OTLP JSON Lines 输出文件（可选），每条追踪一行
+            service_name: 写入 resource 的 service.name
+        """
+        self.traces: deque = deque(maxlen=max_traces)
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, root: Span):
+        with self._lock:
+            self.traces.append(root)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.to_otlp([root]), ensure_ascii=False) + "\n")
+
+    def to_otlp(self, roots: Optional[List[Span]] = None) -> Dict[str, Any]:
+        """将追踪转换为 OTLP/JSON 的 ExportTraceServiceRequest 结构"""
+        if roots is None:
+            with self._lock:
+                roots = list(self.traces)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otel_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "src.metrics.tracing"},
+                    "spans": [span.to_otel() for root in roots for span in root.spans],
+                }],
+            }],
+        }
+
+
+EXPORTER = SpanExporter(path=settings.trace_export_path)
+
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
@@ -0,0 +1,80 @@
+"""
+提取结果的数据结构
+与系统提示词中的输出格式一一对应：字段名为英文，别名为输出中使用的中文字段名。
+支持结构化输出的提供商以该结构作为工具参数，模型直接返回符合结构的对象
+"""
+
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class _Schema(BaseModel):
+    # 按别名（中文字段名）输出和解析；模型额外返回的字段予以保留
+    model_config = ConfigDict(populate_by_name=True, extra="allow")
+
+
+class Headings(_Schema):
+    h1: List[str] = Field(default_factory=list, description="一级标题")
+    h2: List[str] = Field(default_factory=list, description="二级标题")
+
+
+class MainContent(_Schema):
+    text: Optional[str] = Field(None, alias="文本", description="主要内容文本")
+    headings: Optional[Headings] = Field(None, alias="标题", description="页面中的各级标题")
+
+
+class Link(_Schema):
+    text: Optional[str] = Field(None, alias="文本", description="链接文字")
+    href: Optional[str] = Field(None, alias="地址", description="链接地址")
+
+
+class Image(_Schema):
+    src: Optional[str] = Field(None, alias="地址", description="图片地址")
+    description: Optional[str] = Field(None, alias="描述", description="图片描述")
+
+
+class Metadata(_Schema):
+    author: Optional[str] = Field(None, alias="作者", description="作者")
+    date: Optional[str] = Field(None, alias="日期", description="发布日期")
+    tags: List[str] = Field(default_factory=list, alias="标签", description="标签或分类")
+
+
+class Contact(_Schema):
+    emails: List[str] = Field(default_factory=list, alias="邮箱", description="邮箱地址")
+    phones: List[str] = Field(default_factory=list, alias="电话", description="电话号码")
+
+
+class SiteExtraction(_Schema):
+    """从网页中提取的结构化信息（所有描述性内容使用中文）"""
+
+    url: Optional[str] = Field(None, description="完整 URL")
+    title: Optional[str] = Field(None, alias="标题", description="页面标题")
+    description: Optional[str] = Field(None, alias="描述", description="页面描述")
+    main_content: Optional[MainContent] = Field(None, alias="主要内容", description="主要内容")
+    links: List[Link] = Field(
+        default_factory=list, alias="链接", description="关键链接（导航、相关内容）"
+    )
+    images: List[Image] = Field(default_factory=list, alias="图片", description="图片资源")
+    metadata: Optional[Metadata] = Field(
+        None, alias="元数据", description="作者、日期、标签等元数据"
+    )
+    contact: Optional[Contact] = Field(None, alias="联系方式", description="联系方式")
+    structured_data: List[Any] = Field(
+        default_factory=list, alias="结构化数据", description="Schema.org 等结构化数据"
+    )
+    extracted_at: Optional[str] = Field(None, alias="提取时间", description="提取时间")
+    status: Optional[str] = Field(None, alias="状态", description="成功、部分成功或错误")
+
+
+class PackedItem(_Schema):
+    """打包请求中单个网页的提取结果"""
+
+    url: str = Field(..., description="该网页的目标 URL（与输入中的一致）")
+    result: SiteExtraction = Field(..., description="该网页的提取结果")
+
+
+class PackedExtraction(_Schema):
+    """一次请求提取多个网页时的输出结构，每个网页对应 results 中的一项"""
+
+    results: List[PackedItem] = Field(default_factory=list, description="各网页的提取结果")
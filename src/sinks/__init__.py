@@ -0,0 +1,12 @@
+"""
+结果写出模块
+包含有界队列的异步写出管道，以及 JSONL、SQLite 和 Parquet 写出目标
+"""
+
+from .base import ResultSink
+from .jsonl_sink import JsonlSink
+from .parquet_sink import ParquetSink
+from .pipeline import SinkPipeline, create_sink
+from .sqlite_sink import SQLiteSink
+
+__all__ = ["ResultSink", "JsonlSink", "SQLiteSink", "ParquetSink", "SinkPipeline", "create_sink"]
@@ -0,0 +1,29 @@
+"""
+结果写出目标的基类
+"""
+
+from typing import Any, Dict, List
+
+
+class ResultSink:
+    """结果写出目标
+
+    所有方法都由写出管道在线程中调用，同一时间只有一个线程访问，可以直接执行阻塞的文件和数据库操作。
+    """
+
+    # 统计和错误信息中使用的名称
+    name = "sink"
+
+    def open(self):
+        """打开文件或连接（写出开始前调用一次）"""
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        """写出一批结果"""
+        raise NotImplementedError
+
+    def close(self):
+        """刷新并关闭（写出结束时调用一次）"""
+
+    def stats(self) -> Dict[str, Any]:
+        """返回写出统计"""
+        return {}
@@ -0,0 +1,106 @@
+"""
+JSONL 写出
+每条结果一行，按批追加写入；每批写完后刷新到操作系统，并按间隔调用 fsync 落盘
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+from src.sinks.base import ResultSink
+
+
+def truncate_partial_line(path: str) -> int:
+    """截掉文件末尾不完整的一行（上次写到一半时中断），返回截掉的字节数
+
+    追加写入前调用，避免新记录接在半行之后，使两条记录都无法解析。
+    """
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # 从末尾按块向前查找最后一个换行符
+        position = size
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            chunk = f.read(position - start)
+            index = chunk.rfind(b"\n")
+            if index >= 0:
+                keep = start + index + 1
+                break
+            position = start
+        else:
+            keep = 0
+        f.truncate(keep)
+        return size - keep
+
+
+class JsonlSink(ResultSink):
+    """JSONL 文件写出（追加模式，断点续跑时接在已有结果之后）"""
+
+    name = "jsonl"
+
+    def __init__(self, path: str, fsync_interval: float = 1.0):
+        """初始化 JSONL 写出
+
+        Args:
+            path: 输出文件路径，'-' 表示标准输出（不调用 fsync）
+            fsync_interval: 两次 fsync 的最小间隔（秒），0 表示每批都 fsync；关闭时总会 fsync 一次
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file: Optional[TextIO] = None
+        self._last_fsync = 0.0
+        self.lines = 0
+        self.fsyncs = 0
+        # 打开时截掉的不完整末行的字节数
+        self.truncated_bytes = 0
+
+    def open(self):
+        if self.path == "-":
+            self._file = sys.stdout
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            self.truncated_bytes = truncate_partial_line(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_fsync = time.monotonic()
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        self._file.write(
+            "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+        )
+        self._file.flush()
+        self.lines += len(results)
+        if (
+            self._file is not sys.stdout
+            and time.monotonic() - self._last_fsync >= self.fsync_interval
+        ):
+            self._fsync()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+        self.fsyncs += 1
+
+    def close(self):
+        if self._file is None or self._file is sys.stdout:
+            return
+        self._file.flush()
+        self._fsync()
+        self._file.close()
+        self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"lines": self.lines, "fsyncs": self.fsyncs}
+        if self.truncated_bytes:
+            stats["truncated_bytes"] = self.truncated_bytes
+        return stats
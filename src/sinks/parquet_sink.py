@@ -0,0 +1,110 @@
+"""
+Parquet 写出（需要安装 pyarrow：pip install 'site-info-extractor-agent[parquet]'）
+每批结果写为一个行组，文件达到大小上限后换用新文件；写入中的文件使用 .tmp 后缀，关闭后才改名，
+读取方不会看到缺少文件尾的 Parquet 文件
+"""
+
+import importlib.util
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from src.sinks.base import ResultSink
+
+
+class ParquetSink(ResultSink):
+    """Parquet 写出：常用字段为独立的列，完整结果以 JSON 文本保存在 result 列"""
+
+    name = "parquet"
+
+    def __init__(
+        self, directory: str, max_file_bytes: int = 128 * 1024 * 1024, prefix: str = "results"
+    ):
+        """初始化 Parquet 写出
+
+        Args:
+            directory: 输出目录，文件名为 {prefix}-00000.parquet、{prefix}-00001.parquet ...
+            max_file_bytes: 单个文件的大小上限（字节），超过后换用新文件
+            prefix: 文件名前缀
+
+        Raises:
+            ImportError: 未安装 pyarrow
+        """
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError(
+                "Parquet 写出需要安装 pyarrow：pip install 'site-info-extractor-agent[parquet]'"
+            )
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.prefix = prefix
+        self._writer = None
+        self._path: Optional[str] = None
+        self._schema = None
+        self._index = 0
+        self.rows = 0
+        self.files: List[str] = []
+
+    def open(self):
+        import pyarrow as pa
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._schema = pa.schema([
+            ("url", pa.string()),
+            ("status", pa.string()),
+            ("tier", pa.string()),
+            ("error", pa.string()),
+            ("input_tokens", pa.int64()),
+            ("output_tokens", pa.int64()),
+            ("extract_ms", pa.float64()),
+            ("result", pa.string()),
+        ])
+        # 接着已有文件的编号，重复运行时不覆盖之前的结果
+        existing = [
+            name for name in os.listdir(self.directory)
+            if name.startswith(f"{self.prefix}-") and name.endswith(".parquet")
+        ]
+        self._index = len(existing)
+
+    @staticmethod
+    def _row(result: Dict[str, Any]) -> Dict[str, Any]:
+        usage = result.get("usage") or {}
+        timings = result.get("timings") or {}
+        return {
+            "url": result.get("url"),
+            "status": result.get("status"),
+            "tier": result.get("tier"),
+            "error": result.get("error"),
+            "input_tokens": usage.get("input_tokens"),
+            "output_tokens": usage.get("output_tokens"),
+            "extract_ms": timings.get("extract"),
+            "result": json.dumps(result, ensure_ascii=False),
+        }
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._path = os.path.join(self.directory, f"{self.prefix}-{self._index:05d}.parquet")
+            self._index += 1
+            self._writer = pq.ParquetWriter(self._path + ".tmp", self._schema)
+        self._writer.write_table(
+            pa.Table.from_pylist([self._row(result) for result in results], schema=self._schema)
+        )
+        self.rows += len(results)
+        if os.path.getsize(self._path + ".tmp") >= self.max_file_bytes:
+            self._finish_file()
+
+    def _finish_file(self):
+        """写入文件尾并把文件改为正式名称"""
+        self._writer.close()
+        os.replace(self._path + ".tmp", self._path)
+        self.files.append(self._path)
+        self._writer = None
+
+    def close(self):
+        if self._writer is not None:
+            self._finish_file()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "files": len(self.files)}
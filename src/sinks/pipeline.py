@@ -0,0 +1,246 @@
+"""
+结果写出管道
+提取端把结果放入有界队列，独立的写出任务按批取出，在线程中依次交给各写出目标。
+队列已满时 put 等待写出（反压）：写出跟不上时提取端随之放慢，积压的结果数不超过队列容量加一批
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from src.sinks.base import ResultSink
+from src.sinks.jsonl_sink import JsonlSink
+from src.sinks.parquet_sink import ParquetSink
+from src.sinks.sqlite_sink import SQLiteSink
+
+# 写出任务的结束标记
+_CLOSE = object()
+
+
+def create_sink(spec: str) -> ResultSink:
+    """按描述创建写出目标
+
+    Args:
+        spec: "jsonl:路径"、"sqlite:路径" 或 "parquet:目录"；省略前缀时按扩展名判断
+            （.jsonl / .json 为 JSONL，.db / .sqlite / .sqlite3 为 SQLite，
+            .parquet 或无扩展名为 Parquet 目录）
+
+    Returns:
+        写出目标
+
+    Raises:
+        ValueError: 无法识别的描述
+        ImportError: Parquet 写出缺少 pyarrow
+    """
+    kind, sep, target = spec.partition(":")
+    if not sep or kind not in ("jsonl", "sqlite", "parquet"):
+        target = spec
+        extension = target.rsplit(".", 1)[-1].lower() if "." in target.rsplit("/", 1)[-1] else ""
+        if extension in ("jsonl", "json"):
+            kind = "jsonl"
+        elif extension in ("db", "sqlite", "sqlite3"):
+            kind = "sqlite"
+        elif extension in ("parquet", ""):
+            kind = "parquet"
+        else:
+            raise ValueError(
+                f"无法识别的写出目标: {spec}（应为 jsonl:路径、sqlite:路径 或 parquet:目录）"
+            )
+    if not target:
+        raise ValueError(f"写出目标缺少路径: {spec}")
+    if kind == "jsonl":
+        return JsonlSink(target, fsync_interval=settings.jsonl_fsync_interval)
+    if kind == "sqlite":
+        return SQLiteSink(target)
+    return ParquetSink(target, max_file_bytes=settings.parquet_max_file_mb * 1024 * 1024)
+
+
+class SinkPipeline:
+    """结果写出管道
+
+    用法：
+        async with SinkPipeline([JsonlSink("out.jsonl"), SQLiteSink("out.db")]) as pipeline:
+            async for result in agent.extract_many(urls):
+                await pipeline.put(result)
+
+    写出目标出错时写出任务停止，之后的 put 和 close 抛出该异常。
+    """
+
+    def __init__(
+        self,
+        sinks: List[ResultSink],
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        """初始化写出管道
+
+        Args:
+            sinks: 写出目标，每批结果按顺序写入各目标
+            queue_size: 队列容量（条），默认使用配置
+            batch_size: 每批结果数上限，默认使用配置
+            flush_interval: 收到一批中第一条结果后最多等待的时间（秒），默认使用配置
+        """
+        self.sinks = sinks
+        self.queue_size = max(1, queue_size or settings.sink_queue_size)
+        self.batch_size = max(1, batch_size or settings.sink_batch_size)
+        self.flush_interval = (
+            settings.sink_flush_interval if flush_interval is None else flush_interval
+        )
+        self.queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        # 因队列已满而等待的 put 次数和等待时长（秒）
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self.write_seconds = 0.0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.close()
+        except Exception:
+            # 提取本身出错时优先抛出提取的异常
+            if exc_type is None:
+                raise
+
+    async def start(self):
+        """打开各写出目标并启动写出任务"""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        opened = []
+        try:
+            for sink in self.sinks:
+                await asyncio.to_thread(sink.open)
+                opened.append(sink)
+        except BaseException:
+            for sink in opened:
+                await asyncio.to_thread(sink.close)
+            raise
+        self._writer = asyncio.create_task(self._run())
+
+    def _raise_if_failed(self):
+        if self._writer is not None and self._writer.done() and not self._writer.cancelled():
+            error = self._writer.exception()
+            if error is not None:
+                raise error
+
+    async def put(self, result: Dict[str, Any]):
+        """放入一条结果；队列已满时等待写出任务腾出空间
+
+        Raises:
+            RuntimeError: 管道已关闭
+            Exception: 写出目标的异常
+        """
+        if self._closed:
+            raise RuntimeError("写出管道已关闭")
+        self._raise_if_failed()
+        try:
+            self.queue.put_nowait(result)
+        except asyncio.QueueFull:
+            started = time.perf_counter()
+            self.blocked_puts += 1
+            putter = asyncio.ensure_future(self.queue.put(result))
+            try:
+                # 等待期间写出任务出错时不再等待，避免提取端永久阻塞
+                await asyncio.wait({putter, self._writer}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not putter.done():
+                    putter.cancel()
+                self.blocked_seconds += time.perf_counter() - started
+            if not putter.done() or putter.cancelled():
+                self._raise_if_failed()
+                raise RuntimeError("写出任务已停止")
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    async def _next_batch(self) -> tuple[List[Dict[str, Any]], bool]:
+        """取出下一批结果，返回 (结果, 是否收到结束标记)"""
+        loop = asyncio.get_running_loop()
+        item = await self.queue.get()
+        if item is _CLOSE:
+            return [], True
+        batch = [item]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _CLOSE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """把一批结果写入各写出目标（在线程中执行）"""
+        started = time.perf_counter()
+        for sink in self.sinks:
+            sink.write_batch(batch)
+        self.write_seconds += time.perf_counter() - started
+
+    async def _run(self):
+        """写出任务：按批取出结果并写出，直到收到结束标记"""
+        while True:
+            batch, closing = await self._next_batch()
+            if batch:
+                await asyncio.to_thread(self._write, batch)
+                self.written += len(batch)
+                self.batches += 1
+            if closing:
+                return
+
+    async def close(self):
+        """写出队列中剩余的结果并关闭各写出目标
+
+        Raises:
+            Exception: 写出目标的异常
+        """
+        if self._closed or self._writer is None:
+            return
+        self._closed = True
+        close_error = None
+        try:
+            if not self._writer.done():
+                await self._put_close()
+            await asyncio.wait({self._writer})
+        finally:
+            for sink in self.sinks:
+                try:
+                    await asyncio.to_thread(sink.close)
+                except Exception as e:
+                    close_error = close_error or e
+        self._raise_if_failed()
+        if close_error is not None:
+            raise close_error
+
+    async def _put_close(self):
+        """放入结束标记；写出任务已停止时直接返回"""
+        putter = asyncio.ensure_future(self.queue.put(_CLOSE))
+        await asyncio.wait({putter, self._writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not putter.done():
+            putter.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回写出的结果数和批数、队列最大深度、提取端因反压等待的次数和时长，以及各写出目标的统计"""
+        return {
+            "written": self.written,
+            "batches": self.batches,
+            "queue_size": self.queue_size,
+            "max_queue_depth": self.max_queue_depth,
+            "blocked_puts": self.blocked_puts,
+            "blocked_ms": round(self.blocked_seconds * 1000, 1),
+            "write_ms": round(self.write_seconds * 1000, 1),
+            "sinks": [{"sink": sink.name, **sink.stats()} for sink in self.sinks],
+        }
@@ -0,0 +1,85 @@
+"""
+SQLite 写出
+WAL 模式下每批结果在一个事务中批量插入；同一规范化 URL 只保留最新的一条结果，重新提取时覆盖
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.sinks.base import ResultSink
+from src.tools.url_utils import normalize_url
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    "url_key TEXT PRIMARY KEY, url TEXT NOT NULL, status TEXT NOT NULL, "
+    "result TEXT NOT NULL, written_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS results_status ON results (status)",
+)
+
+_UPSERT = (
+    "INSERT INTO results (url_key, url, status, result, written_at) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(url_key) DO UPDATE SET url = excluded.url, status = excluded.status, "
+    "result = excluded.result, written_at = excluded.written_at"
+)
+
+
+class SQLiteSink(ResultSink):
+    """SQLite 写出：results 表按规范化 URL 保存每个 URL 的最新结果（完整结果为 JSON 文本）"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        """初始化 SQLite 写出
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self.rows = 0
+        self.transactions = 0
+
+    def open(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # 写出线程与创建连接的线程不同；同一时间只有一个线程访问
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=30.0
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 只在检查点时 fsync，事务提交不再逐个落盘
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        now = time.time()
+        rows = [
+            (
+                normalize_url(result.get("url") or ""),
+                result.get("url") or "",
+                result.get("status") or "error",
+                json.dumps(result, ensure_ascii=False),
+                now,
+            )
+            for result in results
+        ]
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(_UPSERT, rows)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        self.rows += len(rows)
+        self.transactions += 1
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "transactions": self.transactions}
@@ -3,6 +3,12 @@
 包含浏览器工具、解析工具等
 """
 
+from .browser_pool import BrowserPool
 from .browser_tool import BrowserTool
+from .http_fetcher import HttpFetcher
+from .page_fetcher import PageFetcher
+from .politeness import PolitenessScheduler, RobotsCache, RobotsDisallowedError
+from .request_filter import RequestFilter
 
-__all__ = ["BrowserTool"]
+__all__ = ["BrowserTool", "BrowserPool", "RequestFilter", "HttpFetcher", "PageFetcher",
+           "PolitenessScheduler", "RobotsCache", "RobotsDisallowedError"]
@@ -0,0 +1,234 @@
+"""
+浏览器池
+长期持有 Chromium 进程，为每次请求分配隔离的浏览器上下文和页面
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+
+from src.metrics.tracing import span
+
+
+class _PooledBrowser:
+    """池中的单个浏览器实例及其使用统计"""
+
+    def __init__(self, browser: Browser, contexts_per_browser: int):
+        self.browser = browser
+        self.slots = asyncio.Semaphore(contexts_per_browser)
+        self.active = 0
+        self.pages_served = 0
+        self.peak_js_heap_mb = 0.0
+        self.retiring = False
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser.is_connected() and not self.retiring
+
+
+class BrowserPool:
+    """浏览器池
+
+    复用少量 Chromium 进程，每次请求创建独立的 BrowserContext（Cookie、缓存互不影响）。
+    浏览器在服务页面数达到上限、页面内存占用过大或断开连接时被回收并重新启动。
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        headless: bool = True,
+        contexts_per_browser: int = 4,
+        max_pages_per_browser: int = 100,
+        max_memory_mb: float = 512,
+        memory_check_interval: int = 10,
+    ):
+        """初始化浏览器池
+
+        Args:
+            size: 浏览器进程数量
+            headless: 是否使用无头模式
+            contexts_per_browser: 单个浏览器允许同时打开的上下文数量
+            max_pages_per_browser: 单个浏览器服务多少个页面后回收（0 表示不限制）
+            max_memory_mb: 页面 JS 堆占用超过该值（MB）时回收浏览器（0 表示不检查）
+            memory_check_interval: 每服务多少个页面采样一次内存占用
+        """
+        self.size = max(1, size)
+        self.headless = headless
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_interval = max(1, memory_check_interval)
+
+        self.playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._lock = asyncio.Lock()
+        self._started = False
+        self.recycled = 0
+
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        await self.close()
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    async def start(self):
+        """启动 Playwright 和全部浏览器进程（重复调用无副作用）"""
+        async with self._lock:
+            if self._started:
+                return
+            self.playwright = await async_playwright().start()
+            self._browsers = [
+                _PooledBrowser(await self._launch(), self.contexts_per_browser)
+                for _ in range(self.size)
+            ]
+            self._started = True
+
+    async def close(self):
+        """关闭全部浏览器并停止 Playwright"""
+        async with self._lock:
+            browsers, self._browsers = self._browsers, []
+            for pooled in browsers:
+                await self._close_browser(pooled.browser)
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+            self._started = False
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[BrowserContext]:
+        """借出一个隔离的浏览器上下文，退出时自动关闭
+
+        Yields:
+            新建的 BrowserContext
+        """
+        if not self._started:
+            await self.start()
+
+        pooled = await self._acquire()
+        pooled.active += 1
+        context = None
+        try:
+            context = await pooled.browser.new_context()
+            yield context
+        finally:
+            pooled.active -= 1
+            pooled.pages_served += 1
+            if context is not None:
+                await self._sample_memory(pooled, context)
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            pooled.slots.release()
+            self._mark_for_recycle(pooled)
+            await self._recycle_idle()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """借出一个位于独立上下文中的新页面
+
+        Yields:
+            新建的 Page
+        """
+        async with self.context() as context:
+            page = await context.new_page()
+            yield page
+
+    async def health_check(self) -> List[Dict[str, Any]]:
+        """检查每个浏览器的连接状态，断开的浏览器会被立即替换
+
+        Returns:
+            每个浏览器的状态列表
+        """
+        await self._recycle_idle()
+        return self.stats()["browsers"]
+
+    def stats(self) -> Dict[str, Any]:
+        """返回池的运行统计"""
+        return {
+            "size": self.size,
+            "recycled": self.recycled,
+            "browsers": [
+                {
+                    "connected": pooled.browser.is_connected(),
+                    "active": pooled.active,
+                    "pages_served": pooled.pages_served,
+                    "peak_js_heap_mb": round(pooled.peak_js_heap_mb, 1),
+                    "retiring": pooled.retiring,
+                }
+                for pooled in self._browsers
+            ],
+        }
+
+    async def _launch(self) -> Browser:
+        with span("browser_launch"):
+            return await self.playwright.chromium.launch(headless=self.headless)
+
+    async def _close_browser(self, browser: Browser):
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    def _pick(self) -> _PooledBrowser:
+        """挑选负载最低的健康浏览器；全部待回收时退而使用仍连接的实例"""
+        candidates = [pooled for pooled in self._browsers if pooled.healthy]
+        if not candidates:
+            candidates = [pooled for pooled in self._browsers if pooled.browser.is_connected()]
+        if not candidates:
+            raise RuntimeError("浏览器池中没有可用的浏览器")
+        return min(candidates, key=lambda pooled: pooled.active)
+
+    async def _acquire(self) -> _PooledBrowser:
+        """占用一个浏览器的上下文槽位；等待期间实例若被替换则重新挑选"""
+        while True:
+            if not any(pooled.browser.is_connected() for pooled in self._browsers):
+                await self._recycle_idle()
+            pooled = self._pick()
+            await pooled.slots.acquire()
+            if pooled in self._browsers and pooled.browser.is_connected():
+                return pooled
+            pooled.slots.release()
+
+    def _mark_for_recycle(self, pooled: _PooledBrowser):
+        if self.max_pages_per_browser and pooled.pages_served >= self.max_pages_per_browser:
+            pooled.retiring = True
+        if self.max_memory_mb and pooled.peak_js_heap_mb >= self.max_memory_mb:
+            pooled.retiring = True
+
+    async def _sample_memory(self, pooled: _PooledBrowser, context: BrowserContext):
+        """按间隔采样上下文中页面的 JS 堆占用（仅 Chromium 支持 performance.memory）"""
+        if not self.max_memory_mb or pooled.pages_served % self.memory_check_interval:
+            return
+        for page in context.pages:
+            try:
+                used = await page.evaluate(
+                    "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+                )
+            except Exception:
+                continue
+            pooled.peak_js_heap_mb = max(pooled.peak_js_heap_mb, used / (1024 * 1024))
+
+    async def _recycle_idle(self):
+        """替换已断开连接、或已标记回收且空闲的浏览器"""
+        if not self._started:
+            return
+        async with self._lock:
+            for index, pooled in enumerate(self._browsers):
+                disconnected = not pooled.browser.is_connected()
+                if not (disconnected or (pooled.retiring and pooled.active == 0)):
+                    continue
+                await self._close_browser(pooled.browser)
+                self._browsers[index] = _PooledBrowser(
+                    await self._launch(), self.contexts_per_browser
+                )
+                self.recycled += 1
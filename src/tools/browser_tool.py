@@ -3,20 +3,94 @@
 封装 Playwright 进行网页访问和内容获取
 """
 
-from typing import Optional, Dict, Any
-from playwright.async_api import async_playwright, Browser, Page
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator
+from playwright.async_api import async_playwright, Browser, BrowserContext
+from src.tools.browser_pool import BrowserPool
+from src.tools.request_filter import RequestFilter
+from src.tools.page_readiness import ReadinessPolicy
+from src.tools.content_extractor import MAIN_CONTENT_JS, compose_main_text
+from src.metrics.tracing import span
+
+
+# 兼容原有 metadata 字段的 meta 键
+METADATA_KEYS = ("description", "keywords", "og:title", "og:description", "og:image")
+
+# 每个页面最多保留的链接数和链接文字长度（站点模式从中挑选子页面）
+MAX_LINKS = 300
+MAX_LINK_TEXT_CHARS = 100
+
+# 在页面内一次性读取标题、正文、主体内容、全部 meta、canonical、lang 和 JSON-LD，
+# 避免逐项读取带来的多次 CDP 往返
+_PAGE_SNAPSHOT_JS = """
+(includeHtml) => {
+    const meta = {};
+    for (const el of document.querySelectorAll("meta[name], meta[property]")) {
+        const key = el.getAttribute("name") || el.getAttribute("property");
+        if (key && !(key in meta)) meta[key] = el.getAttribute("content") || "";
+    }
+    const jsonLd = [];
+    for (const el of document.querySelectorAll('script[type="application/ld+json"]')) {
+        try { jsonLd.push(JSON.parse(el.textContent)); } catch (e) {}
+    }
+    const canonical = document.querySelector('link[rel="canonical"]');
+    const links = [];
+    const seenLinks = new Set();
+    for (const el of document.querySelectorAll("a[href]")) {
+        const href = el.href;
+        if (!/^https?:/i.test(href) || seenLinks.has(href)) continue;
+        seenLinks.add(href);
+        const text = (el.innerText || el.textContent || "").replace(/\\s+/g, " ").trim();
+        links.push({text: text.slice(0, MAX_LINK_TEXT_CHARS), href: href});
+        if (links.length >= MAX_LINKS) break;
+    }
+    return {
+        title: document.title,
+        text: document.body ? document.body.innerText : "",
+        main: MAIN_CONTENT,
+        meta: meta,
+        canonical: canonical ? canonical.href : null,
+        lang: document.documentElement.lang || null,
+        json_ld: jsonLd,
+        links: links,
+        content: includeHtml ? document.documentElement.outerHTML : null,
+    };
+}
+""".replace("MAIN_CONTENT", MAIN_CONTENT_JS.strip()).replace(
+    "MAX_LINK_TEXT_CHARS", str(MAX_LINK_TEXT_CHARS)
+).replace("MAX_LINKS", str(MAX_LINKS))
+
+
+def select_metadata(meta: Dict[str, str]) -> Dict[str, str]:
+    """从全部 meta 键值中挑选兼容原有 metadata 字段的部分"""
+    return {key: meta[key] for key in METADATA_KEYS if key in meta}
 
 
 class BrowserTool:
-    """浏览器工具类"""
+    """浏览器工具类
     
-    def __init__(self, headless: bool = True):
+    可以独立启动一个浏览器，也可以借用 BrowserPool 中长期运行的浏览器。
+    """
+    
+    def __init__(
+        self,
+        headless: bool = True,
+        pool: Optional[BrowserPool] = None,
+        request_filter: Optional[RequestFilter] = None,
+        readiness: Optional[ReadinessPolicy] = None,
+    ):
         """初始化浏览器工具
         
         Args:
             headless: 是否使用无头模式
+            pool: 共享浏览器池（可选），提供时不再单独启动浏览器
+            request_filter: 请求拦截过滤器（可选），用于屏蔽图片、字体、追踪脚本等请求
+            readiness: 页面就绪策略（可选），默认等待正文文本稳定且不超过 15 秒
         """
         self.headless = headless
+        self.pool = pool
+        self.request_filter = request_filter
+        self.readiness = readiness or ReadinessPolicy()
         self.browser: Optional[Browser] = None
         self.playwright = None
     
@@ -30,78 +104,85 @@ class BrowserTool:
         await self.close()
     
     async def start(self):
-        """启动浏览器"""
+        """启动浏览器（使用浏览器池时仅确保池已启动）"""
+        if self.pool:
+            await self.pool.start()
+            return
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(headless=self.headless)
     
     async def close(self):
-        """关闭浏览器"""
+        """关闭浏览器（浏览器池由其所有者负责关闭）"""
+        if self.pool:
+            return
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
     
-    async def fetch_page(self, url: str, wait_for: Optional[str] = None) -> Dict[str, Any]:
+    async def fetch_page(
+        self,
+        url: str,
+        wait_for: Optional[str] = None,
+        include_html: bool = False,
+    ) -> Dict[str, Any]:
         """获取页面内容
         
         Args:
             url: 目标 URL
             wait_for: 等待的元素选择器（可选）
+            include_html: 是否返回完整 HTML（content 字段），默认不返回
             
         Returns:
-            包含页面信息的字典
+            包含页面信息的字典：title、text、main_content、metadata、meta、
+            canonical、lang、json_ld、links 等
         """
-        if not self.browser:
-            raise RuntimeError("Browser not started. Call start() or use async context manager.")
-        
-        page = await self.browser.new_page()
-        try:
-            await page.goto(url, wait_until="networkidle")
-            
-            if wait_for:
-                await page.wait_for_selector(wait_for, timeout=10000)
+        async with self._new_context() as context:
+            network = await self.request_filter.attach(context) if self.request_filter else None
+            page = await context.new_page()
+            with span("navigation"):
+                readiness = await self.readiness.navigate(page, url)
+                
+                if wait_for:
+                    await page.wait_for_selector(wait_for, timeout=10000)
             
-            # 获取页面基本信息
-            title = await page.title()
-            content = await page.content()
-            text = await page.inner_text("body")
+            # 单次 evaluate 读取全部页面信息
+            with span("dom_read"):
+                snapshot = await page.evaluate(_PAGE_SNAPSHOT_JS, include_html)
             
-            # 获取元数据
-            metadata = await self._get_metadata(page)
-            
-            return {
+            result = {
                 "url": url,
-                "title": title,
-                "content": content,
-                "text": text,
-                "metadata": metadata
+                "title": snapshot["title"],
+                "text": snapshot["text"],
+                "main_content": compose_main_text(snapshot["main"]),
+                "metadata": select_metadata(snapshot["meta"]),
+                "meta": snapshot["meta"],
+                "canonical": snapshot["canonical"],
+                "lang": snapshot["lang"],
+                "json_ld": snapshot["json_ld"],
+                "links": snapshot["links"],
+                "readiness": readiness,
             }
-        finally:
-            await page.close()
+            if include_html:
+                result["content"] = snapshot["content"]
+            if network is not None:
+                result["network"] = network.to_dict()
+                result["bytes"] = network.received_bytes
+            return result
     
-    async def _get_metadata(self, page: Page) -> Dict[str, str]:
-        """获取页面元数据
-        
-        Args:
-            page: Playwright Page 对象
-            
-        Returns:
-            元数据字典
-        """
-        metadata = {}
-        
-        # 获取各种 meta 标签
-        selectors = {
-            "description": 'meta[name="description"]',
-            "keywords": 'meta[name="keywords"]',
-            "og:title": 'meta[property="og:title"]',
-            "og:description": 'meta[property="og:description"]',
-            "og:image": 'meta[property="og:image"]'
-        }
+    @asynccontextmanager
+    async def _new_context(self) -> AsyncIterator[BrowserContext]:
+        """创建浏览器上下文：优先从浏览器池借用，否则在自有浏览器中新建"""
+        if self.pool:
+            async with self.pool.context() as context:
+                yield context
+            return
         
-        for key, selector in selectors.items():
-            element = await page.query_selector(selector)
-            if element:
-                metadata[key] = await element.get_attribute("content") or ""
+        if not self.browser:
+            raise RuntimeError("Browser not started. Call start() or use async context manager.")
         
-        return metadata
+        context = await self.browser.new_context()
+        try:
+            yield context
+        finally:
+            await context.close()
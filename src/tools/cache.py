@@ -0,0 +1,272 @@
+"""
+提取缓存
+内存 LRU + SQLite 磁盘存储的两级缓存，分别用于页面抓取结果和 LLM 提取结果。
+异步代码使用 a 开头的方法：内存命中时直接返回，读写磁盘时在线程中执行，不阻塞事件循环
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from src.tools.url_utils import normalize_url
+
+
+class TieredCache:
+    """两级缓存
+
+    读取时先查内存 LRU，未命中再查 SQLite 并回填内存；写入同时写两级。
+    磁盘条目数超过上限时按最近访问时间淘汰。值需可 JSON 序列化。
+    同步方法直接访问 SQLite，只应在线程或同步代码中调用；事件循环中使用 aget / aset 等异步方法。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        table: str,
+        memory_entries: int = 1024,
+        max_disk_entries: int = 100000,
+        ttl: Optional[float] = None,
+    ):
+        """初始化缓存
+
+        Args:
+            path: SQLite 文件路径，为 None 时只使用内存
+            table: 表名（同一文件可以存放多个缓存）
+            memory_entries: 内存 LRU 的条目数上限
+            max_disk_entries: 磁盘条目数上限
+            ttl: 条目有效期（秒），None 表示永不过期
+        """
+        self.table = table
+        self.memory_entries = max(0, memory_entries)
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取未过期的值，不存在或已过期时返回 None"""
+        entry, tier = self._lookup(key)
+        if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+            entry = None
+        self._record(tier if entry is not None else None)
+        return entry[1] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        """读取条目（忽略有效期），用于过期后的条件请求重新验证
+
+        Returns:
+            (写入时间戳, 值)，不存在时返回 None
+        """
+        entry, tier = self._lookup(key)
+        self._record(tier)
+        return entry
+
+    def set(self, key: str, value: Any, stored_at: Optional[float] = None):
+        """写入值"""
+        stored_at = stored_at or time.time()
+        with self._lock:
+            self._remember(key, (stored_at, value))
+            if self._conn is None:
+                return
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), stored_at, stored_at),
+            )
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 100:
+                self._evict_disk()
+
+    def peek(self, key: str) -> Optional[Tuple[float, Any]]:
+        """读取条目但不计入命中统计"""
+        return self._lookup(key)[0]
+
+    def touch(self, key: str):
+        """将条目的写入时间更新为当前时间（重新验证成功后使用）"""
+        entry = self.peek(key)
+        if entry is not None:
+            self.set(key, entry[1])
+
+    def _on_disk(self, key: str) -> bool:
+        """读取该键是否需要访问磁盘（内存中没有且有磁盘存储）"""
+        return self._conn is not None and key not in self._memory
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """异步读取未过期的值（同 get）"""
+        if self._on_disk(key):
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def apeek(self, key: str) -> Optional[Tuple[float, Any]]:
+        """异步读取条目但不计入命中统计（同 peek）"""
+        if self._on_disk(key):
+            return await asyncio.to_thread(self.peek, key)
+        return self.peek(key)
+
+    async def aset(self, key: str, value: Any, stored_at: Optional[float] = None):
+        """异步写入值（同 set），磁盘写入在线程中执行"""
+        if self._conn is None:
+            self.set(key, value, stored_at)
+            return
+        await asyncio.to_thread(self.set, key, value, stored_at)
+
+    async def atouch(self, key: str):
+        """异步更新条目的写入时间（同 touch）"""
+        entry = await self.apeek(key)
+        if entry is not None:
+            await self.aset(key, entry[1])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计"""
+        lookups = self.hits["memory"] + self.hits["disk"] + self.misses
+        return {
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        """关闭 SQLite 连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _lookup(self, key: str) -> Tuple[Optional[Tuple[float, Any]], Optional[str]]:
+        """依次查找内存和磁盘，返回 (条目, 命中层级)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry, "memory"
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    f"SELECT stored_at, value FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry)
+                    return entry, "disk"
+
+            return None, None
+
+    def _record(self, tier: Optional[str]):
+        if tier is None:
+            self.misses += 1
+        else:
+            self.hits[tier] += 1
+
+    def _remember(self, key: str, entry: Tuple[float, Any]):
+        if not self.memory_entries:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        self._writes_since_evict = 0
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+
+class FetchCache:
+    """页面抓取缓存
+
+    以规范化 URL 为键。有效期内直接复用；过期后若保存了 ETag 或 Last-Modified，
+    由调用方发起条件请求，服务器返回 304 时刷新有效期继续复用。
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+
+    async def get_fresh(self, url: str) -> Optional[Dict[str, Any]]:
+        """返回有效期内的页面数据"""
+        return await self.cache.aget(normalize_url(url))
+
+    async def get_validators(self, url: str) -> Optional[Dict[str, Any]]:
+        """返回过期条目的页面数据，仅当其带有 ETag 或 Last-Modified 时"""
+        entry = await self.cache.apeek(normalize_url(url))
+        if entry is None:
+            return None
+        page_data = entry[1]
+        if page_data.get("etag") or page_data.get("last_modified"):
+            return page_data
+        return None
+
+    async def store(self, url: str, page_data: Dict[str, Any]):
+        await self.cache.aset(normalize_url(url), page_data)
+
+    async def refresh(self, url: str):
+        await self.cache.atouch(normalize_url(url))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+class LLMResultCache:
+    """LLM 提取结果缓存
+
+    以 (系统提示词 + 用户提示词（含页面文本和元数据）+ 模型名 + 温度) 的哈希为键，
+    页面内容不变时直接复用上次的解析结果。
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+
+    @staticmethod
+    def make_key(system_prompt: str, human_prompt: str, model_name: str, temperature: float) -> str:
+        digest = hashlib.sha256()
+        for part in (system_prompt, human_prompt, model_name or "", repr(float(temperature))):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.cache.aget(key)
+
+    async def store(self, key: str, extracted_data: Dict[str, Any]):
+        await self.cache.aset(key, extracted_data)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
@@ -0,0 +1,272 @@
+"""
+正文提取
+按文本密度和链接密度为 DOM 节点打分，提取页面主体内容，并保留标题和联系方式等关键信息
+"""
+
+import copy
+import re
+from typing import Any, Dict, List, Optional
+
+import lxml.html
+
+# 不可见或不含正文的元素
+INVISIBLE_TAGS = ("script", "style", "noscript", "template", "svg", "head")
+
+# 生成文本时在其后换行的块级元素
+BLOCK_TAGS = (
+    "p", "div", "section", "article", "main", "header", "footer", "nav", "aside",
+    "li", "ul", "ol", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6",
+    "br", "hr", "dd", "dt", "blockquote", "pre", "form", "figure", "figcaption", "address",
+)
+
+# 参与打分的段落类元素及可能成为正文容器的元素
+_PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote", "li", "dd")
+_CONTAINER_TAGS = ("article", "main", "section", "div", "td", "body")
+_HEADING_TAGS = ("h1", "h2", "h3")
+
+# class / id 中提示正文或噪声的关键字
+_POSITIVE_RE = re.compile(
+    r"article|content|entry|main|post|text|blog|story|about|intro|hero|product|detail", re.I
+)
+_NEGATIVE_RE = re.compile(
+    r"nav|menu|footer|sidebar|comment|banner|cookie|consent|advert|promo|share|social|"
+    r"related|breadcrumb|popup|modal|subscribe|newsletter|widget|masthead", re.I
+)
+# 非正文的语义化元素；其中导航、侧栏和页脚内的标题也不保留
+_NOISE_TAGS = ("nav", "aside", "header", "footer", "form")
+_HEADING_NOISE_TAGS = ("nav", "aside", "footer")
+
+# 联系方式：邮箱、电话、地址关键词
+CONTACT_RE = re.compile(
+    r"[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s()-]{6,}\d|地址|电话|邮箱|联系|"
+    r"address|phone|tel\b|email|contact",
+    re.IGNORECASE,
+)
+_CONTACT_CONTAINER_XPATH = (
+    "//footer | //address | //*[contains(translate(@class, 'CONTACT', 'contact'), 'contact')]"
+    " | //*[contains(translate(@id, 'CONTACT', 'contact'), 'contact')]"
+)
+
+# 在页面内运行的同一算法（浏览器层使用），返回 {text, headings, contacts}
+MAIN_CONTENT_JS = r"""
+(() => {
+    const POSITIVE =
+        /article|content|entry|main|post|text|blog|story|about|intro|hero|product|detail/i;
+    const NEGATIVE = new RegExp([
+        /nav|menu|footer|sidebar|comment|banner|cookie|consent|advert|promo|share|social/.source,
+        /related|breadcrumb|popup|modal|subscribe|newsletter|widget|masthead/.source,
+    ].join("|"), "i");
+    const NOISE = new Set(["NAV", "ASIDE", "HEADER", "FOOTER", "FORM"]);
+    const HEADING_NOISE = new Set(["NAV", "ASIDE", "FOOTER"]);
+    const within = (el, tags) => {
+        for (let p = el; p; p = p.parentElement) if (tags.has(p.tagName)) return true;
+        return false;
+    };
+    const CONTACT = new RegExp([
+        /[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s()-]{6,}\d/.source,
+        /地址|电话|邮箱|联系|address|phone|tel\b|email|contact/.source,
+    ].join("|"), "i");
+    const body = document.body;
+    if (!body) return {text: "", headings: [], contacts: []};
+
+    const weight = (el) => {
+        let w = 0;
+        const className = el.className && el.className.baseVal === undefined ? el.className : "";
+        const hint = className + " " + (el.id || "");
+        if (POSITIVE.test(hint)) w += 25;
+        if (NEGATIVE.test(hint)) w -= 25;
+        if (el.tagName === "ARTICLE" || el.tagName === "MAIN") w += 25;
+        if (within(el, NOISE)) w -= 50;
+        return w;
+    };
+    const scores = new Map();
+    const add = (el, value) => {
+        if (!el || !["ARTICLE", "MAIN", "SECTION", "DIV", "TD", "BODY"].includes(el.tagName)) {
+            return;
+        }
+        if (!scores.has(el)) scores.set(el, weight(el));
+        scores.set(el, scores.get(el) + value);
+    };
+    for (const p of body.querySelectorAll("p, pre, td, blockquote, li, dd")) {
+        const text = p.innerText || "";
+        if (text.trim().length < 25) continue;
+        const score = 1 + (text.match(/[,，、。]/g) || []).length + Math.min(text.length / 100, 3);
+        add(p.parentElement, score);
+        if (p.parentElement) add(p.parentElement.parentElement, score / 2);
+    }
+    let top = null, topScore = -Infinity;
+    for (const [el, score] of scores) {
+        const text = el.innerText || "";
+        let linkLength = 0;
+        for (const a of el.querySelectorAll("a")) linkLength += (a.innerText || "").length;
+        const final = score * (1 - (text.length ? linkLength / text.length : 0));
+        scores.set(el, final);
+        if (final > topScore) { top = el; topScore = final; }
+    }
+    const parts = [];
+    if (top) {
+        const threshold = Math.max(10, topScore * 0.2);
+        const siblings = top.parentElement ? Array.from(top.parentElement.children) : [top];
+        for (const el of siblings) {
+            if (el === top || (scores.get(el) || -Infinity) >= threshold) {
+                parts.push(el.innerText || "");
+            }
+        }
+    }
+    const text = parts.join("\n");
+    const headings = [];
+    for (const h of body.querySelectorAll("h1, h2, h3")) {
+        if (within(h, HEADING_NOISE)) continue;
+        const value = (h.innerText || "").trim();
+        if (value && !headings.includes(value)) headings.push(value);
+    }
+    const contacts = [];
+    const contactSelector = "footer, address, [class*=contact i], [id*=contact i]";
+    for (const el of body.querySelectorAll(contactSelector)) {
+        for (const line of (el.innerText || "").split("\n")) {
+            const value = line.trim();
+            if (value && CONTACT.test(value) && !contacts.includes(value)) contacts.push(value);
+        }
+    }
+    for (const a of body.querySelectorAll('a[href^="mailto:"], a[href^="tel:"]')) {
+        const value = a.getAttribute("href").replace(/^(mailto|tel):/, "");
+        if (value && !contacts.includes(value)) contacts.push(value);
+    }
+    return {text: text, headings: headings, contacts: contacts};
+})()
+"""
+
+
+def element_text(element: lxml.html.HtmlElement) -> str:
+    """提取元素内近似 innerText 的可见文本：去掉脚本样式，按块级元素分行"""
+    # 在副本上删除节点，不影响原解析树
+    element = copy.deepcopy(element)
+    for child in list(element.iter(*INVISIBLE_TAGS)):
+        child.drop_tree()
+    for child in element.iter(*BLOCK_TAGS):
+        child.tail = "\n" + (child.tail or "")
+    lines = (" ".join(line.split()) for line in element.text_content().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def visible_text(root: lxml.html.HtmlElement) -> str:
+    """提取整个页面的可见文本"""
+    body = root.find("body")
+    return element_text(body if body is not None else root)
+
+
+def extract_main_content(root: lxml.html.HtmlElement) -> Dict[str, Any]:
+    """从 lxml 解析树中提取正文
+
+    Args:
+        root: lxml 文档根节点
+
+    Returns:
+        {"text": 正文, "headings": 页面 h1-h3 标题, "contacts": 联系方式相关的行}
+    """
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    scores: Dict[Any, float] = {}
+
+    def add(element: Optional[lxml.html.HtmlElement], value: float):
+        if element is None or element.tag not in _CONTAINER_TAGS:
+            return
+        if element not in scores:
+            scores[element] = _weight(element)
+        scores[element] += value
+
+    for paragraph in body.iter(*_PARAGRAPH_TAGS):
+        text = paragraph.text_content()
+        if len(text.strip()) < 25:
+            continue
+        score = 1 + len(re.findall(r"[,，、。]", text)) + min(len(text) / 100, 3)
+        parent = paragraph.getparent()
+        add(parent, score)
+        if parent is not None:
+            add(parent.getparent(), score / 2)
+
+    top = None
+    top_score = float("-inf")
+    for element, score in scores.items():
+        text_length = len(element.text_content())
+        link_length = sum(len(link.text_content()) for link in element.iter("a"))
+        final = score * (1 - (link_length / text_length if text_length else 0))
+        scores[element] = final
+        if final > top_score:
+            top, top_score = element, final
+
+    parts: List[str] = []
+    if top is not None:
+        threshold = max(10, top_score * 0.2)
+        parent = top.getparent()
+        siblings = list(parent) if parent is not None else [top]
+        for element in siblings:
+            if element is top or scores.get(element, float("-inf")) >= threshold:
+                parts.append(element_text(element))
+
+    headings: List[str] = []
+    for heading in body.iter(*_HEADING_TAGS):
+        if _within(heading, _HEADING_NOISE_TAGS):
+            continue
+        value = " ".join(heading.text_content().split())
+        if value and value not in headings:
+            headings.append(value)
+
+    contacts: List[str] = []
+    for element in root.xpath(_CONTACT_CONTAINER_XPATH):
+        for line in element_text(element).splitlines():
+            if CONTACT_RE.search(line) and line not in contacts:
+                contacts.append(line)
+    for href in root.xpath(
+        '//a[starts-with(@href, "mailto:") or starts-with(@href, "tel:")]/@href'
+    ):
+        value = href.split(":", 1)[1].split("?")[0].strip()
+        if value and value not in contacts:
+            contacts.append(value)
+
+    return {
+        "text": "\n".join(part for part in parts if part),
+        "headings": headings,
+        "contacts": contacts,
+    }
+
+
+def compose_main_text(main: Dict[str, Any]) -> str:
+    """将正文、未出现在正文中的标题和联系方式拼接为交给 LLM 的文本"""
+    text = main.get("text") or ""
+    headings = [heading for heading in main.get("headings") or [] if heading not in text]
+    contacts = [contact for contact in main.get("contacts") or [] if contact not in text]
+    sections = []
+    if headings:
+        sections.append("\n".join(headings))
+    if text:
+        sections.append(text)
+    if contacts:
+        sections.append("\n".join(contacts))
+    return "\n".join(sections)
+
+
+def _weight(element: lxml.html.HtmlElement) -> float:
+    """根据 class / id 和所在语义化元素给容器一个初始分"""
+    weight = 0.0
+    hint = f"{element.get('class') or ''} {element.get('id') or ''}"
+    if _POSITIVE_RE.search(hint):
+        weight += 25
+    if _NEGATIVE_RE.search(hint):
+        weight -= 25
+    if element.tag in ("article", "main"):
+        weight += 25
+    if _within(element, _NOISE_TAGS):
+        weight -= 50
+    return weight
+
+
+def _within(element: lxml.html.HtmlElement, tags) -> bool:
+    """元素自身或其祖先是否为给定标签之一"""
+    while element is not None:
+        if element.tag in tags:
+            return True
+        element = element.getparent()
+    return False
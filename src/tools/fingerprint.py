@@ -0,0 +1,154 @@
+"""
+页面指纹
+增量重新提取使用的按 URL 指纹：缓存验证头（ETag / Last-Modified）、压缩后正文的 SimHash、
+元数据哈希和逐行哈希，用于判断页面是否变化，以及变化时只把改动的段落交给 LLM
+"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from src.tools.cache import TieredCache
+from src.tools.text_compactor import CJK_RE
+from src.tools.url_utils import normalize_url
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+_SIMHASH_BITS = 64
+
+
+def content_hash(text: str) -> str:
+    """文本的短哈希（16 个十六进制字符）"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """计算文本的 64 位 SimHash
+
+    以相邻两个词（中日韩文字按单字）为特征并按出现次数加权；
+    内容相近的文本哈希值只有少数位不同。
+    """
+    tokens: List[str] = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if CJK_RE.search(word):
+            tokens.extend(word)
+        else:
+            tokens.append(word)
+    if not tokens:
+        return 0
+    features = Counter(" ".join(tokens[i:i + 2]) for i in range(max(1, len(tokens) - 1)))
+    weights = [0] * _SIMHASH_BITS
+    for feature, count in features.items():
+        bits = f"{int(content_hash(feature), 16):064b}"
+        for index, bit in enumerate(bits):
+            weights[index] += count if bit == "1" else -count
+    return int("".join("1" if weight > 0 else "0" for weight in weights), 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希值不同的位数"""
+    return bin(a ^ b).count("1")
+
+
+def make_fingerprint(
+    page_data: Dict[str, Any],
+    page_text: str,
+    metadata_text: str,
+    extracted: Dict[str, Any],
+) -> Dict[str, Any]:
+    """根据本次抓取和提取结果生成指纹
+
+    Args:
+        page_data: 抓取结果（读取 etag / last_modified）
+        page_text: 交给 LLM 的压缩后正文
+        metadata_text: 标题、元数据和结构化数据拼接成的文本
+        extracted: LLM 提取出的字段
+
+    Returns:
+        可 JSON 序列化的指纹字典
+    """
+    lines = page_text.splitlines()
+    return {
+        "etag": page_data.get("etag"),
+        "last_modified": page_data.get("last_modified"),
+        "simhash": f"{simhash(page_text):016x}",
+        "metadata_hash": content_hash(metadata_text),
+        "sections": [content_hash(line) for line in lines],
+        "extracted": extracted,
+    }
+
+
+def compare(previous: Dict[str, Any], page_text: str, metadata_text: str) -> Dict[str, Any]:
+    """比较本次页面与上次的指纹
+
+    Args:
+        previous: 上次的指纹
+        page_text: 本次的压缩后正文
+        metadata_text: 本次的元数据文本
+
+    Returns:
+        {"distance": SimHash 汉明距离, "metadata_changed": 元数据是否变化,
+         "changed": 新增或改动的段落（相邻的行合并为一段）, "removed": 已删除的行数,
+         "changed_ratio": 新增内容占本次正文的比例与删除行数占上次行数的比例中的较大值}
+    """
+    distance = hamming_distance(int(previous.get("simhash") or "0", 16), simhash(page_text))
+    known = set(previous.get("sections") or [])
+    lines = page_text.splitlines()
+    hashes = [content_hash(line) for line in lines]
+
+    changed: List[str] = []
+    block: List[str] = []
+    changed_chars = 0
+    for line, digest in zip(lines, hashes):
+        if digest in known:
+            if block:
+                changed.append("\n".join(block))
+                block = []
+            continue
+        block.append(line)
+        changed_chars += len(line)
+    if block:
+        changed.append("\n".join(block))
+
+    current = set(hashes)
+    removed = sum(1 for digest in previous.get("sections") or [] if digest not in current)
+    added_ratio = changed_chars / max(1, sum(len(line) for line in lines))
+    removed_ratio = removed / max(1, len(known))
+    return {
+        "distance": distance,
+        "metadata_changed": content_hash(metadata_text) != previous.get("metadata_hash"),
+        "changed": changed,
+        "removed": removed,
+        "changed_ratio": round(max(added_ratio, removed_ratio), 4),
+    }
+
+
+class FingerprintStore:
+    """页面指纹存储
+
+    以规范化 URL 为键，保存最近一次成功提取时的指纹和提取结果（不设有效期，按访问时间淘汰）。
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        return await self.cache.aget(normalize_url(url))
+
+    async def store(self, url: str, fingerprint: Dict[str, Any]):
+        await self.cache.aset(normalize_url(url), fingerprint)
+
+    async def refresh(self, url: str, **validators: Optional[str]):
+        """页面未变化时更新缓存验证头和记录时间，保留其余指纹"""
+        fingerprint = await self.cache.apeek(normalize_url(url))
+        if fingerprint is None:
+            return
+        updated = dict(fingerprint[1])
+        for key, value in validators.items():
+            if value:
+                updated[key] = value
+        await self.store(url, updated)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
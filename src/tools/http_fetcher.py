@@ -0,0 +1,292 @@
+"""
+HTTP 抓取工具
+使用连接池化的 aiohttp 客户端直接请求页面，并用 lxml 解析标题、正文和元数据
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import lxml.html
+from lxml import etree
+
+from src.metrics.tracing import span
+from src.tools.browser_tool import MAX_LINK_TEXT_CHARS, MAX_LINKS, select_metadata
+from src.tools.content_extractor import compose_main_text, extract_main_content, visible_text
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# 常见单页应用的挂载点
+_APP_ROOT_IDS = ("root", "app", "__next", "__nuxt", "___gatsby", "svelte")
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+
+class HttpFetchError(Exception):
+    """HTTP 抓取失败（网络错误、非 2xx 状态码或非 HTML 内容）"""
+
+
+class HttpFetcher:
+    """HTTP 抓取工具
+
+    所有请求共享一个 aiohttp.ClientSession 以复用连接和 DNS 缓存，
+    返回结构与 BrowserTool.fetch_page 一致，并附带服务端渲染判断所需的信息。
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        max_connections_per_host: int = 8,
+        max_bytes: int = 5 * 1024 * 1024,
+        min_text_chars: int = 200,
+        user_agent: str = DEFAULT_USER_AGENT,
+    ):
+        """初始化 HTTP 抓取工具
+
+        Args:
+            timeout: 单次请求总超时（秒）
+            max_connections: 连接池总连接数上限
+            max_connections_per_host: 单个主机的连接数上限
+            max_bytes: 读取响应体的最大字节数，超出部分被截断
+            min_text_chars: 正文少于该字符数时视为需要浏览器渲染
+            user_agent: 请求使用的 User-Agent
+        """
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_bytes = max_bytes
+        self.min_text_chars = min_text_chars
+        self.user_agent = user_agent
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        await self.close()
+
+    async def start(self):
+        """创建共享会话（重复调用无副作用）"""
+        if self.session and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={
+                "User-Agent": self.user_agent,
+                "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+            },
+        )
+
+    async def close(self):
+        """关闭共享会话"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_page(
+        self,
+        url: str,
+        include_html: bool = False,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """请求并解析页面
+
+        Args:
+            url: 目标 URL
+            include_html: 是否返回完整 HTML（content 字段），默认不返回
+            etag: 上次响应的 ETag，提供时发起条件请求（可选）
+            last_modified: 上次响应的 Last-Modified，提供时发起条件请求（可选）
+
+        Returns:
+            包含页面信息的字典；js_shell 字段给出需要浏览器渲染的原因（不需要时为 None），
+            etag / last_modified 为响应的缓存验证头。
+            条件请求命中（304）时只返回 {"url", "status_code", "not_modified": True}
+
+        Raises:
+            HttpFetchError: 网络错误、非 2xx 状态码或响应不是 HTML
+        """
+        await self.start()
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            with span("http_request"):
+                body, charset, final_url, status, validators = await self._request(url, headers)
+        except aiohttp.ClientError as e:
+            raise HttpFetchError(f"请求失败: {e}") from e
+        except asyncio.TimeoutError as e:
+            raise HttpFetchError("请求超时") from e
+        if status == 304:
+            return {"url": url, "status_code": 304, "not_modified": True}
+
+        with span("html_parse"):
+            html = _decode(body, charset)
+            page = parse_html(html, base_url=final_url)
+            page.update({
+                "url": url,
+                "final_url": final_url,
+                "status_code": status,
+                "bytes": len(body),
+                **validators,
+                "js_shell": detect_js_shell(page.pop("_root"), page["text"], self.min_text_chars),
+            })
+        if include_html:
+            page["content"] = html
+        return page
+
+    async def _request(self, url: str, headers: Dict[str, str]):
+        """发出请求并读取响应体，返回 (响应体, 字符集, 最终 URL, 状态码, 缓存验证头)"""
+        async with self.session.get(url, allow_redirects=True, headers=headers) as response:
+            if response.status == 304:
+                return b"", None, str(response.url), 304, {}
+            if response.status >= 400:
+                raise HttpFetchError(f"HTTP {response.status}")
+            content_type = response.headers.get("Content-Type", "")
+            if content_type and "html" not in content_type.lower():
+                raise HttpFetchError(f"非 HTML 内容: {content_type}")
+            body = await self._read_body(response)
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            return body, response.charset, str(response.url), response.status, validators
+
+    async def _read_body(self, response: aiohttp.ClientResponse) -> bytes:
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                break
+        return b"".join(chunks)[: self.max_bytes]
+
+
+def parse_html(html: str, base_url: Optional[str] = None) -> Dict[str, Any]:
+    """用 lxml 解析与 BrowserTool.fetch_page 相同的页面信息
+
+    Args:
+        html: 页面 HTML
+        base_url: 用于将 canonical 链接解析为绝对地址（可选）
+
+    Returns:
+        包含 title、text、main_content、metadata、meta、canonical、lang、json_ld、
+        links（去重后的 http(s) 链接 {"text", "href"}）以及解析树 _root 的字典
+    """
+    try:
+        root = lxml.html.document_fromstring(html, base_url=base_url)
+    except (etree.ParserError, ValueError):
+        # 带 XML 编码声明的字符串无法直接解析，改用字节
+        root = lxml.html.document_fromstring(
+            html.encode("utf-8", errors="replace"), base_url=base_url
+        )
+
+    title = (root.findtext(".//title") or "").strip()
+
+    meta: Dict[str, str] = {}
+    for element in root.iter("meta"):
+        key = element.get("name") or element.get("property")
+        if key and key not in meta:
+            meta[key] = element.get("content") or ""
+
+    json_ld = []
+    for script in root.xpath('//script[@type="application/ld+json"]'):
+        try:
+            json_ld.append(json.loads(script.text or ""))
+        except json.JSONDecodeError:
+            continue
+
+    canonical = None
+    for link in root.xpath('//link[@rel="canonical"][@href]'):
+        canonical = lxml.html.urljoin(base_url, link.get("href")) if base_url else link.get("href")
+        break
+
+    return {
+        "title": title,
+        "text": visible_text(root),
+        "main_content": compose_main_text(extract_main_content(root)),
+        "metadata": select_metadata(meta),
+        "meta": meta,
+        "canonical": canonical,
+        "lang": root.get("lang") or None,
+        "json_ld": json_ld,
+        "links": collect_links(root, base_url),
+        "_root": root,
+    }
+
+
+def collect_links(
+    root: lxml.html.HtmlElement, base_url: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """按页面顺序收集去重后的 http(s) 链接（最多 MAX_LINKS 个），相对地址按 base_url 解析"""
+    links: List[Dict[str, str]] = []
+    seen = set()
+    for element in root.iter("a"):
+        href = (element.get("href") or "").strip()
+        if not href:
+            continue
+        if base_url:
+            href = lxml.html.urljoin(base_url, href)
+        if not href.lower().startswith(("http://", "https://")) or href in seen:
+            continue
+        seen.add(href)
+        text = " ".join(element.text_content().split())
+        links.append({"text": text[:MAX_LINK_TEXT_CHARS], "href": href})
+        if len(links) >= MAX_LINKS:
+            break
+    return links
+
+
+def detect_js_shell(
+    root: lxml.html.HtmlElement, text: str, min_text_chars: int = 200
+) -> Optional[str]:
+    """判断页面是否为需要执行 JavaScript 才能显示内容的应用外壳
+
+    Returns:
+        判断原因（tiny_text / noscript_app / empty_app_root），不是外壳时返回 None
+    """
+    text_length = len(text)
+    if text_length < min_text_chars:
+        return "tiny_text"
+
+    if text_length < min_text_chars * 3:
+        for noscript in root.iter("noscript"):
+            if "javascript" in (noscript.text_content() or "").lower():
+                return "noscript_app"
+
+    if text_length < min_text_chars * 5:
+        for app_id in _APP_ROOT_IDS:
+            for element in root.xpath(f'//*[@id="{app_id}"]'):
+                if not element.text_content().strip():
+                    return "empty_app_root"
+
+    return None
+
+
+def _decode(body: bytes, charset: Optional[str]) -> str:
+    if not charset:
+        match = _CHARSET_RE.search(body[:4096])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
@@ -0,0 +1,100 @@
+"""
+子页面排序
+站点模式下从首页链接中挑选同站点、最可能包含联系方式、公司介绍、团队和价格信息的子页面
+"""
+
+import re
+from typing import Any, Dict, List
+from urllib.parse import unquote, urlsplit
+
+from src.tools.url_utils import host_key, normalize_url
+
+# (权重, 匹配链接路径或链接文字的关键词)
+_KEYWORDS = [
+    (3.0, re.compile(r"contact|kontakt|contacto|reach[-_ ]?us|get[-_ ]?in[-_ ]?touch"
+                     r"|联系|聯絡|联络", re.I)),
+    (3.0, re.compile(r"about|company|who[-_ ]?we[-_ ]?are|our[-_ ]?story"
+                     r"|关于|公司|企业简介|简介|關於", re.I)),
+    (2.5, re.compile(r"imprint|impressum|legal[-_ ]?notice|mentions[-_ ]?legales", re.I)),
+    (2.0, re.compile(r"team|people|leadership|management|founders|staff|团队|管理层|團隊", re.I)),
+    (2.0, re.compile(r"pricing|prices?|plans|价格|定价|收费|价目|價格", re.I)),
+    (1.5, re.compile(r"locations?|offices?|address|地址|门店|网点", re.I)),
+    (1.0, re.compile(r"services|products|solutions|faq|support|服务|产品|解决方案|常见问题", re.I)),
+]
+
+# 与网站信息无关或需要登录的页面
+_PENALTIES = re.compile(
+    r"log[-_ ]?in|sign[-_ ]?(in|up)|register|cart|checkout|account|privacy|cookie|terms|"
+    r"登录|注册|购物车|隐私|条款",
+    re.I,
+)
+
+_SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".zip", ".rar", ".gz",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".mov", ".xml",
+    ".css", ".js",
+)
+
+
+def _site(url: str) -> str:
+    """去掉 www. 前缀的主机标识，首页与 www 子域名视为同一站点"""
+    host = host_key(url)
+    return host[4:] if host.startswith("www.") else host
+
+
+def _page_key(url: str) -> str:
+    """去重用的页面标识：规范化 URL 并忽略 www. 前缀"""
+    return normalize_url(url).replace("://www.", "://", 1)
+
+
+def rank_links(base_url: str, links: List[Dict[str, str]], limit: int) -> List[Dict[str, Any]]:
+    """按与网站信息的相关度挑选子页面
+
+    只保留与首页同站点、命中至少一个关键词的 HTML 页面链接；
+    得分为命中的关键词中的最高权重，路径越深得分越低，登录、隐私条款等页面扣分。
+
+    Args:
+        base_url: 首页 URL
+        links: 首页中的链接 [{"text", "href"}]
+        limit: 最多返回的子页面数
+
+    Returns:
+        按得分从高到低排列的 [{"url", "text", "score"}]
+    """
+    if limit <= 0:
+        return []
+    site = _site(base_url)
+    seen = {_page_key(base_url)}
+    ranked = []
+    for index, link in enumerate(links):
+        href = link.get("href") or ""
+        parts = urlsplit(href)
+        if parts.scheme not in ("http", "https") or _site(href) != site:
+            continue
+        path = unquote(parts.path or "/")
+        if path.lower().endswith(_SKIPPED_EXTENSIONS):
+            continue
+        key = _page_key(href)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        text = link.get("text") or ""
+        target = f"{path} {text}"
+        score = max(
+            (weight for weight, pattern in _KEYWORDS if pattern.search(target)), default=0.0
+        )
+        if score <= 0:
+            continue
+        if _PENALTIES.search(target):
+            score -= 3.0
+        depth = len([segment for segment in path.split("/") if segment])
+        score -= 0.25 * max(0, depth - 1)
+        if parts.query:
+            score -= 0.5
+        if score > 0:
+            # 得分相同时保留页面中的先后顺序
+            ranked.append((score, -index, {"url": href, "text": text, "score": round(score, 2)}))
+
+    ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [item for _, _, item in ranked[:limit]]
@@ -0,0 +1,214 @@
+"""
+分层页面抓取
+先走 HTTP 快速通道，仅在页面需要 JavaScript 渲染时才回退到浏览器
+"""
+
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional
+
+from src.metrics.tracing import span
+from src.tools.browser_tool import BrowserTool
+from src.tools.cache import FetchCache
+from src.tools.http_fetcher import HttpFetcher, HttpFetchError
+from src.tools.politeness import PolitenessScheduler
+
+# 只描述单次抓取过程的字段，不写入缓存
+_PER_FETCH_KEYS = ("readiness", "network", "cache")
+
+
+class PageFetcher:
+    """分层页面抓取工具
+
+    大多数服务端渲染的页面由 HttpFetcher 直接返回；请求失败或被判定为
+    JavaScript 应用外壳时使用浏览器重新抓取。结果中的 tier 字段标明实际使用的层级。
+    """
+
+    def __init__(
+        self,
+        browser_factory: Callable[[], BrowserTool],
+        http: Optional[HttpFetcher] = None,
+        browser_semaphore: Optional[asyncio.Semaphore] = None,
+        cache: Optional[FetchCache] = None,
+        scheduler: Optional[PolitenessScheduler] = None,
+    ):
+        """初始化分层抓取工具
+
+        Args:
+            browser_factory: 创建 BrowserTool 的工厂函数（通常绑定共享浏览器池）
+            http: HTTP 抓取工具（可选），为 None 时所有页面都使用浏览器
+            browser_semaphore: 限制同时打开浏览器页面数量的信号量（可选）
+            cache: 页面抓取缓存（可选）
+            scheduler: 礼貌抓取调度器（可选），发出请求前按主机排队并检查 robots.txt；
+                命中缓存时不排队
+        """
+        self.browser_factory = browser_factory
+        self.http = http
+        self.browser_semaphore = browser_semaphore
+        self.cache = cache
+        self.scheduler = scheduler
+        self.tier_counts = {"http": 0, "browser": 0}
+
+    async def close(self):
+        """关闭 HTTP 会话和调度器的 robots.txt 会话（浏览器池由其所有者负责关闭）"""
+        if self.http:
+            await self.http.close()
+        if self.scheduler:
+            await self.scheduler.close()
+
+    async def fetch_page(
+        self,
+        url: str,
+        include_html: bool = False,
+        validators: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """抓取页面
+
+        Args:
+            url: 目标 URL
+            include_html: 是否返回完整 HTML（content 字段）
+            validators: 调用方保存的上次响应的 etag / last_modified（可选），
+                抓取缓存未命中时用于发起条件请求
+
+        Returns:
+            包含页面信息的字典，tier 为 "http" 或 "browser"；
+            回退到浏览器时 fallback_reason 给出原因；
+            启用缓存时 cache 为 "hit"、"revalidated" 或 "miss"；
+            按 validators 发起的条件请求返回 304 时只包含 url、tier 和 not_modified: True
+
+        Raises:
+            RobotsDisallowedError: 启用调度器且 robots.txt 不允许抓取时
+        """
+        with span("fetch") as fetch_span:
+            page_data = await self._fetch_cached(url, include_html, validators)
+            fetch_span.set_attribute("tier", page_data.get("tier", ""))
+            fetch_span.set_attribute("cache", page_data.get("cache") or "disabled")
+            return page_data
+
+    async def _fetch_cached(
+        self,
+        url: str,
+        include_html: bool,
+        validators: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """先查抓取缓存，未命中或过期时再分层抓取"""
+        if self.cache is None:
+            async with self._slot(url):
+                http_page = await self._conditional_fetch(url, include_html, validators)
+                if http_page is not None and http_page.get("not_modified"):
+                    return http_page
+                return await self._fetch(url, include_html, http_page)
+
+        def usable(page_data: Optional[Dict[str, Any]]) -> bool:
+            return page_data is not None and (not include_html or "content" in page_data)
+
+        cached = await self.cache.get_fresh(url)
+        if usable(cached):
+            return {**cached, "cache": "hit"}
+
+        async with self._slot(url):
+            return await self._revalidate_or_fetch(url, include_html, usable, validators)
+
+    def _slot(self, url: str):
+        return self.scheduler.slot(url) if self.scheduler else nullcontext()
+
+    async def _revalidate_or_fetch(
+        self,
+        url: str,
+        include_html: bool,
+        usable: Callable[[Optional[Dict[str, Any]]], bool],
+        validators: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """缓存未命中时抓取并写入缓存"""
+        # 缓存已过期但带有验证头：通过条件请求确认页面是否变化
+        stale = await self.cache.get_validators(url)
+        if usable(stale):
+            http_page = await self._conditional_fetch(url, include_html, stale)
+            if http_page is not None and http_page.get("not_modified"):
+                await self.cache.refresh(url)
+                return {**stale, "cache": "revalidated"}
+        else:
+            # 缓存中没有可用的条目时使用调用方提供的验证头
+            http_page = await self._conditional_fetch(url, include_html, validators)
+            if http_page is not None and http_page.get("not_modified"):
+                return {**http_page, "cache": "miss"}
+
+        page_data = await self._fetch(url, include_html, http_page)
+        await self.cache.store(
+            url, {k: v for k, v in page_data.items() if k not in _PER_FETCH_KEYS}
+        )
+        page_data["cache"] = "miss"
+        return page_data
+
+    async def _conditional_fetch(
+        self,
+        url: str,
+        include_html: bool,
+        validators: Optional[Dict[str, Optional[str]]],
+    ) -> Optional[Dict[str, Any]]:
+        """带验证头发起 HTTP 条件请求；没有验证头、未启用 HTTP 通道或请求失败时返回 None
+
+        返回 304 时结果为 {"url", "tier": "http", "not_modified": True}，否则为完整的 HTTP 抓取结果
+        """
+        if (
+            not self.http
+            or not validators
+            or not (validators.get("etag") or validators.get("last_modified"))
+        ):
+            return None
+        try:
+            with span("http_fetch", conditional=True):
+                http_page = await self.http.fetch_page(
+                    url,
+                    include_html=include_html,
+                    etag=validators.get("etag"),
+                    last_modified=validators.get("last_modified"),
+                )
+        except HttpFetchError:
+            return None
+        if http_page.get("not_modified"):
+            self.tier_counts["http"] += 1
+            return {"url": http_page.get("url", url), "tier": "http", "not_modified": True}
+        return http_page
+
+    async def _fetch(
+        self,
+        url: str,
+        include_html: bool,
+        http_page: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """依次尝试 HTTP 快速通道和浏览器（http_page 为已取得的 HTTP 结果时不再重复请求）"""
+        fallback_reason = None
+        if self.http:
+            try:
+                if http_page is None:
+                    with span("http_fetch"):
+                        http_page = await self.http.fetch_page(url, include_html=include_html)
+                page_data = http_page
+                fallback_reason = page_data.pop("js_shell", None)
+                if not fallback_reason:
+                    page_data["tier"] = "http"
+                    self.tier_counts["http"] += 1
+                    return page_data
+            except HttpFetchError as e:
+                fallback_reason = str(e)
+
+        with span("browser_fetch"):
+            page_data = await self._fetch_with_browser(url, include_html)
+        page_data["tier"] = "browser"
+        if fallback_reason:
+            page_data["fallback_reason"] = fallback_reason
+        self.tier_counts["browser"] += 1
+        return page_data
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各层级服务的页面数量"""
+        return dict(self.tier_counts)
+
+    async def _fetch_with_browser(self, url: str, include_html: bool) -> Dict[str, Any]:
+        if self.browser_semaphore is None:
+            async with self.browser_factory() as browser:
+                return await browser.fetch_page(url, include_html=include_html)
+        async with self.browser_semaphore:
+            async with self.browser_factory() as browser:
+                return await browser.fetch_page(url, include_html=include_html)
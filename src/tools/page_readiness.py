@@ -0,0 +1,127 @@
+"""
+页面就绪策略
+决定导航后等待到什么时候开始读取页面内容，并保证整体等待不超过硬性截止时间
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# 支持的就绪策略：前三种直接对应 page.goto 的 wait_until，
+# text_stable 在 DOMContentLoaded 之后等待正文文本长度在 stable_ms 内不再变化
+READINESS_STRATEGIES = ("domcontentloaded", "load", "networkidle", "text_stable")
+
+_BODY_TEXT_LENGTH_JS = "() => document.body ? document.body.innerText.length : 0"
+
+
+class ReadinessPolicy:
+    """页面就绪策略
+
+    支持按域名覆盖策略（匹配域名本身及其子域名），达到截止时间后不报错，
+    而是直接读取当时已加载的内容。
+    """
+
+    def __init__(
+        self,
+        strategy: str = "text_stable",
+        deadline_ms: int = 15000,
+        stable_ms: int = 500,
+        poll_ms: int = 100,
+        domain_overrides: Optional[Dict[str, Any]] = None,
+    ):
+        """初始化就绪策略
+
+        Args:
+            strategy: 默认策略，取值见 READINESS_STRATEGIES
+            deadline_ms: 导航加等待的总时长上限（毫秒）
+            stable_ms: text_stable 策略要求文本长度保持不变的时长（毫秒）
+            poll_ms: text_stable 策略的轮询间隔（毫秒）
+            domain_overrides: 域名 → 策略名，或域名 → 包含上述参数的字典
+        """
+        if strategy not in READINESS_STRATEGIES:
+            raise ValueError(f"未知的页面就绪策略: {strategy}")
+        self.strategy = strategy
+        self.deadline_ms = deadline_ms
+        self.stable_ms = stable_ms
+        self.poll_ms = poll_ms
+        self.domain_overrides = {
+            domain.lower().lstrip("."): override
+            for domain, override in (domain_overrides or {}).items()
+        }
+
+    def for_url(self, url: str) -> "ReadinessPolicy":
+        """返回适用于该 URL 的策略（应用域名覆盖后的副本，无覆盖时返回自身）"""
+        host = (urlsplit(url).hostname or "").lower()
+        while host:
+            override = self.domain_overrides.get(host)
+            if override is not None:
+                if isinstance(override, str):
+                    override = {"strategy": override}
+                return ReadinessPolicy(
+                    strategy=override.get("strategy", self.strategy),
+                    deadline_ms=override.get("deadline_ms", self.deadline_ms),
+                    stable_ms=override.get("stable_ms", self.stable_ms),
+                    poll_ms=override.get("poll_ms", self.poll_ms),
+                )
+            _, _, host = host.partition(".")
+        return self
+
+    async def navigate(self, page: Page, url: str) -> Dict[str, Any]:
+        """导航到 URL 并按策略等待页面就绪
+
+        超过截止时间时不抛出异常，调用方继续读取当前页面内容；
+        其他导航错误（如 DNS 解析失败）照常抛出。
+
+        Args:
+            page: Playwright Page 对象
+            url: 目标 URL
+
+        Returns:
+            就绪报告：使用的策略、等待耗时（毫秒）以及是否因截止时间而提前结束
+        """
+        policy = self.for_url(url)
+        started = time.monotonic()
+        wait_until = "domcontentloaded" if policy.strategy == "text_stable" else policy.strategy
+        timed_out = False
+
+        try:
+            await page.goto(url, wait_until=wait_until, timeout=policy.deadline_ms)
+            if policy.strategy == "text_stable":
+                remaining_ms = policy.deadline_ms - (time.monotonic() - started) * 1000
+                timed_out = not await policy._wait_text_stable(page, remaining_ms)
+        except PlaywrightTimeoutError:
+            timed_out = True
+
+        return {
+            "strategy": policy.strategy,
+            "wait_ms": round((time.monotonic() - started) * 1000),
+            "timed_out": timed_out,
+        }
+
+    async def _wait_text_stable(self, page: Page, remaining_ms: float) -> bool:
+        """等待正文文本长度在 stable_ms 内保持不变
+
+        Returns:
+            在截止时间前达到稳定时返回 True
+        """
+        deadline = time.monotonic() + remaining_ms / 1000
+        last_length = -1
+        stable_since = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                length = await page.evaluate(_BODY_TEXT_LENGTH_JS)
+            except Exception:
+                # 页面仍在跳转等情况下上下文可能被销毁，稍后重试
+                length = -1
+            now = time.monotonic()
+            if length != last_length:
+                last_length = length
+                stable_since = now
+            elif length >= 0 and (now - stable_since) * 1000 >= self.stable_ms:
+                return True
+            await asyncio.sleep(min(self.poll_ms / 1000, max(0.0, deadline - now)))
+        return False
@@ -0,0 +1,410 @@
+"""
+礼貌抓取调度
+按主机限制同时进行的请求数和相邻请求的最小间隔，遵守 robots.txt（按主机缓存，支持 Crawl-delay），
+并在批量提取时交错调度不同主机的 URL，使单个主机的等待不占用全局并发
+"""
+
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from src.metrics.tracing import span
+from src.tools.url_utils import ensure_scheme, host_key
+
+
+class RobotsDisallowedError(Exception):
+    """robots.txt 不允许抓取该 URL"""
+
+
+class RobotsRules:
+    """一个主机的 robots.txt 规则"""
+
+    def __init__(self, parser: RobotFileParser, user_agent: str, status: str):
+        """初始化规则
+
+        Args:
+            parser: 已解析的 RobotFileParser
+            user_agent: 匹配规则时使用的爬虫标识
+            status: ok（已解析）、missing（4xx，全部允许）或 unreachable（5xx 或网络错误，全部禁止）
+        """
+        self.parser = parser
+        self.user_agent = user_agent
+        self.status = status
+
+    def allowed(self, url: str) -> bool:
+        return self.parser.can_fetch(self.user_agent, url)
+
+    @property
+    def delay(self) -> float:
+        """Crawl-delay 或 Request-rate 要求的请求间隔（秒），未声明时为 0"""
+        crawl_delay = self.parser.crawl_delay(self.user_agent)
+        if crawl_delay:
+            return float(crawl_delay)
+        rate = self.parser.request_rate(self.user_agent)
+        if rate and rate.requests:
+            return rate.seconds / rate.requests
+        return 0.0
+
+
+class RobotsCache:
+    """按主机缓存 robots.txt
+
+    遵循 RFC 9309：4xx 视为没有限制；5xx 或无法访问时视为全部禁止，
+    并使用较短的缓存时间以便稍后重试。同一主机的并发查询只发出一次请求。
+    """
+
+    def __init__(
+        self,
+        user_agent: str = "SiteInfoExtractor",
+        ttl: float = 86400.0,
+        unreachable_ttl: float = 300.0,
+        timeout: float = 10.0,
+        max_bytes: int = 512 * 1024,
+        max_entries: int = 10000,
+    ):
+        """初始化缓存
+
+        Args:
+            user_agent: 匹配 robots.txt 规则时使用的爬虫标识（同时作为请求的 User-Agent）
+            ttl: 缓存时间（秒）
+            unreachable_ttl: robots.txt 无法访问时的缓存时间（秒）
+            timeout: 请求超时（秒）
+            max_bytes: 读取 robots.txt 的最大字节数
+            max_entries: 最多缓存的主机数
+        """
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.unreachable_ttl = unreachable_ttl
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[RobotsRules, float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.fetches = 0
+        self.hits = 0
+
+    async def close(self):
+        for task in self._pending.values():
+            task.cancel()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, url: str) -> RobotsRules:
+        """返回 URL 所在主机的规则，缓存过期或不存在时请求 robots.txt"""
+        parts = urlsplit(ensure_scheme(url))
+        origin = f"{parts.scheme}://{parts.netloc}"
+        entry = self._entries.get(origin)
+        if entry and entry[1] > time.monotonic():
+            self._entries.move_to_end(origin)
+            self.hits += 1
+            return entry[0]
+        task = self._pending.get(origin)
+        if task is None:
+            task = asyncio.create_task(self._fetch(origin))
+            self._pending[origin] = task
+            task.add_done_callback(lambda _: self._pending.pop(origin, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, origin: str) -> RobotsRules:
+        self.fetches += 1
+        parser = RobotFileParser(origin + "/robots.txt")
+        status = "ok"
+        try:
+            with span("robots_fetch", origin=origin):
+                code, text = await self._request(origin + "/robots.txt")
+            if code >= 500:
+                status = "unreachable"
+            elif code >= 400:
+                status = "missing"
+            else:
+                parser.parse(text.splitlines())
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError):
+            status = "unreachable"
+        if status == "missing":
+            parser.allow_all = True
+        elif status == "unreachable":
+            parser.disallow_all = True
+
+        rules = RobotsRules(parser, self.user_agent, status)
+        ttl = self.unreachable_ttl if status == "unreachable" else self.ttl
+        self._entries[origin] = (rules, time.monotonic() + ttl)
+        self._entries.move_to_end(origin)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return rules
+
+    async def _request(self, url: str) -> Tuple[int, str]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": self.user_agent},
+            )
+        async with self._session.get(url, allow_redirects=True) as response:
+            if response.status >= 400:
+                return response.status, ""
+            body = await response.content.read(self.max_bytes)
+            return response.status, body.decode("utf-8", errors="replace")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hosts": len(self._entries), "fetches": self.fetches, "hits": self.hits}
+
+
+class _HostState:
+    """单个主机的调度状态和统计"""
+
+    def __init__(self, delay: float):
+        self.active = 0
+        self.waiting = 0
+        # 已交给调用方、尚未开始抓取的 URL（interleave 调度后到 slot 之间）
+        self.reserved: Counter = Counter()
+        self.next_allowed = 0.0
+        self.delay = delay
+        self.condition = asyncio.Condition()
+        self.requests = 0
+        self.disallowed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.robots = ""
+
+
+class PolitenessScheduler:
+    """按主机的礼貌抓取调度器
+
+    slot(url) 在抓取前按主机排队：同一主机同时进行的请求不超过 max_per_host，
+    相邻两次请求的开始时间至少间隔 min_delay（robots.txt 的 Crawl-delay 更大时以其为准）。
+    interleave(urls) 在批量提取时预读一段输入，优先调度可以立即抓取的主机，各主机轮流调度。
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 2,
+        min_delay: float = 1.0,
+        robots: Optional[RobotsCache] = None,
+        max_crawl_delay: float = 30.0,
+        lookahead: int = 1000,
+    ):
+        """初始化调度器
+
+        Args:
+            max_per_host: 单个主机同时进行的请求数上限
+            min_delay: 同一主机相邻请求的最小间隔（秒）
+            robots: robots.txt 缓存（可选），为 None 时不检查 robots.txt
+            max_crawl_delay: Crawl-delay 的上限（秒），避免个别站点的超大值拖住整个批次
+            lookahead: interleave 预读的 URL 数量上限
+        """
+        self.max_per_host = max(1, max_per_host)
+        self.min_delay = min_delay
+        self.robots = robots
+        self.max_crawl_delay = max_crawl_delay
+        self.lookahead = max(1, lookahead)
+        self._hosts: Dict[str, _HostState] = {}
+        self._changed = asyncio.Event()
+
+    async def close(self):
+        if self.robots:
+            await self.robots.close()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.min_delay)
+        return state
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """在该 URL 所在主机上取得一个抓取名额
+
+        Raises:
+            RobotsDisallowedError: robots.txt 不允许抓取时
+        """
+        url = ensure_scheme(url)
+        host = host_key(url)
+        state = self._state(host)
+        if state.reserved[url] > 0:
+            state.reserved[url] -= 1
+            if not state.reserved[url]:
+                del state.reserved[url]
+        state.waiting += 1
+        started = time.monotonic()
+        acquired = False
+        try:
+            if self.robots:
+                rules = await self.robots.get(url)
+                state.robots = rules.status
+                state.delay = max(self.min_delay, min(rules.delay, self.max_crawl_delay))
+                if not rules.allowed(url):
+                    state.disallowed += 1
+                    reason = (
+                        "robots.txt 无法访问，暂不抓取"
+                        if rules.status == "unreachable"
+                        else "robots.txt 禁止抓取"
+                    )
+                    raise RobotsDisallowedError(f"{reason}: {url}")
+            with span("host_wait", host=host):
+                async with state.condition:
+                    while True:
+                        now = time.monotonic()
+                        if state.active < self.max_per_host and now >= state.next_allowed:
+                            break
+                        timeout = (
+                            state.next_allowed - now if state.active < self.max_per_host else None
+                        )
+                        try:
+                            await asyncio.wait_for(state.condition.wait(), timeout)
+                        except asyncio.TimeoutError:
+                            pass
+                    state.active += 1
+                    state.next_allowed = now + state.delay
+                    acquired = True
+        finally:
+            state.waiting -= 1
+            if not acquired:
+                self._changed.set()
+
+        waited = time.monotonic() - started
+        state.requests += 1
+        state.total_wait += waited
+        state.max_wait = max(state.max_wait, waited)
+        try:
+            yield
+        finally:
+            state.active -= 1
+            async with state.condition:
+                # 等待者各自重新计算间隔，只唤醒一个会让其余等待者错过已到期的名额
+                state.condition.notify_all()
+            self._changed.set()
+
+    def unreserve(self, url: str):
+        """interleave 调度的 URL 没有经过 slot（如命中缓存或提前出错）时释放其预留名额"""
+        url = ensure_scheme(url)
+        state = self._hosts.get(host_key(url))
+        if state is not None and state.reserved[url] > 0:
+            state.reserved[url] -= 1
+            if not state.reserved[url]:
+                del state.reserved[url]
+            self._changed.set()
+
+    def ready_in(self, host: str) -> Optional[float]:
+        """主机还需多久才能开始下一个请求（秒）；名额已满时返回 None"""
+        state = self._hosts.get(host)
+        if state is None:
+            return 0.0
+        queued = state.waiting + sum(state.reserved.values())
+        if state.active + queued >= self.max_per_host:
+            return None
+        now = time.monotonic()
+        # 已排队的请求依次占用后续的间隔
+        return max(0.0, max(state.next_allowed, now) + state.delay * queued - now)
+
+    async def interleave(self, urls: AsyncIterator[str]) -> AsyncIterator[str]:
+        """按主机交错调度 URL
+
+        预读至多 lookahead 个 URL 并按主机分组，每次返回一个可以立即抓取的主机的 URL（各主机轮流）；
+        所有主机都需要等待时，等到最早可用的主机就绪或有请求结束。返回的 URL 在该主机上预留名额，
+        调用方处理完成后应调用 unreserve（已经过 slot 的 URL 调用无副作用）。
+        读取输入出错时先返回已预读的 URL，再抛出该异常。
+
+        Args:
+            urls: URL 异步迭代器
+
+        Yields:
+            调度顺序的 URL
+        """
+        buffered: "OrderedDict[str, deque]" = OrderedDict()
+        count = 0
+        exhausted = False
+        error: Optional[Exception] = None
+        while True:
+            # 读取输入，直到读到可以立即抓取的主机或预读已满
+            while not exhausted and count < self.lookahead:
+                try:
+                    url = await anext(urls)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                except Exception as e:
+                    exhausted, error = True, e
+                    break
+                host = host_key(url)
+                buffered.setdefault(host, deque()).append(url)
+                count += 1
+                if self.ready_in(host) == 0:
+                    break
+            if not buffered:
+                if error is not None:
+                    raise error
+                return
+
+            host, wait = self._pick(buffered)
+            if host is None:
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue = buffered[host]
+            url = queue.popleft()
+            count -= 1
+            if queue:
+                # 轮转：刚调度的主机排到最后
+                buffered.move_to_end(host)
+            else:
+                del buffered[host]
+            self._state(host).reserved[ensure_scheme(url)] += 1
+            yield url
+
+    def _pick(self, buffered: "OrderedDict[str, deque]") -> Tuple[Optional[str], Optional[float]]:
+        """返回第一个可以立即抓取的主机；没有时返回 (None, 最短等待时间)"""
+        wait: Optional[float] = None
+        for host in buffered:
+            ready_in = self.ready_in(host)
+            if ready_in == 0:
+                return host, None
+            if ready_in is not None:
+                wait = ready_in if wait is None else min(wait, ready_in)
+        return None, wait
+
+    def stats(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """返回按主机的排队统计
+
+        Args:
+            top: 只返回累计等待时间最长的前若干个主机（可选）
+
+        Returns:
+            {"hosts": {主机: {...}}, "requests", "queued", "disallowed", "robots"}
+        """
+        ordered = sorted(self._hosts.items(), key=lambda item: item[1].total_wait, reverse=True)
+        hosts = {}
+        for host, state in ordered[:top] if top else ordered:
+            hosts[host] = {
+                "active": state.active,
+                "queued": state.waiting + sum(state.reserved.values()),
+                "requests": state.requests,
+                "disallowed": state.disallowed,
+                "delay_s": round(state.delay, 3),
+                "avg_wait_ms": (
+                    round(state.total_wait * 1000 / state.requests, 1) if state.requests else 0.0
+                ),
+                "max_wait_ms": round(state.max_wait * 1000, 1),
+                "robots": state.robots,
+            }
+        return {
+            "hosts": hosts,
+            "host_count": len(self._hosts),
+            "requests": sum(state.requests for state in self._hosts.values()),
+            "queued": sum(
+                state.waiting + sum(state.reserved.values()) for state in self._hosts.values()
+            ),
+            "disallowed": sum(state.disallowed for state in self._hosts.values()),
+            **({"robots": self.robots.stats()} if self.robots else {}),
+        }
@@ -0,0 +1,169 @@
+"""
+请求拦截过滤器
+在浏览器上下文上拦截图片、媒体、字体、样式表以及常见统计/广告域名的请求
+"""
+
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Request, Response, Route
+
+# 默认拦截的资源类型（Playwright request.resource_type）
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# 常见的统计、广告和用户追踪域名（匹配域名本身及其子域名）
+DEFAULT_TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "analytics.twitter.com",
+    "ads-twitter.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "nr-data.net",
+    "hm.baidu.com",
+    "cnzz.com",
+    "umeng.com",
+    "growingio.com",
+)
+
+
+class RequestStats:
+    """单个浏览器上下文的请求统计"""
+
+    def __init__(self):
+        self.allowed_requests = 0
+        self.blocked_requests = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.blocked_by_domain = 0
+        self.received_bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "allowed_requests": self.allowed_requests,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "blocked_by_domain": self.blocked_by_domain,
+            "received_bytes": self.received_bytes,
+        }
+
+
+class RequestFilter:
+    """请求拦截过滤器
+
+    通过 BrowserContext.route 拦截所有请求，按资源类型和域名丢弃不影响文本提取的请求，
+    并统计拦截数量以及实际接收的字节数（按响应的 Content-Length 估算）。
+    """
+
+    def __init__(
+        self,
+        blocked_resource_types: Iterable[str] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+        block_stylesheets: bool = False,
+        block_trackers: bool = True,
+        blocked_domains: Iterable[str] = (),
+    ):
+        """初始化过滤器
+
+        Args:
+            blocked_resource_types: 要拦截的资源类型，如 image、media、font
+            block_stylesheets: 是否同时拦截样式表（可能影响依赖样式判断可见性的页面）
+            block_trackers: 是否拦截内置的统计/广告域名列表
+            blocked_domains: 额外要拦截的域名
+        """
+        self.blocked_resource_types = set(blocked_resource_types)
+        if block_stylesheets:
+            self.blocked_resource_types.add("stylesheet")
+        domains = list(blocked_domains)
+        if block_trackers:
+            domains.extend(DEFAULT_TRACKER_DOMAINS)
+        self.blocked_domains = {domain.lower().lstrip(".") for domain in domains if domain}
+        self.totals = RequestStats()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.blocked_resource_types or self.blocked_domains)
+
+    async def attach(self, context: BrowserContext) -> RequestStats:
+        """在浏览器上下文上安装拦截规则
+
+        Args:
+            context: 目标浏览器上下文
+
+        Returns:
+            该上下文的请求统计对象（随请求进行持续更新）
+        """
+        stats = RequestStats()
+
+        async def handle(route: Route, request: Request):
+            reason = self.block_reason(request.url, request.resource_type)
+            if reason is None:
+                stats.allowed_requests += 1
+                self.totals.allowed_requests += 1
+                await route.continue_()
+                return
+            for target in (stats, self.totals):
+                target.blocked_requests += 1
+                if reason == "domain":
+                    target.blocked_by_domain += 1
+                else:
+                    target.blocked_by_type[reason] = target.blocked_by_type.get(reason, 0) + 1
+            await route.abort("blockedbyclient")
+
+        def on_response(response: Response):
+            size = _content_length(response)
+            stats.received_bytes += size
+            self.totals.received_bytes += size
+
+        if self.enabled:
+            await context.route("**/*", handle)
+        context.on("response", on_response)
+        return stats
+
+    def block_reason(self, url: str, resource_type: str) -> Optional[str]:
+        """判断请求是否应被拦截
+
+        Returns:
+            拦截原因（资源类型或 "domain"），不拦截时返回 None
+        """
+        if resource_type in self.blocked_resource_types:
+            return resource_type
+        if self.blocked_domains and self._is_blocked_host(urlsplit(url).hostname or ""):
+            return "domain"
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回累计的拦截统计"""
+        return self.totals.to_dict()
+
+    def _is_blocked_host(self, host: str) -> bool:
+        host = host.lower()
+        while host:
+            if host in self.blocked_domains:
+                return True
+            _, _, host = host.partition(".")
+        return False
+
+
+def _content_length(response: Response) -> int:
+    try:
+        return int(response.headers.get("content-length", 0))
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,183 @@
+"""
+页面文本压缩
+在调用 LLM 前清理、去重并按信息密度筛选页面文本，使其落在输入令牌预算之内
+"""
+
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from src.tools.content_extractor import CONTACT_RE
+
+# 中日韩字符及全角符号：大多数分词器约一个字符一个令牌（页面指纹分词时同样使用）
+CJK_RE = re.compile(
+    r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+
+# 常见的样板行（Cookie 提示、跳转链接、分享按钮等）
+_BOILERPLATE_RE = re.compile(
+    r"^(skip to (main )?content|back to top|accept( all)?( cookies)?|reject all|cookie settings|"
+    r"manage cookies|we use cookies.*|this (web)?site uses cookies.*|share on \w+|share|menu|close|"
+    r"toggle navigation|跳到主要内容|返回顶部|回到顶部|分享到.*|接受全部|拒绝全部|"
+    r"本网站使用\s*cookie.*)$",
+    re.IGNORECASE,
+)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# 每个片段的目标行数
+_SECTION_LINES = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """快速估算令牌数：中日韩字符按 1 个令牌，其余字符按 4 个字符 1 个令牌"""
+    if not text:
+        return 0
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TextCompactor:
+    """页面文本压缩器
+
+    依次执行：合并空白 → 去除重复行（导航、页脚在多处重复出现）→ 去除样板行 →
+    超出预算时按片段的信息密度排序，保留得分最高的片段并按原顺序拼接。
+    """
+
+    def __init__(self, budget_tokens: int = 6000):
+        """初始化压缩器
+
+        Args:
+            budget_tokens: 默认的输入令牌预算
+        """
+        self.budget_tokens = budget_tokens
+
+    def compact(self, text: str, budget_tokens: int | None = None) -> Tuple[str, Dict[str, Any]]:
+        """压缩页面文本
+
+        Args:
+            text: 原始页面文本
+            budget_tokens: 本次使用的令牌预算（可选，默认使用初始化时的预算）
+
+        Returns:
+            (压缩后的文本, 统计信息)，统计信息包含原始和压缩后的令牌数
+        """
+        budget = budget_tokens or self.budget_tokens
+        original_tokens = estimate_tokens(text)
+
+        lines = [" ".join(line.split()) for line in text.splitlines()]
+        lines = [line for line in lines if line]
+
+        seen = set()
+        unique_lines: List[str] = []
+        for line in lines:
+            if line in seen:
+                continue
+            seen.add(line)
+            unique_lines.append(line)
+        duplicate_lines = len(lines) - len(unique_lines)
+
+        kept_lines = [line for line in unique_lines if not _is_boilerplate(line)]
+        boilerplate_lines = len(unique_lines) - len(kept_lines)
+
+        compacted = "\n".join(kept_lines)
+        compacted_tokens = estimate_tokens(compacted)
+        dropped_sections = 0
+        if compacted_tokens > budget:
+            compacted, dropped_sections = _fit_sections(kept_lines, budget)
+            compacted_tokens = estimate_tokens(compacted)
+
+        return compacted, {
+            "original_tokens": original_tokens,
+            "compacted_tokens": compacted_tokens,
+            "budget_tokens": budget,
+            "duplicate_lines": duplicate_lines,
+            "boilerplate_lines": boilerplate_lines,
+            "dropped_sections": dropped_sections,
+        }
+
+
+def _is_boilerplate(line: str) -> bool:
+    if _BOILERPLATE_RE.match(line):
+        return True
+    # 只有符号、没有文字或数字的行
+    return not any(ch.isalnum() for ch in line)
+
+
+def _fit_sections(lines: List[str], budget: int) -> Tuple[str, int]:
+    """按信息密度挑选片段填充预算，返回 (拼接后的文本, 丢弃的片段数)"""
+    sections = [lines[i:i + _SECTION_LINES] for i in range(0, len(lines), _SECTION_LINES)]
+    word_counts = Counter(word.lower() for line in lines for word in _WORD_RE.findall(line))
+
+    scored = []
+    for index, section in enumerate(sections):
+        text = "\n".join(section)
+        tokens = max(1, estimate_tokens(text))
+        words = [word.lower() for word in _WORD_RE.findall(text)]
+        # 信息密度：全文稀有词占比越高、长句越多得分越高
+        rarity = sum(1 / word_counts[word] for word in words) / tokens if words else 0.0
+        long_lines = sum(len(line) >= 40 for line in section) / len(section)
+        # 与系统提示词关注的联系方式相关的内容，排序时加分
+        contact = 1.0 if CONTACT_RE.search(text) else 0.0
+        position = 1 / (1 + index / 4)
+        scored.append((rarity + long_lines + contact + position, index, text, tokens))
+
+    chosen = []
+    used = 0
+    for _, index, text, tokens in sorted(scored, reverse=True):
+        if used + tokens > budget:
+            continue
+        chosen.append((index, text))
+        used += tokens
+
+    if not chosen:
+        # 单个片段就超出预算时，截取得分最高的片段
+        _, index, text, tokens = max(scored)
+        ratio = budget / tokens
+        chosen = [(index, text[: int(len(text) * ratio)])]
+
+    chosen.sort()
+    return "\n".join(text for _, text in chosen), len(sections) - len(chosen)
+
+
+# 条目放不下时依次尝试的缩短程度：(字符串保留的字符数, 列表保留的项数)
+_JSON_LD_SHRINK_STEPS = ((200, 10), (80, 5), (40, 2))
+
+
+def fit_json_ld(items: List[Any], budget_tokens: int) -> str:
+    """按令牌预算保留页面的 JSON-LD，返回重新序列化的合法 JSON 数组
+
+    按原顺序逐个保留完整的条目；放不下的条目先缩短其中的长字符串和长列表再尝试，仍放不下时丢弃。
+
+    Args:
+        items: 页面中解析出的 JSON-LD（每个 script 一项，数组会展开为多个条目）
+        budget_tokens: 令牌预算
+
+    Returns:
+        保留的条目序列化后的 JSON；没有可保留的条目时返回空字符串
+    """
+    flat: List[Any] = []
+    for item in items:
+        flat.extend(item if isinstance(item, list) else [item])
+    kept: List[Any] = []
+    for item in flat:
+        candidates = [item] + [
+            _shrink_json(item, chars, count) for chars, count in _JSON_LD_SHRINK_STEPS
+        ]
+        for candidate in candidates:
+            if estimate_tokens(json.dumps(kept + [candidate], ensure_ascii=False)) <= budget_tokens:
+                kept.append(candidate)
+                break
+    return json.dumps(kept, ensure_ascii=False) if kept else ""
+
+
+def _shrink_json(value: Any, max_chars: int, max_items: int) -> Any:
+    """截短 JSON 值中的字符串和列表，保持结构不变"""
+    if isinstance(value, dict):
+        return {key: _shrink_json(item, max_chars, max_items) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shrink_json(item, max_chars, max_items) for item in value[:max_items]]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "…"
+    return value
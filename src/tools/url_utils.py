@@ -0,0 +1,55 @@
+"""
+URL 工具
+统一 URL 的规范化规则，供缓存键、去重和断点续跑使用
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 不影响页面内容的跟踪参数
+_TRACKING_PARAM_PREFIXES = ("utm_",)
+_TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "spm", "_hsenc", "_hsmi"}
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def ensure_scheme(url: str) -> str:
+    """未提供协议时默认补全为 https://"""
+    url = url.strip()
+    if url and not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    return url
+
+
+def normalize_url(url: str) -> str:
+    """规范化 URL
+
+    补全协议，小写协议和主机名，去掉默认端口、片段和跟踪参数，查询参数按名称排序，
+    空路径统一为 "/"。
+
+    Args:
+        url: 原始 URL
+
+    Returns:
+        规范化后的 URL
+    """
+    parts = urlsplit(ensure_scheme(url))
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS
+        and not key.lower().startswith(_TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def host_key(url: str) -> str:
+    """URL 的主机标识：小写主机名，非默认端口时附带端口，用于按主机限流和调度"""
+    parts = urlsplit(ensure_scheme(url))
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{parts.port}"
+    return host
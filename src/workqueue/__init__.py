@@ -0,0 +1,18 @@
+"""
+工作队列模块
+包含 SQLite 工作队列、HTTP 协调器与客户端，以及从队列领取任务的工作进程
+"""
+
+from .remote import QueueServer, RemoteWorkQueue, open_queue
+from .sqlite_queue import Job, SQLiteWorkQueue
+from .worker import QueueWorker, default_worker_id
+
+__all__ = [
+    "Job",
+    "SQLiteWorkQueue",
+    "QueueServer",
+    "RemoteWorkQueue",
+    "open_queue",
+    "QueueWorker",
+    "default_worker_id",
+]
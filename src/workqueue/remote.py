@@ -0,0 +1,200 @@
+"""
+工作队列协调器
+QueueServer 以 HTTP 提供 SQLiteWorkQueue 的各项操作，RemoteWorkQueue 是对应的客户端，
+接口与 SQLiteWorkQueue 相同，多台机器上的工作进程通过它共享同一个队列
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from config.settings import settings
+from src.workqueue.sqlite_queue import Job, SQLiteWorkQueue
+
+
+class QueueServer:
+    """工作队列协调器服务"""
+
+    def __init__(
+        self,
+        queue: SQLiteWorkQueue,
+        port: int,
+        host: str = "127.0.0.1",
+        token: Optional[str] = None,
+    ):
+        """初始化协调器
+
+        Args:
+            queue: 协调器持有的队列
+            port: 监听端口，0 表示由系统分配
+            host: 监听地址，默认只监听本机；供其他机器访问时设为 0.0.0.0
+            token: 访问令牌（可选），设置后请求需携带 Authorization: Bearer <token>
+        """
+        self.queue = queue
+        self.host = host
+        self.port = port
+        self.token = token
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        """启动服务，启动后 port 为实际监听的端口"""
+        app = web.Application(middlewares=[self._auth], client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/enqueue", self._enqueue)
+        app.router.add_post("/lease", self._lease)
+        app.router.add_post("/extend", self._extend)
+        app.router.add_post("/complete", self._complete)
+        app.router.add_post("/fail", self._fail)
+        app.router.add_post("/release", self._release)
+        app.router.add_get("/stats", self._stats)
+        app.router.add_get("/results", self._results)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _auth(self, request: web.Request, handler):
+        if self.token and request.headers.get("Authorization") != f"Bearer {self.token}":
+            raise web.HTTPUnauthorized()
+        return await handler(request)
+
+    async def _enqueue(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response(await self.queue.enqueue(body["urls"]))
+
+    async def _lease(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        jobs = await self.queue.lease(body["worker"], int(body.get("limit", 1)))
+        return web.json_response({"jobs": [job._asdict() for job in jobs]})
+
+    async def _extend(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response({"ok": await self.queue.extend(Job(**body["job"]))})
+
+    async def _complete(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        completed = await self.queue.complete(
+            Job(**body["job"]), body["result"], body.get("worker", "")
+        )
+        return web.json_response({"ok": completed})
+
+    async def _fail(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        status = await self.queue.fail(Job(**body["job"]), body["error"], body.get("worker", ""))
+        return web.json_response({"status": status})
+
+    async def _release(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response({"ok": await self.queue.release(Job(**body["job"]))})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        window = float(request.query.get("window", 60))
+        return web.json_response(await self.queue.stats(window))
+
+    async def _results(self, request: web.Request) -> web.Response:
+        after = int(request.query.get("after", 0))
+        limit = int(request.query.get("limit", 1000))
+        rows = await self.queue.results(after, limit)
+        return web.json_response({"results": [[seq, result] for seq, result in rows]})
+
+
+class RemoteWorkQueue:
+    """通过 HTTP 访问协调器的工作队列客户端，接口与 SQLiteWorkQueue 相同"""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 30.0):
+        """初始化客户端
+
+        Args:
+            base_url: 协调器地址，例如 http://10.0.0.5:8765
+            token: 访问令牌（可选）
+            timeout: 单个请求的超时时间（秒）
+        """
+        self.base_url = base_url.rstrip("/")
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        self._session = aiohttp.ClientSession(
+            headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        await self._session.close()
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._session.post(self.base_url + path, json=payload) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._session.get(self.base_url + path, params=params) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def enqueue(self, urls: Iterable[str]) -> Dict[str, int]:
+        return await self._post("/enqueue", {"urls": list(urls)})
+
+    async def lease(self, worker: str, limit: int = 1) -> List[Job]:
+        body = await self._post("/lease", {"worker": worker, "limit": limit})
+        return [Job(**job) for job in body["jobs"]]
+
+    async def extend(self, job: Job) -> bool:
+        return (await self._post("/extend", {"job": job._asdict()}))["ok"]
+
+    async def complete(self, job: Job, result: Dict[str, Any], worker: str = "") -> bool:
+        return (
+            await self._post(
+                "/complete", {"job": job._asdict(), "result": result, "worker": worker}
+            )
+        )["ok"]
+
+    async def fail(self, job: Job, error: str, worker: str = "") -> str:
+        return (
+            await self._post("/fail", {"job": job._asdict(), "error": error, "worker": worker})
+        )["status"]
+
+    async def release(self, job: Job) -> bool:
+        return (await self._post("/release", {"job": job._asdict()}))["ok"]
+
+    async def stats(self, window: float = 60.0) -> Dict[str, Any]:
+        return await self._get("/stats", {"window": window})
+
+    async def results(self, after: int = 0, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        body = await self._get("/results", {"after": after, "limit": limit})
+        return [(seq, result) for seq, result in body["results"]]
+
+
+def open_queue(target: Optional[str] = None, token: Optional[str] = None):
+    """按地址打开工作队列
+
+    Args:
+        target: http(s):// 开头时连接协调器，否则视为 SQLite 文件路径；默认使用 settings.work_queue
+        token: 协调器的访问令牌（可选，默认使用 settings.work_queue_token）
+
+    Returns:
+        RemoteWorkQueue 或 SQLiteWorkQueue
+    """
+    target = target or settings.work_queue
+    if target.startswith(("http://", "https://")):
+        return RemoteWorkQueue(target, token=token or settings.work_queue_token)
+    return SQLiteWorkQueue(
+        target,
+        visibility_timeout=settings.work_queue_visibility_timeout,
+        max_attempts=settings.work_queue_max_attempts,
+    )
@@ -0,0 +1,376 @@
+"""
+SQLite 工作队列
+以 SQLite 文件保存 URL 任务、租约和结果：同一台机器上的多个进程可以直接共享该文件，
+多台机器通过协调器（QueueServer）以 HTTP 访问同一个队列
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from src.tools.url_utils import normalize_url
+
+
+class Job(NamedTuple):
+    """一次租约中的任务"""
+    id: int
+    url: str
+    # 本次租约的令牌，续约、完成和失败时用于确认仍持有租约
+    lease_token: str
+    # 包含本次在内的投递次数
+    attempts: int
+
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, url_key TEXT NOT NULL UNIQUE, "
+    "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+    "available_at REAL NOT NULL, lease_token TEXT, lease_expires REAL, worker TEXT, "
+    "enqueued_at REAL NOT NULL, updated_at REAL NOT NULL, error TEXT)",
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)",
+    "CREATE TABLE IF NOT EXISTS results ("
+    "seq INTEGER PRIMARY KEY AUTOINCREMENT, url_key TEXT NOT NULL UNIQUE, job_id INTEGER NOT NULL, "
+    "url TEXT NOT NULL, status TEXT NOT NULL, result TEXT NOT NULL, worker TEXT, "
+    "completed_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS results_worker ON results (worker, completed_at)",
+    "CREATE TABLE IF NOT EXISTS workers ("
+    "worker TEXT PRIMARY KEY, first_seen REAL NOT NULL, last_seen REAL NOT NULL, "
+    "completed INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0)",
+)
+
+
+class SQLiteWorkQueue:
+    """基于 SQLite 的 URL 工作队列
+
+    - 入队时按规范化 URL 去重
+    - 取任务时获得带可见性超时的租约；租约过期（进程崩溃或失联）后任务重新可见，
+      因此每个任务至少被处理一次
+    - 结果按规范化 URL 写入，重复投递导致的重复完成只会覆盖同一条结果（幂等）
+    - 失败的任务按指数退避重试，超过最大尝试次数后标记为 failed
+
+    所有公开方法都是协程，SQLite 操作在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 300.0, max_attempts: int = 5):
+        """初始化队列
+
+        Args:
+            path: SQLite 文件路径
+            visibility_timeout: 租约时长（秒），超过后任务重新可见
+            max_attempts: 每个任务的最大投递次数
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # 多个进程同时写入时等待对方的事务结束，而不是立即报 database is locked
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30.0
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+    async def enqueue(self, urls: Iterable[str]) -> Dict[str, int]:
+        """按规范化 URL 去重后入队
+
+        Returns:
+            {"added": 新增任务数, "duplicates": 已存在的任务数}
+        """
+        return await asyncio.to_thread(self._enqueue, list(urls))
+
+    async def lease(self, worker: str, limit: int = 1) -> List[Job]:
+        """领取最多 limit 个可执行的任务（待处理且到达可执行时间，或租约已过期）
+
+        Args:
+            worker: 工作进程标识
+            limit: 领取数量上限
+
+        Returns:
+            领取到的任务列表，队列中没有可执行任务时为空
+        """
+        return await asyncio.to_thread(self._lease, worker, limit)
+
+    async def extend(self, job: Job) -> bool:
+        """续约，返回是否仍持有该任务的租约（租约已过期时续约失败）"""
+        return await asyncio.to_thread(self._extend, job)
+
+    async def complete(self, job: Job, result: Dict[str, Any], worker: str = "") -> bool:
+        """写入结果并将任务标记为完成
+
+        租约已过期并被其他进程领取时仍然写入（同一 URL 只保留一条结果）。
+
+        Returns:
+            本次调用是否完成了该任务（任务此前已完成时为 False）
+        """
+        return await asyncio.to_thread(self._complete, job, result, worker)
+
+    async def fail(self, job: Job, error: str, worker: str = "") -> str:
+        """报告任务失败：未超过最大尝试次数时按指数退避重新入队，否则标记为 failed
+
+        Returns:
+            任务的新状态（pending 或 failed），不再持有租约时为 stale
+        """
+        return await asyncio.to_thread(self._fail, job, error, worker)
+
+    async def release(self, job: Job) -> bool:
+        """归还租约（如进程退出前），任务立即重新可见且不计入尝试次数"""
+        return await asyncio.to_thread(self._release, job)
+
+    async def stats(self, window: float = 60.0) -> Dict[str, Any]:
+        """返回积压情况和各工作进程的吞吐量
+
+        Args:
+            window: 计算近期吞吐量的时间窗口（秒）
+        """
+        return await asyncio.to_thread(self._stats, window)
+
+    async def results(self, after: int = 0, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        """按写入顺序读取结果
+
+        Args:
+            after: 只返回序号大于 after 的结果
+            limit: 数量上限
+
+        Returns:
+            [(序号, 结果), ...]
+        """
+        return await asyncio.to_thread(self._results, after, limit)
+
+    def _transaction(self):
+        return _Transaction(self._conn, self._lock)
+
+    def _enqueue(self, urls: List[str]) -> Dict[str, int]:
+        now = time.time()
+        added = 0
+        with self._transaction() as conn:
+            for url in urls:
+                url = url.strip()
+                if not url:
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs "
+                    "(url, url_key, available_at, enqueued_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (url, normalize_url(url), now, now, now),
+                )
+                added += cursor.rowcount
+        return {"added": added, "duplicates": sum(1 for url in urls if url.strip()) - added}
+
+    def _lease(self, worker: str, limit: int) -> List[Job]:
+        now = time.time()
+        jobs: List[Job] = []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, url, attempts FROM jobs "
+                "WHERE (status = 'pending' AND available_at <= ?) "
+                "OR (status = 'leased' AND lease_expires <= ?) "
+                "ORDER BY available_at, id LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            for job_id, url, attempts in rows:
+                if attempts >= self.max_attempts:
+                    # 多次租约过期仍未完成（如页面导致进程崩溃），不再投递
+                    self._mark_failed(
+                        conn, job_id, url, "租约多次过期，超过最大尝试次数", worker, now
+                    )
+                    continue
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_token = ?, "
+                    "lease_expires = ?, worker = ?, updated_at = ? WHERE id = ?",
+                    (token, now + self.visibility_timeout, worker, now, job_id),
+                )
+                jobs.append(Job(job_id, url, token, attempts + 1))
+            conn.execute(
+                "INSERT INTO workers (worker, first_seen, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET last_seen = excluded.last_seen",
+                (worker, now, now),
+            )
+        return jobs
+
+    def _extend(self, job: Job) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased' AND lease_expires > ?",
+                (now + self.visibility_timeout, now, job.id, job.lease_token, now),
+            )
+            return cursor.rowcount == 1
+
+    def _complete(self, job: Job, result: Dict[str, Any], worker: str) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            url_key = normalize_url(job.url)
+            conn.execute(
+                "INSERT INTO results (url_key, job_id, url, status, result, worker, completed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url_key) DO UPDATE SET "
+                "status = excluded.status, result = excluded.result, "
+                "worker = excluded.worker, completed_at = excluded.completed_at",
+                (url_key, job.id, job.url, result.get("status", "success"),
+                 json.dumps(result, ensure_ascii=False), worker, now),
+            )
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', lease_token = NULL, lease_expires = NULL, "
+                "error = NULL, updated_at = ? WHERE id = ? AND status != 'done'",
+                (now, job.id),
+            )
+            completed = cursor.rowcount == 1
+            if completed and worker:
+                conn.execute(
+                    "UPDATE workers SET completed = completed + 1, last_seen = ? WHERE worker = ?",
+                    (now, worker),
+                )
+            return completed
+
+    def _fail(self, job: Job, error: str, worker: str) -> str:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                (job.id, job.lease_token),
+            ).fetchone()
+            if row is None:
+                return "stale"
+            if worker:
+                conn.execute(
+                    "UPDATE workers SET failed = failed + 1, last_seen = ? WHERE worker = ?",
+                    (now, worker),
+                )
+            if row[0] >= self.max_attempts:
+                self._mark_failed(conn, job.id, job.url, error, worker, now)
+                return "failed"
+            # 指数退避：1、2、4…… 秒，最长 60 秒
+            delay = min(2 ** (row[0] - 1), 60)
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', lease_token = NULL, lease_expires = NULL, "
+                "available_at = ?, error = ?, updated_at = ? WHERE id = ?",
+                (now + delay, error, now, job.id),
+            )
+            return "pending"
+
+    def _release(self, job: Job) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = attempts - 1, lease_token = NULL, "
+                "lease_expires = NULL, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                (now, now, job.id, job.lease_token),
+            )
+            return cursor.rowcount == 1
+
+    @staticmethod
+    def _mark_failed(
+        conn: sqlite3.Connection, job_id: int, url: str, error: str, worker: str, now: float
+    ):
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', lease_token = NULL, lease_expires = NULL, "
+            "error = ?, updated_at = ? WHERE id = ?",
+            (error, now, job_id),
+        )
+        result = {"url": url, "status": "error", "error": error}
+        conn.execute(
+            "INSERT INTO results (url_key, job_id, url, status, result, worker, completed_at) "
+            "VALUES (?, ?, ?, 'error', ?, ?, ?) "
+            "ON CONFLICT(url_key) DO UPDATE SET status = 'error', result = excluded.result, "
+            "worker = excluded.worker, completed_at = excluded.completed_at",
+            (normalize_url(url), job_id, url, json.dumps(result, ensure_ascii=False), worker, now),
+        )
+
+    def _stats(self, window: float) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            counts = dict(
+                self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            )
+            ready, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM jobs "
+                "WHERE status = 'pending' AND available_at <= ?",
+                (now,),
+            ).fetchone()
+            expired = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_expires <= ?", (now,)
+            ).fetchone()[0]
+            recent = dict(self._conn.execute(
+                "SELECT worker, COUNT(*) FROM results WHERE completed_at >= ? GROUP BY worker",
+                (now - window,),
+            ).fetchall())
+            worker_rows = self._conn.execute(
+                "SELECT worker, first_seen, last_seen, completed, failed "
+                "FROM workers ORDER BY worker"
+            ).fetchall()
+
+        workers = {}
+        for worker, first_seen, last_seen, completed, failed in worker_rows:
+            elapsed = max(last_seen - first_seen, 1.0)
+            workers[worker] = {
+                "completed": completed,
+                "failed": failed,
+                "throughput": round(completed / elapsed, 3),
+                "recent_throughput": round(recent.get(worker, 0) / window, 3),
+                "last_seen_s": round(now - last_seen, 1),
+                "active": now - last_seen <= self.visibility_timeout,
+            }
+        return {
+            "backlog": {
+                "pending": counts.get("pending", 0),
+                "ready": ready,
+                "leased": counts.get("leased", 0),
+                "expired_leases": expired,
+                "done": counts.get("done", 0),
+                "failed": counts.get("failed", 0),
+                "oldest_pending_s": round(now - oldest, 1) if oldest else 0.0,
+            },
+            "throughput": round(sum(recent.values()) / window, 3),
+            "workers": workers,
+        }
+
+    def _results(self, after: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, result FROM results WHERE seq > ? ORDER BY seq LIMIT ?", (after, limit)
+            ).fetchall()
+        return [(seq, json.loads(result)) for seq, result in rows]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE 事务：开始时即取得写锁，避免多个进程同时领取同一任务"""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
@@ -0,0 +1,134 @@
+"""
+队列工作进程
+从工作队列领取 URL 任务交给 Agent 提取，处理期间定时续约，完成后写回结果；
+错误结果报告为失败并按退避重试，进程退出前归还未完成的租约
+"""
+
+import asyncio
+import os
+import socket
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from src.workqueue.sqlite_queue import Job
+
+
+def default_worker_id() -> str:
+    """默认的工作进程标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class QueueWorker:
+    """工作队列的消费者"""
+
+    def __init__(
+        self,
+        agent,
+        queue,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        exit_when_idle: bool = False,
+    ):
+        """初始化工作进程
+
+        Args:
+            agent: SiteExtractorAgent 实例
+            queue: SQLiteWorkQueue 或 RemoteWorkQueue
+            worker_id: 工作进程标识（可选，默认为 主机名:进程号）
+            concurrency: 同时处理的任务数（可选，默认使用 settings.batch_concurrency）
+            poll_interval: 队列为空时的轮询间隔（秒，可选）
+            exit_when_idle: 队列中没有待处理和处理中的任务时退出（否则持续等待新任务）
+        """
+        self.agent = agent
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.concurrency = max(1, concurrency or settings.batch_concurrency)
+        self.poll_interval = (
+            poll_interval if poll_interval is not None else settings.work_queue_poll_interval
+        )
+        self.exit_when_idle = exit_when_idle
+        self.counts: Dict[str, int] = {"completed": 0, "failed": 0, "retried": 0}
+
+    async def run(self) -> Dict[str, int]:
+        """运行直到队列空闲（exit_when_idle）或被取消
+
+        Returns:
+            本进程的计数：completed、failed（不再重试）、retried（重新入队）
+        """
+        slots = [asyncio.create_task(self._slot()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*slots)
+        finally:
+            for task in slots:
+                task.cancel()
+            await asyncio.gather(*slots, return_exceptions=True)
+        return self.counts
+
+    async def _slot(self):
+        while True:
+            try:
+                jobs = await self.queue.lease(self.worker_id, 1)
+                if not jobs:
+                    if self.exit_when_idle and await self._idle():
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self._process(jobs[0])
+            except Exception:
+                # 队列暂时不可用：稍后重试；未写回结果的任务在租约过期后重新投递
+                await asyncio.sleep(self.poll_interval)
+
+    async def _idle(self) -> bool:
+        backlog = (await self.queue.stats())["backlog"]
+        return backlog["pending"] == 0 and backlog["leased"] == 0
+
+    async def _process(self, job: Job):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            try:
+                result = await self.agent.extract(job.url)
+            except asyncio.CancelledError:
+                # 进程退出：归还租约，任务立即由其他工作进程接手
+                await asyncio.shield(self._release(job))
+                raise
+            except Exception as e:
+                result = {"url": job.url, "status": "error", "error": str(e)}
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+        result["attempts"] = job.attempts
+        if result.get("status") == "error":
+            state = await self.queue.fail(job, result.get("error") or "未知错误", self.worker_id)
+            if state == "failed":
+                self.counts["failed"] += 1
+            elif state == "pending":
+                self.counts["retried"] += 1
+            return
+        await self._complete(job, result)
+
+    async def _complete(self, job: Job, result: Dict[str, Any]):
+        # 结果按 URL 幂等写入：租约过期后被重复处理的任务只保留一条结果
+        await self.queue.complete(job, result, self.worker_id)
+        self.counts["completed"] += 1
+
+    async def _release(self, job: Job):
+        try:
+            await self.queue.release(job)
+        except Exception:
+            # 归还失败时等待租约过期即可
+            pass
+
+    async def _heartbeat(self, job: Job):
+        """每隔三分之一个可见性超时续约一次；租约丢失后停止续约，结果仍照常写回"""
+        timeout = getattr(self.queue, "visibility_timeout", settings.work_queue_visibility_timeout)
+        interval = max(timeout / 3, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.queue.extend(job):
+                    return
+            except Exception:
+                # 协调器暂时不可用，下次再试
+                continue
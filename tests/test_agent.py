@@ -5,15 +5,31 @@
 
 import sys
 import os
+import json
+import asyncio
 import warnings
 import pytest
-from unittest.mock import Mock, patch
+import pytest_asyncio
+from pathlib import Path
+from urllib.parse import quote
+from aiohttp import web
+from unittest.mock import AsyncMock, Mock, patch
+from langchain_core.messages import AIMessage
 
 # 将项目根目录添加到Python路径中
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from config.settings import settings
 from src.agents.extractor_agent import SiteExtractorAgent
+from src.agents.process_pool import ProcessPoolExtractor, merge_stats
+from src.metrics.tracing import span
+from src.tools.browser_pool import BrowserPool
 from src.tools.browser_tool import BrowserTool
+from src.tools.http_fetcher import detect_js_shell, parse_html
+from src.tools.link_ranker import rank_links
+from src.tools.page_readiness import ReadinessPolicy
+from src.tools.request_filter import RequestFilter
+from src.tools.text_compactor import estimate_tokens
 
 # 抑制 Python 3.14 与 Pydantic V1 的兼容性警告
 warnings.filterwarnings(
@@ -23,9 +39,30 @@ warnings.filterwarnings(
 )
 
 
+def _chromium_installed() -> bool:
+    """Playwright 的 Chromium 是否已下载（playwright install chromium）"""
+    candidates = [
+        os.environ.get("PLAYWRIGHT_BROWSERS_PATH", ""),
+        "~/.cache/ms-playwright",
+        "~/Library/Caches/ms-playwright",
+        "~/AppData/Local/ms-playwright",
+    ]
+    return any(
+        any(Path(path).expanduser().glob("chromium*"))
+        for path in candidates if path and path != "0"
+    )
+
+
+# 需要真实浏览器的测试在未安装 Chromium 的环境中跳过
+requires_chromium = pytest.mark.skipif(
+    not _chromium_installed(), reason="未安装 Playwright Chromium"
+)
+
+
 class TestBrowserTool:
     """浏览器工具测试"""
 
+    @requires_chromium
     @pytest.mark.asyncio
     async def test_browser_initialization(self):
         """测试浏览器初始化"""
@@ -33,36 +70,753 @@ class TestBrowserTool:
             assert browser.browser is not None
             assert browser.playwright is not None
 
+    @requires_chromium
+    @pytest.mark.asyncio
+    async def test_fetch_page_snapshot(self):
+        """测试一次 evaluate 读取标题、正文、meta、canonical、lang 和 JSON-LD"""
+        html = (
+            '<html lang="en"><head><title>Snap</title>'
+            '<meta name="description" content="desc"><meta property="og:image" content="i.png">'
+            '<meta name="viewport" content="width=device-width">'
+            '<link rel="canonical" href="https://snap.test/home">'
+            '<script type="application/ld+json">{"@type": "Organization", "name": "Snap"}</script>'
+            '</head><body><h1>Hello</h1></body></html>'
+        )
+        async with BrowserTool(readiness=ReadinessPolicy(strategy="load")) as browser:
+            page_data = await browser.fetch_page("data:text/html," + quote(html))
+
+        assert page_data["title"] == "Snap"
+        assert page_data["text"].strip() == "Hello"
+        assert page_data["metadata"] == {"description": "desc", "og:image": "i.png"}
+        assert page_data["meta"]["viewport"] == "width=device-width"
+        assert page_data["canonical"] == "https://snap.test/home"
+        assert page_data["lang"] == "en"
+        assert page_data["json_ld"] == [{"@type": "Organization", "name": "Snap"}]
+        assert "content" not in page_data
+
+
+class FakeBrowser:
+    """记录上下文和关闭状态的假浏览器，用于不依赖 Chromium 的浏览器池测试"""
+
+    def __init__(self):
+        self.connected = True
+        self.contexts = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self):
+        self.contexts += 1
+        return FakeContext()
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+    async def new_page(self):
+        page = Mock()
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        pass
+
+
+def fake_playwright(launched):
+    """替换 async_playwright：chromium.launch 返回假浏览器并记录到 launched 中"""
+    async def launch(headless=True):
+        launched.append(FakeBrowser())
+        return launched[-1]
+
+    playwright = Mock(chromium=Mock(launch=launch), stop=AsyncMock())
+    return lambda: Mock(start=AsyncMock(return_value=playwright))
+
+
+class TestBrowserPool:
+    """浏览器池测试"""
+
+    @pytest.mark.asyncio
+    async def test_pool_launches_and_recycles_without_chromium(self):
+        """测试启动、按页面上限回收和替换断开的浏览器，每次启动都记录 browser_launch 阶段"""
+        launched = []
+        with patch("src.tools.browser_pool.async_playwright", fake_playwright(launched)):
+            with span("pool") as root:
+                async with BrowserPool(size=1, max_pages_per_browser=2) as pool:
+                    for _ in range(2):
+                        async with pool.page():
+                            pass
+                    assert pool.recycled == 1
+                    assert len(launched) == 2
+                    assert launched[0].contexts == 2 and not launched[0].connected
+
+                    launched[1].connected = False
+                    browsers = await pool.health_check()
+                    assert pool.recycled == 2
+                    assert browsers == [{
+                        "connected": True, "active": 0, "pages_served": 0,
+                        "peak_js_heap_mb": 0.0, "retiring": False,
+                    }]
+        assert len([s for s in root.spans if s.name == "browser_launch"]) == 3
+        assert not launched[-1].connected
+
+    @requires_chromium
+    @pytest.mark.asyncio
+    async def test_pool_reuses_and_recycles_browser(self):
+        """测试浏览器复用以及达到页面上限后的回收"""
+        async with BrowserPool(size=1, max_pages_per_browser=2) as pool:
+            first = pool.stats()["browsers"][0]
+            async with pool.page() as page:
+                await page.set_content("<p>one</p>")
+            assert pool.stats()["browsers"][0]["pages_served"] == 1
+            assert pool.recycled == 0
+
+            async with BrowserTool(pool=pool) as browser:
+                assert browser.browser is None
+                async with browser._new_context() as context:
+                    page = await context.new_page()
+                    await page.set_content("<p>two</p>")
+
+            assert pool.recycled == 1
+            assert pool.stats()["browsers"][0]["pages_served"] == 0
+            assert first["connected"]
+
+
+class TestRequestFilter:
+    """请求拦截过滤器测试"""
+
+    def test_block_reason(self):
+        """测试按资源类型和域名（含子域名）判断拦截"""
+        request_filter = RequestFilter(blocked_domains=["ads.example.net"])
+        assert request_filter.block_reason("https://example.com/a.png", "image") == "image"
+        assert request_filter.block_reason("https://example.com/a.css", "stylesheet") is None
+        assert request_filter.block_reason(
+            "https://www.google-analytics.com/analytics.js", "script"
+        ) == "domain"
+        assert request_filter.block_reason("https://x.ads.example.net/t.js", "script") == "domain"
+        assert request_filter.block_reason("https://example.com/", "document") is None
+
+        with_css = RequestFilter(block_stylesheets=True, block_trackers=False)
+        assert with_css.block_reason("https://example.com/a.css", "stylesheet") == "stylesheet"
+        assert with_css.block_reason("https://www.google-analytics.com/a.js", "script") is None
+
+
+class TestReadinessPolicy:
+    """页面就绪策略测试"""
+
+    def test_domain_overrides(self):
+        """测试按域名（含子域名）覆盖就绪策略"""
+        policy = ReadinessPolicy(
+            strategy="load",
+            domain_overrides={
+                "example.com": "networkidle",
+                "slow.org": {"strategy": "text_stable", "deadline_ms": 30000},
+            },
+        )
+        assert policy.for_url("https://www.example.com/a").strategy == "networkidle"
+        slow = policy.for_url("https://slow.org/")
+        assert slow.strategy == "text_stable"
+        assert slow.deadline_ms == 30000
+        assert policy.for_url("https://other.com/") is policy
+
+    def test_unknown_strategy(self):
+        """测试未知策略名称"""
+        with pytest.raises(ValueError):
+            ReadinessPolicy(strategy="idle")
+
+    @requires_chromium
+    @pytest.mark.asyncio
+    async def test_deadline_still_extracts(self):
+        """测试正文持续变化时在截止时间返回，并报告超时"""
+        async with BrowserTool(readiness=ReadinessPolicy(deadline_ms=1500)) as browser:
+            async with browser._new_context() as context:
+                page = await context.new_page()
+                await page.route("**/*", lambda route: route.fulfill(
+                    content_type="text/html",
+                    body="<body>tick<script>setInterval(() => document.body.append('x'), 50)"
+                         "</script></body>",
+                ))
+                report = await browser.readiness.navigate(page, "http://ticker.test/")
+                assert report["timed_out"]
+                assert report["wait_ms"] < 3000
+                assert "tick" in await page.inner_text("body")
+
+
+class TestHttpFetcher:
+    """HTTP 快速通道解析测试"""
+
+    def test_parse_server_rendered_page(self):
+        """测试解析标题、元数据和可见文本，服务端渲染页面不需要回退"""
+        html = (
+            "<html><head><title> Example </title>"
+            "<meta name='description' content='desc'>"
+            "<meta property='og:title' content='OG'></head>"
+            "<body><h1>Heading</h1><p>" + "content " * 50 + "</p>"
+            "<script>var hidden = 1;</script><ul><li>a</li><li>b</li></ul></body></html>"
+        )
+        page = parse_html(html)
+        assert page["title"] == "Example"
+        assert page["metadata"] == {"description": "desc", "og:title": "OG"}
+        assert page["text"].splitlines()[0] == "Heading"
+        assert "hidden" not in page["text"]
+        assert detect_js_shell(page["_root"], page["text"]) is None
+
+    def test_detect_js_shell(self):
+        """测试识别单页应用外壳"""
+        html = (
+            "<html><body><noscript>You need to enable JavaScript to run this app.</noscript>"
+            "<div id='root'></div>" + "<p>" + "x" * 300 + "</p></body></html>"
+        )
+        page = parse_html(html)
+        assert detect_js_shell(page["_root"], page["text"]) == "noscript_app"
+
+        empty = parse_html("<html><body><div id='app'></div></body></html>")
+        assert detect_js_shell(empty["_root"], empty["text"]) == "tiny_text"
+
+
+class FakeLLM:
+    """返回固定 JSON 的模拟聊天模型，记录收到的提示词"""
+
+    def __init__(self, content):
+        self.content = content
+        self.prompts = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return AIMessage(
+            content=self.content,
+            usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120},
+        )
+
+
+class NoLLM:
+    """Agent 夹具的默认模型：测试没有替换 agent.llm 就调用 LLM 时直接失败，不会访问真实的提供商"""
+
+    async def ainvoke(self, messages, **kwargs):
+        raise AssertionError("测试中发生了真实的 LLM 调用，请先替换 agent.llm")
+
+    async def astream(self, messages, **kwargs):
+        raise AssertionError("测试中发生了真实的 LLM 调用，请先替换 agent.llm")
+        yield
+
+
+@pytest_asyncio.fixture
+async def local_site():
+    """在本机随机端口上提供一个服务端渲染的页面，返回其 URL"""
+    html = (
+        "<html><head><title>Local Co</title><meta name='description' content='本地测试页面'></head>"
+        "<body><nav><a href='/'>首页</a></nav><main><h1>Local Co</h1>"
+        + "<p>Local Co builds offline test fixtures for extraction pipelines. </p>" * 8
+        + "<p>联系我们: hello@local.test</p></main></body></html>"
+    )
+
+    async def page(request):
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    yield f"http://127.0.0.1:{runner.addresses[0][1]}/"
+    await runner.cleanup()
+
 
 class TestSiteExtractorAgent:
     """SiteExtractorAgent 测试"""
 
-    @pytest.fixture
-    def agent(self):
-        """创建 Agent 实例"""
+    @pytest_asyncio.fixture
+    async def agent(self):
+        """创建 Agent 实例（不使用缓存），测试结束后关闭"""
         config = {
             "model_name": "gemini-2.5-flash",
-            "google_api_key": "test-key"
+            "google_api_key": "test-key",
+            "cache": False,
         }
-        return SiteExtractorAgent(config)
+        async with SiteExtractorAgent(config) as agent:
+            # 模型在构造时已经创建，patch 工厂函数不会生效；各测试按需替换 agent.llm
+            agent.llm = NoLLM()
+            yield agent
 
     def test_agent_initialization(self, agent):
         """测试 Agent 初始化"""
         assert agent is not None
         assert agent.config["model_name"] == "gemini-2.5-flash"
+        # 礼貌抓取只在批量运行中默认开启，单个 URL 的提取不排队、不请求 robots.txt
+        assert agent.scheduler is None
+        assert (
+            ProcessPoolExtractor({}, workers=1).config["politeness"] == settings.politeness_enabled
+        )
+
+    @pytest.mark.asyncio
+    async def test_extract_with_mock(self, agent, local_site):
+        """测试提取功能：本地页面走 HTTP 快速通道，模拟模型的输出被解析进结果"""
+        # 模型在 Agent 构造时已经创建，直接替换实例上的 llm
+        agent.llm = FakeLLM('{"标题": "Local Co", "联系方式": {"邮箱": ["hello@local.test"]}}')
+
+        result = await agent.extract(local_site)
+        assert result["status"] == "success"
+        assert result["url"] == local_site
+        assert result["tier"] == "http"
+        assert result["标题"] == "Local Co"
+        assert result["usage"]["total_tokens"] == 120
+        assert {"fetch", "llm_call", "extract"} <= set(result["timings"])
+        assert "hello@local.test" in agent.llm.prompts[0]
+
+    @pytest.mark.asyncio
+    async def test_static_prefix_and_cached_tokens(self, agent, local_site):
+        """测试各 URL 的系统消息逐字节相同、网页内容只在用户消息中，缓存命中的令牌计入 usage"""
+        systems = []
+
+        class CachingLLM(FakeLLM):
+            async def ainvoke(self, messages, **kwargs):
+                systems.append(messages[0].content)
+                response = await super().ainvoke(messages, **kwargs)
+                response.usage_metadata["input_token_details"] = {"cache_read": 80}
+                return response
+
+        agent.llm = CachingLLM('{"标题": "Local Co"}')
+        first = await agent.extract(f"{local_site}?n=1")
+        await agent.extract(f"{local_site}?n=2")
+
+        assert systems[0] == systems[1] and local_site not in systems[0]
+        assert "hello@local.test" in agent.llm.prompts[0]
+        assert first["usage"]["cache_read_tokens"] == 80
+
+    @pytest.mark.asyncio
+    async def test_oversized_json_ld_is_trimmed_to_valid_json(self, agent):
+        """测试超出预算的 JSON-LD 按条目裁剪，提示词中始终是预算内的合法 JSON"""
+        json_ld = [
+            {"@type": "Organization", "name": "Local Co", "email": "hello@local.test"},
+            {"@type": "Article", "articleBody": "本地测试公司的产品说明。" * 2000},
+        ]
+
+        async def fake_fetch_page(url, **kwargs):
+            return {
+                "url": url,
+                "title": "Local Co",
+                "text": "Local Co 产品介绍。" * 20,
+                "json_ld": json_ld,
+                "tier": "http",
+            }
+
+        agent.fetcher.fetch_page = fake_fetch_page
+        agent.llm = FakeLLM('{"标题": "Local Co"}')
+        result = await agent.extract("https://local.test/")
+
+        assert result["status"] == "success"
+        json_ld_text = agent.llm.prompts[0].split("（JSON-LD）：\n\n", 1)[1]
+        items = json.loads(json_ld_text)
+        assert items[0]["email"] == "hello@local.test"
+        assert estimate_tokens(json_ld_text) <= agent.compactor.budget_tokens // 4
+
+    @pytest.mark.asyncio
+    async def test_extract_reports_parse_error(self, agent, local_site):
+        """测试无法解析的输出返回 parsed_error 和原始响应"""
+        agent.llm = FakeLLM("抱歉，我无法完成这个任务。")
+
+        with patch("src.agents.extractor_agent.settings.llm_parse_reask", False):
+            result = await agent.extract(local_site)
+        assert result["status"] == "parsed_error"
+        assert result["raw_response"] == "抱歉，我无法完成这个任务。"
+        assert agent.parse_stats()["gemini/gemini-2.5-flash"]["failure_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_extract_many_streams_and_isolates_failures(self, agent):
+        """测试批量提取：流式返回、并发受限、单个 URL 失败不影响其他 URL"""
+        in_flight = {"now": 0, "peak": 0}
+
+        async def fake_extract(url):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            if url.endswith("3"):
+                raise RuntimeError("boom")
+            return {"url": url, "status": "success"}
+
+        agent.extract = fake_extract
+        urls = [f"https://example.com/{i}" for i in range(20)]
+        results = [result async for result in agent.extract_many(urls, concurrency=4)]
+
+        assert len(results) == 20
+        assert in_flight["peak"] <= 4
+        assert sorted(r["url"] for r in results) == sorted(urls)
+        assert sum(r["status"] == "error" for r in results) == 2
 
     @pytest.mark.asyncio
-    @patch("src.agents.extractor_agent.ChatGoogleGenerativeAI")
-    async def test_extract_with_mock(self, mock_llm, agent):
-        """测试提取功能（使用 Mock LLM）"""
-        # 设置 mock 返回值
-        mock_response = Mock()
-        mock_response.content = '{"url": "https://example.com", "title": "Test"}'
-        mock_llm.return_value.ainvoke = Mock(return_value=mock_response)
+    async def test_extract_many_yields_finished_work_before_input_error(self, agent):
+        """测试读取输入出错时，已开始的 URL 仍然返回结果，之后再抛出输入的异常"""
+        async def fake_extract(url):
+            await asyncio.sleep(0.05 if url.endswith("0") else 0)
+            return {"url": url, "status": "success"}
+
+        async def broken_input():
+            for i in range(3):
+                yield f"https://example.com/{i}"
+            raise OSError("输入读取失败")
+
+        agent.extract = fake_extract
+        results = []
+        with pytest.raises(OSError):
+            async for result in agent.extract_many(broken_input(), concurrency=4):
+                results.append(result)
+
+        assert sorted(r["url"] for r in results) == [f"https://example.com/{i}" for i in range(3)]
+
+
+class TestIncrementalRecrawl:
+    """增量重新提取测试"""
+
+    @pytest_asyncio.fixture
+    async def versioned_site(self):
+        """内容和 ETag 可以修改的本地页面，请求带有匹配的 If-None-Match 时返回 304"""
+        state = {
+            "etag": '"v1"',
+            "paragraphs": [
+                f"Local Co product line {i} offers offline fixtures, pricing and support plans."
+                for i in range(12)
+            ],
+            "requests": 0,
+        }
+
+        async def page(request):
+            state["requests"] += 1
+            if request.headers.get("If-None-Match") == state["etag"]:
+                return web.Response(status=304)
+            html = (
+                "<html><head><title>Local Co</title></head><body><main>"
+                + "".join(f"<p>{text}</p>" for text in state["paragraphs"])
+                + "</main></body></html>"
+            )
+            return web.Response(
+                text=html, content_type="text/html", headers={"ETag": state["etag"]}
+            )
+
+        app = web.Application()
+        app.router.add_get("/", page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}/", state
+        await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_recrawl_skips_llm_for_unchanged_pages(self, versioned_site, tmp_path):
+        """测试 304 和内容未变时复用上次结果，内容变化时只发送改动的段落和上次的结果"""
+        url, state = versioned_site
+        config = {
+            "model_name": "gemini-2.5-flash",
+            "google_api_key": "test-key",
+            "cache": False,
+            "politeness": False,
+            "recrawl": True,
+        }
+        with patch(
+            "src.agents.extractor_agent.settings.cache_path", str(tmp_path / "cache.sqlite3")
+        ):
+            async with SiteExtractorAgent(config) as agent:
+                agent.llm = FakeLLM('{"标题": "Local Co"}')
+
+                first = await agent.extract(url)
+                assert first["recrawl"] == {"status": "new"}
+                assert len(agent.llm.prompts) == 1
+
+                # 服务器返回 304：不读取页面，也不调用 LLM
+                second = await agent.extract(url)
+                assert second["recrawl"]["status"] == "not_modified"
+                assert second["标题"] == "Local Co"
+                assert len(agent.llm.prompts) == 1
+
+                # ETag 变了但内容相同：按 SimHash 判断未变化
+                state["etag"] = '"v2"'
+                third = await agent.extract(url)
+                assert third["recrawl"]["status"] == "unchanged"
+                assert len(agent.llm.prompts) == 1
+
+                # 修改两段：只把这两段和上次的结果交给模型
+                state["etag"] = '"v3"'
+                state["paragraphs"][3] = (
+                    "New: Local Co now ships same-day replacement kits to every region."
+                )
+                state["paragraphs"][7] = (
+                    "New: call +1 555 0100 or email sales@local.test for volume pricing."
+                )
+                agent.llm = FakeLLM(
+                    '{"标题": "Local Co", "联系方式": {"邮箱": ["sales@local.test"]}}'
+                )
+                fourth = await agent.extract(url)
+                assert fourth["recrawl"]["status"] == "patched"
+                assert fourth["联系方式"] == {"邮箱": ["sales@local.test"]}
+                prompt = agent.llm.prompts[0]
+                assert '"标题": "Local Co"' in prompt
+                assert "same-day replacement" in prompt and "sales@local.test" in prompt
+                assert "product line 0 " not in prompt
+
+                # 修改后的结果成为新的基准
+                state["etag"] = '"v4"'
+                assert (await agent.extract(url))["联系方式"] == {"邮箱": ["sales@local.test"]}
+
+
+class PackedFakeLLM:
+    """按打包请求中各网页的 URL 返回结果数组的模拟模型"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, messages, **kwargs):
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        urls = [
+            line.split("：", 1)[1]
+            for line in prompt.splitlines()
+            if line.startswith("目标网站 URL：")
+        ]
+        results = [{"url": url, "result": {"标题": "Local Co", "url": url}} for url in urls]
+        return AIMessage(
+            content=json.dumps({"results": results}, ensure_ascii=False),
+            usage_metadata={"input_tokens": 400, "output_tokens": 80, "total_tokens": 480},
+        )
+
+
+class TestPromptPacking:
+    """多 URL 打包测试"""
+
+    @pytest_asyncio.fixture
+    async def agent(self):
+        config = {
+            "model_name": "gemini-2.5-flash", "google_api_key": "test-key",
+            "cache": False, "politeness": False, "packing": True,
+        }
+        async with SiteExtractorAgent(config) as agent:
+            agent.llm = FakeLLM('{"标题": "Single"}')
+            # 放宽收集窗口，使同时抓取的网页总能落在同一个打包请求中
+            agent.packer.max_wait = 1.0
+            yield agent
+
+    @pytest.mark.asyncio
+    async def test_extract_many_packs_small_pages(self, agent, local_site):
+        agent.packer.llm = PackedFakeLLM()
+        urls = [f"{local_site}?n={i}" for i in range(4)]
+        results = [result async for result in agent.extract_many(urls, concurrency=4)]
+
+        assert sorted(result["url"] for result in results) == sorted(urls)
+        assert all(
+            result["标题"] == "Local Co" and result["packed"] == {"pages": 4} for result in results
+        )
+        assert sum(result["usage"]["total_tokens"] for result in results) == 480
+        assert len(agent.packer.llm.prompts) == 1 and not agent.llm.prompts
+        stats = agent.packing_stats()
+        assert stats["calls_saved"] == 3 and stats["input_tokens_saved"] > 0
+
+    @pytest.mark.asyncio
+    async def test_malformed_packed_output_falls_back(self, agent, local_site):
+        agent.packer.llm = FakeLLM("抱歉，我无法完成这个任务。")
+        urls = [f"{local_site}?n={i}" for i in range(3)]
+        results = [result async for result in agent.extract_many(urls, concurrency=3)]
+
+        assert all(
+            result["status"] == "success" and result["标题"] == "Single" for result in results
+        )
+        assert all("packed" not in result for result in results)
+        assert len(agent.llm.prompts) == 3
+        assert agent.packing_stats()["fallbacks"] == 3
+
+
+class TestSiteMode:
+    """站点模式测试"""
+
+    def test_rank_links(self):
+        """测试只保留同站点的相关子页面，按关键词得分排序并去重"""
+        links = [
+            {"text": "Home", "href": "https://example.com/"},
+            {"text": "Blog", "href": "https://example.com/blog/post-1"},
+            {"text": "Pricing", "href": "https://example.com/pricing"},
+            {"text": "联系我们", "href": "https://www.example.com/contact"},
+            {"text": "Contact", "href": "https://example.com/contact#form"},
+            {"text": "About", "href": "https://other.com/about"},
+            {"text": "Team brochure", "href": "https://example.com/team.pdf"},
+            {"text": "Privacy", "href": "https://example.com/about/privacy"},
+            {"text": "Our team", "href": "https://example.com/about/team"},
+        ]
+        ranked = rank_links("https://example.com/", links, 3)
+        assert [item["url"] for item in ranked] == [
+            "https://www.example.com/contact",
+            "https://example.com/about/team",
+            "https://example.com/pricing",
+        ]
+        assert rank_links("https://example.com/", links, 0) == []
+
+    @pytest_asyncio.fixture
+    async def company_site(self):
+        """首页链接到联系、关于和博客页面的本地站点，记录各页面的请求次数"""
+        nav = "<nav><a href='/'>Home</a><a href='/contact'>Contact</a>" \
+              "<a href='/about'>About us</a><a href='/blog'>Blog</a>" \
+              "<a href='https://other.test/contact'>Partner</a></nav>"
+        footer = "<p>Acme GmbH, Sensorstrasse 1, 10115 Berlin</p>"
+        bodies = {
+            "/": "<h1>Acme</h1>"
+                 + "<p>Acme builds industrial sensors for harsh environments worldwide.</p>" * 6,
+            "/contact": "<h1>Contact</h1><p>Email sales@acme.test or call +1 555 0100 "
+                        "during office hours.</p>" * 4,
+            "/about": "<h1>About</h1><p>Acme was founded in 1999 and employs 120 engineers "
+                      "in Berlin.</p>" * 4,
+            "/blog": "<h1>Blog</h1><p>Release notes and product news from the Acme team.</p>" * 4,
+        }
+        hits = {path: 0 for path in bodies}
+
+        def handler(path):
+            async def page(request):
+                hits[path] += 1
+                html = (f"<html><head><title>Acme {path}</title></head>"
+                        f"<body>{nav}<main>{bodies[path]}{footer}</main></body></html>")
+                return web.Response(text=html, content_type="text/html")
+            return page
+
+        app = web.Application()
+        for path in bodies:
+            app.router.add_get(path, handler(path))
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}/", hits
+        await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_site_mode_merges_subpages_into_one_call(self, company_site):
+        """测试站点模式抓取首页和得分最高的子页面，合并正文后只调用一次 LLM"""
+        url, hits = company_site
+        config = {
+            "model_name": "gemini-2.5-flash",
+            "google_api_key": "test-key",
+            "cache": False,
+            "politeness": False,
+        }
+        with patch("src.agents.extractor_agent.settings.site_max_subpages", 2):
+            async with SiteExtractorAgent(config) as agent:
+                agent.llm = FakeLLM('{"标题": "Acme", "联系方式": {"邮箱": ["sales@acme.test"]}}')
+                result = await agent.extract(url, site=True)
+
+        assert result["status"] == "success"
+        assert result["联系方式"] == {"邮箱": ["sales@acme.test"]}
+        assert [page["url"] for page in result["pages"]] == [url, url + "contact", url + "about"]
+        assert all(page["tier"] == "http" for page in result["pages"])
+        assert result["compaction"]["source"] == "site"
+        assert hits == {"/": 1, "/contact": 1, "/about": 1, "/blog": 0}
+
+        assert len(agent.llm.prompts) == 1
+        prompt = agent.llm.prompts[0]
+        assert "sales@acme.test" in prompt and "founded in 1999" in prompt
+        # 各页面共有的行只保留一次
+        assert prompt.count("Sensorstrasse 1") == 1
+        assert "site_fetch" in result["timings"] and "site_merge" in result["timings"]
+
+    @pytest.mark.asyncio
+    async def test_site_mode_reports_landing_failure(self):
+        config = {
+            "model_name": "gemini-2.5-flash",
+            "google_api_key": "test-key",
+            "cache": False,
+            "politeness": False,
+        }
+        async with SiteExtractorAgent(config) as agent:
+            agent.fetcher.fetch_page = _failing_fetch
+            result = await agent.extract("https://unreachable.test/", site=True)
+        assert result["status"] == "error"
+        assert "boom" in result["error"]
+
+
+async def _failing_fetch(url, **kwargs):
+    raise RuntimeError("boom")
+
+
+def install_fake_llm(agent):
+    """多进程测试的 initializer：在工作进程中替换为模拟模型"""
+    agent.llm = FakeLLM('{"标题": "Local Co"}')
+
+
+def install_crash_on_marked_url(agent):
+    """多进程测试的 initializer：提取带 crash 标记的 URL 时工作进程直接退出"""
+    install_fake_llm(agent)
+    extract = agent.extract
+
+    async def crashing_extract(url, *args, **kwargs):
+        if "crash" in url:
+            # 等开始提取的消息送达父进程后再退出
+            await asyncio.sleep(1.0)
+            os._exit(3)
+        return await extract(url, *args, **kwargs)
+
+    agent.extract = crashing_extract
+
+
+class TestProcessPoolExtractor:
+    """多进程提取测试"""
+
+    @pytest.mark.asyncio
+    async def test_extract_many_across_processes(self, local_site):
+        # 所有 URL 在同一主机上，关闭礼貌抓取以免按主机排队拖慢测试
+        config = {
+            "model_name": "gemini-2.5-flash",
+            "google_api_key": "test-key",
+            "cache": False,
+            "politeness": False,
+        }
+        extractor = ProcessPoolExtractor(config, workers=2, initializer=install_fake_llm)
+        urls = [f"{local_site}?n={i}" for i in range(12)]
+        # 与单进程的 extract_many 一致：去掉首尾空白，跳过空行
+        lines = [f"  {url}\n" for url in urls[:6]] + ["", "   \n"] + urls[6:]
+
+        results = [result async for result in extractor.extract_many(lines, concurrency=2)]
+
+        assert sorted(result["url"] for result in results) == sorted(urls)
+        assert all(result["标题"] == "Local Co" for result in results)
+        assert len(extractor.worker_stats) == 2
+        assert extractor.parse_stats()["gemini/gemini-2.5-flash"]["total"] == 12
+
+    @pytest.mark.asyncio
+    async def test_worker_exit_reports_started_and_hands_over_queued(self, local_site):
+        # 进程退出时已开始的 URL 记为错误，已分给该分片、尚未开始的 URL 由替补进程处理，不会丢失
+        config = {
+            "model_name": "gemini-2.5-flash",
+            "google_api_key": "test-key",
+            "cache": False,
+            "politeness": False,
+        }
+        extractor = ProcessPoolExtractor(config, workers=1, initializer=install_crash_on_marked_url)
+        urls = [f"{local_site}?n={i}" for i in range(6)]
+        urls.insert(2, f"{local_site}?crash=1")
+
+        results = {
+            result["url"]: result async for result in extractor.extract_many(urls, concurrency=1)
+        }
+
+        assert sorted(results) == sorted(urls)
+        assert results[urls[2]]["status"] == "error"
+        assert "退出码 3" in results[urls[2]]["error"]
+        assert all(results[url]["标题"] == "Local Co" for url in urls if url != urls[2])
+        assert extractor.restarts == 1
 
-        result = await agent.extract("https://example.com")
-        assert result["status"] in ["success", "error", "parsed_error"]
-        assert result["url"] == "https://example.com"
+    def test_merge_stats(self):
+        merged = merge_stats([
+            {"groq": {"model": "m", "requests": 3, "latency_ms": 100.0, "cooling_down": False,
+                      "rate_limit": {"requests": 3, "total_wait_ms": 30.0, "avg_wait_ms": 10.0,
+                                     "max_wait_ms": 20.0}}},
+            {"groq": {"model": "m", "requests": 1, "latency_ms": 200.0, "cooling_down": True,
+                      "rate_limit": {"requests": 1, "total_wait_ms": 50.0, "avg_wait_ms": 50.0,
+                                     "max_wait_ms": 50.0}}},
+        ])["groq"]
+        assert merged["requests"] == 4
+        assert merged["latency_ms"] == 125.0
+        assert merged["cooling_down"] is True
+        assert merged["rate_limit"]["avg_wait_ms"] == 20.0
+        assert merged["rate_limit"]["max_wait_ms"] == 50.0
+        parse = merge_stats([{"p": {"json": 3, "failed": 1, "total": 4, "failure_rate": 0.25}},
+                             {"p": {"json": 4, "total": 4, "failure_rate": 0.0}}])
+        assert parse["p"]["failure_rate"] == 0.125
 
 
 # TODO: 添加更多集成测试
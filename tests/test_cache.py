@@ -0,0 +1,163 @@
+"""
+缓存测试
+包含 URL 规范化、两级缓存、页面抓取缓存和页面指纹的单元测试
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tools.cache import FetchCache, LLMResultCache, TieredCache
+from src.tools.fingerprint import (
+    FingerprintStore,
+    compare,
+    hamming_distance,
+    make_fingerprint,
+    simhash,
+)
+from src.tools.url_utils import normalize_url
+
+
+class TestNormalizeUrl:
+    """URL 规范化测试"""
+
+    def test_normalize(self):
+        """测试补全协议、小写主机、去掉默认端口、片段和跟踪参数"""
+        assert normalize_url("Example.COM") == "https://example.com/"
+        assert normalize_url("https://example.com:443/a?b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+        assert normalize_url("http://example.com:8080/?utm_source=x&id=3") == "http://example.com:8080/?id=3"
+
+
+class TestTieredCache:
+    """两级缓存测试"""
+
+    def test_memory_and_disk_hits(self, tmp_path):
+        """测试内存未命中时从磁盘读取并回填内存"""
+        path = str(tmp_path / "cache.sqlite3")
+        cache = TieredCache(path, "t", memory_entries=1)
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+
+        assert cache.get("b") == {"v": 2}
+        assert cache.get("a") == {"v": 1}
+        assert cache.get("missing") is None
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+        cache.close()
+
+        reopened = TieredCache(path, "t")
+        assert reopened.get("a") == {"v": 1}
+        reopened.close()
+
+    def test_ttl_and_disk_eviction(self, tmp_path):
+        """测试过期条目不再返回，以及磁盘条目数超过上限时淘汰最久未访问的条目"""
+        cache = TieredCache(str(tmp_path / "cache.sqlite3"), "t", memory_entries=0,
+                            max_disk_entries=50, ttl=60)
+        cache.set("old", 1, stored_at=time.time() - 120)
+        assert cache.get("old") is None
+        assert cache.get_entry("old")[1] == 1
+
+        for i in range(100):
+            cache.set(f"k{i}", i)
+        assert cache.stats()["evictions"] == 50
+        assert cache.get("k99") == 99
+        assert cache.get("k0") is None
+        cache.close()
+
+
+class TestFetchCache:
+    """页面抓取缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_validators_after_expiry(self):
+        """测试过期后只有带验证头的条目可用于条件请求"""
+        fetch_cache = FetchCache(TieredCache(None, "fetch", ttl=0))
+        await fetch_cache.store("example.com", {"text": "a", "etag": '"v1"'})
+        await fetch_cache.store("https://other.com/", {"text": "b"})
+        time.sleep(0.01)
+
+        assert await fetch_cache.get_fresh("https://example.com/") is None
+        assert (await fetch_cache.get_validators("https://example.com/#x"))["etag"] == '"v1"'
+        assert await fetch_cache.get_validators("other.com") is None
+
+    @pytest.mark.asyncio
+    async def test_disk_access_runs_off_the_event_loop(self, tmp_path):
+        """测试异步方法在线程中读写磁盘，内存命中时不切换线程"""
+        cache = TieredCache(str(tmp_path / "cache.sqlite3"), "fetch", memory_entries=0)
+        threads = []
+        original = cache._lookup
+
+        def recording_lookup(key):
+            threads.append(threading.current_thread())
+            return original(key)
+
+        cache._lookup = recording_lookup
+        await cache.aset("k", {"v": 1})
+        assert await cache.aget("k") == {"v": 1}
+        assert threads and threading.main_thread() not in threads
+        cache.close()
+
+    def test_llm_cache_key(self):
+        """测试 LLM 缓存键随提示词、模型和温度变化"""
+        key = LLMResultCache.make_key("sys", "page", "model-a", 0.0)
+        assert key == LLMResultCache.make_key("sys", "page", "model-a", 0)
+        assert key != LLMResultCache.make_key("sys", "page2", "model-a", 0.0)
+        assert key != LLMResultCache.make_key("sys", "page", "model-b", 0.0)
+        assert key != LLMResultCache.make_key("sys", "page", "model-a", 0.5)
+
+
+class TestFingerprint:
+    """页面指纹测试"""
+
+    LINES = [
+        f"第 {i} 段：Local Co 在这里介绍产品线 {i} 的特性与价格，以及售后服务的联系方式。"
+        for i in range(20)
+    ]
+
+    def test_simhash_distance(self):
+        """测试相近文本的 SimHash 只有少数位不同，无关文本相差很多位"""
+        text = "\n".join(self.LINES)
+        near = "\n".join(self.LINES[:-1] + [self.LINES[-1].replace("价格", "报价")])
+        other = "\n".join(
+            f"Unrelated article number {i} about gardening and weather." for i in range(20)
+        )
+        assert simhash(text) == simhash(text)
+        assert hamming_distance(simhash(text), simhash(near)) <= 3
+        assert hamming_distance(simhash(text), simhash(other)) > 10
+
+    def test_compare_lists_changed_sections(self):
+        """测试比较结果只列出新增或改动的行，并统计删除的行"""
+        previous = make_fingerprint(
+            {"etag": '"v1"'}, "\n".join(self.LINES), "meta", {"标题": "Local Co"}
+        )
+        lines = (
+            self.LINES[:5]
+            + ["新增：电话 010-12345678", "新增：邮箱 hi@local.test"]
+            + self.LINES[6:]
+        )
+        diff = compare(previous, "\n".join(lines), "meta")
+        assert diff["changed"] == ["新增：电话 010-12345678\n新增：邮箱 hi@local.test"]
+        assert diff["removed"] == 1
+        assert diff["metadata_changed"] is False
+        assert 0 < diff["changed_ratio"] < 0.1
+        assert compare(previous, "\n".join(self.LINES), "meta2")["metadata_changed"] is True
+
+    @pytest.mark.asyncio
+    async def test_store_refresh_keeps_fingerprint(self):
+        """测试刷新只更新验证头，URL 按规范化形式存取"""
+        store = FingerprintStore(TieredCache(None, "fingerprints"))
+        await store.store("example.com", make_fingerprint({"etag": '"v1"'}, "a", "", {"标题": "A"}))
+        await store.refresh("https://example.com/#top", etag='"v2"', last_modified=None)
+        fingerprint = await store.get("https://EXAMPLE.com/")
+        assert fingerprint["etag"] == '"v2"'
+        assert fingerprint["extracted"] == {"标题": "A"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,64 @@
+"""
+正文提取测试
+包含主体内容定位、标题与联系方式保留的单元测试
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import lxml.html
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tools.content_extractor import compose_main_text, extract_main_content, visible_text
+from src.tools.http_fetcher import parse_html
+from src.tools.text_compactor import estimate_tokens
+
+CORPUS_DIR = Path(__file__).resolve().parent.parent / "benchmarks" / "corpus"
+
+PAGE = """
+<html><body>
+<nav><ul>{links}</ul></nav>
+<aside><h3>Related</h3>
+<p><a href="/x">Another story with a long headline that is only a link</a></p></aside>
+<main>
+  <h1>Example Corp</h1>
+  <p>Example Corp builds tools for teams, founded in 2010, headquartered in Berlin.</p>
+  <p>Our products include a scheduler, a time tracker, and an invoicing service for freelancers.</p>
+</main>
+<footer>{links}<p>Email: hello@example.com</p><a href="tel:+4930123456">Call</a></footer>
+</body></html>
+""".format(links="".join(f'<li><a href="/p{i}">Link {i}</a></li>' for i in range(30)))
+
+
+class TestContentExtractor:
+    """正文提取测试"""
+
+    def test_extracts_main_and_keeps_contacts(self):
+        """测试定位正文，去掉导航和侧栏，并保留页脚中的联系方式"""
+        main = extract_main_content(lxml.html.document_fromstring(PAGE))
+        assert "scheduler" in main["text"]
+        assert "Link 3" not in main["text"]
+        assert main["headings"] == ["Example Corp"]
+        assert "Email: hello@example.com" in main["contacts"]
+        assert "+4930123456" in main["contacts"]
+
+        text = compose_main_text(main)
+        assert "Another story" not in text
+        assert text.endswith("+4930123456")
+
+    def test_parse_html_returns_main_content(self):
+        """测试 HTTP 层的解析结果同时包含整页文本和正文"""
+        page = parse_html(PAGE)
+        assert "Link 3" in page["text"]
+        assert "Link 3" not in page["main_content"]
+
+    def test_corpus_token_reduction(self):
+        """测试基准语料中正文提取明显减少令牌数"""
+        for path in sorted(CORPUS_DIR.glob("*.html")):
+            root = lxml.html.document_fromstring(path.read_text(encoding="utf-8"))
+            body_tokens = estimate_tokens(visible_text(root))
+            main_tokens = estimate_tokens(compose_main_text(extract_main_content(root)))
+            assert main_tokens < body_tokens * 0.7, path.name
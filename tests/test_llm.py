@@ -0,0 +1,532 @@
+"""
+LLM 模块测试
+包含提供商注册表、多提供商路由、客户端限流、流式 JSON 解析、结构化输出、
+多 URL 提示词打包和提示词缓存的单元测试
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+
+from src.llm.packing import PromptPacker, parse_packed_response
+from src.llm.prompt_cache import (
+    GeminiContextCache,
+    PromptCachingChatModel,
+    cache_tokens,
+    enable_prompt_caching,
+)
+from src.llm.providers import PROVIDERS, create_chat_model, is_available, select_provider
+from src.llm.rate_limiter import RateLimitedChatModel, RateLimiter, TokenBucket
+from src.llm.router import LLMRouter, ProviderRoute, classify_error
+from src.llm.streaming import IncrementalJSONParser, stream_json
+from src.llm.structured import bind_structured_output, broken_fragments, parse_response, repair_json
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestProviders:
+    """提供商注册表测试"""
+
+    def test_select_provider_priority(self):
+        """测试按优先顺序选择已配置的提供商"""
+        with patch("src.llm.providers.is_available", return_value=True):
+            assert select_provider({"groq_api_key": "k", "openai_api_key": "k"}) == "openai"
+            assert select_provider({"cerebras_api_key": "k"}) == "cerebras"
+            assert select_provider({}) is None
+        assert is_available("unknown") is False
+
+    def test_create_chat_model_passes_base_url(self):
+        """测试 OpenAI 兼容提供商使用各自的服务地址"""
+        chat_class = Mock()
+        with patch("src.llm.providers.load_chat_class", return_value=chat_class) as load:
+            create_chat_model(
+                "siliconflow", {"model_name": "m", "siliconflow_api_key": "k", "max_tokens": 100}
+            )
+        load.assert_called_once_with("siliconflow")
+        chat_class.assert_called_once_with(
+            model="m", temperature=0.0, max_tokens=100, api_key="k",
+            base_url=PROVIDERS["siliconflow"].base_url,
+        )
+
+    def test_agent_import_does_not_load_provider_sdks(self):
+        """测试导入 Agent 模块时不会导入任何提供商的 SDK"""
+        modules = sorted({spec.module for spec in PROVIDERS.values()})
+        code = (
+            "import sys, src.agents; "
+            f"print([m for m in {modules!r} if m in sys.modules])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT / "src")},
+            capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == "[]"
+
+
+class StatusError(Exception):
+    """带 HTTP 状态码的模拟 SDK 异常"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeLLM:
+    """按预设序列返回结果或抛出异常的模拟聊天模型"""
+
+    def __init__(self, outcomes=None, delay=0.0):
+        self.outcomes = list(outcomes or [])
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = Mock()
+        response.content = outcome
+        response.response_metadata = {}
+        response.usage_metadata = {"input_tokens": 50, "output_tokens": 10, "total_tokens": 60}
+        return response
+
+
+class TestLLMRouter:
+    """多提供商路由测试"""
+
+    def test_classify_error(self):
+        """测试 429 / 5xx / 超时可重试，4xx 不可重试"""
+        assert classify_error(StatusError(429)) == "rate_limit"
+        assert classify_error(StatusError(503)) == "server_error"
+        assert classify_error(asyncio.TimeoutError()) == "timeout"
+        assert classify_error(StatusError(401)) is None
+
+    @pytest.mark.asyncio
+    async def test_fails_over_and_cools_down(self):
+        """测试限流时切换到其他提供商，并让限流的提供商进入冷却期"""
+        limited = FakeLLM([StatusError(429)] * 10)
+        healthy = FakeLLM()
+        router = LLMRouter(
+            [ProviderRoute("groq", "m1", limited), ProviderRoute("gemini", "m2", healthy)]
+        )
+
+        # 固定选择候选中的第一个，使首次请求落在限流的提供商上
+        with patch("src.llm.router.random.choices", lambda candidates, weights: candidates[:1]):
+            for _ in range(5):
+                response = await router.ainvoke([])
+                assert response.response_metadata["router"]["provider"] == "gemini"
+
+        assert limited.calls == 1
+        stats = router.stats()
+        assert stats["providers"]["groq"]["cooling_down"] is True
+        assert stats["providers"]["gemini"]["requests"] == 5
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_error_raises(self):
+        """测试不可重试的错误直接抛出，不切换提供商"""
+        router = LLMRouter([ProviderRoute("openai", "m", FakeLLM([StatusError(400)]))])
+        with pytest.raises(StatusError):
+            await router.ainvoke([])
+        assert router.retries == 0
+
+    @pytest.mark.asyncio
+    async def test_spreads_load_across_providers(self):
+        """测试并发请求分配到多个提供商，吞吐量叠加"""
+        llms = {name: FakeLLM(delay=0.02) for name in ("a", "b", "c")}
+        router = LLMRouter([ProviderRoute(name, "m", llm) for name, llm in llms.items()])
+        await asyncio.gather(*(router.ainvoke([]) for _ in range(30)))
+        assert all(llm.calls > 0 for llm in llms.values())
+
+    @pytest.mark.asyncio
+    async def test_prefers_provider_with_quota(self):
+        """测试限流额度耗尽的提供商不会被选中"""
+        exhausted = RateLimiter(rpm=1)
+        await exhausted.acquire()
+        throttled, free = FakeLLM(), FakeLLM()
+        router = LLMRouter(
+            [ProviderRoute("groq", "m", throttled, exhausted), ProviderRoute("openai", "m", free)]
+        )
+        for _ in range(5):
+            await router.ainvoke([])
+        assert throttled.calls == 0 and free.calls == 5
+
+    def test_token_bucket(self):
+        """测试令牌桶容量耗尽后需要等待补充"""
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        assert bucket.try_acquire()
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        assert 0 < bucket.wait_time() <= 1.0
+
+
+class TestRateLimiter:
+    """RPM / TPM 限流测试"""
+
+    @pytest.mark.asyncio
+    async def test_callers_queue_in_order(self):
+        """测试令牌额度不足时调用方按顺序排队等待，并记录队列长度和等待时间"""
+        limiter = RateLimiter(tpm=60000)  # 每秒补充 1000 个令牌
+        await limiter.acquire(60000)
+        order = []
+
+        async def call(index):
+            await limiter.acquire(100)
+            order.append(index)
+
+        await asyncio.gather(*(call(i) for i in range(3)))
+        stats = limiter.stats()
+        assert order == [0, 1, 2]
+        assert stats["max_queue_depth"] == 3
+        assert stats["waited_requests"] == 3
+        assert stats["max_wait_ms"] >= 250
+
+    def test_record_usage_adjusts_budget(self):
+        """测试按实际用量多退少补"""
+        limiter = RateLimiter(tpm=1000)
+        limiter.token_bucket.tokens = 500
+        limiter.record_usage(estimated_tokens=100, actual_tokens=300)
+        assert limiter.token_bucket.tokens == pytest.approx(300, abs=1)
+        limiter.record_usage(estimated_tokens=300, actual_tokens=100)
+        assert limiter.token_bucket.tokens == pytest.approx(500, abs=1)
+
+    def test_from_settings_prefers_model_limits(self):
+        """测试 "提供商/模型" 的限额优先于提供商的限额"""
+        limits = {"groq": {"rpm": 30}, "groq/small": {"rpm": 60, "tpm": 1000}}
+        with patch("src.llm.rate_limiter.settings") as mock_settings:
+            mock_settings.llm_rate_limits = limits
+            assert RateLimiter.from_settings("groq", "small").rpm == 60
+            assert RateLimiter.from_settings("groq", "large").rpm == 30
+            assert RateLimiter.from_settings("openai", "gpt") is None
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_chat_model_records_usage(self):
+        """测试包装后的模型使用 usage_metadata 统计实际令牌数"""
+        model = RateLimitedChatModel(FakeLLM(), RateLimiter(rpm=60))
+        response = await model.ainvoke(["hello"])
+        assert "wait_ms" in response.response_metadata["rate_limit"]
+        assert model.stats()["rate_limit"]["actual_tokens"] == 60
+
+
+class StreamingLLM:
+    """按预设文本块流式输出的模拟聊天模型，记录实际产出的块数和流是否被关闭"""
+
+    def __init__(self, pieces, error=None):
+        self.pieces = list(pieces)
+        self.error = error
+        self.produced = 0
+        self.closed = False
+
+    async def astream(self, messages, **kwargs):
+        if self.error:
+            raise self.error
+        try:
+            for piece in self.pieces:
+                self.produced += 1
+                await asyncio.sleep(0)
+                yield AIMessageChunk(content=piece)
+        finally:
+            self.closed = True
+
+
+class TestStreaming:
+    """流式调用与增量 JSON 解析测试"""
+
+    def test_parser_emits_fields_as_they_complete(self):
+        """测试字段在值结束时逐个产出，字符串中的括号、逗号和转义引号不影响解析"""
+        parser = IncrementalJSONParser()
+        assert parser.feed('```json\n{"title": "A, {b}') == []
+        assert parser.feed(' \\"c\\"", "tags": ["x",') == [("title", 'A, {b} "c"')]
+        assert parser.feed(' "y"], "contact": {"phone": "1"}') == [("tags", ["x", "y"])]
+        assert parser.feed('}\n```\n说明文字') == [("contact", {"phone": "1"})]
+        assert parser.done
+        assert json.loads(parser.text) == parser.fields
+
+    def test_parser_incomplete_object(self):
+        """测试对象未闭合时只返回已完成的字段"""
+        parser = IncrementalJSONParser()
+        parser.feed('{"a": 1, "b": "unfinished')
+        assert parser.fields == {"a": 1}
+        assert not parser.done and parser.text is None
+
+    @pytest.mark.asyncio
+    async def test_stream_json_stops_when_object_closes(self):
+        """测试对象闭合后停止接收并关闭底层流，回调按到达顺序收到字段"""
+        llm = StreamingLLM(
+            ['{"title": ', '"Acme", "phone"', ': "123"}', " 以上是", "提取结果"] + ["..."] * 50
+        )
+        fields = []
+        response = await stream_json(llm, [], on_field=lambda key, value: fields.append(key))
+        assert fields == ["title", "phone"]
+        assert json.loads(response.content) == {"title": "Acme", "phone": "123"}
+        assert llm.produced == 3 and llm.closed
+        assert response.response_metadata["stream"]["stopped_on_close"] is True
+
+    @pytest.mark.asyncio
+    async def test_router_stream_fails_over_before_first_chunk(self):
+        """测试首个消息块之前的可重试错误切换到其他提供商"""
+        routes = [
+            ProviderRoute("groq", "g", StreamingLLM([], error=StatusError(429))),
+            ProviderRoute("gemini", "m", StreamingLLM(['{"a": 1}', " trailing"])),
+        ]
+        router = LLMRouter(routes, max_attempts=2)
+        # 固定选择候选中的第一个，使首次尝试落在会失败的提供商上
+        with patch("src.llm.router.random.choices", lambda candidates, weights: candidates[:1]):
+            response = await stream_json(router, [])
+        assert json.loads(response.content) == {"a": 1}
+        assert response.response_metadata["router"] == {
+            "provider": "gemini",
+            "model": "m",
+            "attempts": 2,
+        }
+        assert routes[0].failures == 1 and routes[1].in_flight == 0
+        assert routes[1].llm.closed
+
+
+class TestStructuredOutput:
+    """结构化输出与宽松解析测试"""
+
+    def test_bind_by_provider_capability(self):
+        """测试按提供商选择工具调用、JSON 模式或不绑定"""
+        llm = Mock()
+        bind_structured_output(llm, "openai")
+        llm.bind_tools.assert_called_once()
+        assert llm.bind_tools.call_args.kwargs["tool_choice"] == "SiteExtraction"
+        bind_structured_output(llm, "cerebras")
+        llm.bind.assert_called_once_with(response_format={"type": "json_object"})
+        assert bind_structured_output(llm, "xunfei") is llm
+
+    def test_parse_tool_call_arguments(self):
+        """测试工具调用参数按结构规范化，保留中文字段名和额外字段"""
+        response = AIMessage(content="", tool_calls=[{
+            "name": "SiteExtraction", "id": "1",
+            "args": {"标题": "Acme", "联系方式": {"邮箱": ["a@b.c"]}, "行业": "制造"},
+        }])
+        parsed = parse_response(response)
+        assert parsed.mode == "structured"
+        assert parsed.data == {"标题": "Acme", "联系方式": {"邮箱": ["a@b.c"]}, "行业": "制造"}
+
+    @pytest.mark.parametrize("text, expected", [
+        ("{'标题': 'A', '标签': ['x', 'y',],}", {"标题": "A", "标签": ["x", "y"]}),
+        ('{"a": "it\'s", b: True, "c": None}', {"a": "it's", "b": True, "c": None}),
+        ('{"a": 1, "b": {"c": "截断的文', {"a": 1, "b": {"c": "截断的文"}}),
+        ('{"a": 1, "b": tru', {"a": 1}),
+        ('说明：{"a": {"x": 1,}, // 注释\n "b": 2}', {"a": {"x": 1}, "b": 2}),
+    ])
+    def test_repair_json(self, text, expected):
+        """测试修复尾逗号、单引号、未加引号的键、注释和截断"""
+        assert repair_json(text) == expected
+        assert parse_response(AIMessage(content=text)).mode == "repaired"
+
+    def test_broken_fragments(self):
+        """测试只返回无法解析的字段和截断的最后一个字段"""
+        fields, fragments = broken_fragments('```json\n{"a": 1, "b": [1 2], "c": "ok", "d": {"e"')
+        assert fields == {"a": 1, "c": "ok"}
+        assert fragments == ['"b": [1 2]', '"d": {"e"']
+
+
+class PackingLLM:
+    """按打包请求中的网页序号返回结果的模拟模型，malformed 为 True 时返回无法解析的文本"""
+
+    def __init__(self, malformed: bool = False):
+        self.malformed = malformed
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        prompt = messages[-1].content
+        self.calls.append(prompt)
+        if self.malformed:
+            return AIMessage(content="抱歉，我无法完成这个任务。")
+        urls = [
+            line.split("：", 1)[1]
+            for line in prompt.splitlines()
+            if line.startswith("目标网站 URL：")
+        ]
+        # 故意打乱顺序并去掉末尾斜杠，结果仍按规范化 URL 对应
+        results = [
+            {"url": url.rstrip("/"), "result": {"标题": url.rsplit("/", 1)[-1]}}
+            for url in reversed(urls)
+        ]
+        return AIMessage(
+            content=json.dumps({"results": results}, ensure_ascii=False),
+            usage_metadata={"input_tokens": 301, "output_tokens": 40, "total_tokens": 341},
+        )
+
+
+class TestPromptPacking:
+    """多 URL 提示词打包测试"""
+
+    def test_parse_packed_response_shapes(self):
+        """测试按 URL 拆分结果：兼容顶层数组和以 URL 为键的对象，丢弃缺少或不符合结构的网页"""
+        urls = ["https://a.test/", "https://b.test/x"]
+        listed = AIMessage(
+            content='[{"url": "https://B.test/x", "result": {"标题": "B"}}, '
+                    '{"url": "https://a.test", "标题": "A"}]'
+        )
+        assert parse_packed_response(listed, urls) == (
+            {"https://b.test/x": {"标题": "B"},
+             "https://a.test/": {"url": "https://a.test", "标题": "A"}},
+            "json",
+        )
+
+        keyed = AIMessage(
+            content='{"https://a.test/": {"标题": "A", "链接": "不是列表"}, '
+                    '"https://b.test/x": {"标题": "B"}}'
+        )
+        assert parse_packed_response(keyed, urls) == ({"https://b.test/x": {"标题": "B"}}, "json")
+
+        # 没有 URL 但数量一致时按顺序对应
+        ordered = AIMessage(content='{"results": [{"标题": "A"}, {"标题": "B"},]}')
+        results, mode = parse_packed_response(ordered, urls)
+        assert mode == "repaired" and results["https://b.test/x"] == {"标题": "B"}
+
+        assert parse_packed_response(AIMessage(content="无法完成"), urls) == ({}, "failed")
+
+    @pytest.mark.asyncio
+    async def test_packs_pages_into_one_call(self):
+        """测试同一窗口中的网页合并为一次请求，用量按网页平分，系统提示词只发送一次"""
+        llm = PackingLLM()
+        packer = PromptPacker(
+            llm, "系统提示词" * 50, budget_tokens=1000, max_pages=3, max_wait=0.05
+        )
+        urls = [f"https://site.test/{name}" for name in "abcd"]
+        results = await asyncio.gather(*(
+            packer.submit(url, f"目标网站 URL：{url}\n以下是抓取到的页面正文文本：\n正文 {url}")
+            for url in urls
+        ))
+
+        # 前三个网页达到 max_pages 立即发出，第四个网页单独等待到超时后交给调用方单独调用
+        assert len(llm.calls) == 1 and llm.calls[0].count("\n### 网页 ") == 3
+        assert [result.data["标题"] for result in results[:3]] == ["a", "b", "c"]
+        assert results[3] is None
+        assert sum(result.usage["input_tokens"] for result in results[:3]) == 301
+        assert results[0].response_metadata["packed"] == {"pages": 3}
+        stats = packer.stats()
+        assert stats["packed_calls"] == 1 and stats["single"] == 1 and stats["calls_saved"] == 2
+        assert stats["input_tokens_saved"] > 0
+
+    @pytest.mark.asyncio
+    async def test_budget_splits_windows(self):
+        """测试再加入一个网页会超过令牌预算时先发出已收集的网页"""
+        llm = PackingLLM()
+        packer = PromptPacker(llm, "系统", budget_tokens=80, max_pages=8, max_wait=0.02)
+        urls = [f"https://site.test/{index}" for index in range(4)]
+        await asyncio.gather(
+            *(packer.submit(url, f"目标网站 URL：{url}\n" + "x" * 100) for url in urls)
+        )
+        assert [prompt.count("\n### 网页 ") for prompt in llm.calls] == [2, 2]
+
+    @pytest.mark.asyncio
+    async def test_malformed_output_falls_back(self):
+        """测试打包输出无法解析时所有网页都返回 None，由调用方单独调用"""
+        packer = PromptPacker(
+            PackingLLM(malformed=True), "系统", budget_tokens=1000, max_pages=2, max_wait=1
+        )
+        results = await asyncio.gather(
+            packer.submit("https://a.test/", "目标网站 URL：https://a.test/"),
+            packer.submit("https://b.test/", "目标网站 URL：https://b.test/"),
+        )
+        assert results == [None, None]
+        stats = packer.stats()
+        assert stats["fallbacks"] == 2 and stats["calls_saved"] == -1
+
+
+class RecordingLLM:
+    """记录收到的消息和调用参数的模拟模型，error 不为空时抛出该异常"""
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        if self.error:
+            raise self.error
+        return AIMessage(content="{}")
+
+
+class TestPromptCaching:
+    """提示词缓存测试"""
+
+    MESSAGES = [SystemMessage(content="静态前缀"), HumanMessage(content="网页内容")]
+
+    @pytest.mark.asyncio
+    async def test_anthropic_marks_system_prompt(self):
+        """测试 Anthropic 的系统提示词改为带 cache_control 的内容块"""
+        llm = RecordingLLM()
+        await PromptCachingChatModel(llm, "anthropic").ainvoke(self.MESSAGES)
+        messages, _ = llm.calls[0]
+        assert messages[0].content == [
+            {"type": "text", "text": "静态前缀", "cache_control": {"type": "ephemeral"}}
+        ]
+        assert messages[1] is self.MESSAGES[1]
+
+    @pytest.mark.asyncio
+    async def test_openai_uses_stable_cache_key(self):
+        """测试 OpenAI 请求带有由静态前缀决定的 prompt_cache_key"""
+        llm = RecordingLLM()
+        model = PromptCachingChatModel(llm, "openai")
+        await model.ainvoke(self.MESSAGES)
+        await model.ainvoke([self.MESSAGES[0], HumanMessage(content="另一个网页")])
+        keys = {kwargs["prompt_cache_key"] for _, kwargs in llm.calls}
+        assert len(keys) == 1
+
+    @pytest.mark.asyncio
+    async def test_gemini_context_cache(self):
+        """测试 Gemini 上下文缓存只创建一次，请求不再携带系统提示词；服务端拒绝缓存时改为照常发送"""
+        created = []
+
+        def create(llm, system_text, tools, ttl):
+            created.append((system_text, tools, ttl))
+            return "cachedContents/1"
+
+        base, bound = RecordingLLM(), RecordingLLM()
+        model = PromptCachingChatModel(
+            bound, "gemini", GeminiContextCache(base, tools=["schema"], ttl=600, create=create)
+        )
+        await asyncio.gather(model.ainvoke(self.MESSAGES), model.ainvoke(self.MESSAGES))
+        assert created == [("静态前缀", ["schema"], 600)]
+        assert all(kwargs == {"cached_content": "cachedContents/1"} for _, kwargs in base.calls)
+        assert all(messages == self.MESSAGES[1:] for messages, _ in base.calls)
+
+        base.error = StatusError(404)
+        await model.ainvoke(self.MESSAGES)
+        assert bound.calls[-1][0] == self.MESSAGES
+        # 一个缓存周期内不再使用上下文缓存
+        await model.ainvoke(self.MESSAGES)
+        assert len(base.calls) == 3 and len(bound.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_gemini_context_cache_rate_limit_not_swallowed(self):
+        """测试使用缓存的请求遇到 429 时直接抛出，由路由器或调用方重试"""
+        base = RecordingLLM(error=StatusError(429))
+        model = PromptCachingChatModel(
+            RecordingLLM(), "gemini", GeminiContextCache(base, create=lambda *args: "c")
+        )
+        with pytest.raises(StatusError):
+            await model.ainvoke(self.MESSAGES)
+
+    def test_enable_and_cache_tokens(self):
+        """测试只为需要改写请求的提供商加包装，并从用量明细中读取缓存令牌"""
+        llm = RecordingLLM()
+        assert enable_prompt_caching(llm, "groq") is llm
+        assert isinstance(enable_prompt_caching(llm, "anthropic"), PromptCachingChatModel)
+        with patch("src.llm.prompt_cache.settings.llm_prompt_caching", False):
+            assert enable_prompt_caching(llm, "anthropic") is llm
+        usage = {
+            "input_tokens": 1800,
+            "input_token_details": {"cache_read": 1500, "cache_creation": 0},
+        }
+        assert cache_tokens(usage) == {"cache_read": 1500}
@@ -0,0 +1,156 @@
+"""
+命令行测试
+包含命令行参数、批量模式读取 URL 列表和断点续跑的单元测试
+"""
+
+import io
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from rich.console import Console
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.main as main_module
+from config.settings import settings
+from src.main import build_agent_config, build_arg_parser, load_completed_urls, read_urls
+from src.tools.url_utils import normalize_url
+
+
+async def collect(input_path: str, skip: set[str]) -> list[str]:
+    return [url async for url in read_urls(input_path, skip)]
+
+
+class TestLoadCompletedUrls:
+    """断点续跑读取已完成 URL 的测试"""
+
+    def test_resume_from_partial_jsonl(self, tmp_path):
+        """测试只收集非 error 记录的规范化 URL，跳过空行和上次中断留下的不完整行"""
+        output = tmp_path / "out.jsonl"
+        records = [
+            {"url": "https://Example.com/a?utm_source=x", "status": "success"},
+            {"url": "https://b.test", "status": "error", "error": "timeout"},
+            {"url": "https://c.test/", "status": "parsed_error"},
+            {"status": "success"},
+        ]
+        lines = [json.dumps(record) for record in records]
+        partial = '{"url": "https://d.test", "sta'
+        output.write_text("\n".join(lines) + "\n   \n" + partial, encoding="utf-8")
+
+        assert load_completed_urls(str(output)) == {
+            normalize_url("https://example.com/a"), normalize_url("https://c.test"),
+        }
+
+    def test_missing_output_and_stdout(self, tmp_path):
+        """测试输出文件不存在或输出到标准输出时没有已完成的 URL"""
+        assert load_completed_urls(str(tmp_path / "missing.jsonl")) == set()
+        assert load_completed_urls("-") == set()
+
+
+class TestReadUrls:
+    """批量模式读取 URL 列表的测试"""
+
+    @pytest.mark.asyncio
+    async def test_skips_blank_whitespace_and_comment_lines(self, tmp_path):
+        """测试去掉首尾空白，跳过空行、只有空白的行和注释"""
+        urls = tmp_path / "urls.txt"
+        urls.write_text(
+            "  https://a.test/one  \n\n   \n\t\n# 注释\r\nhttps://b.test\r\n  # 缩进的注释\nhttps://c.test",
+            encoding="utf-8",
+        )
+        assert await collect(str(urls), set()) == [
+            "https://a.test/one", "https://b.test", "https://c.test",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_urls_yielded_once(self, tmp_path):
+        """测试规范化后相同的 URL 只产出第一次出现的写法"""
+        urls = tmp_path / "urls.txt"
+        urls.write_text(
+            "https://a.test\nhttps://A.test/\nhttps://b.test/x?utm_source=mail\n"
+            "https://b.test/x\nhttps://a.test#top\n",
+            encoding="utf-8",
+        )
+        assert await collect(str(urls), set()) == [
+            "https://a.test", "https://b.test/x?utm_source=mail",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_completed_urls(self, tmp_path):
+        """测试断点续跑：跳过输出文件中已完成的 URL，失败和未写完的 URL 重新处理"""
+        output = tmp_path / "out.jsonl"
+        output.write_text(
+            json.dumps({"url": "https://a.test/", "status": "success"}) + "\n"
+            + json.dumps({"url": "https://b.test/", "status": "error"}) + "\n"
+            + '{"url": "https://c.test/", "status": "succ',
+            encoding="utf-8",
+        )
+        urls = tmp_path / "urls.txt"
+        urls.write_text(
+            "https://A.test\nhttps://b.test\nhttps://c.test\nhttps://d.test\n", encoding="utf-8"
+        )
+
+        completed = load_completed_urls(str(output))
+        assert await collect(str(urls), completed) == [
+            "https://b.test", "https://c.test", "https://d.test",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_reads_file_in_chunks(self, tmp_path, monkeypatch):
+        """测试文件跨越多个读取块时不丢失、不拆断 URL"""
+        monkeypatch.setattr(main_module, "URL_READ_CHUNK_BYTES", 64)
+        expected = [f"https://site.test/page/{i}" for i in range(200)]
+        urls = tmp_path / "urls.txt"
+        urls.write_text("\n".join(expected) + "\n", encoding="utf-8")
+        assert await collect(str(urls), set()) == expected
+
+    @pytest.mark.asyncio
+    async def test_reads_stdin(self, monkeypatch):
+        """测试 '-' 从标准输入逐行读取，读完后不关闭标准输入"""
+        stdin = io.StringIO("https://a.test\n\nhttps://b.test\n")
+        monkeypatch.setattr(sys, "stdin", stdin)
+        assert await collect("-", set()) == ["https://a.test", "https://b.test"]
+        assert not stdin.closed
+
+
+class TestArguments:
+    """batch 和 worker 共用的提取开关测试"""
+
+    FLAGS = {
+        "router": "llm_router_enabled",
+        "stream": "llm_streaming",
+        "recrawl": "recrawl_enabled",
+        "site": "site_mode_enabled",
+        "pack": "llm_packing_enabled",
+    }
+
+    @pytest.mark.parametrize("command", ["batch", "worker"])
+    def test_flags_default_to_settings_and_can_be_turned_off(self, command):
+        """测试开关默认取配置中的值，--no-xxx 可以关闭配置中开启的功能，--xxx 可以开启"""
+        with patch.multiple(settings, **{name: True for name in self.FLAGS.values()}):
+            parser = build_arg_parser()
+        args = parser.parse_args([command])
+        assert all(getattr(args, flag) for flag in self.FLAGS)
+        args = parser.parse_args([command, *(f"--no-{flag}" for flag in self.FLAGS)])
+        assert not any(getattr(args, flag) for flag in self.FLAGS)
+
+        with patch.multiple(settings, **{name: False for name in self.FLAGS.values()}):
+            parser = build_arg_parser()
+        args = parser.parse_args([command, "--router", "--pack"])
+        assert args.router and args.pack and not args.site
+
+    def test_turned_off_flags_reach_agent_config(self):
+        """测试关闭的开关显式写入 Agent 配置，不会让 Agent 回退到配置中的默认值"""
+        with patch.multiple(settings, groq_api_key="test-key", llm_router_enabled=True,
+                            site_mode_enabled=True):
+            args = build_arg_parser().parse_args(
+                ["batch", "--provider", "groq", "--no-router", "--no-site", "--recrawl"]
+            )
+            config = build_agent_config(args, Console(stderr=True))
+        assert config["router"] is False
+        assert config["site"] is False
+        assert config["recrawl"] is True
@@ -0,0 +1,122 @@
+"""
+指标模块测试
+包含指标注册表、阶段追踪和本地指标端点的单元测试
+"""
+
+import asyncio
+import os
+import sys
+
+import aiohttp
+import pytest
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.metrics.registry import MetricsRegistry
+from src.metrics.server import MetricsServer
+from src.metrics.tracing import SpanExporter, current_span, span
+
+
+class TestRegistry:
+    """指标注册表测试"""
+
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("demo_total", "示例计数", ["status"])
+        counter.inc(status="ok")
+        counter.inc(2, status="ok")
+        histogram = registry.histogram("demo_seconds", "示例耗时", ["stage"], buckets=(0.1, 1.0))
+        histogram.observe(0.5, stage="llm")
+        gauge = registry.gauge("demo_depth", "示例队列", ["provider"])
+        gauge.set_function(lambda: 3, provider="groq")
+
+        text = registry.render()
+        assert "# TYPE demo_total counter" in text
+        assert 'demo_total{status="ok"} 3' in text
+        assert 'demo_seconds_bucket{stage="llm",le="0.1"} 0' in text
+        assert 'demo_seconds_bucket{stage="llm",le="1"} 1' in text
+        assert 'demo_seconds_bucket{stage="llm",le="+Inf"} 1' in text
+        assert 'demo_seconds_sum{stage="llm"} 0.5' in text
+        assert 'demo_depth{provider="groq"} 3' in text
+
+    def test_same_name_returns_same_metric(self):
+        registry = MetricsRegistry()
+        assert registry.counter("a_total", "a") is registry.counter("a_total", "a")
+
+
+class TestTracing:
+    """阶段追踪测试"""
+
+    def test_nested_spans_and_timings(self):
+        with span("extract", url="https://example.com") as root:
+            with span("fetch"):
+                assert current_span().name == "fetch"
+            with span("llm_call"):
+                pass
+            with span("llm_call"):
+                pass
+        assert current_span() is None
+
+        timings = root.timings()
+        assert set(timings) == {"extract", "fetch", "llm_call"}
+        children = [s for s in root.spans if s is not root]
+        assert all(s.trace_id == root.trace_id for s in children)
+        assert all(s.parent is root for s in children)
+
+    def test_error_recorded_on_span(self):
+        with pytest.raises(ValueError):
+            with span("json_parse") as failed:
+                raise ValueError("bad json")
+        assert failed.to_otel()["status"]["code"] == 2
+
+    def test_otlp_export_shape(self):
+        with span("extract", url="https://example.com", attempt=1) as root:
+            with span("fetch"):
+                pass
+        exporter = SpanExporter()
+        exporter.export(root)
+
+        payload = exporter.to_otlp()
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == ["fetch", "extract"]
+        assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+        assert "parentSpanId" not in spans[1]
+        assert {"key": "attempt", "value": {"intValue": "1"}} in spans[1]["attributes"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_tasks_have_separate_traces(self):
+        async def one(name):
+            with span("extract", url=name) as root:
+                await asyncio.sleep(0.01)
+                with span("fetch"):
+                    await asyncio.sleep(0.01)
+            return root
+
+        a, b = await asyncio.gather(one("a"), one("b"))
+        assert a.trace_id != b.trace_id
+        assert [s.name for s in a.spans] == ["fetch", "extract"]
+        assert [s.name for s in b.spans] == ["fetch", "extract"]
+
+
+class TestMetricsServer:
+    """本地指标端点测试"""
+
+    @pytest.mark.asyncio
+    async def test_serves_metrics_and_traces(self):
+        registry = MetricsRegistry()
+        registry.counter("served_total", "示例").inc()
+        exporter = SpanExporter()
+        with span("extract") as root:
+            pass
+        exporter.export(root)
+
+        async with MetricsServer(0, registry=registry, exporter=exporter) as server:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{server.port}/metrics") as response:
+                    assert response.status == 200
+                    assert "served_total 1" in await response.text()
+                async with session.get(f"http://127.0.0.1:{server.port}/traces") as response:
+                    payload = await response.json()
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert spans[0]["name"] == "extract"
@@ -0,0 +1,152 @@
+"""
+礼貌抓取调度测试
+包含按主机的并发与间隔限制、交错调度和 robots.txt 缓存（RFC 9309 的 4xx / 5xx 处理）的单元测试
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tools.politeness import PolitenessScheduler, RobotsCache, RobotsDisallowedError
+from src.tools.url_utils import host_key
+
+
+@pytest_asyncio.fixture
+async def robots_site():
+    """返回 robots.txt 的本地站点：禁止 /private，Request-rate 为每秒 5 次"""
+    hits = {"count": 0}
+
+    async def robots(request):
+        hits["count"] += 1
+        return web.Response(text="User-agent: *\nDisallow: /private\nRequest-rate: 5/1\n")
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    yield f"http://127.0.0.1:{runner.addresses[0][1]}", hits
+    await runner.cleanup()
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class TestHostKey:
+    """主机标识测试"""
+
+    def test_host_key(self):
+        assert host_key("https://Example.COM/a") == "example.com"
+        assert host_key("example.com:443/a") == "example.com"
+        assert host_key("http://example.com:8080/") == "example.com:8080"
+
+
+class TestPolitenessScheduler:
+    """按主机调度测试"""
+
+    @pytest.mark.asyncio
+    async def test_per_host_concurrency_and_delay(self):
+        scheduler = PolitenessScheduler(max_per_host=1, min_delay=0.05)
+        starts = {"a.test": [], "b.test": []}
+
+        async def fetch(url):
+            async with scheduler.slot(url):
+                starts[host_key(url)].append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(fetch(f"https://{host}/{i}") for host in starts for i in range(3)))
+
+        # 只断言下限（间隔由调度器保证），机器负载高时测试仍然稳定
+        for times in starts.values():
+            gaps = [b - a for a, b in zip(times, times[1:])]
+            assert all(gap >= 0.045 for gap in gaps)
+        # 不同主机互不等待：b.test 的第一个请求在 a.test 的第二个请求之前开始
+        assert starts["b.test"][0] < starts["a.test"][1]
+        stats = scheduler.stats()
+        assert stats["requests"] == 6
+        assert stats["hosts"]["a.test"]["max_wait_ms"] >= 90
+
+    @pytest.mark.asyncio
+    async def test_interleave_rotates_hosts(self):
+        scheduler = PolitenessScheduler(max_per_host=1, min_delay=0)
+        urls = [f"https://a.test/{i}" for i in range(3)] + [f"https://b.test/{i}" for i in range(3)]
+        order = []
+        held = None
+        # 每个 URL 处理到下一个 URL 被调度时才结束，刚调度的主机此时仍然占满名额
+        async for url in scheduler.interleave(_aiter(urls)):
+            order.append(host_key(url))
+            if held:
+                scheduler.unreserve(held)
+            held = url
+        assert order == ["a.test", "b.test"] * 3
+
+    @pytest.mark.asyncio
+    async def test_interleave_holds_busy_host(self):
+        scheduler = PolitenessScheduler(max_per_host=1, min_delay=0)
+        urls = ["https://a.test/1", "https://a.test/2", "https://b.test/1"]
+        stream = scheduler.interleave(_aiter(urls))
+        first = await anext(stream)
+        # a.test 的名额被第一个 URL 预留，第二个 URL 让位给 b.test
+        assert host_key(first) == "a.test"
+        assert await anext(stream) == "https://b.test/1"
+        waiter = asyncio.create_task(anext(stream))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        scheduler.unreserve(first)
+        assert await asyncio.wait_for(waiter, 1) == "https://a.test/2"
+
+
+class TestRobotsCache:
+    """robots.txt 缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_disallow_and_request_rate(self, robots_site):
+        base, hits = robots_site
+        scheduler = PolitenessScheduler(max_per_host=2, min_delay=0, robots=RobotsCache())
+        try:
+            async with scheduler.slot(f"{base}/public"):
+                pass
+            with pytest.raises(RobotsDisallowedError):
+                async with scheduler.slot(f"{base}/private/a"):
+                    pass
+            async with scheduler.slot(f"{base}/public2"):
+                pass
+        finally:
+            await scheduler.close()
+
+        host = scheduler.stats()["hosts"][host_key(base)]
+        assert host["delay_s"] == 0.2
+        assert host["disallowed"] == 1
+        assert host["robots"] == "ok"
+        # 第二个请求按 Request-rate 折算的间隔等待；robots.txt 只请求一次
+        assert host["max_wait_ms"] >= 150
+        assert hits["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_status_handling(self, monkeypatch):
+        cache = RobotsCache(unreachable_ttl=0)
+        codes = {"https://missing.test/robots.txt": 404, "https://down.test/robots.txt": 503}
+
+        async def fake_request(url):
+            return codes[url], ""
+
+        monkeypatch.setattr(cache, "_request", fake_request)
+        missing = await cache.get("https://missing.test/a")
+        assert missing.status == "missing" and missing.allowed("https://missing.test/a")
+        down = await cache.get("https://down.test/a")
+        assert down.status == "unreachable" and not down.allowed("https://down.test/a")
+
+        # 无法访问时缓存很快过期，恢复后重新请求
+        codes["https://down.test/robots.txt"] = 404
+        assert (await cache.get("https://down.test/a")).allowed("https://down.test/a")
+        assert cache.fetches == 3
@@ -0,0 +1,179 @@
+"""
+结果写出测试
+包含写出管道的分批与反压、写出目标出错时的处理，以及 JSONL、SQLite、Parquet 写出目标的单元测试
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sinks import JsonlSink, ParquetSink, ResultSink, SinkPipeline, SQLiteSink, create_sink
+from src.sinks.jsonl_sink import truncate_partial_line
+
+
+def make_result(index: int, status: str = "success") -> dict:
+    return {"url": f"https://example.com/{index}", "status": status, "标题": f"页面 {index}",
+            "usage": {"input_tokens": 100, "output_tokens": 20}, "timings": {"extract": 12.5}}
+
+
+class RecordingSink(ResultSink):
+    """记录每批结果的写出目标，可以模拟较慢的写出或写出失败"""
+
+    name = "recording"
+
+    def __init__(self, delay: float = 0.0, fail_after: int = -1):
+        self.delay = delay
+        self.fail_after = fail_after
+        self.batches = []
+        self.closed = False
+
+    def write_batch(self, results):
+        if len(self.batches) == self.fail_after:
+            raise OSError("磁盘已满")
+        time.sleep(self.delay)
+        self.batches.append(list(results))
+
+    def close(self):
+        self.closed = True
+
+
+class TestSinkPipeline:
+    """写出管道测试"""
+
+    @pytest.mark.asyncio
+    async def test_batches_preserve_order_and_drain_on_close(self):
+        sink = RecordingSink()
+        async with SinkPipeline(
+            [sink], queue_size=100, batch_size=8, flush_interval=0.05
+        ) as pipeline:
+            for index in range(20):
+                await pipeline.put(make_result(index))
+
+        written = [result["url"] for batch in sink.batches for result in batch]
+        assert written == [f"https://example.com/{index}" for index in range(20)]
+        assert all(len(batch) <= 8 for batch in sink.batches)
+        assert sink.closed
+        stats = pipeline.stats()
+        assert stats["written"] == 20
+        assert stats["batches"] == len(sink.batches)
+
+    @pytest.mark.asyncio
+    async def test_slow_sink_blocks_producer(self):
+        # 写出很慢时 put 在队列已满处等待，队列深度不超过容量
+        sink = RecordingSink(delay=0.02)
+        async with SinkPipeline([sink], queue_size=2, batch_size=1, flush_interval=0) as pipeline:
+            for index in range(10):
+                await pipeline.put(make_result(index))
+                assert pipeline.queue.qsize() <= 2
+
+        stats = pipeline.stats()
+        assert stats["written"] == 10
+        assert stats["blocked_puts"] > 0
+        assert stats["blocked_ms"] > 0
+        assert stats["max_queue_depth"] <= 2
+
+    @pytest.mark.asyncio
+    async def test_sink_error_reaches_producer(self):
+        # 写出出错后，正在等待的 put 不会永久阻塞，之后的 put 和 close 抛出该异常
+        sink = RecordingSink(fail_after=1)
+        pipeline = SinkPipeline([sink], queue_size=1, batch_size=1, flush_interval=0)
+        await pipeline.start()
+        with pytest.raises(OSError):
+            for index in range(10):
+                await asyncio.wait_for(pipeline.put(make_result(index)), 1.0)
+        with pytest.raises(OSError):
+            await pipeline.close()
+        assert sink.closed
+
+
+class TestResultSinks:
+    """JSONL、SQLite、Parquet 写出目标测试"""
+
+    @pytest.mark.asyncio
+    async def test_jsonl_appends_and_fsyncs_on_close(self, tmp_path):
+        path = tmp_path / "out" / "results.jsonl"
+        path.parent.mkdir()
+        path.write_text(json.dumps(make_result(0)) + "\n", encoding="utf-8")
+        sink = JsonlSink(str(path), fsync_interval=60)
+        async with SinkPipeline([sink], batch_size=4, flush_interval=0) as pipeline:
+            for index in range(1, 6):
+                await pipeline.put(make_result(index))
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["标题"] for line in lines] == [
+            f"页面 {index}" for index in range(6)
+        ]
+        # 间隔内不 fsync，关闭时 fsync 一次
+        assert sink.stats() == {"lines": 5, "fsyncs": 1}
+
+    @pytest.mark.asyncio
+    async def test_jsonl_truncates_partial_last_line_before_append(self, tmp_path):
+        # 上次运行写到一半时中断，留下不完整的最后一行
+        path = tmp_path / "results.jsonl"
+        path.write_text(
+            json.dumps(make_result(0)) + "\n" + json.dumps(make_result(1))[:25], encoding="utf-8"
+        )
+        sink = JsonlSink(str(path))
+        async with SinkPipeline([sink], flush_interval=0) as pipeline:
+            await pipeline.put(make_result(2))
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["标题"] for line in lines] == ["页面 0", "页面 2"]
+        assert sink.stats()["truncated_bytes"] == 25
+
+    @pytest.mark.asyncio
+    async def test_sqlite_wal_upsert_by_normalized_url(self, tmp_path):
+        path = str(tmp_path / "results.db")
+        async with SinkPipeline([SQLiteSink(path)], batch_size=3, flush_interval=0) as pipeline:
+            for index in range(5):
+                await pipeline.put(make_result(index, status="error"))
+            # 同一 URL 的新结果覆盖旧结果
+            await pipeline.put({**make_result(1), "url": "https://EXAMPLE.com/1#top"})
+
+        conn = sqlite3.connect(path)
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            rows = dict(conn.execute("SELECT url, status FROM results").fetchall())
+        finally:
+            conn.close()
+        assert len(rows) == 5
+        assert rows["https://EXAMPLE.com/1#top"] == "success"
+
+    @pytest.mark.asyncio
+    async def test_parquet_rolls_files_by_size(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        directory = tmp_path / "parquet"
+        sink = ParquetSink(str(directory), max_file_bytes=1)
+        async with SinkPipeline([sink], batch_size=2, flush_interval=0) as pipeline:
+            for index in range(6):
+                await pipeline.put(make_result(index))
+
+        files = sorted(directory.glob("results-*.parquet"))
+        assert len(files) == sink.stats()["files"] >= 2
+        assert not list(directory.glob("*.tmp"))
+        table = pq.read_table(files[0])
+        assert table.column("input_tokens").to_pylist()[0] == 100
+        assert json.loads(table.column("result").to_pylist()[0])["标题"] == "页面 0"
+
+    def test_truncate_partial_line_without_newline(self, tmp_path):
+        path = tmp_path / "results.jsonl"
+        path.write_bytes(b"{\"url\": \"https://exa")
+        assert truncate_partial_line(str(path)) == 20
+        assert path.read_bytes() == b""
+        assert truncate_partial_line(str(path)) == 0
+
+    def test_create_sink_from_spec(self, tmp_path):
+        assert isinstance(create_sink(f"jsonl:{tmp_path}/a.txt"), JsonlSink)
+        assert isinstance(create_sink(f"sqlite:{tmp_path}/a"), SQLiteSink)
+        assert isinstance(create_sink(f"{tmp_path}/a.jsonl"), JsonlSink)
+        assert isinstance(create_sink(f"{tmp_path}/a.sqlite3"), SQLiteSink)
+        with pytest.raises(ValueError):
+            create_sink(f"{tmp_path}/a.csv")
@@ -0,0 +1,78 @@
+"""
+页面文本压缩测试
+包含令牌估算和文本压缩的单元测试
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tools.text_compactor import TextCompactor, estimate_tokens, fit_json_ld
+
+
+class TestEstimateTokens:
+    """令牌估算测试"""
+
+    def test_mixed_text(self):
+        """测试中日韩字符按字计数，其余按 4 个字符计数"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("你好世界") == 4
+        assert estimate_tokens("abcdefgh") == 2
+
+
+class TestTextCompactor:
+    """文本压缩测试"""
+
+    def test_dedupe_and_boilerplate(self):
+        """测试合并空白、去除重复导航行和样板行"""
+        text = "Home\nAbout\n\nSkip to content\n  Welcome   to   Example  \n----\nHome\nAbout\n"
+        compacted, stats = TextCompactor(budget_tokens=1000).compact(text)
+        assert compacted == "Home\nAbout\nWelcome to Example"
+        assert stats["duplicate_lines"] == 2
+        assert stats["boilerplate_lines"] == 2
+        assert stats["dropped_sections"] == 0
+
+    def test_fits_budget_and_keeps_contact(self):
+        """测试超出预算时按片段筛选，并优先保留联系方式"""
+        paragraphs = [
+            f"Paragraph {i} describes product line {i} "
+            f"with features alpha{i} and beta{i} in detail."
+            for i in range(300)
+        ]
+        text = "\n".join(paragraphs + ["Contact us: info@example.com, +1 555 123 4567"])
+        compacted, stats = TextCompactor().compact(text, budget_tokens=500)
+        assert stats["original_tokens"] > 500
+        assert stats["compacted_tokens"] <= 500
+        assert stats["dropped_sections"] > 0
+        assert "info@example.com" in compacted
+        assert compacted.startswith("Paragraph 0 ")
+
+
+class TestFitJsonLd:
+    """结构化数据预算测试"""
+
+    def test_oversized_json_ld_stays_valid_and_within_budget(self):
+        """测试超出预算的 JSON-LD 按条目保留、缩短或丢弃，结果始终是预算内的合法 JSON"""
+        organization = {"@type": "Organization", "name": "示例公司", "email": "info@example.com"}
+        article = {"@type": "Article", "articleBody": "示例公司的产品介绍与技术文章。" * 400}
+        products = [
+            {"@type": "Product", "name": f"Product {i}", "description": "x" * 500}
+            for i in range(50)
+        ]
+        for budget in (50, 200, 1000):
+            text = fit_json_ld([organization, article, products], budget)
+            items = json.loads(text)
+            assert estimate_tokens(text) <= budget
+            assert items[0] == organization
+        # 长字符串被缩短而不是整条丢弃
+        assert json.loads(fit_json_ld([organization, article], 200))[1]["articleBody"].endswith("…")
+        assert fit_json_ld([article], 5) == ""
+        assert fit_json_ld([organization], 1000) == json.dumps([organization], ensure_ascii=False)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
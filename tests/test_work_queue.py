@@ -0,0 +1,156 @@
+"""
+工作队列测试
+包含 SQLite 工作队列（去重、租约、重试、幂等结果）、HTTP 协调器和工作进程的单元测试
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 将项目根目录添加到Python路径中
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.workqueue.remote import QueueServer, RemoteWorkQueue
+from src.workqueue.sqlite_queue import SQLiteWorkQueue
+from src.workqueue.worker import QueueWorker
+
+
+class FakeAgent:
+    """按 URL 返回固定结果的 Agent，URL 中包含 fail 时返回错误"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def extract(self, url):
+        self.calls.append(url)
+        await asyncio.sleep(0)
+        if "fail" in url:
+            return {"url": url, "status": "error", "error": "抓取失败"}
+        return {"url": url, "status": "success", "标题": url.rsplit("/", 1)[-1]}
+
+
+class TestSQLiteWorkQueue:
+    """SQLite 工作队列测试"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_deduplicates_normalized_urls(self, tmp_path):
+        async with SQLiteWorkQueue(str(tmp_path / "queue.sqlite3")) as queue:
+            counts = await queue.enqueue([
+                "https://Example.com/a",
+                "https://example.com/a#top",
+                "https://example.com/b",
+                "",
+            ])
+            assert counts == {"added": 2, "duplicates": 1}
+            assert (await queue.enqueue(["https://example.com/b"]))["duplicates"] == 1
+
+            jobs = await queue.lease("w1", 10)
+            assert [job.url for job in jobs] == ["https://Example.com/a", "https://example.com/b"]
+            assert await queue.lease("w2", 10) == []
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_redelivered_and_result_is_idempotent(self, tmp_path):
+        async with SQLiteWorkQueue(
+            str(tmp_path / "queue.sqlite3"), visibility_timeout=0.05
+        ) as queue:
+            await queue.enqueue(["https://example.com/a"])
+            first = (await queue.lease("w1"))[0]
+            await asyncio.sleep(0.1)
+            # 第一个租约过期（工作进程失联），任务重新投递
+            assert await queue.extend(first) is False
+            second = (await queue.lease("w2"))[0]
+            assert second.id == first.id and second.attempts == 2
+
+            assert (
+                await queue.complete(second, {"url": second.url, "status": "success", "n": 2}, "w2")
+                is True
+            )
+            # 失联的工作进程稍后写回结果：覆盖同一条结果，不产生重复
+            assert (
+                await queue.complete(first, {"url": first.url, "status": "success", "n": 1}, "w1")
+                is False
+            )
+            results = await queue.results()
+            assert len(results) == 1
+            assert results[0][1]["n"] == 1
+
+            stats = await queue.stats()
+            assert stats["backlog"]["done"] == 1
+            assert stats["workers"]["w2"]["completed"] == 1
+            assert stats["workers"]["w1"]["completed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_fail_retries_with_backoff_then_gives_up(self, tmp_path):
+        async with SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2) as queue:
+            await queue.enqueue(["https://example.com/a"])
+            job = (await queue.lease("w1"))[0]
+            assert await queue.fail(job, "超时", "w1") == "pending"
+            # 退避期间不可领取
+            assert await queue.lease("w1") == []
+            assert (await queue.stats())["backlog"]["ready"] == 0
+
+            # 跳过退避时间
+            queue._conn.execute("UPDATE jobs SET available_at = 0")
+            job = (await queue.lease("w1"))[0]
+            assert job.attempts == 2
+            assert await queue.fail(job, "超时", "w1") == "failed"
+            # 租约已结束，重复报告失败不会改变状态
+            assert await queue.fail(job, "超时", "w1") == "stale"
+
+            stats = await queue.stats()
+            assert stats["backlog"]["failed"] == 1
+            assert stats["workers"]["w1"]["failed"] == 2
+            assert (await queue.results())[0][1] == {
+                "url": "https://example.com/a",
+                "status": "error",
+                "error": "超时",
+            }
+
+    @pytest.mark.asyncio
+    async def test_release_returns_job_without_counting_attempt(self, tmp_path):
+        async with SQLiteWorkQueue(str(tmp_path / "queue.sqlite3")) as queue:
+            await queue.enqueue(["https://example.com/a"])
+            job = (await queue.lease("w1"))[0]
+            assert await queue.release(job) is True
+            again = (await queue.lease("w2"))[0]
+            assert again.attempts == 1
+
+
+class TestQueueWorker:
+    """工作进程与协调器测试"""
+
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue_through_coordinator(self, tmp_path):
+        urls = [f"https://example.com/page{i}" for i in range(10)] + ["https://example.com/fail"]
+        async with SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2) as queue:
+            async with QueueServer(queue, 0, token="secret") as server:
+                base_url = f"http://127.0.0.1:{server.port}"
+                async with RemoteWorkQueue(base_url, token="secret") as client:
+                    assert (await client.enqueue(urls + urls[:3]))["added"] == 11
+
+                    agents = [FakeAgent(), FakeAgent()]
+                    workers = [
+                        QueueWorker(agent, client, worker_id=f"w{i}", concurrency=2,
+                                    poll_interval=0.01, exit_when_idle=True)
+                        for i, agent in enumerate(agents)
+                    ]
+                    # 失败的任务退避 1 秒后重试一次
+                    counts = await asyncio.wait_for(
+                        asyncio.gather(*(worker.run() for worker in workers)), 10
+                    )
+
+                    assert sum(count["completed"] for count in counts) == 10
+                    assert sum(count["failed"] for count in counts) == 1
+                    stats = await client.stats()
+                    assert stats["backlog"]["done"] == 10
+                    assert stats["backlog"]["failed"] == 1
+                    assert set(stats["workers"]) == {"w0", "w1"}
+                    results = [result for _, result in await client.results()]
+                    assert len(results) == 11
+                    assert {result["url"] for result in results} == set(urls)
+
+                async with RemoteWorkQueue(base_url) as anonymous:
+                    with pytest.raises(Exception):
+                        await anonymous.stats()